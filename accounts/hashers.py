@@ -0,0 +1,59 @@
+"""
+Password hasher profiles.
+
+Every student in a class logs in within the same minute, and on a Raspberry
+Pi the default PBKDF2 hasher (600,000 SHA-256 rounds) is the most expensive
+thing those requests do. The "low-power" profile puts an Argon2 hasher
+tuned for small machines first: one lane and 19 MiB per hash (the OWASP
+minimum for Argon2id) instead of Django's 8 lanes and 100 MiB. Each login
+costs a fraction of the CPU time, and the memory cost keeps GPU guessing
+just as expensive.
+
+The other hashers stay in the list, so existing hashes still verify. Django
+re-hashes a password with the first hasher whenever a user logs in with a
+hash from another hasher or with other parameters, so switching profile
+upgrades every account on its next login.
+
+Argon2 needs the argon2-cffi package. Without it the low-power profile
+falls back to the default list.
+"""
+import importlib.util
+
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+DEFAULT_PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+PROFILES = {
+    'default': DEFAULT_PASSWORD_HASHERS,
+    # Replaces Django's Argon2 hasher - two hashers can't share an algorithm name
+    'low-power': ['accounts.hashers.LowPowerArgon2PasswordHasher'] + [
+        path for path in DEFAULT_PASSWORD_HASHERS if path != 'django.contrib.auth.hashers.Argon2PasswordHasher'
+    ],
+}
+
+
+class LowPowerArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id sized for a Raspberry Pi serving a class-wide login burst"""
+    algorithm = 'argon2'
+    time_cost = 2
+    memory_cost = 19 * 1024  # KiB
+    parallelism = 1
+
+
+def argon2_available():
+    return importlib.util.find_spec('argon2') is not None
+
+
+def get_password_hashers(profile):
+    """PASSWORD_HASHERS for a profile name"""
+    if profile not in PROFILES:
+        raise ValueError(f'Unknown password hasher profile {profile!r} (choose from {", ".join(PROFILES)})')
+    if profile == 'low-power' and not argon2_available():
+        return PROFILES['default']
+    return PROFILES[profile]
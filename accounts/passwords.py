@@ -0,0 +1,65 @@
+"""
+Hashing many passwords at once (roster imports).
+
+PBKDF2 is deliberately slow - most of a second per password on a Raspberry
+Pi - so hash_passwords() spreads the work over a process pool, one process
+per CPU core.
+
+Passwords are hashed at full strength unless provisional=True is passed.
+That opt-in (import_roster --provisional) uses a tenth of the hasher's
+iterations; Django re-hashes the password at full strength the first time
+it is used to log in (the hasher reports that the stored hash "must
+update"), but a student who never logs in keeps the weak hash, so it is
+only meant for sheets handed out and used straight away.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import get_hasher
+from django.utils.module_loading import import_string
+
+PROVISIONAL_ITERATIONS_DIVISOR = 10
+# Below this many passwords starting worker processes costs more than it saves
+MIN_PASSWORDS_FOR_POOL = 8
+
+
+def _encode(job):
+    """Hash one password in a worker process - needs no Django settings"""
+    hasher_path, password, salt, iterations = job
+    hasher = import_string(hasher_path)()
+    if iterations:
+        return hasher.encode(password, salt, iterations)
+    return hasher.encode(password, salt)
+
+
+def _verify(job):
+    """Check one password in a worker process; returns (matched, seconds)"""
+    hasher_path, password, encoded = job
+    started = time.perf_counter()
+    matched = import_string(hasher_path)().verify(password, encoded)
+    return matched, time.perf_counter() - started
+
+
+def hash_passwords(passwords, provisional=False, workers=None):
+    """
+    Encoded hashes of passwords (in order) with the default hasher, ready
+    to store in User.password. provisional=True hashes with a tenth of the
+    iterations (see above).
+    """
+    hasher = get_hasher()
+    hasher_path = f'{type(hasher).__module__}.{type(hasher).__qualname__}'
+    iterations = None
+    if provisional and getattr(hasher, 'iterations', None):
+        iterations = max(1, hasher.iterations // PROVISIONAL_ITERATIONS_DIVISOR)
+    jobs = [(hasher_path, password, hasher.salt(), iterations) for password in passwords]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < MIN_PASSWORDS_FOR_POOL:
+        return [_encode(job) for job in jobs]
+
+    # spawn, not fork: the web process has background threads, and forking
+    # them could copy a lock held mid-operation into the workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(_encode, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
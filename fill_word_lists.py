@@ -3,17 +3,45 @@
 Fill word lists to 2000 words each using Datamuse API.
 Fetches real English words and avoids phrases.
 Includes smart backfilling when letters run out of words.
+
+Every API response is kept in an on-disk cache (cache/datamuse/, one JSON
+file per query), so a second run - or a run that was interrupted - makes no
+request it has made before. Requests go through a small thread pool with a
+shared rate limit, and each finished word list is recorded in a checkpoint
+file so a resumed run skips it.
+
+    python fill_word_lists.py                  # fill all lists, resuming if interrupted
+    python fill_word_lists.py --restart        # forget the checkpoint (the cache is kept)
+    python fill_word_lists.py --offline        # cached responses only, no network
+    python fill_word_lists.py --lengths 3 4 5 --workers 8 --rate 10
+
+Run `python manage.py compile_words` afterwards to rebuild words.lexicon.
 """
 
-import requests
-import time
+import argparse
+import hashlib
+import json
+import os
 import random
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from collections import defaultdict
 
 # Target number of words per bucket
 TARGET_WORDS_PER_BUCKET = 2000
 
+API_URL = 'https://api.datamuse.com/words'
+
+BASE_DIR = Path(__file__).parent
+WORDS_DIR = BASE_DIR / 'game' / 'management' / 'commands'
+CACHE_DIR = BASE_DIR / 'cache' / 'datamuse'
+CHECKPOINT_PATH = BASE_DIR / 'cache' / 'fill_word_lists_checkpoint.json'
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
 # Letters with their relative frequency in English (to balance distribution)
 # Common letters get more words, rare letters get fewer
 LETTER_WEIGHTS = {
@@ -25,24 +53,114 @@ LETTER_WEIGHTS = {
     'z': 10
 }
 
-def fetch_words_for_length_and_letter(word_length, starting_letter):
+# A letter that returned at least this many words probably has more
+BACKFILL_THRESHOLD = 100
+
+
+class FetchFailed(Exception):
+    """Some of a word length's requests failed, so its list can't be finished this run"""
+
+
+class ResponseCache:
+    """API responses on disk, one JSON file per query URL"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, url):
+        return self.directory / f'{hashlib.sha1(url.encode()).hexdigest()}.json'
+
+    def get(self, url):
+        """The cached response body for url, or None"""
+        try:
+            with open(self.path(url), encoding='utf-8') as f:
+                return json.load(f)['data']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, url, data):
+        # Written to a temporary file first, so an interrupted run never
+        # leaves half a response behind
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(url)
+        temporary = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'data': data}, f)
+        os.replace(temporary, path)
+
+
+class RateLimiter:
+    """At most `rate` requests per second, shared by all threads"""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_slot = 0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class WordFetcher:
     """
-    Fetch words of a specific length starting with a specific letter from Datamuse API.
+    Fetches word lists from the API through the cache: each distinct query is
+    requested once, ever. With offline=True an uncached query returns no words.
     """
-    # Build the pattern: letter + (length-1) question marks
-    pattern = starting_letter + ('?' * (word_length - 1))
-    url = f"https://api.datamuse.com/words?sp={pattern}&max=1000"
-    
-    try:
-        print(f"  Fetching {word_length}-letter words starting with '{starting_letter}'...", end=' ')
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"❌ HTTP {response.status_code}")
-            return []
-        
-        data = response.json()
-        
+
+    def __init__(self, cache, api_url=API_URL, workers=4, rate=5, offline=False, timeout=10):
+        self.cache = cache
+        self.api_url = api_url
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.offline = offline
+        self.timeout = timeout
+        self.requests_made = 0
+        self.cache_hits = 0
+        self.lock = threading.Lock()
+
+    def url(self, word_length, starting_letter):
+        # The pattern: letter + (length-1) question marks
+        pattern = starting_letter + ('?' * (word_length - 1))
+        return f'{self.api_url}?{urllib.parse.urlencode({"sp": pattern, "max": 1000})}'
+
+    def get(self, url):
+        """The response body for url (cached, or fetched and cached), or None on failure"""
+        data = self.cache.get(url)
+        if data is not None:
+            with self.lock:
+                self.cache_hits += 1
+            return data
+        if self.offline:
+            return None
+
+        self.limiter.wait()
+        with self.lock:
+            self.requests_made += 1
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                data = json.loads(response.read().decode('utf-8'))
+        except (OSError, ValueError) as e:
+            # URLError and HTTPError are OSErrors; failures aren't cached, so
+            # the next run retries them
+            print(f"  ❌ {url}: {e}")
+            return None
+        self.cache.put(url, data)
+        return data
+
+    def fetch_words_for_length_and_letter(self, word_length, starting_letter):
+        """
+        Fetch words of a specific length starting with a specific letter.
+        None if the request failed (or, offline, was never cached).
+        """
+        data = self.get(self.url(word_length, starting_letter))
+        if data is None:
+            return None
+
         # Filter out phrases (anything with spaces) and ensure correct length
         words = []
         for item in data:
@@ -50,62 +168,99 @@ def fetch_words_for_length_and_letter(word_length, starting_letter):
             # Skip if it contains a space (phrase) or isn't the right length
             if ' ' not in word and len(word) == word_length and word.isalpha():
                 words.append(word)
-        
-        print(f"✓ Got {len(words)} words")
         return words
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        return []
 
-def fill_word_list(word_length):
+    def fetch_all_letters(self, word_length, letters=LETTERS):
+        """({letter: words} for the letters fetched, [letters whose request failed]), fetched concurrently"""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = dict(zip(letters, pool.map(lambda letter: self.fetch_words_for_length_and_letter(word_length, letter), letters)))
+        failed = [letter for letter, words in results.items() if words is None]
+        return {letter: words for letter, words in results.items() if words is not None}, failed
+
+
+class Checkpoint:
+    """The word lengths already filled by an interrupted run, and their counts"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.done = {int(length): count for length, count in json.load(f)['done'].items()}
+        except (OSError, ValueError, KeyError):
+            self.done = {}
+
+    def mark_done(self, word_length, count):
+        self.done[word_length] = count
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f'{self.path.name}.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'done': self.done}, f)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        self.done = {}
+        if self.path.exists():
+            self.path.unlink()
+
+
+def word_list_path(word_length, words_dir=WORDS_DIR):
+    return Path(words_dir) / f'{word_length}_letter_words.txt'
+
+
+def fill_word_list(word_length, fetcher, words_dir=WORDS_DIR):
     """
     Fill a word list file to TARGET_WORDS_PER_BUCKET words.
     Includes smart backfilling when letters run out of words.
+    Raises FetchFailed, leaving the file as it was, if any letter's request failed.
     """
-    file_path = Path(__file__).parent / 'game' / 'management' / 'commands' / f'{word_length}_letter_words.txt'
-    
+    file_path = word_list_path(word_length, words_dir)
+
     if not file_path.exists():
         print(f"⚠️  File not found: {file_path}")
         return
-    
+
     # Read existing words
     with open(file_path, 'r', encoding='utf-8') as f:
         existing_words = set(line.strip().lower() for line in f if line.strip())
-    
+
     current_count = len(existing_words)
     print(f"\n{'='*60}")
     print(f"📚 {word_length}-letter words")
     print(f"{'='*60}")
     print(f"Current count: {current_count}")
     print(f"Target count: {TARGET_WORDS_PER_BUCKET}")
-    
+
     if current_count >= TARGET_WORDS_PER_BUCKET:
         print(f"✅ Already has {current_count} words (>= {TARGET_WORDS_PER_BUCKET}). Skipping.")
-        return
-    
+        return current_count
+
     needed = TARGET_WORDS_PER_BUCKET - current_count
     print(f"Need to add: {needed} words\n")
-    
+
     # Collect new words from each letter
     letter_words = {}  # Track words collected per letter
     all_collected_words = set()
-    
+
     # Calculate how many words to fetch per letter based on weights
     total_weight = sum(LETTER_WEIGHTS.values())
-    
+
     # Phase 1: Fetch from all letters based on weights
     print("Phase 1: Fetching words from all letters...")
-    for letter in 'abcdefghijklmnopqrstuvwxyz':
+    fetched, failed_letters = fetcher.fetch_all_letters(word_length)
+    if failed_letters:
+        # Filling the list from the other letters would skew it, and a
+        # checkpointed list is never fetched again
+        raise FetchFailed(f"no response for {', '.join(failed_letters)} - the list is left for the next run")
+    for letter in LETTERS:
         # Calculate proportional number of words for this letter
         letter_proportion = LETTER_WEIGHTS[letter] / total_weight
         fetch_target = int(needed * letter_proportion * 1.5) + 20  # Extra buffer
-        
-        words = fetch_words_for_length_and_letter(word_length, letter)
-        
+
+        words = fetched[letter]
+
         # Filter out words we already have (existing or collected)
         new_words = [w for w in words if w not in existing_words and w not in all_collected_words]
-        
+
         if new_words:
             # Randomly sample to avoid bias
             sample_size = min(len(new_words), fetch_target)
@@ -114,140 +269,157 @@ def fill_word_list(word_length):
             all_collected_words.update(sampled)
         else:
             letter_words[letter] = []
-        
-        # Small delay to be nice to the API
-        time.sleep(0.2)
-    
+    print(f"  Got {sum(len(words) for words in fetched.values())} words for {len(LETTERS)} letters")
+
     # Flatten all collected words
     all_new_words = list(all_collected_words)
     random.shuffle(all_new_words)
-    
+
     print(f"\n📊 Phase 1 collected {len(all_new_words)} unique new words")
-    
-    # Phase 2: Smart backfilling if we're still short
+
+    # Phase 2: Smart backfilling if we're still short. The same query always
+    # returns the same words, so rather than asking again this draws on the
+    # words phase 1 fetched but didn't sample.
     if len(all_new_words) < needed:
         shortage = needed - len(all_new_words)
         print(f"\n⚠️  Still need {shortage} more words!")
         print(f"Phase 2: Smart backfilling from letters with available words...")
-        
+
         # Find letters that still have available words
-        letters_with_more = []
-        for letter in 'abcdefghijklmnopqrstuvwxyz':
-            # Check if this letter returned the max (likely has more)
-            if len(letter_words.get(letter, [])) >= 100:  # Arbitrary threshold
-                letters_with_more.append(letter)
-        
+        letters_with_more = [
+            letter for letter in LETTERS
+            if len(letter_words.get(letter, [])) >= BACKFILL_THRESHOLD
+        ]
+
         if letters_with_more:
             print(f"   Found {len(letters_with_more)} letters with potentially more words: {', '.join(letters_with_more)}")
-            
-            # Attempt to fill the gap
-            attempts = 0
-            max_attempts = len(letters_with_more) * 3  # Give it a good try
-            
-            while len(all_new_words) < needed and attempts < max_attempts:
+
+            while len(all_new_words) < needed and letters_with_more:
                 # Pick a random letter that likely has more words
                 letter = random.choice(letters_with_more)
-                
-                # Fetch again (API returns random order, so we might get different words)
-                print(f"   Backfill attempt {attempts + 1}: Fetching more from '{letter}'...", end=' ')
-                words = fetch_words_for_length_and_letter(word_length, letter)
-                
-                # Filter out words we already have
-                new_words = [w for w in words if w not in existing_words and w not in all_collected_words]
-                
+                new_words = [w for w in fetched[letter] if w not in existing_words and w not in all_collected_words]
+
                 if new_words:
-                    # Add the new words
                     random.shuffle(new_words)
-                    added_count = min(len(new_words), shortage)
-                    to_add = new_words[:added_count]
-                    
+                    to_add = new_words[:needed - len(all_new_words)]
                     all_new_words.extend(to_add)
                     all_collected_words.update(to_add)
-                    
-                    shortage = needed - len(all_new_words)
-                    print(f"✓ Added {added_count} words ({shortage} still needed)")
-                else:
-                    print(f"✗ No new words found")
-                    # Remove this letter from the pool
-                    letters_with_more.remove(letter)
-                    if not letters_with_more:
-                        print("   ⚠️  Exhausted all letters with available words")
-                        break
-                
-                attempts += 1
-                time.sleep(0.2)
-            
+                    print(f"   ✓ Added {len(to_add)} words from '{letter}' ({needed - len(all_new_words)} still needed)")
+                # Everything this letter returned is now used
+                letters_with_more.remove(letter)
+
             print(f"\n📊 Phase 2 collected {len(all_new_words) - (needed - shortage)} additional words")
         else:
             print("   ⚠️  No letters found with additional words available")
-    
+
     # Take only what we need
     words_to_add = all_new_words[:needed]
-    
+
     print(f"\n📝 Adding {len(words_to_add)} words to reach target")
-    
+
     if len(words_to_add) == 0:
         print(f"⚠️  Could not find enough new words")
-        return
-    
+        return current_count
+
     # Combine existing and new words
     all_words = sorted(list(existing_words) + words_to_add)
-    
-    # Write back to file
-    with open(file_path, 'w', encoding='utf-8') as f:
+
+    # Write back to file (via a temporary file, so an interrupted run never
+    # leaves a list half written)
+    temporary = file_path.with_name(f'{file_path.name}.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
         for word in all_words:
             f.write(word + '\n')
-    
+    os.replace(temporary, file_path)
+
     final_count = len(all_words)
     print(f"✅ Updated! Final count: {final_count} words")
-    
+
     if final_count < TARGET_WORDS_PER_BUCKET:
         shortage = TARGET_WORDS_PER_BUCKET - final_count
         print(f"⚠️  Still {shortage} words short of target (API may not have enough unique words)")
-    
+
     return final_count
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Fill the word lists from the Datamuse API')
+    parser.add_argument('--lengths', type=int, nargs='+', default=list(range(3, 21)), help='Word lengths to fill (default 3-20)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent requests (default 4)')
+    parser.add_argument('--rate', type=float, default=5, help='Requests per second across all workers (default 5)')
+    parser.add_argument('--offline', action='store_true', help='Use cached responses only - no network')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and fill every list again')
+    parser.add_argument('--api-url', default=API_URL, help='Datamuse-compatible endpoint (e.g. a local stand-in)')
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR), help=f'Response cache (default {CACHE_DIR})')
+    parser.add_argument('--checkpoint', default=str(CHECKPOINT_PATH), help=f'Checkpoint file (default {CHECKPOINT_PATH})')
+    parser.add_argument('--words-dir', default=str(WORDS_DIR), help='Directory of the *_letter_words.txt files')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """
     Main function to fill all word lists.
     """
+    args = parse_args(argv)
+    fetcher = WordFetcher(
+        ResponseCache(args.cache_dir),
+        api_url=args.api_url,
+        workers=args.workers,
+        rate=args.rate,
+        offline=args.offline,
+    )
+    checkpoint = Checkpoint(args.checkpoint)
+    if args.restart:
+        checkpoint.clear()
+
     print("=" * 60)
     print("WORD LIST FILLER - Datamuse API (Enhanced)")
     print("=" * 60)
     print(f"Target: {TARGET_WORDS_PER_BUCKET} words per bucket")
-    print(f"API: https://api.datamuse.com/words")
-    print(f"Features: Smart backfilling, duplicate detection")
+    print(f"API: {args.api_url}{' (offline - cache only)' if args.offline else ''}")
+    print(f"Fetching: {args.workers} workers, {args.rate:g} requests/s, cache in {args.cache_dir}")
+    print(f"Features: Smart backfilling, duplicate detection, resumable")
+    if checkpoint.done:
+        print(f"Resuming: {len(checkpoint.done)} lists already filled ({args.checkpoint})")
     print("=" * 60)
-    
+
     # Track results
     results = {}
-    
-    # Process word lists from 3 to 20 letters
-    for word_length in range(3, 21):
+    failed = []
+
+    for word_length in args.lengths:
+        if word_length in checkpoint.done:
+            results[word_length] = checkpoint.done[word_length]
+            continue
+        # Only a list whose every request came back is checkpointed; a failed
+        # one is fetched again (failures aren't cached) by the next run
         try:
-            final_count = fill_word_list(word_length)
-            results[word_length] = final_count if final_count else 0
+            final_count = fill_word_list(word_length, fetcher, args.words_dir)
         except Exception as e:
             print(f"❌ Error processing {word_length}-letter words: {e}")
             results[word_length] = 0
-    
+            failed.append(word_length)
+            continue
+        results[word_length] = final_count if final_count else 0
+        if final_count is not None:
+            checkpoint.mark_done(word_length, final_count)
+
     print("\n" + "=" * 60)
     print("✅ COMPLETE!")
     print("=" * 60)
-    
+    print(f"{fetcher.requests_made} requests, {fetcher.cache_hits} answered from the cache")
+
     # Summary
     print("\nFinal word counts:")
     total_words = 0
     buckets_at_target = 0
-    
-    for word_length in range(3, 21):
-        file_path = Path(__file__).parent / 'game' / 'management' / 'commands' / f'{word_length}_letter_words.txt'
+
+    for word_length in args.lengths:
+        file_path = word_list_path(word_length, args.words_dir)
         if file_path.exists():
             with open(file_path, 'r', encoding='utf-8') as f:
                 count = len([line for line in f if line.strip()])
-            
+
             total_words += count
-            
+
             if count >= TARGET_WORDS_PER_BUCKET:
                 status = "✅"
                 buckets_at_target += 1
@@ -255,25 +427,33 @@ def main():
                 status = "⚠️ "
             else:
                 status = "❌"
-            
+
             percentage = (count / TARGET_WORDS_PER_BUCKET) * 100
             print(f"  {status} {word_length:2d}-letter words: {count:4d} ({percentage:5.1f}%)")
-    
+
+    bucket_count = len(args.lengths)
     print(f"\n{'='*60}")
     print(f"📊 SUMMARY")
     print(f"{'='*60}")
     print(f"Total words across all buckets: {total_words:,}")
-    print(f"Buckets at {TARGET_WORDS_PER_BUCKET} target: {buckets_at_target}/18")
-    print(f"Average words per bucket: {total_words / 18:.0f}")
-    
-    if buckets_at_target == 18:
+    print(f"Buckets at {TARGET_WORDS_PER_BUCKET} target: {buckets_at_target}/{bucket_count}")
+    print(f"Average words per bucket: {total_words / bucket_count:.0f}")
+
+    if buckets_at_target == bucket_count:
         print(f"\n🎉 ALL BUCKETS FILLED TO TARGET! 🎉")
-    elif buckets_at_target >= 15:
+    elif buckets_at_target >= bucket_count * 0.8:
         print(f"\n🎊 Excellent! Most buckets filled!")
-    elif buckets_at_target >= 10:
+    elif buckets_at_target >= bucket_count * 0.5:
         print(f"\n👍 Good progress! Many buckets filled!")
     else:
         print(f"\n💪 Keep going! Some buckets need more words.")
 
+    if failed:
+        print(f"\n⚠️  Failed: {', '.join(map(str, failed))}-letter words - run again to resume")
+    else:
+        # Nothing left to resume; the next run starts over (from the cache)
+        checkpoint.clear()
+    print("\nRebuild the compiled lexicon with: python manage.py compile_words")
+
 if __name__ == '__main__':
     main()
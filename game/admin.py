@@ -2,8 +2,10 @@ from django.contrib import admin
 from .models import (
     Word, GameConfiguration, StudentProgress, GameSession,
     WordAttempt, BucketProgress, WordQueue, Classroom,
-    BucketLadder, CustomBucket, CustomWord
+    BucketLadder, CustomBucket, CustomWord, WordStats,
+    MisspellingPattern, AnalysisWatermark, ArchivedWordAttempt, TermSummary
 )
+from .word_search import prefix_filter, word_index_changed
 
 
 @admin.register(Classroom)
@@ -20,13 +22,77 @@ class WordAdmin(admin.ModelAdmin):
     list_display = ['text', 'difficulty_bucket', 'word_length']
     list_filter = ['difficulty_bucket']
     search_fields = ['text']
+    search_help_text = 'Words starting with the text, or, if none do, words containing it'
     ordering = ['difficulty_bucket', 'text']
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Words starting with the search term - a range on the text index, not
+        a LIKE scan. Only if none do ("tion") are words containing it searched.
+        """
+        if not search_term.strip():
+            return queryset, False
+        starting_with = queryset.filter(**prefix_filter(search_term))
+        if starting_with.exists():
+            return starting_with, False
+        return super().get_search_results(request, queryset, search_term)
+
+    # Keep the teachers' word search (word_search.py) in step with edits here
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        word_index_changed()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        word_index_changed()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        word_index_changed()
+
+
+@admin.register(WordStats)
+class WordStatsAdmin(admin.ModelAdmin):
+    list_display = ['word', 'difficulty', 'attempts', 'errors', 'students', 'avg_attempts_to_mastery', 'computed_at']
+    list_filter = ['word__difficulty_bucket']
+    search_fields = ['word__text']
+    ordering = ['-difficulty']
+    readonly_fields = [field.name for field in WordStats._meta.fields]
+
+
+@admin.register(MisspellingPattern)
+class MisspellingPatternAdmin(admin.ModelAdmin):
+    list_display = ['student', 'pattern', 'count', 'last_seen_at']
+    list_filter = ['pattern']
+    search_fields = ['student__username']
+    ordering = ['-count']
+    readonly_fields = [field.name for field in MisspellingPattern._meta.fields]
+
+
+@admin.register(AnalysisWatermark)
+class AnalysisWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['name', 'last_id', 'updated_at']
+
+
+@admin.register(ArchivedWordAttempt)
+class ArchivedWordAttemptAdmin(admin.ModelAdmin):
+    list_display = ['student', 'word', 'custom_word', 'is_correct', 'attempted_at', 'term']
+    list_filter = ['term', 'is_correct']
+    search_fields = ['student__username', 'word__text', 'custom_word__text']
+    raw_id_fields = ['student', 'word', 'custom_word']
+
+
+@admin.register(TermSummary)
+class TermSummaryAdmin(admin.ModelAdmin):
+    list_display = ['student', 'term', 'attempts', 'correct', 'first_attempt_at', 'last_attempt_at']
+    list_filter = ['term']
+    search_fields = ['student__username']
+
 
 @admin.register(GameConfiguration)
 class GameConfigurationAdmin(admin.ModelAdmin):
-    list_display = ['teacher', 'words_to_complete_bucket', 'recycling_distance']
-    list_filter = ['teacher']
+    list_display = ['teacher', 'words_to_complete_bucket', 'recycling_distance', 'scheduler', 'word_sampling']
+    list_filter = ['teacher', 'scheduler', 'word_sampling']
 
 
 @admin.register(StudentProgress)
@@ -61,10 +127,10 @@ class BucketProgressAdmin(admin.ModelAdmin):
 
 @admin.register(WordQueue)
 class WordQueueAdmin(admin.ModelAdmin):
-    list_display = ['student', 'word', 'position', 'times_failed', 'is_mastered']
+    list_display = ['student', 'word', 'due_key', 'times_failed', 'times_correct', 'streak', 'is_mastered']
     list_filter = ['is_mastered', 'times_failed']
     search_fields = ['student__username', 'word__text']
-    ordering = ['student', 'position']
+    ordering = ['student', 'due_key', 'position']
 
 
 class CustomBucketInline(admin.TabularInline):
@@ -0,0 +1,151 @@
+"""
+Term-based archiving of WordAttempt.
+
+archive_attempts() moves attempts older than a cutoff into
+ArchivedWordAttempt, labelled with a term name, and adds them to each
+student's TermSummary. WordAttempt - which the game and the everyday
+teacher pages query - then only holds the current term.
+
+Attempts at words a student still has in progress (unmastered in their
+WordQueue) are never archived: the game checks those to decide whether a
+bucket is finished.
+
+Each batch is copied, summarised and deleted in one transaction, so an
+interrupted run can simply be started again.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef, Q, Value
+
+from .misspellings import update_misspelling_index
+from .models import ArchivedWordAttempt, TermSummary, WordAttempt, WordQueue
+
+BATCH_SIZE = 5000
+
+# Columns copied from WordAttempt to ArchivedWordAttempt
+COPIED_COLUMNS = [
+    'student_id', 'word_id', 'custom_word_id', 'word_key', 'session_id',
+    'user_spelling', 'is_correct', 'attempt_number', 'attempted_at',
+]
+
+
+def get_archivable_attempts(cutoff):
+    """Attempts before cutoff, except those at words still in progress"""
+    in_progress = WordQueue.objects.filter(
+        student_id=OuterRef('student_id'),
+        word_key=OuterRef('word_key'),
+        is_mastered=False
+    )
+    return WordAttempt.objects.filter(attempted_at__lt=cutoff).exclude(Exists(in_progress))
+
+
+def archive_attempts(cutoff, term, batch_size=BATCH_SIZE, progress=None):
+    """
+    Move attempts before cutoff into the archive under term.
+    progress(archived) is called after each batch. Returns the number archived.
+    """
+    # Wrong answers must be in the misspelling index before they leave the hot table
+    update_misspelling_index()
+
+    archived = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                get_archivable_attempts(cutoff).filter(id__gt=last_id)
+                .order_by('id').values_list('id', 'student_id', 'is_correct', 'attempted_at')[:batch_size]
+            )
+            if not rows:
+                break
+            # The batch is the archivable attempts in an id range, so copying
+            # and deleting it takes two bound ids rather than one per row
+            # (SQLite before 3.32 allows at most 999)
+            batch = get_archivable_attempts(cutoff).filter(id__gt=last_id, id__lte=rows[-1][0])
+            _archive_batch(batch, rows, term)
+        last_id = rows[-1][0]
+        archived += len(rows)
+        if progress:
+            progress(archived)
+    return archived
+
+
+def _archive_batch(batch, rows, term):
+    """Archive batch (a WordAttempt queryset), whose rows are (id, student_id, is_correct, attempted_at)"""
+    # Copied in the database - building model instances for every row costs
+    # several times more than the copy itself
+    copied = batch.order_by().annotate(archive_term=Value(term)).values(*COPIED_COLUMNS, 'archive_term')
+    select, params = copied.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {ArchivedWordAttempt._meta.db_table} ({", ".join(COPIED_COLUMNS)}, term) {select}',
+            params
+        )
+
+    # student_id -> [attempts, correct, first, last]
+    totals = {}
+    for _, student_id, is_correct, attempted_at in rows:
+        entry = totals.setdefault(student_id, [0, 0, attempted_at, attempted_at])
+        entry[0] += 1
+        entry[1] += is_correct
+        entry[2] = min(entry[2], attempted_at)
+        entry[3] = max(entry[3], attempted_at)
+
+    existing = {
+        summary.student_id: summary
+        for summary in TermSummary.objects.filter(term=term, student_id__in=totals.keys())
+    }
+    to_create = []
+    to_update = []
+    for student_id, (attempts, correct, first, last) in totals.items():
+        summary = existing.get(student_id)
+        if summary is None:
+            to_create.append(TermSummary(
+                student_id=student_id,
+                term=term,
+                attempts=attempts,
+                correct=correct,
+                first_attempt_at=first,
+                last_attempt_at=last
+            ))
+        else:
+            summary.attempts += attempts
+            summary.correct += correct
+            summary.first_attempt_at = min(summary.first_attempt_at, first)
+            summary.last_attempt_at = max(summary.last_attempt_at, last)
+            to_update.append(summary)
+    TermSummary.objects.bulk_create(to_create)
+    TermSummary.objects.bulk_update(to_update, ['attempts', 'correct', 'first_attempt_at', 'last_attempt_at'])
+
+    batch.delete()
+
+
+def get_word_performance(student, full_history=False):
+    """
+    Per-word attempt counts for student_detail, most attempted first.
+    The current term only, unless full_history also adds the archive.
+    """
+    fields = ('word__text', 'word__difficulty_bucket')
+    tables = [WordAttempt]
+    if full_history:
+        tables.append(ArchivedWordAttempt)
+
+    performance = {}
+    for model in tables:
+        rows = model.objects.filter(student=student).values(*fields).annotate(
+            total_attempts=Count('id'),
+            correct_attempts=Count('id', filter=Q(is_correct=True))
+        ).order_by()
+        for row in rows:
+            key = (row['word__text'], row['word__difficulty_bucket'])
+            entry = performance.setdefault(key, {
+                'word__text': row['word__text'],
+                'word__difficulty_bucket': row['word__difficulty_bucket'],
+                'total_attempts': 0,
+                'correct_attempts': 0,
+            })
+            entry['total_attempts'] += row['total_attempts']
+            entry['correct_attempts'] += row['correct_attempts']
+
+    word_performance = sorted(performance.values(), key=lambda perf: perf['total_attempts'], reverse=True)
+    for perf in word_performance:
+        perf['accuracy'] = (perf['correct_attempts'] / perf['total_attempts'] * 100) if perf['total_attempts'] > 0 else 0
+    return word_performance
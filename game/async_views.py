@@ -0,0 +1,110 @@
+"""
+Async versions of the student game API (next word, submit answer, end session).
+
+Served by an ASGI server (see setup_production.sh), a request that is waiting
+on the database no longer ties up a whole worker process, so a handful of
+slow requests can't block the rest of the classroom. They return exactly the
+same JSON as the synchronous views in views.py and are switched in by
+settings.GAME_ASYNC_API (on by default when running under spelling_game.asgi).
+
+Next word and submit answer run the same game engine (game/engine) as the
+synchronous views, in one sync_to_async call each: an operation is a few
+queries and one transaction, and running it in a single worker-thread hop
+costs less than awaiting each query separately.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils import timezone
+
+from accounts.models import User
+from . import engine
+from .models import GameSession
+from .tracing import timed_view
+from .views import answer_submission
+
+
+# ===== HELPERS =====
+
+async def get_api_user(request):
+    """
+    Resolve request.user off the event loop (the session lookup is a
+    synchronous query). The classroom and teacher are loaded up front so
+    get_teacher() and uses_custom_ladder() never hit the database later.
+    Returns None for anonymous users.
+    """
+    def load_user():
+        if not request.user.is_authenticated:
+            return None
+        return User.objects.select_related(
+            'classroom__teacher', 'classroom__bucket_ladder', 'teacher'
+        ).get(pk=request.user.pk)
+
+    return await sync_to_async(load_user)()
+
+
+async def check_api_request(request, method):
+    """
+    Async equivalent of @login_required + @require_http_methods for the game API.
+    Returns (user, None) or (None, error_response).
+    """
+    if request.method != method:
+        return None, HttpResponseNotAllowed([method])
+
+    user = await get_api_user(request)
+    if user is None:
+        return None, redirect_to_login(request.get_full_path())
+
+    if user.is_teacher():
+        return None, JsonResponse({'error': 'Teachers cannot play the game'}, status=403)
+
+    return user, None
+
+
+# ===== VIEWS =====
+
+async def get_next_word(request):
+    """API endpoint to get the next word for the student (async version)"""
+    student, error_response = await check_api_request(request, 'GET')
+    if error_response:
+        return error_response
+
+    return JsonResponse(await sync_to_async(engine.next_word)(student))
+
+
+@timed_view('submit_answer')
+async def submit_answer(request):
+    """API endpoint to submit a word answer (async version)"""
+    student, error_response = await check_api_request(request, 'POST')
+    if error_response:
+        return error_response
+
+    return await sync_to_async(answer_submission)(student, json.loads(request.body))
+
+
+async def end_session(request):
+    """API endpoint to end the current session (async version)"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    student = await get_api_user(request)
+    if student is None:
+        return redirect_to_login(request.get_full_path())
+
+    session = await GameSession.objects.filter(student=student, is_active=True).afirst()
+
+    if session:
+        session.ended_at = timezone.now()
+        session.is_active = False
+        await session.asave()
+
+        return JsonResponse({
+            'session_id': session.id,
+            'words_correct': session.words_correct,
+            'words_attempted': session.words_attempted,
+            'accuracy': session.accuracy
+        })
+
+    return JsonResponse({'error': 'No active session'}, status=404)
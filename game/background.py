@@ -0,0 +1,56 @@
+"""
+Small in-process worker pool for work that shouldn't hold up a response,
+such as recomputing the progress widget and leaderboard after an answer.
+
+Tasks run on a thread pool inside the web worker, so nothing extra has to be
+installed or started on the Pi. Set GAME_BACKGROUND_TASKS = False to run
+tasks inline instead (useful for tests and debugging).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Create the shared thread pool on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'GAME_BACKGROUND_WORKERS', 2),
+                    thread_name_prefix='game-background'
+                )
+    return _executor
+
+
+def _run_task(func, args, kwargs):
+    """Run a task on a pool thread with its own database connection"""
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', func.__name__)
+    finally:
+        # Each pool thread gets its own connection - don't leak it
+        connection.close()
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Schedule func(*args, **kwargs) to run after the current transaction
+    commits, off the request thread.
+    """
+    if not getattr(settings, 'GAME_BACKGROUND_TASKS', True):
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+
+    transaction.on_commit(lambda: _get_executor().submit(_run_task, func, args, kwargs))
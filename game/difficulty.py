@@ -0,0 +1,170 @@
+"""
+Empirical word difficulty.
+
+compute_word_stats() reads WordAttempt and the archived terms
+(ArchivedWordAttempt) once, in ranges of word ids, ordered by (word, student,
+time). Each range is streamed with .iterator(), so memory
+holds one range's cursor batch plus the misspelling counts of the word being
+processed - never the whole table. For every default word it stores on
+WordStats:
+
+- attempts, errors and students
+- how many students mastered it, and the average number of answers that
+  took (the classic rule: right first time, or 3 correct answers once missed)
+- the most common wrong spellings
+- difficulty: the error rate smoothed towards the overall error rate, so a
+  word answered twice doesn't look impossibly hard or easy
+
+sample_new_words() uses difficulty to pick new words for the queue when a
+teacher chooses "easier words first" or "harder words first".
+"""
+import math
+import random
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import ExpressionWrapper, F, FloatField, Max, Value
+from django.utils import timezone
+
+from .models import ArchivedWordAttempt, Word, WordAttempt, WordStats
+from .scheduling import LegacyScheduler
+
+# Word ids per range - bounds the rows SQLite sorts at a time
+CHUNK_WORDS = 500
+# Rows fetched from the cursor at a time
+FETCH_SIZE = 2000
+TOP_MISSPELLINGS = 5
+# Each word's error rate is blended with the overall rate as if it had this many extra attempts
+PRIOR_ATTEMPTS = 10
+# How strongly difficulty tilts sampling: a word with difficulty 0.1 below
+# the candidates' average is about e^(4 * 0.1) = 1.5x as likely to be picked
+SAMPLING_STRENGTH = 4.0
+
+STATS_FIELDS = [
+    'attempts', 'errors', 'students', 'students_mastered',
+    'avg_attempts_to_mastery', 'common_misspellings', 'computed_at',
+]
+
+
+def build_word_stats(word_id, rows, computed_at):
+    """WordStats for one word from its attempt rows, ordered by student then time"""
+    attempts = errors = students = students_mastered = attempts_to_mastery = 0
+    misspellings = Counter()
+
+    for _, student_rows in groupby(rows, key=itemgetter(1)):
+        students += 1
+        correct = failed = 0
+        mastered_at = None
+        for number, (_, _, _, is_correct, spelling) in enumerate(student_rows, 1):
+            attempts += 1
+            if is_correct:
+                correct += 1
+            else:
+                failed += 1
+                errors += 1
+                if spelling:
+                    misspellings[spelling] += 1
+            if mastered_at is None and is_correct and (failed == 0 or correct >= LegacyScheduler.required_after_miss):
+                mastered_at = number
+        if mastered_at:
+            students_mastered += 1
+            attempts_to_mastery += mastered_at
+
+    return WordStats(
+        word_id=word_id,
+        attempts=attempts,
+        errors=errors,
+        students=students,
+        students_mastered=students_mastered,
+        avg_attempts_to_mastery=attempts_to_mastery / students_mastered if students_mastered else None,
+        common_misspellings=[list(item) for item in misspellings.most_common(TOP_MISSPELLINGS)],
+        computed_at=computed_at,
+    )
+
+
+def compute_word_stats(chunk_words=CHUNK_WORDS, progress=None):
+    """
+    Rebuild WordStats from WordAttempt and the archive in one streaming pass.
+    progress(words_done, attempts_done) is called after each range.
+    Returns (words, attempts).
+    """
+    computed_at = timezone.now()
+    max_word_id = Word.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    total_words = total_attempts = total_errors = 0
+
+    for low in range(0, max_word_id + 1, chunk_words):
+        hot, archived = (
+            model.objects.filter(
+                word_id__gte=low,
+                word_id__lt=low + chunk_words
+            ).values_list('word_id', 'student_id', 'attempted_at', 'is_correct', 'user_spelling').order_by()
+            for model in (WordAttempt, ArchivedWordAttempt)
+        )
+        rows = hot.union(archived, all=True).order_by(
+            'word_id', 'student_id', 'attempted_at'
+        ).iterator(chunk_size=FETCH_SIZE)
+
+        batch = [
+            build_word_stats(word_id, word_rows, computed_at)
+            for word_id, word_rows in groupby(rows, key=itemgetter(0))
+        ]
+        if batch:
+            WordStats.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['word'],
+                update_fields=STATS_FIELDS
+            )
+            total_words += len(batch)
+            total_attempts += sum(stats.attempts for stats in batch)
+            total_errors += sum(stats.errors for stats in batch)
+        if progress:
+            progress(total_words, total_attempts)
+
+    # Words whose attempts are all gone (deleted students) have no stats any more
+    WordStats.objects.filter(computed_at__lt=computed_at).delete()
+
+    # Smoothing needs the overall error rate, which is only known now
+    overall_rate = total_errors / total_attempts if total_attempts else 0
+    WordStats.objects.update(difficulty=ExpressionWrapper(
+        (F('errors') + Value(PRIOR_ATTEMPTS * overall_rate)) / (F('attempts') + Value(float(PRIOR_ATTEMPTS))),
+        output_field=FloatField()
+    ))
+    return total_words, total_attempts
+
+
+def get_word_difficulty(word):
+    """WordStats.difficulty of a Word fetched with select_related('stats'), or None"""
+    try:
+        return word.stats.difficulty
+    except (WordStats.DoesNotExist, AttributeError):
+        return None
+
+
+def sample_new_words(words, count, word_sampling='random'):
+    """
+    Pick up to count of words (a list) to add to the queue.
+    'easier_first' / 'harder_first' weight default words by difficulty -
+    words without stats count as average. Custom words have no stats, so
+    they are always picked at random. No queries if the words were fetched
+    with select_related('stats').
+    """
+    count = min(count, len(words))
+    if word_sampling not in ('easier_first', 'harder_first'):
+        return random.sample(words, count)
+
+    difficulties = [get_word_difficulty(word) for word in words]
+    known = [difficulty for difficulty in difficulties if difficulty is not None]
+    if not known:
+        return random.sample(words, count)
+    average = sum(known) / len(known)
+
+    direction = -1 if word_sampling == 'easier_first' else 1
+    keyed = []
+    for word, difficulty in zip(words, difficulties):
+        weight = math.exp(direction * SAMPLING_STRENGTH * ((difficulty if difficulty is not None else average) - average))
+        # Weighted sampling without replacement: the largest u ** (1 / weight) win
+        keyed.append((random.random() ** (1 / weight), word))
+    keyed.sort(key=itemgetter(0), reverse=True)
+    return [word for _, word in keyed[:count]]
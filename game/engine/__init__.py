@@ -0,0 +1,17 @@
+"""
+The spelling game's rules, apart from the views that serve them.
+
+    state.py       StudentGameState and load_state() - what the rules know about a student
+    queries.py     the other reads an operation makes, one query each
+    rules.py       pure functions: answer counters, bucket completion and moves, queue entries
+    persist.py     Changes and persist() - all of an operation's writes, in one transaction
+    operations.py  next_word() and submit_answer(), called by the sync and async views
+
+The number of queries of each operation only depends on the branch it takes,
+never on the size of the student's queue or history. The bounds are listed
+in GAME_ENGINE.md and checked by the tests in game/tests.py.
+"""
+from .operations import (
+    NEXT_WORD_QUERIES, SUBMIT_ANSWER_QUERIES, Submission, next_word, submit_answer
+)
+from .state import LOAD_QUERIES, StudentGameState, load_state
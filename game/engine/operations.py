@@ -0,0 +1,341 @@
+"""
+next_word() and submit_answer(): the game API's two operations.
+
+Each reads the student's state (load_state), asks the rules what happens,
+and makes every write in one persist() call. They return plain data - the
+views wrap it in a JsonResponse - and report their stages to the request's
+timing trace (see tracing.py).
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ..difficulty import sample_new_words
+from ..misspellings import spelling_feedback
+from ..models import GameSession, StudentProgress, WordAttempt
+from ..scheduling import next_due_entry
+from ..tracing import current_trace
+from . import queries, rules
+from .persist import Changes, persist
+from .state import load_state
+
+# Queries of the usual case, including the transaction's SAVEPOINT and
+# RELEASE (BEGIN and COMMIT outside tests). The tests in game/tests.py hold
+# the engine to these; see GAME_ENGINE.md for every branch.
+#   next_word: a word from the queue, new words queued
+NEXT_WORD_QUERIES = 10
+#   submit_answer: an answer to a queued word that doesn't master it
+SUBMIT_ANSWER_QUERIES = 14
+
+CORRECT = 'correct'
+WRONG = 'wrong'
+DUPLICATE = 'duplicate'
+BUCKET_COMPLETE = 'bucket_complete'
+GAME_COMPLETE = 'game_complete'
+
+
+class Submission:
+    """
+    Result of submit_answer(): the JSON body and status code of the response,
+    the recorded attempt (None if nothing was recorded) and the outcome for
+    the timing trace
+    """
+
+    def __init__(self, data, status=200, attempt=None, outcome=None):
+        self.data = data
+        self.status = status
+        self.attempt = attempt
+        self.outcome = outcome
+
+
+def next_word(student):
+    """The next word for student to spell, or the bucket/game they just completed"""
+    state = load_state(student)
+    progress = state.progress
+    changes = Changes()
+
+    # A bucket filled up by the last answers is left here once nothing is half-learned
+    bucket_progress = state.bucket_progress
+    words_in_progress = None
+    if rules.bucket_is_full(bucket_progress, state.config):
+        words_in_progress = queries.count_words_in_progress(state.bucket_queue(state.current_bucket))
+    if rules.bucket_is_done(bucket_progress, state.config, words_in_progress):
+        if not bucket_progress.is_completed:
+            bucket_progress.is_completed = True
+            changes.save(bucket_progress)
+
+        next_bucket = queries.find_next_bucket(state, state.current_bucket)
+        if next_bucket is None:
+            bucket_name = progress.get_current_bucket_display()
+            with transaction.atomic():
+                persist(changes)
+            return {
+                'game_complete': True,
+                'message': f'Congratulations! You have mastered all available buckets up to {bucket_name}!',
+                'words_mastered': bucket_progress.words_mastered,
+                'final_bucket': bucket_name
+            }
+
+        # Unmastered words of the old bucket won't be used anymore
+        changes.delete(state.bucket_queue(state.current_bucket))
+        move_to_next_bucket(state, next_bucket, changes)
+        with transaction.atomic():
+            persist(changes)
+        return {
+            'bucket_complete': True,
+            'new_bucket': progress.get_current_bucket_display(),
+            'words_mastered': bucket_progress.words_mastered
+        }
+
+    now = timezone.now()
+    queue_word = next_due_entry(
+        state.bucket_queue(state.current_bucket).select_related(state.word_field), now
+    )
+
+    # Always keep the queue topped up with new words from the bucket
+    available_words = queries.available_words(state)
+    new_words = sample_new_words(available_words, rules.NEW_WORDS_PER_REQUEST, state.config.word_sampling)
+    if new_words:
+        changes.add_to_queue(rules.new_queue_entries(
+            state.student, new_words, state.word_field, queries.queue_ends(state.student)
+        ))
+
+    if queue_word:
+        word_obj = getattr(queue_word, state.word_field)
+    elif not available_words:
+        # Nothing queued and nothing left in this bucket
+        next_bucket = queries.find_next_bucket(state, state.current_bucket)
+        if next_bucket is None:
+            bucket_name = progress.get_current_bucket_display()
+            return {
+                'game_complete': True,
+                'message': f'Congratulations! You have completed all available buckets up to {bucket_name}!'
+            }
+
+        move_to_next_bucket(state, next_bucket, changes)
+        with transaction.atomic():
+            persist(changes)
+        return {
+            'bucket_complete': True,
+            'new_bucket': progress.get_current_bucket_display()
+        }
+    else:
+        # Nothing queued in this bucket: a word still waiting from elsewhere
+        # in the queue goes first, otherwise the first of the new words
+        waiting = queries.first_due_entry(state.student, state.word_field, now)
+        word_obj = getattr(waiting, state.word_field) if waiting else new_words[0]
+
+    word_text, word_id = rules.word_payload(word_obj, state.using_custom)
+    # Shown on the teacher's live classroom monitor
+    changes.update(
+        StudentProgress.objects.filter(pk=progress.pk),
+        current_word_text=word_text,
+        current_word_at=now
+    )
+    with transaction.atomic():
+        persist(changes)
+
+    return {
+        'word_id': word_id,
+        'word': word_text,
+        'difficulty_bucket': progress.get_current_bucket_display(),
+        'bucket_complete': False
+    }
+
+
+def move_to_next_bucket(state, next_bucket, changes):
+    """Move the student on to next_bucket, with a BucketProgress there"""
+    rules.move_to_bucket(state.progress, next_bucket)
+    changes.save(state.progress)
+    state.bucket_progress = queries.find_bucket_progress(state, next_bucket)
+    if state.bucket_progress is None:
+        state.bucket_progress = state.new_bucket_progress(next_bucket)
+        changes.save(state.bucket_progress)
+
+
+def find_duplicate(student, client_attempt_id):
+    """
+    The original response to an answer already recorded under this client
+    attempt id (or a retry hint if it is still being processed), or None if
+    this is the first time we've seen the id
+    """
+    attempt = queries.find_submission(student, client_attempt_id)
+    if attempt is None:
+        return None
+
+    if attempt.response_data is None:
+        # The original request is still running - ask the client to try again shortly
+        return Submission({'error': 'Answer is still being processed', 'retry': True}, status=409, outcome=DUPLICATE)
+
+    response_data = dict(attempt.response_data)
+    response_data['duplicate'] = True
+    return Submission(response_data, outcome=DUPLICATE)
+
+
+def submit_answer(student, word_id, spelling, client_attempt_id=None):
+    """
+    Record student's spelling of word_id ('default_12' / 'custom_3') and
+    return a Submission. A retried submission (same client_attempt_id)
+    replays the original response instead of counting the answer twice.
+    """
+    trace = current_trace()
+    spelling = (spelling or '').strip().lower()
+    client_attempt_id = str(client_attempt_id or '').strip()[:64] or None
+
+    if client_attempt_id:
+        duplicate = find_duplicate(student, client_attempt_id)
+        if duplicate:
+            return duplicate
+
+    found = queries.find_word(word_id)
+    if found is None:
+        return Submission({'error': 'Word not found'}, status=404)
+    word_obj, is_custom = found
+    word_key = word_obj.word_key
+    trace.lap('word_lookup')
+
+    state = load_state(student)
+    student, progress, config = state.student, state.progress, state.config
+    trace.lap('state_load')
+    session = queries.active_session(student) or GameSession(student=student)
+    previous_attempts = queries.count_attempts(student, word_key)
+    queue_word = queries.find_queue_entry(student, word_key)
+    is_correct = spelling == word_obj.text.lower()
+    trace.set(student=student.id, correct=is_correct)
+    trace.lap('session_lookup')
+
+    # Written stage by stage in persist(), each lapped under its name
+    changes = Changes()
+    attempt = WordAttempt(
+        student=student,
+        session=session,
+        user_spelling=spelling,
+        is_correct=is_correct,
+        attempt_number=previous_attempts + 1,
+        client_attempt_id=client_attempt_id,
+        **{'custom_word' if is_custom else 'word': word_obj}
+    )
+    changes.save(session, attempt)
+    changes.stage('attempt_insert')
+    rules.count_answer(session, progress, word_obj, is_correct)
+    changes.save(progress)
+    changes.stage('progress_update')
+    trace.lap('progress_update')
+
+    newly_mastered = False
+    if queue_word:
+        # The scheduler decides whether the word is now mastered and, if not,
+        # when it comes back (counted in words from the front of the queue)
+        newly_mastered = state.scheduler.record_answer(
+            queue_word, is_correct, queries.queue_front_key(student), timezone.now(), config
+        )
+        changes.save(queue_word)
+        changes.stage('queue_update')
+        trace.lap('queue_update')
+
+    completion = None
+    if newly_mastered:
+        completion = master_word(state, word_obj, queue_word, changes)
+        changes.stage('mastery_check' if completion is None else 'bucket_advancement')
+
+    if completion is None:
+        correct_answers = 0
+        if queue_word is None:
+            correct_answers = queries.count_attempts(student, word_key, correct_only=True) + is_correct
+        correct_count, mastery_required = rules.word_mastery(state.scheduler, queue_word, correct_answers)
+        response_data = {
+            'correct': is_correct,
+            'correct_spelling': word_obj.text,
+            'bucket_complete': False,
+            'words_mastered': state.bucket_progress.words_mastered if state.bucket_progress else 0,
+            'words_to_complete': config.words_to_complete_bucket,
+            'session_correct': session.words_correct,
+            'session_attempted': session.words_attempted,
+            'total_correct': progress.total_words_correct,
+            'word_correct_count': correct_count,
+            'word_mastery_required': mastery_required,
+        }
+        if not is_correct:
+            # Distance and per-letter diff, so the game can highlight the wrong letters
+            response_data.update(spelling_feedback(word_obj.text.lower(), spelling))
+        outcome = CORRECT if is_correct else WRONG
+    else:
+        outcome, response_data = completion
+        response_data.update({
+            'correct': True,
+            'session_correct': session.words_correct,
+            'session_attempted': session.words_attempted,
+            'total_correct': progress.total_words_correct,
+        })
+    trace.lap('response_build')
+
+    try:
+        with transaction.atomic():
+            persist(changes)
+            response_data['status_version'] = attempt.id
+            if client_attempt_id:
+                # Kept for retries of this submission
+                attempt.response_data = response_data
+                attempt.save(update_fields=['response_data'])
+    except IntegrityError:
+        # A concurrent retry with the same attempt id got here first
+        return find_duplicate(student, client_attempt_id) or Submission(
+            {'error': 'Answer is still being processed', 'retry': True}, status=409, outcome=DUPLICATE
+        )
+    trace.lap('persist')
+    return Submission(response_data, attempt=attempt, outcome=outcome)
+
+
+def master_word(state, word_obj, queue_word, changes):
+    """
+    Count a newly mastered word towards its bucket. Returns None, or
+    (outcome, response fields) if that completed the bucket or the game.
+    """
+    # Custom ladders count towards the current bucket, default buckets
+    # towards the word's own
+    bucket = state.current_bucket if state.using_custom else word_obj.difficulty_bucket
+    if bucket == state.current_bucket:
+        bucket_progress = state.bucket_progress = state.bucket_progress or state.new_bucket_progress(bucket)
+    else:
+        bucket_progress = queries.find_bucket_progress(state, bucket) or state.new_bucket_progress(bucket)
+    bucket_progress.words_mastered += 1
+    changes.save(bucket_progress)
+
+    trace = current_trace()
+    if not rules.bucket_is_full(bucket_progress, state.config):
+        trace.lap('mastery_check')
+        return None
+    # The answered word itself is still unmastered in the database
+    words_in_progress = queries.count_words_in_progress(
+        state.bucket_queue(bucket).exclude(pk=queue_word.pk)
+    )
+    trace.lap('mastery_check')
+    if not rules.bucket_is_done(bucket_progress, state.config, words_in_progress):
+        return None
+
+    bucket_progress.is_completed = True
+    progress = state.progress
+    next_bucket = queries.find_next_bucket(state, bucket)
+    trace.lap('bucket_advancement')
+    if next_bucket is None:
+        if state.using_custom:
+            final_bucket = progress.get_current_bucket_display()
+            message = f'Congratulations! You have mastered all buckets in {progress.custom_bucket.ladder.name}!'
+        else:
+            final_bucket = bucket
+            message = f'Congratulations! You have mastered all available buckets up to {bucket}-letter words!'
+        return GAME_COMPLETE, {
+            'game_complete': True,
+            'words_mastered': bucket_progress.words_mastered,
+            'final_bucket': final_bucket,
+            'message': message,
+        }
+
+    # Unmastered words of the old bucket won't be used anymore
+    changes.delete(state.bucket_queue(bucket))
+    rules.move_to_bucket(progress, next_bucket)
+    changes.save(progress)
+    return BUCKET_COMPLETE, {
+        'bucket_complete': True,
+        'words_mastered': bucket_progress.words_mastered,
+        'new_bucket': progress.get_current_bucket_display() if state.using_custom else progress.current_bucket,
+    }
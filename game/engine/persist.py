@@ -0,0 +1,78 @@
+"""
+The single write step of an operation.
+
+Operations collect what they decided in a Changes object and hand it to
+persist() once, inside transaction.atomic(), so every answer or bucket move
+is written completely or not at all - and on SQLite, with one commit
+instead of one per statement.
+
+An operation can also split its writes into named stages (Changes.stage);
+persist() then makes them stage by stage and laps each on the request's
+timing trace, so a trace shows what the attempt insert or the bucket
+advancement cost inside the one transaction.
+"""
+from ..models import WordQueue
+from ..tracing import current_trace
+
+
+class Changes:
+    """Writes decided on by an operation, made in this order by persist()"""
+
+    def __init__(self):
+        self.saves = []
+        self.queue_entries = []
+        self.deletes = []
+        self.updates = []
+        self.stages = []
+
+    def save(self, *instances):
+        """Save (insert or update) instances, in order; saving one twice is a no-op"""
+        for instance in instances:
+            if not any(instance is saved for saved in self.saves):
+                self.saves.append(instance)
+
+    def add_to_queue(self, entries):
+        self.queue_entries.extend(entries)
+
+    def delete(self, queryset):
+        self.deletes.append(queryset)
+
+    def update(self, queryset, **values):
+        self.updates.append((queryset, values))
+
+    def stage(self, name):
+        """Time the writes added since the previous stage as `name` when they are persisted"""
+        self.stages.append((name, self._ends()))
+
+    def _ends(self):
+        return len(self.saves), len(self.queue_entries), len(self.deletes), len(self.updates)
+
+
+def persist(changes):
+    """
+    Make changes: saves first, then new queue entries (one INSERT), then
+    deletes and updates - so a queue entry saved as mastered is never caught
+    by a delete of its bucket's unmastered entries. With stages, each stage
+    is written in turn in that order and then lapped. Run inside
+    transaction.atomic().
+    """
+    trace = current_trace() if changes.stages else None
+    starts = (0, 0, 0, 0)
+    for name, ends in changes.stages + [(None, changes._ends())]:
+        _write(changes, starts, ends)
+        if name is not None:
+            trace.lap(name)
+        starts = ends
+
+
+def _write(changes, starts, ends):
+    """The writes of changes between the starts and ends counts"""
+    saves, queue_entries, deletes, updates = (slice(start, end) for start, end in zip(starts, ends))
+    for instance in changes.saves[saves]:
+        instance.save()
+    if changes.queue_entries[queue_entries]:
+        WordQueue.objects.bulk_create(changes.queue_entries[queue_entries])
+    for queryset in changes.deletes[deletes]:
+        queryset.delete()
+    for queryset, values in changes.updates[updates]:
+        queryset.update(**values)
@@ -0,0 +1,105 @@
+"""
+The reads an operation makes besides load_state() - one query each, so an
+operation's query count only depends on which branches it takes.
+"""
+from django.db.models import F, Max, Min, Q
+
+from ..models import BucketProgress, CustomBucket, CustomWord, GameSession, Word, WordAttempt, WordQueue
+from ..scheduling import due_now_filter
+
+
+def find_word(word_id):
+    """(word, is_custom) for a 'default_12' / 'custom_3' word id, or None"""
+    word_id = str(word_id or '')
+    is_custom = word_id.startswith('custom_')
+    model = CustomWord if is_custom else Word
+    try:
+        return model.objects.get(id=int(word_id.split('_')[1])), is_custom
+    except (ValueError, IndexError, model.DoesNotExist):
+        return None
+
+
+def find_submission(student, client_attempt_id):
+    """The attempt already recorded under client_attempt_id, if any"""
+    return WordAttempt.objects.filter(
+        student=student,
+        client_attempt_id=client_attempt_id
+    ).only('id', 'response_data').first()
+
+
+def active_session(student):
+    return GameSession.objects.filter(student=student, is_active=True).first()
+
+
+def count_attempts(student, word_key, correct_only=False):
+    attempts = WordAttempt.objects.filter(student=student, word_key=word_key)
+    if correct_only:
+        attempts = attempts.filter(is_correct=True)
+    return attempts.count()
+
+
+def find_queue_entry(student, word_key):
+    return WordQueue.objects.filter(student=student, word_key=word_key).first()
+
+
+def queue_front_key(student):
+    """Lowest due_key still waiting in the student's queue"""
+    return WordQueue.objects.filter(
+        student=student,
+        is_mastered=False
+    ).aggregate(min_key=Min('due_key'))['min_key'] or 0
+
+
+def queue_ends(student):
+    """(highest position, highest due_key) in the student's queue"""
+    ends = WordQueue.objects.filter(
+        student=student
+    ).aggregate(max_pos=Max('position'), max_key=Max('due_key'))
+    return ends['max_pos'] or 0, ends['max_key'] or 0
+
+
+def count_words_in_progress(queue_entries):
+    """
+    How many of queue_entries have been answered at least once. The entries
+    carry their own answer counts, so this is one COUNT, not a WordAttempt
+    lookup per word.
+    """
+    return queue_entries.filter(Q(times_failed__gt=0) | Q(times_correct__gt=0)).count()
+
+
+def first_due_entry(student, word_field, now):
+    """The student's unmastered entry of word_field that is due first (due now only)"""
+    return WordQueue.objects.filter(
+        due_now_filter(now),
+        student=student,
+        is_mastered=False,
+        **{f'{word_field}__isnull': False}
+    ).select_related(word_field).order_by('due_key', 'position').first()
+
+
+def available_words(state):
+    """Words of the current bucket the student has never had in their queue"""
+    queued = WordQueue.objects.filter(student=state.student).values('word_key')
+    if state.using_custom:
+        words = CustomWord.objects.filter(bucket=state.progress.custom_bucket).alias(key=F('id') * -1)
+    else:
+        words = Word.objects.filter(difficulty_bucket=state.progress.current_bucket).select_related('stats').alias(
+            key=F('id')
+        )
+    return list(words.exclude(key__in=queued))
+
+
+def find_next_bucket(state, bucket):
+    """The bucket after bucket (a CustomBucket or a word length), or None if it is the last"""
+    if state.using_custom:
+        return CustomBucket.objects.filter(
+            ladder_id=bucket.ladder_id,
+            position__gt=bucket.position
+        ).order_by('position').first()
+    if bucket and Word.objects.filter(difficulty_bucket=bucket + 1).exists():
+        return bucket + 1
+    return None
+
+
+def find_bucket_progress(state, bucket):
+    return BucketProgress.objects.filter(student=state.student, **state.bucket_lookup(bucket)).first()
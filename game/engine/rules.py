@@ -0,0 +1,74 @@
+"""
+The game rules as pure functions: they only read and change attributes of
+objects they are given, never the database, so they can be checked without
+one.
+
+Mastery and recycling of a single word are up to the classroom's scheduler
+(Scheduler.record_answer in scheduling.py), which works the same way.
+"""
+from ..models import CustomBucket, WordQueue
+
+NEW_WORDS_PER_REQUEST = 5
+
+
+def word_payload(word_obj, is_custom):
+    """(text, word id) sent to the game for a word"""
+    prefix = 'custom' if is_custom else 'default'
+    return word_obj.text, f'{prefix}_{word_obj.id}'
+
+
+def count_answer(session, progress, word_obj, is_correct):
+    """Add an answer to the session and overall counters; a correct one scores the word's length"""
+    session.words_attempted += 1
+    progress.total_attempts += 1
+    if is_correct:
+        session.words_correct += 1
+        progress.total_words_correct += 1
+        progress.total_points_earned += word_obj.word_length
+
+
+def bucket_is_full(bucket_progress, config):
+    """Enough words mastered in the bucket to leave it"""
+    return bucket_progress is not None and bucket_progress.words_mastered >= config.words_to_complete_bucket
+
+
+def bucket_is_done(bucket_progress, config, words_in_progress):
+    """A full bucket is only left once no half-learned words remain in it"""
+    return bucket_is_full(bucket_progress, config) and words_in_progress == 0
+
+
+def move_to_bucket(progress, bucket):
+    """Point progress at bucket (a CustomBucket or a word length)"""
+    if isinstance(bucket, CustomBucket):
+        progress.custom_bucket = bucket
+    else:
+        progress.current_bucket = bucket
+
+
+def word_mastery(scheduler, queue_word, correct_answers):
+    """
+    (correct answers so far, correct answers required) for a word; words
+    outside the queue need a single correct answer
+    """
+    if queue_word is not None:
+        return scheduler.mastery_progress(queue_word)
+    return correct_answers, 1
+
+
+def new_queue_entries(student, words, word_field, ends):
+    """
+    WordQueue entries for words, due after everything already queued
+    (ends: see queries.queue_ends). They are bulk-created, so word_key is
+    set here rather than by save().
+    """
+    max_position, max_due_key = ends
+    return [
+        WordQueue(
+            student=student,
+            position=max_position + i + 1,
+            due_key=max_due_key + i + 1,
+            word_key=word_obj.word_key,
+            **{word_field: word_obj}
+        )
+        for i, word_obj in enumerate(words)
+    ]
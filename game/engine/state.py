@@ -0,0 +1,83 @@
+"""
+What the game rules know about one student.
+
+load_state() reads it in LOAD_QUERIES queries, whatever the student's
+history: their StudentProgress with the user, classroom, teacher and current
+custom bucket joined in, the teacher's GameConfiguration, and the
+BucketProgress of the current bucket.
+"""
+from accounts.models import User
+from ..models import BucketProgress, GameConfiguration, StudentProgress, WordQueue, word_in_bucket
+from ..scheduling import get_scheduler
+
+LOAD_QUERIES = 3
+
+
+class StudentGameState:
+    """
+    A student's progress, configuration and current bucket progress.
+
+    A bucket is a CustomBucket for classrooms on a custom ladder and a word
+    length otherwise; the methods below build the lookups for either.
+    """
+
+    def __init__(self, progress, config, bucket_progress=None):
+        self.progress = progress
+        self.student = progress.student
+        self.config = config
+        self.bucket_progress = bucket_progress
+        self.using_custom = progress.uses_custom_ladder()
+        self.scheduler = get_scheduler(config)
+
+    @property
+    def word_field(self):
+        """WordQueue / WordAttempt field holding this student's words"""
+        return 'custom_word' if self.using_custom else 'word'
+
+    @property
+    def current_bucket(self):
+        return self.progress.custom_bucket if self.using_custom else self.progress.current_bucket
+
+    def bucket_lookup(self, bucket):
+        """BucketProgress field values for bucket"""
+        if self.using_custom:
+            return {'custom_bucket': bucket}
+        return {'bucket': bucket}
+
+    def bucket_queue(self, bucket):
+        """The student's unmastered queue entries in bucket"""
+        return WordQueue.objects.filter(word_in_bucket(bucket), student=self.student, is_mastered=False)
+
+    def new_bucket_progress(self, bucket):
+        return BucketProgress(student=self.student, **self.bucket_lookup(bucket))
+
+
+def load_config(student):
+    """
+    The student's teacher's configuration (the first one for students
+    without a teacher), created if there is none yet
+    """
+    teacher = student.get_teacher()
+    if teacher:
+        config = GameConfiguration.objects.filter(teacher=teacher).first()
+    else:
+        config = GameConfiguration.objects.first()
+
+    if not config:
+        config = GameConfiguration.objects.create(
+            teacher=User.objects.filter(role='teacher').first() or student
+        )
+    return config
+
+
+def load_state(student):
+    """Read a student's game state (LOAD_QUERIES queries once a configuration exists)"""
+    progress = StudentProgress.objects.select_related(
+        'student__classroom__teacher', 'student__classroom__bucket_ladder',
+        'student__teacher', 'custom_bucket__ladder'
+    ).get(student=student)
+    state = StudentGameState(progress, load_config(progress.student))
+    state.bucket_progress = BucketProgress.objects.filter(
+        student=state.student, **state.bucket_lookup(state.current_bucket)
+    ).first()
+    return state
@@ -0,0 +1,160 @@
+"""
+Grade-book CSV exports of a classroom.
+
+Each export is a generator of rows read in one joined query (select_related
+or values_list across relations) with .iterator(chunk_size=...), so a year of answers for a whole classroom is
+never held in memory: rows are written to the response as they are read.
+
+csv_chunks() turns rows into CSV text in ~64 KB pieces. Under ASGI the
+export is served through async_csv_chunks(), which reads each piece in a
+worker thread - a synchronous iterator would make Django read the whole
+export into a list before sending anything.
+"""
+import csv
+import io
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from accounts.models import User
+from .models import ArchivedWordAttempt, BucketProgress, GameSession, WordAttempt
+
+# Rows fetched from the database at a time
+EXPORT_CHUNK_SIZE = 2000
+# CSV text sent to the client at a time
+FLUSH_BYTES = 64 * 1024
+# Excel only opens UTF-8 CSV files correctly with a byte order mark
+UTF8_BOM = '\ufeff'
+
+STUDENT_COLUMNS = ['Username', 'First Name', 'Last Name']
+
+
+def format_time(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+def safe_cell(value):
+    """Stop spreadsheet programs from running typed text as a formula"""
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def student_cells(student):
+    return [safe_cell(student.username), safe_cell(student.first_name), safe_cell(student.last_name)]
+
+
+def attempt_rows(classroom, full_history=False):
+    """
+    One row per answer, oldest first; past terms too with full_history.
+    This is the big export, so it reads plain tuples from one joined query
+    instead of building four model instances per answer.
+    """
+    yield STUDENT_COLUMNS + [
+        'Word', 'Bucket', 'Answer', 'Correct', 'Attempt Number', 'Answered At', 'Session', 'Term'
+    ]
+    students = {
+        student.id: student_cells(student)
+        for student in User.objects.filter(classroom=classroom).only('username', 'first_name', 'last_name')
+    }
+    fields = [
+        'student_id', 'word__text', 'word__difficulty_bucket', 'custom_word__text', 'custom_word__bucket__name',
+        'user_spelling', 'is_correct', 'attempt_number', 'attempted_at', 'session_id',
+    ]
+    tables = [(WordAttempt, fields)]
+    if full_history:
+        tables.insert(0, (ArchivedWordAttempt, fields + ['term']))
+    for model, model_fields in tables:
+        attempts = model.objects.filter(
+            student__classroom=classroom
+        ).order_by('id').values_list(*model_fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        for row in attempts:
+            (student_id, word, bucket, custom_word, custom_bucket,
+             spelling, is_correct, attempt_number, attempted_at, session_id) = row[:10]
+            # A student who joined after the export started isn't in students yet
+            yield students.get(student_id, [student_id, '', '']) + [
+                custom_word or word,
+                custom_bucket if custom_word else bucket,
+                safe_cell(spelling),
+                'yes' if is_correct else 'no',
+                attempt_number,
+                format_time(attempted_at),
+                session_id,
+                row[10] if len(row) > 10 else '',
+            ]
+
+
+def session_rows(classroom):
+    """One row per game session, oldest first"""
+    yield STUDENT_COLUMNS + [
+        'Session', 'Started At', 'Ended At', 'Words Attempted', 'Words Correct', 'Accuracy %', 'Active'
+    ]
+    sessions = GameSession.objects.filter(
+        student__classroom=classroom
+    ).select_related('student').order_by('id').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for session in sessions:
+        accuracy = round(session.words_correct / session.words_attempted * 100, 1) if session.words_attempted else ''
+        yield student_cells(session.student) + [
+            session.id,
+            format_time(session.started_at),
+            format_time(session.ended_at),
+            session.words_attempted,
+            session.words_correct,
+            accuracy,
+            'yes' if session.is_active else 'no',
+        ]
+
+
+def progress_rows(classroom):
+    """One row per student and bucket, with the student's overall progress"""
+    yield STUDENT_COLUMNS + [
+        'Bucket', 'Words Mastered', 'Completed', 'Current Bucket', 'Total Points', 'Total Attempts', 'Total Correct'
+    ]
+    records = BucketProgress.objects.filter(
+        student__classroom=classroom
+    ).select_related(
+        'student__progress__custom_bucket', 'custom_bucket'
+    ).order_by('student__username', 'bucket', 'custom_bucket__position').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for record in records:
+        progress = getattr(record.student, 'progress', None)
+        yield student_cells(record.student) + [
+            record.custom_bucket.name if record.custom_bucket else record.bucket,
+            record.words_mastered,
+            'yes' if record.is_completed else 'no',
+            progress.get_current_bucket_display() if progress else '',
+            progress.total_points_earned if progress else '',
+            progress.total_attempts if progress else '',
+            progress.total_words_correct if progress else '',
+        ]
+
+
+EXPORTS = {
+    'attempts': attempt_rows,
+    'sessions': session_rows,
+    'progress': progress_rows,
+}
+
+
+def csv_chunks(rows):
+    """CSV text of rows in pieces of about FLUSH_BYTES"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write(UTF8_BOM)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def async_csv_chunks(rows):
+    """csv_chunks() for ASGI - each piece is produced in a worker thread"""
+    chunks = csv_chunks(rows)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,314 @@
+"""
+Learning-curve simulator for the bucket settings.
+
+Answers "with these settings, how many answers (and sessions) does a student
+need to finish a bucket?" by replaying the queue and mastery rules for a
+whole population of synthetic students at once. Every student is a row of
+NumPy arrays and each step answers one word for all of them, so thousands
+of students run in a few seconds.
+
+The model:
+- each word's chance of being spelled right comes from WordAttempt history,
+  first attempts and later attempts separately, shrunk towards the bucket
+  average so words with little history don't get extreme rates
+- each student gets an ability offset (normal, in log-odds) that applies to
+  every word
+- the queue follows get_next_word / submit_answer: words are introduced in
+  random order, the lowest due_key is shown next, the scheduler decides
+  mastery and the next due_key, and the bucket is complete once
+  words_to_complete_bucket words are mastered and no missed word is still
+  waiting to be mastered
+- wall-clock due_at waits are ignored (at normal pace they rarely matter)
+
+NumPy is only needed here; without it the command and the teacher preview
+report that the simulator is unavailable.
+"""
+try:
+    import numpy as np
+except ImportError:  # Optional - only the simulator needs it
+    np = None
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+
+from .models import CustomWord, GameSession, Word, WordAttempt
+from .scheduling import DEFAULT_SCHEDULER, SCHEDULERS
+
+# Used when a bucket has no answer history at all
+DEFAULT_FIRST_CORRECT_RATE = 0.7
+DEFAULT_REVIEW_CORRECT_RATE = 0.8
+# Each word's rate is blended with the bucket average as if it had this many extra attempts
+PRIOR_ATTEMPTS = 10
+DEFAULT_ABILITY_SPREAD = 1.0
+DEFAULT_SESSION_LENGTH = 20
+DEFAULT_MAX_ATTEMPTS = 5000
+WORD_RATES_CACHE_SECONDS = 600
+
+# Teacher config preview: small enough to answer within a couple of seconds
+PREVIEW_STUDENTS = 200
+PREVIEW_BUCKETS = 3
+PREVIEW_MAX_ATTEMPTS = 2000
+
+
+class SimulatorUnavailable(RuntimeError):
+    pass
+
+
+def require_numpy():
+    if np is None:
+        raise SimulatorUnavailable('The learning-curve simulator needs NumPy (pip install numpy)')
+
+
+def get_word_correct_rates(bucket=None, custom_bucket=None):
+    """
+    Per-word chance of a correct answer for a default bucket (word length)
+    or a CustomBucket. Returns {'first': [...], 'review': [...], 'attempts': n}
+    with one rate per word in the bucket. Cached for a few minutes.
+    """
+    if custom_bucket is not None:
+        cache_key = f'learning_curve:rates:custom:{custom_bucket.id}'
+    else:
+        cache_key = f'learning_curve:rates:{bucket}'
+    rates = cache.get(cache_key)
+    if rates is not None:
+        return rates
+
+    if custom_bucket is not None:
+        word_ids = list(CustomWord.objects.filter(bucket=custom_bucket).values_list('id', flat=True))
+        id_field = 'custom_word_id'
+        attempts = WordAttempt.objects.filter(custom_word__bucket=custom_bucket)
+    else:
+        word_ids = list(Word.objects.filter(difficulty_bucket=bucket).values_list('id', flat=True))
+        id_field = 'word_id'
+        attempts = WordAttempt.objects.filter(word__difficulty_bucket=bucket)
+
+    # One grouped query for the whole bucket
+    counts = {
+        row[id_field]: row
+        for row in attempts.values(id_field).annotate(
+            first=Count('id', filter=Q(attempt_number=1)),
+            first_correct=Count('id', filter=Q(attempt_number=1, is_correct=True)),
+            review=Count('id', filter=Q(attempt_number__gt=1)),
+            review_correct=Count('id', filter=Q(attempt_number__gt=1, is_correct=True)),
+        )
+    }
+    totals = {
+        key: sum(row[key] for row in counts.values())
+        for key in ('first', 'first_correct', 'review', 'review_correct')
+    }
+    first_mean = totals['first_correct'] / totals['first'] if totals['first'] else DEFAULT_FIRST_CORRECT_RATE
+    review_mean = totals['review_correct'] / totals['review'] if totals['review'] else DEFAULT_REVIEW_CORRECT_RATE
+
+    first_rates = []
+    review_rates = []
+    for word_id in word_ids:
+        row = counts.get(word_id, {'first': 0, 'first_correct': 0, 'review': 0, 'review_correct': 0})
+        first_rates.append((row['first_correct'] + PRIOR_ATTEMPTS * first_mean) / (row['first'] + PRIOR_ATTEMPTS))
+        review_rates.append((row['review_correct'] + PRIOR_ATTEMPTS * review_mean) / (row['review'] + PRIOR_ATTEMPTS))
+
+    rates = {
+        'first': first_rates,
+        'review': review_rates,
+        'attempts': totals['first'] + totals['review'],
+    }
+    cache.set(cache_key, rates, WORD_RATES_CACHE_SECONDS)
+    return rates
+
+
+def get_average_session_length(students=None):
+    """Average answers per finished session (optionally for some students only)"""
+    sessions = GameSession.objects.filter(is_active=False, words_attempted__gt=0)
+    if students is not None:
+        sessions = sessions.filter(student__in=students)
+    average = sessions.aggregate(avg=Avg('words_attempted'))['avg']
+    return average or DEFAULT_SESSION_LENGTH
+
+
+def _logit(rates):
+    rates = np.clip(np.asarray(rates, dtype=np.float64), 0.01, 0.99)
+    return np.log(rates / (1 - rates))
+
+
+def _schedule_legacy(scheduler, rng, correct, times_correct, streak, interval, ease, recycling_distance):
+    mastered = correct & (times_correct >= scheduler.required_after_miss)
+    interval = rng.integers(1, min(recycling_distance, 50) + 1, size=correct.size)
+    return mastered, interval, ease
+
+
+def _schedule_leitner(scheduler, rng, correct, times_correct, streak, interval, ease, recycling_distance):
+    boxes = np.asarray(scheduler.box_intervals)
+    mastered = streak >= len(boxes)
+    interval = boxes[np.minimum(streak, len(boxes) - 1)]
+    return mastered, interval, ease
+
+
+def _schedule_sm2(scheduler, rng, correct, times_correct, streak, interval, ease, recycling_distance):
+    quality = np.where(correct, scheduler.quality(True), scheduler.quality(False))
+    ease = np.maximum(scheduler.min_ease, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    first_intervals = np.asarray(scheduler.first_intervals)
+    early = streak <= len(first_intervals)
+    grown = np.where(
+        early,
+        first_intervals[np.clip(streak - 1, 0, len(first_intervals) - 1)],
+        np.round(interval * ease)
+    )
+    interval = np.where(correct, grown, 2)
+    mastered = correct & (interval >= scheduler.mastery_interval)
+    return mastered, interval, ease
+
+
+# Vectorized twins of Scheduler.schedule() in scheduling.py - keep them in step
+SCHEDULE_RULES = {
+    'legacy': _schedule_legacy,
+    'leitner': _schedule_leitner,
+    'sm2': _schedule_sm2,
+}
+
+
+def simulate_bucket(first_rates, review_rates, words_to_complete, recycling_distance=100,
+                    scheduler_name=DEFAULT_SCHEDULER, students=1000, ability_spread=DEFAULT_ABILITY_SPREAD,
+                    session_length=DEFAULT_SESSION_LENGTH, max_attempts=DEFAULT_MAX_ATTEMPTS, seed=None):
+    """
+    Simulate `students` students playing one bucket until it is complete.
+    Returns a summary dict (see summarize); students still going after
+    max_attempts answers count as not finished.
+    """
+    require_numpy()
+    rng = np.random.default_rng(seed)
+    bucket_size = len(first_rates)
+    if bucket_size == 0:
+        return summarize(np.full(students, -1), bucket_size, session_length)
+
+    scheduler = SCHEDULERS[scheduler_name]
+    schedule = SCHEDULE_RULES[scheduler_name]
+    target = min(words_to_complete, bucket_size)
+
+    # Column j is the j-th word a student is given. New words are due after
+    # everything already queued, so the only new word that can be next is
+    # the first one not seen yet (next_new); its due key is next_new + 1.
+    columns = min(bucket_size, max_attempts + 1)
+    order = rng.permuted(np.tile(np.arange(bucket_size), (students, 1)), axis=1)[:, :columns]
+    ability = rng.normal(0, ability_spread, size=(students, 1))
+    p_first = 1 / (1 + np.exp(-(_logit(first_rates)[order] + ability)))
+    p_review = 1 / (1 + np.exp(-(_logit(review_rates)[order] + ability)))
+    del order
+
+    times_correct = np.zeros((students, columns), dtype=np.int32)
+    times_failed = np.zeros((students, columns), dtype=np.int32)
+    streak = np.zeros((students, columns), dtype=np.int32)
+    interval = np.zeros((students, columns), dtype=np.float64)
+    ease = np.full((students, columns), SCHEDULERS['sm2'].default_ease)
+    next_new = np.zeros(students, dtype=np.int64)
+
+    # Missed words waiting for review: (due key, column) slots per student,
+    # grown when a student has more words in progress than slots
+    pending_key = np.full((students, 32), np.inf)
+    pending_col = np.zeros((students, 32), dtype=np.int64)
+
+    mastered_count = np.zeros(students, dtype=np.int32)
+    in_progress = np.zeros(students, dtype=np.int32)
+    attempts_needed = np.full(students, -1)
+
+    for step in range(max_attempts):
+        rows = np.flatnonzero(attempts_needed < 0)
+        if rows.size == 0:
+            break
+        index = np.arange(rows.size)
+
+        # get_next_word: lowest due key - the first unseen word or a pending review
+        slots = pending_key[rows].argmin(axis=1)
+        review_key = pending_key[rows, slots]
+        new_key = np.where(next_new[rows] < columns, next_new[rows] + 1, np.inf)
+        first_time = new_key < review_key
+        front_key = np.minimum(new_key, review_key)
+        stuck = np.isinf(front_key)
+        if stuck.any():
+            # Every word seen and mastered - the bucket has run out of words
+            attempts_needed[rows[stuck]] = step
+            rows, slots, first_time, front_key = rows[~stuck], slots[~stuck], first_time[~stuck], front_key[~stuck]
+            index = np.arange(rows.size)
+        cols = np.where(first_time, next_new[rows], pending_col[rows, slots])
+        next_new[rows] += first_time
+
+        # The student answers
+        probability = np.where(first_time, p_first[rows, cols], p_review[rows, cols])
+        correct = rng.random(rows.size) < probability
+
+        # submit_answer: Scheduler.record_answer
+        word_correct = times_correct[rows, cols] + correct
+        word_failed = times_failed[rows, cols] + ~correct
+        word_streak = np.where(correct, streak[rows, cols] + 1, 0)
+        rule_mastered, next_interval, next_ease = schedule(
+            scheduler, rng, correct, word_correct, word_streak,
+            interval[rows, cols], ease[rows, cols], recycling_distance
+        )
+        known = correct & (word_failed == 0)
+        newly_mastered = known | ((word_failed > 0) & rule_mastered)
+        rescheduled = ~newly_mastered
+
+        times_correct[rows, cols] = word_correct
+        times_failed[rows, cols] = word_failed
+        streak[rows, cols] = word_streak
+        ease[rows, cols] = np.where(known, ease[rows, cols], next_ease)
+        interval[rows, cols] = np.where(rescheduled, next_interval, interval[rows, cols])
+        due_key = front_key + next_interval
+
+        # Reviews keep their slot; a newly missed word takes a free one
+        review = ~first_time
+        pending_key[rows[review], slots[review]] = np.where(rescheduled[review], due_key[review], np.inf)
+        added = first_time & rescheduled
+        if added.any():
+            added_rows = rows[added]
+            free = np.isinf(pending_key[added_rows])
+            if not free.any(axis=1).all():
+                pending_key = np.hstack([pending_key, np.full(pending_key.shape, np.inf)])
+                pending_col = np.hstack([pending_col, np.zeros(pending_col.shape, dtype=np.int64)])
+                free = np.isinf(pending_key[added_rows])
+            free_slots = free.argmax(axis=1)
+            pending_key[added_rows, free_slots] = due_key[index[added]]
+            pending_col[added_rows, free_slots] = cols[added]
+
+        # Bucket progress: a missed word stays "in progress" until it is mastered
+        mastered_count[rows] += newly_mastered
+        in_progress[rows] += added.astype(np.int32) - (newly_mastered & ~known)
+        done = (mastered_count[rows] >= target) & (in_progress[rows] == 0)
+        attempts_needed[rows[done]] = step + 1
+
+    return summarize(attempts_needed, bucket_size, session_length)
+
+
+def summarize(attempts_needed, bucket_size, session_length):
+    finished = attempts_needed[attempts_needed >= 0]
+    summary = {
+        'words_in_bucket': bucket_size,
+        'students': int(attempts_needed.size),
+        'finished_share': finished.size / attempts_needed.size if attempts_needed.size else 0,
+        'session_length': round(float(session_length), 1),
+    }
+    if finished.size:
+        p10, p50, p90 = np.percentile(finished, [10, 50, 90])
+        summary.update({
+            'attempts_mean': round(float(finished.mean()), 1),
+            'attempts_p10': int(p10),
+            'attempts_p50': int(p50),
+            'attempts_p90': int(p90),
+            'sessions_mean': round(float(finished.mean()) / session_length, 1),
+            'sessions_p90': round(float(p90) / session_length, 1),
+        })
+    return summary
+
+
+def simulate_default_buckets(buckets, words_to_complete, recycling_distance, scheduler_name,
+                             students=1000, ability_spread=DEFAULT_ABILITY_SPREAD,
+                             session_length=DEFAULT_SESSION_LENGTH, max_attempts=DEFAULT_MAX_ATTEMPTS, seed=None):
+    """simulate_bucket for several default buckets; returns a list of summaries"""
+    results = []
+    for bucket in buckets:
+        rates = get_word_correct_rates(bucket=bucket)
+        summary = simulate_bucket(
+            rates['first'], rates['review'], words_to_complete, recycling_distance, scheduler_name,
+            students, ability_spread, session_length, max_attempts, seed
+        )
+        summary.update({'bucket': f'Bucket {bucket}', 'history_attempts': rates['attempts']})
+        results.append(summary)
+    return results
@@ -0,0 +1,250 @@
+"""
+The built-in word lists, compiled into one binary file.
+
+The lists are kept as 18 text files (game/management/commands/3..20_letter_words.txt,
+one word per line, the file's number is the word's bucket). Reading them
+means normalizing and deduplicating ~30,000 lines; compile_lexicon() does
+that once and writes words.lexicon next to them:
+
+    header        magic b'SSLX', format version, bucket count, word count
+    bucket table  per bucket: bucket, index of its first word, word count
+    offsets       word count + 1 little-endian uint32 byte offsets into the text
+    text          the words, UTF-8, one per line, grouped by bucket and sorted
+
+Lexicon reads that file through mmap without copying it, so loading costs
+one open() and a few struct reads, and a bucket's words are one decode and
+split.
+
+If settings.GAME_WORD_FREQUENCIES names a frequency list, the rarest words
+of each bucket are dropped on the way (word_frequency.py).
+
+load_lexicon() is what callers use: it opens the compiled file, or - if it
+is missing or older than a text file or the frequency list - compiles the
+text in memory instead, so editing a list never serves stale words.
+"""
+import mmap
+import os
+import struct
+import sys
+import unicodedata
+from array import array
+
+from .word_frequency import FrequencyFilter
+
+WORDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'management', 'commands')
+
+LEXICON_PATH = os.path.join(WORDS_DIR, 'words.lexicon')
+
+BUCKETS = range(3, 21)
+
+MAX_WORD_LENGTH = 100  # Word.text max_length
+
+MAGIC = b'SSLX'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHHI')  # magic, version, bucket count, word count
+BUCKET_ENTRY = struct.Struct('<HxxII')  # bucket, first word, word count
+
+# Default for the word_filter arguments below: the filter in settings, if any
+SETTINGS = 'settings'
+
+
+def source_path(bucket, words_dir=WORDS_DIR):
+    return os.path.join(words_dir, f'{bucket}_letter_words.txt')
+
+
+def normalize(text):
+    """A line of a word list as it is stored: trimmed, lowercase, composed accents"""
+    return unicodedata.normalize('NFC', text.strip().lower())
+
+
+def validate(word):
+    """Why word (normalized) can't be a game word, or None if it can"""
+    if not word.isalpha():
+        return 'not a single word of letters'
+    if len(word) > MAX_WORD_LENGTH:
+        return f'longer than {MAX_WORD_LENGTH} letters'
+    return None
+
+
+class Problem:
+    """A line left out of the lexicon"""
+
+    def __init__(self, filename, line_number, text, reason):
+        self.filename = filename
+        self.line_number = line_number
+        self.text = text
+        self.reason = reason
+
+    def __str__(self):
+        return f'{self.filename}:{self.line_number}: {self.text!r} - {self.reason}'
+
+
+class WordLists:
+    """
+    The text word lists after normalizing and deduplicating: words maps each
+    word to its bucket. A word listed in several files goes to the last one
+    (moved counts those), as load_words has always done. filtered holds the
+    frequency filter's {bucket: BucketReport} once it has run.
+    """
+
+    def __init__(self):
+        self.words = {}
+        self.problems = []
+        self.missing = []
+        self.moved = 0
+        self.lines = 0
+        self.filtered = None
+
+    @classmethod
+    def read(cls, words_dir=WORDS_DIR):
+        lists = cls()
+        for bucket in BUCKETS:
+            path = source_path(bucket, words_dir)
+            if not os.path.exists(path):
+                lists.missing.append(os.path.basename(path))
+                continue
+            with open(path, encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    lists.add(normalize(line), bucket, os.path.basename(path), line_number)
+        return lists
+
+    def add(self, word, bucket, filename, line_number):
+        if not word:
+            return
+        self.lines += 1
+        reason = validate(word)
+        if reason:
+            self.problems.append(Problem(filename, line_number, word, reason))
+            return
+        if self.words.get(word, bucket) != bucket:
+            self.moved += 1
+        self.words[word] = bucket
+
+
+def build(words):
+    """The compiled lexicon (bytes) for a {word: bucket} dict"""
+    by_bucket = {}
+    for word, bucket in words.items():
+        by_bucket.setdefault(bucket, []).append(word)
+    buckets = sorted(by_bucket)
+
+    table = []
+    offsets = array('I', [0])
+    text = bytearray()
+    for bucket in buckets:
+        bucket_words = sorted(by_bucket[bucket])
+        table.append(BUCKET_ENTRY.pack(bucket, len(offsets) - 1, len(bucket_words)))
+        for word in bucket_words:
+            text += word.encode('utf-8') + b'\n'
+            offsets.append(len(text))
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+
+    return b''.join([
+        HEADER.pack(MAGIC, VERSION, len(buckets), len(words)),
+        *table,
+        offsets.tobytes(),
+        bytes(text),
+    ])
+
+
+class Lexicon:
+    """Read-only view of a compiled lexicon (bytes or an mmap)"""
+
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        magic, version, bucket_count, word_count = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a word lexicon (or an older format) - run compile_words')
+        self.word_count = word_count
+
+        position = HEADER.size
+        self.table = {}
+        for _ in range(bucket_count):
+            bucket, first, count = BUCKET_ENTRY.unpack_from(self.buffer, position)
+            self.table[bucket] = (first, count)
+            position += BUCKET_ENTRY.size
+
+        offsets_end = position + 4 * (word_count + 1)
+        if sys.byteorder == 'little':
+            self.offsets = self.buffer[position:offsets_end].cast('I')
+        else:
+            self.offsets = array('I', self.buffer[position:offsets_end])
+            self.offsets.byteswap()
+        self.text = self.buffer[offsets_end:]
+
+    @classmethod
+    def open(cls, path=LEXICON_PATH):
+        with open(path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def from_words(cls, words):
+        return cls(build(words))
+
+    def __len__(self):
+        return self.word_count
+
+    def buckets(self):
+        return sorted(self.table)
+
+    def words(self, bucket):
+        """The bucket's words, sorted"""
+        if bucket not in self.table:
+            return []
+        first, count = self.table[bucket]
+        if not count:
+            return []
+        start, end = self.offsets[first], self.offsets[first + count]
+        return str(self.text[start:end - 1], 'utf-8').split('\n')
+
+    def items(self):
+        """(word, bucket) for every word, by bucket"""
+        for bucket in self.buckets():
+            for word in self.words(bucket):
+                yield word, bucket
+
+
+def read_word_lists(words_dir=WORDS_DIR, word_filter=SETTINGS):
+    """The text lists, passed through word_filter (a FrequencyFilter, or None for none)"""
+    if word_filter == SETTINGS:
+        word_filter = FrequencyFilter.from_settings()
+    lists = WordLists.read(words_dir)
+    if word_filter is not None:
+        lists.filtered = word_filter.apply(lists.words)
+    return lists
+
+
+def is_stale(path=LEXICON_PATH, words_dir=WORDS_DIR):
+    """The compiled file is missing, or a text list or the frequency list was changed after it was written"""
+    if not os.path.exists(path):
+        return True
+    compiled_at = os.path.getmtime(path)
+    sources = [source_path(bucket, words_dir) for bucket in BUCKETS]
+    word_filter = FrequencyFilter.from_settings()
+    if word_filter is not None:
+        sources.append(word_filter.path)
+    return any(
+        os.path.getmtime(source) > compiled_at
+        for source in sources
+        if os.path.exists(source)
+    )
+
+
+def compile_lexicon(path=LEXICON_PATH, words_dir=WORDS_DIR, word_filter=SETTINGS):
+    """Read the text lists and write the compiled file; returns the WordLists read"""
+    lists = read_word_lists(words_dir, word_filter)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(build(lists.words))
+    os.replace(temporary, path)
+    return lists
+
+
+def load_lexicon(path=LEXICON_PATH, words_dir=WORDS_DIR):
+    """The compiled lexicon, or the text lists compiled in memory if it is out of date"""
+    if is_stale(path, words_dir):
+        return Lexicon.from_words(read_word_lists(words_dir).words)
+    return Lexicon.open(path)
+
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.misspellings import rebuild_misspelling_index, update_misspelling_index
+
+
+class Command(BaseCommand):
+    help = 'Add wrong answers recorded since the last run to the misspelling pattern index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Forget the index and analyse every wrong answer again'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['rebuild']:
+            analysed = rebuild_misspelling_index()
+        else:
+            analysed = update_misspelling_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Analysed {analysed} wrong answers in {time.monotonic() - started:.1f}s'
+        ))
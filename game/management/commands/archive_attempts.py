@@ -0,0 +1,47 @@
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from game.archive import BATCH_SIZE, archive_attempts, get_archivable_attempts
+
+
+class Command(BaseCommand):
+    help = 'Move word attempts from past terms out of the hot table into the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Archive attempts before this date (YYYY-MM-DD), e.g. the first day of the new term')
+        parser.add_argument('--older-than-days', type=int, help='Archive attempts older than this many days instead')
+        parser.add_argument('--term', help='Name of the archived term, e.g. "2025-26 Fall" (default: "before <date>")')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Attempts moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the attempts that would be archived')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                day = datetime.strptime(options['before'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--before must be a date like 2026-01-05')
+            cutoff = timezone.make_aware(datetime.combine(day, dt_time.min))
+        elif options['older_than_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        else:
+            raise CommandError('Give --before or --older-than-days')
+
+        term = options['term'] or f'before {cutoff:%Y-%m-%d}'
+        if options['dry_run']:
+            count = get_archivable_attempts(cutoff).count()
+            self.stdout.write(f'{count} attempts before {cutoff:%Y-%m-%d %H:%M} would be archived as "{term}"')
+            return
+
+        started = time.monotonic()
+
+        def progress(archived):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {archived} attempts archived so far')
+
+        archived = archive_attempts(cutoff, term, options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} attempts as "{term}" in {time.monotonic() - started:.1f}s'
+        ))
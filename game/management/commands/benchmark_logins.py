@@ -0,0 +1,76 @@
+"""
+Measure how fast the password hashers get a class through its login burst.
+
+At the start of a period a whole class logs in at once. Nearly all of a
+login's CPU time is the password check, so each hasher profile gets a
+burst of --logins password checks spread over --workers processes (the
+Gunicorn sync workers). Also reported: the one-off cost of the first login
+after switching to a profile, when the stored hash is checked with the old
+hasher and re-hashed with the new one. Nothing touches the database.
+"""
+import multiprocessing
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from accounts.hashers import PROFILES, argon2_available
+from accounts.passwords import _verify
+
+PASSWORD = 'correct-horse-42'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark logins per second for a class-wide login burst with each password hasher profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=30, help='Students logging in at once')
+        parser.add_argument('--workers', type=int, default=3, help='Web worker processes sharing the burst (Gunicorn --workers)')
+        parser.add_argument('--profile', choices=list(PROFILES), help='Only benchmark this profile')
+
+    def handle(self, *args, **options):
+        if options['logins'] < 1 or options['workers'] < 1:
+            raise CommandError('--logins and --workers must be at least 1')
+        profiles = [options['profile']] if options['profile'] else list(PROFILES)
+        if 'low-power' in profiles and not argon2_available():
+            self.stdout.write(self.style.WARNING('argon2-cffi is not installed - skipping the low-power profile'))
+            profiles.remove('low-power')
+
+        self.stdout.write(f'{options["logins"]} logins over {options["workers"]} worker processes\n')
+        self.stdout.write(f"{'profile':<12}{'hasher':<32}{'ms/login':>10}{'burst s':>9}{'logins/s':>10}")
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=options['workers'], mp_context=context) as pool:
+            # Start every worker before timing anything
+            list(pool.map(time.sleep, [0.1] * options['workers']))
+            for profile in profiles:
+                path = PROFILES[profile][0]
+                hasher = import_string(path)()
+                encoded = hasher.encode(PASSWORD, hasher.salt())
+                jobs = [(path, PASSWORD, encoded)] * options['logins']
+
+                started = time.perf_counter()
+                results = list(pool.map(_verify, jobs))
+                elapsed = time.perf_counter() - started
+                if not all(matched for matched, _ in results):
+                    raise CommandError(f'{path} failed to verify its own hash')
+
+                per_login = statistics.fmean(seconds for _, seconds in results) * 1000
+                self.stdout.write(
+                    f'{profile:<12}{type(hasher).__name__:<32}{per_login:>10.1f}{elapsed:>9.2f}'
+                    f'{options["logins"] / elapsed:>10.1f}'
+                )
+
+        if 'low-power' in profiles:
+            # First login after the switch: check the old PBKDF2 hash, store an Argon2 one
+            old_hasher = PBKDF2PasswordHasher()
+            new_hasher = import_string(PROFILES['low-power'][0])()
+            old_encoded = old_hasher.encode(PASSWORD, old_hasher.salt())
+            started = time.perf_counter()
+            old_hasher.verify(PASSWORD, old_encoded)
+            new_hasher.encode(PASSWORD, new_hasher.salt())
+            upgrade = (time.perf_counter() - started) * 1000
+            self.stdout.write(f'\nFirst login after switching to low-power (check + re-hash): {upgrade:.0f} ms, once per student')
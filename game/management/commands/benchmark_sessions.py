@@ -0,0 +1,135 @@
+"""
+Compare the session storage profiles on the student game API.
+
+For each profile in settings.SESSION_ENGINES a throwaway student plays
+--answers rounds of /api/next-word/ + /api/submit-answer/ through the test
+client, and the queries of every request are counted: all of them, and
+those on django_session.
+
+Nothing touches the live data: the run plays against a throwaway test
+database (created like the test runner's, with the word list and game
+configuration copied in, and dropped at the end) and throwaway file caches
+in a temporary directory, so no session, widget or leaderboard entry is left
+behind in the shared cache.
+"""
+import contextlib
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from accounts.models import User
+from game.models import Classroom, GameConfiguration, Word
+
+
+class Command(BaseCommand):
+    help = 'Benchmark queries and time per game API request for each session storage profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--answers', type=int, default=50, help='Rounds of next word + submit answer per profile')
+        parser.add_argument('--profile', choices=list(settings.SESSION_ENGINES), help='Only benchmark this profile')
+
+    def handle(self, *args, **options):
+        if options['answers'] < 1:
+            raise CommandError('--answers must be at least 1')
+        profiles = [options['profile']] if options['profile'] else list(settings.SESSION_ENGINES)
+
+        self.stdout.write(f'{options["answers"]} rounds per profile (current profile: {settings.SESSION_PROFILE})\n')
+        self.stdout.write(
+            f"{'profile':<16}{'endpoint':<22}{'queries':>9}{'session q':>11}{'mean ms':>9}{'p95 ms':>8}"
+        )
+        words = list(Word.objects.all())
+        configurations = list(GameConfiguration.objects.all())
+        with tempfile.TemporaryDirectory() as cache_dir, self.throwaway_database():
+            Word.objects.bulk_create(words, batch_size=500)
+            GameConfiguration.objects.bulk_create(configurations)
+            for profile in profiles:
+                # Background tasks run inline, right after each request commits,
+                # so their queries are counted with the request that queued them
+                with override_settings(
+                    SESSION_ENGINE=settings.SESSION_ENGINES[profile],
+                    CACHES=self.throwaway_caches(os.path.join(cache_dir, profile)),
+                    GAME_BACKGROUND_TASKS=False,
+                    ALLOWED_HOSTS=['testserver']
+                ):
+                    results = self.run_profile(profile, options['answers'])
+                for endpoint, (queries, session_queries, timings) in results.items():
+                    timings.sort()
+                    self.stdout.write(
+                        f'{profile:<16}{endpoint:<22}{statistics.fmean(queries):>9.1f}'
+                        f'{statistics.fmean(session_queries):>11.1f}{statistics.fmean(timings) * 1000:>9.1f}'
+                        f'{timings[len(timings) * 95 // 100] * 1000:>8.1f}'
+                    )
+
+    @contextlib.contextmanager
+    def throwaway_database(self):
+        """Point the default connection at a freshly migrated test database, dropped afterwards"""
+        live_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(live_name, verbosity=0)
+
+    def throwaway_caches(self, directory):
+        """settings.CACHES with every cache moved under directory"""
+        return {
+            alias: {**cache_settings, 'LOCATION': os.path.join(directory, alias)}
+            for alias, cache_settings in settings.CACHES.items()
+        }
+
+    def run_profile(self, profile, answers):
+        results = {'/api/next-word/': ([], [], []), '/api/submit-answer/': ([], [], [])}
+        client = self.make_player(profile)
+        for round_number in range(answers):
+            response = self.request(results['/api/next-word/'], client.get, '/api/next-word/')
+            data = response.json()
+            if 'word_id' not in data:
+                continue
+            payload = json.dumps({
+                'word_id': data['word_id'],
+                'spelling': data['word'],
+                'attempt_id': f'benchmark-{round_number}',
+            })
+            self.request(
+                results['/api/submit-answer/'], client.post, '/api/submit-answer/',
+                payload, content_type='application/json'
+            )
+        return results
+
+    def make_player(self, profile):
+        teacher = User.objects.create(username=f'session-benchmark-teacher-{profile}', role='teacher')
+        classroom = Classroom.objects.create(name=f'Session benchmark ({profile})', teacher=teacher)
+        bucket = classroom.default_starting_bucket
+        if Word.objects.filter(difficulty_bucket=bucket).count() < 20:
+            Word.objects.bulk_create([
+                Word(text=f'benchmark{"x" * bucket}{index}', difficulty_bucket=bucket, word_length=bucket)
+                for index in range(20)
+            ], ignore_conflicts=True)
+        student = User.objects.create(
+            username=f'session-benchmark-student-{profile}', role='student', classroom=classroom, teacher=teacher
+        )
+        client = Client()
+        client.force_login(student)
+        # The game page sets up the student's progress
+        client.get('/play/')
+        return client
+
+    def request(self, result, method, *args, **kwargs):
+        queries, session_queries, timings = result
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = method(*args, **kwargs)
+            timings.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise CommandError(f'{args[0]} returned {response.status_code}')
+        queries.append(len(captured))
+        session_queries.append(sum('django_session' in query['sql'] for query in captured))
+        return response
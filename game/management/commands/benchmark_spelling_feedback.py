@@ -0,0 +1,79 @@
+"""
+Time the spelling alignment used by submit_answer on the full word list.
+
+Every word in the word lists (game.lexicon) gets one synthetic misspelling (a
+wrong, missing, extra or swapped letter, like real answers) and each routine
+is timed per call. Nothing touches the database.
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.lexicon import load_lexicon
+from game.misspellings import classify, edit_distance, spelling_feedback
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+def load_word_list():
+    lexicon = load_lexicon()
+    return sorted(word for bucket in lexicon.buckets() for word in lexicon.words(bucket))
+
+
+def misspell(word, rng):
+    """word with one random edit"""
+    position = rng.randrange(len(word))
+    edit = rng.choice(('sub', 'del', 'ins', 'swap'))
+    if edit == 'sub':
+        return word[:position] + rng.choice(LETTERS) + word[position + 1:]
+    if edit == 'del':
+        return word[:position] + word[position + 1:]
+    if edit == 'ins':
+        return word[:position] + rng.choice(LETTERS) + word[position:]
+    if position == len(word) - 1:
+        position -= 1
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the submit_answer spelling feedback over the full word list (no database access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the misspellings')
+        parser.add_argument('--repeat', type=int, default=3, help='Passes over the word list (best pass is reported)')
+        parser.add_argument('--budget-us', type=float, default=50, help='Per-call budget in microseconds')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        pairs = [(word, misspell(word, rng)) for word in load_word_list()]
+        self.stdout.write(f'{len(pairs)} words, one misspelling each, best of {options["repeat"]} passes\n')
+
+        routines = [
+            ('edit_distance', lambda target, typed: edit_distance(target, typed, max(3, len(target) // 2))),
+            ('spelling_feedback', spelling_feedback),
+            ('classify', classify),
+        ]
+        self.stdout.write(f"{'routine':<20}{'mean us':>10}{'p50':>8}{'p99':>8}{'max':>9}")
+        for name, routine in routines:
+            best = None
+            for _ in range(options['repeat']):
+                timings = []
+                clock = time.perf_counter_ns
+                for target, typed in pairs:
+                    started = clock()
+                    routine(target, typed)
+                    timings.append(clock() - started)
+                if best is None or sum(timings) < sum(best):
+                    best = timings
+            best.sort()
+            mean = statistics.fmean(best) / 1000
+            line = (
+                f'{name:<20}{mean:>10.1f}{best[len(best) // 2] / 1000:>8.1f}'
+                f'{best[len(best) * 99 // 100] / 1000:>8.1f}{best[-1] / 1000:>9.1f}'
+            )
+            if mean <= options['budget_us']:
+                self.stdout.write(self.style.SUCCESS(line))
+            else:
+                self.stdout.write(self.style.ERROR(f'{line}  over the {options["budget_us"]:.0f}us budget'))
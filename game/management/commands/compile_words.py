@@ -0,0 +1,77 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game.lexicon import LEXICON_PATH, Lexicon, compile_lexicon, is_stale
+from game.word_frequency import FrequencyFilter
+
+
+class Command(BaseCommand):
+    help = 'Compile the *_letter_words.txt lists into words.lexicon (normalized, deduplicated, validated)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help="Don't write anything - fail if words.lexicon is missing or older than the lists"
+        )
+        parser.add_argument(
+            '--frequencies',
+            help='"word count" frequency list for the rare word filter (default: settings.GAME_WORD_FREQUENCIES, if it exists)'
+        )
+        parser.add_argument('--min-zipf', type=float, help='Words under this Zipf frequency are rare')
+        parser.add_argument('--max-share', type=float, help='Most of a bucket dropped as rare (0-1)')
+        parser.add_argument('--no-filter', action='store_true', help='Keep rare words')
+
+    def get_filter(self, options):
+        """The rare word filter in settings with the options given applied, or None"""
+        if options['no_filter']:
+            return None
+        word_filter = FrequencyFilter.from_settings()
+        if options['frequencies']:
+            if not os.path.exists(options['frequencies']):
+                raise CommandError(f'Frequency list not found: {options["frequencies"]}')
+            word_filter = word_filter or FrequencyFilter(options['frequencies'])
+            word_filter.path = options['frequencies']
+        if word_filter is None:
+            return None
+        for option in ('min_zipf', 'max_share'):
+            if options[option] is not None:
+                setattr(word_filter, option, options[option])
+        return word_filter
+
+    def handle(self, *args, **options):
+        if options['check']:
+            if is_stale():
+                raise CommandError('words.lexicon is out of date - run: python manage.py compile_words')
+            self.stdout.write(self.style.SUCCESS('words.lexicon is up to date'))
+            return
+
+        word_filter = self.get_filter(options)
+        started = time.monotonic()
+        lists = compile_lexicon(word_filter=word_filter)
+        elapsed = time.monotonic() - started
+
+        for filename in lists.missing:
+            self.stdout.write(self.style.WARNING(f'Warning: {filename} not found.'))
+        for problem in lists.problems:
+            self.stdout.write(self.style.WARNING(f'Skipped {problem}'))
+        if lists.moved:
+            self.stdout.write(f'{lists.moved} words listed in more than one file kept their last bucket')
+
+        lexicon = Lexicon.open(LEXICON_PATH)
+        if lists.filtered is not None:
+            self.write_filter_report(lists.filtered)
+        elif options['verbosity'] > 1:
+            for bucket in lexicon.buckets():
+                self.stdout.write(f'  bucket {bucket}: {len(lexicon.words(bucket))} words')
+        self.stdout.write(self.style.SUCCESS(
+            f'Compiled {len(lexicon)} words from {lists.lines} lines into {LEXICON_PATH} '
+            f'({os.path.getsize(LEXICON_PATH) // 1024} KB) in {elapsed:.2f}s'
+        ))
+
+    def write_filter_report(self, reports):
+        self.stdout.write(f'{"bucket":>6} {"listed":>7} {"dropped":>8} {"words":>7}')
+        for bucket, report in sorted(reports.items()):
+            self.stdout.write(f'{bucket:>6} {report.before:>7} {report.dropped:>8} {report.after:>7}')
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from game.difficulty import CHUNK_WORDS, compute_word_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-word difficulty stats (WordStats) from the answer history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-words',
+            type=int,
+            default=CHUNK_WORDS,
+            help='Word ids read per range - lower it if the server runs short of memory'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(words, attempts):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {words} words, {attempts} attempts so far')
+
+        words, attempts = compute_word_stats(options['chunk_words'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Computed difficulty for {words} words from {attempts} attempts '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
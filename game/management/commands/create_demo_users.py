@@ -1,10 +1,23 @@
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
 from accounts.models import User
+from game.models import Classroom
+
+LOAD_TEST_PASSWORD = 'loadtest123'
 
 
 class Command(BaseCommand):
     help = 'Create demo users for testing'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--load-test',
+            type=int,
+            default=0,
+            metavar='N',
+            help='Also create N students (loadtest001, loadtest002, ...) in a "Load Test" classroom for load_test.py'
+        )
+
     def handle(self, *args, **kwargs):
         # Create teacher
         teacher, created = User.objects.get_or_create(
@@ -52,7 +65,33 @@ class Command(BaseCommand):
         except User.DoesNotExist:
             pass
         
+        if kwargs['load_test']:
+            self.create_load_test_students(teacher, kwargs['load_test'])
+        
         self.stdout.write(self.style.SUCCESS('\nDemo accounts created successfully!'))
         self.stdout.write('Teacher: teacher / teacher123')
         self.stdout.write('Student: student / student123 (assigned to teacher)')
         self.stdout.write('Admin: admin / admin123')
+
+    def create_load_test_students(self, teacher, count):
+        """Create students for load_test.py, all sharing one password hash"""
+        classroom, _ = Classroom.objects.get_or_create(teacher=teacher, name='Load Test')
+        # Hash once - hashing the same password 100 times takes minutes on a Pi
+        password_hash = make_password(LOAD_TEST_PASSWORD)
+        
+        created_count = 0
+        for i in range(1, count + 1):
+            _, created = User.objects.update_or_create(
+                username=f'loadtest{i:03d}',
+                defaults={
+                    'role': 'student',
+                    'classroom': classroom,
+                    'password': password_hash
+                }
+            )
+            created_count += created
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Load test students: loadtest001-loadtest{count:03d} / {LOAD_TEST_PASSWORD} '
+            f'({created_count} new) in classroom "{classroom.name}"'
+        ))
@@ -0,0 +1,63 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game.models import Classroom
+from game.roster import RosterError, import_roster, parse_roster
+
+
+class Command(BaseCommand):
+    help = 'Create student accounts in a classroom from a roster CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('roster', help='CSV file with a header row: username, and optionally password, first_name, last_name, email')
+        parser.add_argument('--classroom', type=int, required=True, help='Id of the classroom to add the students to')
+        parser.add_argument('--output', help='Write the usernames and passwords of the new accounts to this CSV file')
+        parser.add_argument('--provisional', action='store_true',
+                            help='Hash passwords with a tenth of the iterations, upgraded on each first login '
+                                 '(much faster; students who never log in keep the weak hash)')
+        parser.add_argument('--workers', type=int, help='Processes used for password hashing (default: one per CPU core)')
+
+    def handle(self, *args, **options):
+        try:
+            classroom = Classroom.objects.select_related('teacher').get(id=options['classroom'])
+        except Classroom.DoesNotExist:
+            raise CommandError(f'No classroom with id {options["classroom"]}')
+
+        try:
+            with open(options['roster'], encoding='utf-8-sig', newline='') as roster_file:
+                rows, problems = parse_roster(roster_file.read())
+        except (OSError, UnicodeDecodeError) as error:
+            raise CommandError(f'Could not read {options["roster"]}: {error}')
+        except RosterError as error:
+            raise CommandError(str(error))
+
+        for problem in problems:
+            self.stdout.write(self.style.WARNING(f'  Skipped {problem}'))
+
+        started = time.monotonic()
+        created, skipped = import_roster(
+            classroom, rows,
+            provisional_hashes=options['provisional'],
+            workers=options['workers']
+        )
+        elapsed = time.monotonic() - started
+
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'  {len(skipped)} usernames already exist: {", ".join(skipped)}'))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output_file:
+                writer = csv.writer(output_file)
+                writer.writerow(['username', 'password'])
+                writer.writerows((username, password) for username, password, _ in created)
+            self.stdout.write(f'  Credentials written to {options["output"]}')
+        else:
+            # Generated passwords are not stored anywhere else
+            for username, password, generated in created:
+                if generated:
+                    self.stdout.write(f'  {username}\t{password}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(created)} students in "{classroom.name}" in {elapsed:.1f}s'
+        ))
@@ -1,45 +1,43 @@
 from django.core.management.base import BaseCommand
+from game.lexicon import WORDS_DIR, is_stale, load_lexicon, read_word_lists
 from game.models import Word
-import os
+from game.word_search import word_index_changed
+
+# Words deleted per query (under SQLite's limit on query parameters)
+DELETE_BATCH_SIZE = 500
 
 class Command(BaseCommand):
     help = 'Populate the database with ~5000 common English words organized by difficulty'
 
-    def handle(self, *args, **kwargs):
-        # Common English words organized by length (difficulty)
-        # This is a curated list of common words for 6th graders and up
-        # Directory containing your *_letter_words.txt files
-        # Get the directory where this command file is located
-        WORDS_DIR = os.path.dirname(os.path.abspath(__file__))
-        words_by_length = {}
-        # Loop through expected lengths (or dynamically scan the directory)
-        for length in range(3, 21):  # from 3 to 20 letters
-            filename = f"{length}_letter_words.txt"
-            filepath = os.path.join(WORDS_DIR, filename)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-text',
+            action='store_true',
+            help='Read the *_letter_words.txt lists even if words.lexicon is up to date'
+        )
 
-            if os.path.exists(filepath):
-                with open(filepath, "r", encoding="utf-8") as f:
-                    # Split lines, strip whitespace, and ignore empties
-                    words = [w.strip() for w in f.read().splitlines() if w.strip()]
-                    words_by_length[length] = words
-            else:
-                # Optionally log or skip missing files
+    def handle(self, *args, **options):
+        # The words come from words.lexicon (see compile_words), already
+        # normalized, deduplicated and passed through the rare word filter -
+        # later files override earlier files for duplicate words. Without an up-to-date lexicon the text lists
+        # in this directory are read instead.
+        missing = []
+        if options['from_text'] or is_stale():
+            self.stdout.write(f'Reading word lists from {WORDS_DIR}')
+            lists = read_word_lists()
+            for filename in lists.missing:
                 print(f"Warning: {filename} not found.")
-                words_by_length[length] = []
-        
+            for problem in lists.problems:
+                print(f"Skipped {problem}")
+            word_to_bucket = lists.words
+            missing = lists.missing
+        else:
+            word_to_bucket = dict(load_lexicon().items())
+
         created_count = 0
         updated_count = 0
         
-        # First pass: collect all words and their intended buckets
-        # Later files override earlier files for duplicate words
-        word_to_bucket = {}
-        for length, words in words_by_length.items():
-            for word_text in words:
-                word_text = word_text.strip().lower()
-                if word_text:
-                    word_to_bucket[word_text] = length
-        
-        # Second pass: create/update all words
+        # Create/update all words
         for word_text, bucket in word_to_bucket.items():
             word, created = Word.objects.update_or_create(
                 text=word_text,
@@ -52,10 +50,29 @@ class Command(BaseCommand):
                 created_count += 1
             else:
                 updated_count += 1
-        
+
+        # Words no longer listed - taken out of a list, or dropped by the
+        # rare word filter - are deleted, with their queue entries and
+        # attempts (see delete_word_references). Not while a list is
+        # missing, which would empty its bucket.
+        deleted_count = 0
+        if missing:
+            self.stdout.write(self.style.WARNING('Some word lists are missing - no words were deleted'))
+        else:
+            stale_ids = [
+                word_id for word_id, text in Word.objects.values_list('id', 'text')
+                if text not in word_to_bucket
+            ]
+            for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+                Word.objects.filter(id__in=stale_ids[start:start + DELETE_BATCH_SIZE]).delete()
+            deleted_count = len(stale_ids)
+
+        word_index_changed()
+
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully loaded {created_count} new words and updated {updated_count} existing words'
+                f'Successfully loaded {created_count} new words, updated {updated_count} existing words '
+                f'and deleted {deleted_count} words no longer listed'
             )
         )
         self.stdout.write(
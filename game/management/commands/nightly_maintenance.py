@@ -0,0 +1,27 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Nightly batch jobs (run by the spelling-game-nightly systemd timer)'
+
+    # (command, options) run in order; one failing step doesn't stop the others
+    STEPS = [
+        ('compute_word_difficulty', {}),
+        ('analyze_misspellings', {}),
+        ('clearsessions', {}),
+    ]
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, step_options in self.STEPS:
+            self.stdout.write(f'==> {name}')
+            try:
+                call_command(name, stdout=self.stdout, stderr=self.stderr, **step_options)
+            except Exception as error:
+                failed.append(name)
+                self.stderr.write(self.style.ERROR(f'{name} failed: {error}'))
+
+        if failed:
+            raise CommandError(f"Nightly maintenance finished with errors: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS('Nightly maintenance finished'))
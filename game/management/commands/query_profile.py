@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from game.profiling import get_profile_report, reset_profile
+
+
+class Command(BaseCommand):
+    help = 'Show per-endpoint latency percentiles and the costliest query shapes from the query profiler'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Query shapes to show')
+        parser.add_argument('--reset', action='store_true', help='Delete the collected totals and start over')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            reset_profile()
+            self.stdout.write(self.style.SUCCESS('Query profile reset'))
+            return
+
+        report = get_profile_report(top=options['top'])
+        if not report['endpoints']:
+            self.stdout.write(self.style.WARNING(
+                f'No requests recorded in {settings.GAME_QUERY_PROFILER_DIR} - '
+                'run the services with GAME_QUERY_PROFILER=1'
+            ))
+            return
+
+        self.stdout.write(f'{report["processes"]} process(es), slowest p95 first (ms)\n')
+        self.stdout.write(
+            f"{'view':<36}{'requests':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'db p95':>8}{'db %':>6}{'queries':>9}{'max':>5}"
+        )
+        for row in report['endpoints']:
+            self.stdout.write(
+                f"{row['view'][:35]:<36}{row['requests']:>9}{row['p50']:>8.1f}{row['p95']:>8.1f}{row['p99']:>8.1f}"
+                f"{row['db_p95']:>8.1f}{row['db_share']:>6.0f}{row['mean_queries']:>9.1f}{row['max_queries']:>5}"
+            )
+
+        self.stdout.write(f'\nTop {len(report["shapes"])} query shapes by total time')
+        for shape in report['shapes']:
+            self.stdout.write(
+                f"\n{shape['total_ms']:>9.0f} ms total  {shape['count']:>7} runs  {shape['mean_ms']:.2f} ms mean  "
+                f"{shape['max_ms']:.1f} ms max  ({', '.join(shape['views'])})"
+            )
+            self.stdout.write(f"    {shape['sql']}")
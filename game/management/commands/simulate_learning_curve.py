@@ -0,0 +1,130 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from accounts.models import User
+from game.learning_curve import (
+    DEFAULT_ABILITY_SPREAD, DEFAULT_MAX_ATTEMPTS, SimulatorUnavailable,
+    get_average_session_length, get_word_correct_rates, simulate_bucket, simulate_default_buckets
+)
+from game.models import BucketLadder, GameConfiguration, Word
+from game.scheduling import DEFAULT_SCHEDULER, SCHEDULERS
+
+
+def parse_buckets(value):
+    """'3-6' or '3,5,7' -> [3, 4, 5, 6] / [3, 5, 7]"""
+    buckets = []
+    for part in value.split(','):
+        part = part.strip()
+        if '-' in part:
+            low, high = part.split('-', 1)
+            buckets.extend(range(int(low), int(high) + 1))
+        elif part:
+            buckets.append(int(part))
+    return buckets
+
+
+class Command(BaseCommand):
+    help = 'Estimate answers and sessions needed to complete each bucket (needs NumPy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teacher', help="Use this teacher's game configuration and students' session lengths")
+        parser.add_argument('--buckets', help='Default buckets to simulate, e.g. 3-8 or 3,5,7 (default: all)')
+        parser.add_argument('--ladder', type=int, help='Simulate the buckets of this custom ladder (id) instead')
+        parser.add_argument(
+            '--words-to-complete',
+            help='words_to_complete_bucket to try; a comma separated list compares several values'
+        )
+        parser.add_argument('--recycling-distance', type=int, help='recycling_distance to try')
+        parser.add_argument('--scheduler', choices=list(SCHEDULERS), help='Review scheduler to try')
+        parser.add_argument('--students', type=int, default=1000, help='Simulated students per bucket')
+        parser.add_argument('--ability-spread', type=float, default=DEFAULT_ABILITY_SPREAD,
+                            help='Spread of student ability in log-odds (0 = every student average)')
+        parser.add_argument('--session-length', type=float,
+                            help='Answers per session (default: average of past sessions)')
+        parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                            help='Give up on a student after this many answers in one bucket')
+        parser.add_argument('--seed', type=int, help='Random seed for repeatable results')
+
+    def handle(self, *args, **options):
+        config = None
+        students = None
+        if options['teacher']:
+            teacher = User.objects.filter(username=options['teacher'], role='teacher').first()
+            if not teacher:
+                raise CommandError(f"Teacher '{options['teacher']}' not found")
+            config = GameConfiguration.objects.filter(teacher=teacher).first()
+            students = User.objects.filter(Q(classroom__teacher=teacher) | Q(teacher=teacher), role='student')
+
+        if options['words_to_complete']:
+            words_to_complete_values = [int(value) for value in options['words_to_complete'].split(',')]
+        else:
+            words_to_complete_values = [config.words_to_complete_bucket if config else 200]
+        recycling_distance = options['recycling_distance'] or (config.recycling_distance if config else 100)
+        scheduler = options['scheduler'] or (config.scheduler if config else DEFAULT_SCHEDULER)
+        session_length = options['session_length'] or get_average_session_length(students)
+
+        sim_options = {
+            'students': options['students'],
+            'ability_spread': options['ability_spread'],
+            'session_length': session_length,
+            'max_attempts': options['max_attempts'],
+            'seed': options['seed'],
+        }
+
+        self.stdout.write(
+            f"{options['students']} students per bucket, recycling distance {recycling_distance}, "
+            f"scheduler {scheduler}, {session_length:.1f} answers per session"
+        )
+
+        if options['ladder']:
+            ladder = BucketLadder.objects.filter(id=options['ladder']).first()
+            if not ladder:
+                raise CommandError(f"Ladder {options['ladder']} not found")
+            custom_buckets = list(ladder.custom_buckets.order_by('position'))
+        elif options['buckets']:
+            buckets = parse_buckets(options['buckets'])
+        else:
+            buckets = list(
+                Word.objects.values_list('difficulty_bucket', flat=True)
+                .distinct().order_by('difficulty_bucket')
+            )
+
+        try:
+            for words_to_complete in words_to_complete_values:
+                self.stdout.write(f'\nwords_to_complete_bucket = {words_to_complete}')
+                if options['ladder']:
+                    results = []
+                    for custom_bucket in custom_buckets:
+                        rates = get_word_correct_rates(custom_bucket=custom_bucket)
+                        summary = simulate_bucket(
+                            rates['first'], rates['review'], words_to_complete, recycling_distance,
+                            scheduler, **sim_options
+                        )
+                        summary.update({'bucket': custom_bucket.name, 'history_attempts': rates['attempts']})
+                        results.append(summary)
+                else:
+                    results = simulate_default_buckets(
+                        buckets, words_to_complete, recycling_distance, scheduler, **sim_options
+                    )
+                self.print_results(results)
+        except SimulatorUnavailable as error:
+            raise CommandError(str(error))
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"{'bucket':<16}{'words':>7}{'history':>9}{'finished':>10}"
+            f"{'answers p10':>13}{'p50':>7}{'p90':>7}{'mean':>8}{'sessions':>10}{'p90':>7}"
+        )
+        for row in results:
+            if 'attempts_mean' not in row:
+                self.stdout.write(
+                    f"{row['bucket']:<16}{row['words_in_bucket']:>7}{row['history_attempts']:>9}"
+                    f"{row['finished_share']:>10.0%}   nobody finished"
+                )
+                continue
+            self.stdout.write(
+                f"{row['bucket']:<16}{row['words_in_bucket']:>7}{row['history_attempts']:>9}"
+                f"{row['finished_share']:>10.0%}{row['attempts_p10']:>13}{row['attempts_p50']:>7}"
+                f"{row['attempts_p90']:>7}{row['attempts_mean']:>8.0f}{row['sessions_mean']:>10.1f}"
+                f"{row['sessions_p90']:>7.1f}"
+            )
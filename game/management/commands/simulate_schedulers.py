@@ -0,0 +1,235 @@
+"""
+Compare the review schedulers (game/scheduling.py) on synthetic students.
+
+Each synthetic student plays a fixed number of answers against a pool of
+words, with the queue handled the same way get_next_word does it: the lowest
+due_key among entries that are due, 5 new words appended per word shown.
+Nothing touches the database - the schedulers run on in-memory entries.
+
+Student memory model (deliberately simple):
+- a word is already known with a probability that depends on the student's
+  ability and the word's difficulty; known words are spelled right 97% of
+  the time
+- a word that was missed is learned from the correct spelling shown after
+  the miss, and is then recalled with probability exp(-gap / stability),
+  where gap is the number of words seen since it was last practised
+- a correct review grows the stability, more so when recall was hard
+  (spacing effect); a miss shrinks it again
+
+Every scheduler replays the same students and words (same seed), so the
+differences in the report come from the scheduling alone.
+"""
+import heapq
+import math
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from game.scheduling import SCHEDULERS
+
+NEW_WORDS_PER_STEP = 5
+KNOWN_RECALL = 0.97
+BASE_STABILITY = 8.0
+MISS_STABILITY_FACTOR = 0.6
+
+
+class SimulatedEntry:
+    """In-memory stand-in for a WordQueue row"""
+
+    def __init__(self, word, due_key):
+        self.word = word
+        self.due_key = due_key
+        self.due_at = None
+        self.is_mastered = False
+        self.times_failed = 0
+        self.times_correct = 0
+        self.streak = 0
+        self.ease = 2.5
+        self.interval = 0
+
+
+class SimulatedConfig:
+    def __init__(self, recycling_distance):
+        self.recycling_distance = recycling_distance
+
+
+class WordMemory:
+    def __init__(self, known):
+        self.known = known
+        self.stability = 0.0
+        self.last_seen = None
+
+    def recall_probability(self, clock):
+        if self.known:
+            return KNOWN_RECALL
+        if self.last_seen is None:
+            return 0.0
+        return math.exp(-(clock - self.last_seen) / self.stability)
+
+    def practise(self, clock, recalled, probability, base_stability):
+        if self.known:
+            return
+        if self.last_seen is None:
+            # First miss: learned from the correct spelling
+            self.stability = base_stability
+        elif recalled:
+            self.stability *= 1.5 + 4 * (1 - probability)
+        else:
+            self.stability = max(base_stability, self.stability * MISS_STABILITY_FACTOR)
+        self.last_seen = clock
+
+
+def simulate_student(scheduler, config, rng, words, ability, attempts, seconds_per_answer, retention_gap,
+                     scheduler_rng=None):
+    """Play one student; returns a dict of counters. scheduler_rng feeds the scheduler's random draws."""
+    base_stability = BASE_STABILITY * math.exp(0.3 * ability)
+    memories = {}
+    queue = []  # heap of (due_key, sequence, entry)
+    next_word = 0
+    next_sequence = 0
+    max_due_key = 0
+    start = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+    mastered = []
+    reviews = 0
+    easy_reviews = 0
+
+    def push(entry):
+        nonlocal next_sequence
+        next_sequence += 1
+        heapq.heappush(queue, (entry.due_key, next_sequence, entry))
+
+    for clock in range(attempts):
+        now = start + timedelta(seconds=clock * seconds_per_answer)
+
+        # get_next_word: keep the queue topped up, then pick the lowest due key that is due
+        for _ in range(NEW_WORDS_PER_STEP):
+            if next_word >= len(words):
+                break
+            max_due_key += 1
+            push(SimulatedEntry(next_word, max_due_key))
+            next_word += 1
+        if not queue:
+            break
+
+        waiting = []
+        while queue and queue[0][2].due_at is not None and queue[0][2].due_at > now:
+            waiting.append(heapq.heappop(queue))
+        if queue:
+            _, _, entry = heapq.heappop(queue)
+            for item in waiting:
+                heapq.heappush(queue, item)
+        else:
+            # Everything is waiting - take the lowest due key anyway
+            waiting.sort(key=lambda item: item[:2])
+            _, _, entry = waiting[0]
+            for item in waiting[1:]:
+                heapq.heappush(queue, item)
+
+        # The student answers
+        memory = memories.get(entry.word)
+        if memory is None:
+            difficulty = words[entry.word]
+            memory = WordMemory(rng.random() < 1 / (1 + math.exp(difficulty - ability)))
+            memories[entry.word] = memory
+        elif not memory.known:
+            reviews += 1
+        probability = memory.recall_probability(clock)
+        is_correct = rng.random() < probability
+        if memory.last_seen is not None and probability > 0.95:
+            easy_reviews += 1
+        memory.practise(clock, is_correct, probability, base_stability)
+
+        # submit_answer: front_key is the lowest unmastered due key, this entry included
+        front_key = min(entry.due_key, queue[0][0]) if queue else entry.due_key
+        if scheduler.record_answer(entry, is_correct, front_key, now, config, scheduler_rng):
+            mastered.append(entry)
+        else:
+            push(entry)
+        max_due_key = max(max_due_key, entry.due_key)
+
+    # How many of the mastered words would still be spelled right retention_gap words later
+    end_clock = attempts + retention_gap
+    learned = [entry for entry in mastered if entry.times_failed]
+    return {
+        'mastered': len(mastered),
+        'retained': sum(memories[entry.word].recall_probability(end_clock) for entry in mastered),
+        'learned': len(learned),
+        'learned_retained': sum(memories[entry.word].recall_probability(end_clock) for entry in learned),
+        'reviews': reviews,
+        'easy_reviews': easy_reviews,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare the word queue review schedulers on synthetic students (no database access)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200, help='Synthetic students per scheduler')
+        parser.add_argument('--attempts', type=int, default=300, help='Answers per student')
+        parser.add_argument('--words', type=int, default=500, help='Words in the pool')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed (same students for every scheduler)')
+        parser.add_argument(
+            '--schedulers',
+            default=','.join(SCHEDULERS),
+            help=f"Comma separated schedulers to compare (default: {','.join(SCHEDULERS)})"
+        )
+        parser.add_argument('--recycling-distance', type=int, default=100,
+                            help='recycling_distance setting used by the legacy scheduler')
+        parser.add_argument('--seconds-per-answer', type=float, default=6,
+                            help='Simulated time one answer takes')
+        parser.add_argument('--retention-gap', type=int, default=500,
+                            help='Words later at which retention of mastered words is measured')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['schedulers'].split(',') if name.strip()]
+        unknown = [name for name in names if name not in SCHEDULERS]
+        if unknown:
+            raise CommandError(f"Unknown scheduler(s): {', '.join(unknown)}. Choose from {', '.join(SCHEDULERS)}")
+
+        config = SimulatedConfig(options['recycling_distance'])
+        attempts = options['attempts']
+        self.stdout.write(
+            f"Simulating {options['students']} students x {attempts} answers, "
+            f"{options['words']} words, seed {options['seed']}\n"
+        )
+        self.stdout.write(
+            f"{'scheduler':<10}{'mastered/100':>14}{'retained/100':>14}{'att/retained':>14}"
+            f"{'learned/100':>13}{'retention':>11}{'easy reviews':>14}"
+        )
+
+        for name in names:
+            totals = dict.fromkeys(('mastered', 'retained', 'learned', 'learned_retained', 'reviews', 'easy_reviews'), 0)
+            population = random.Random(options['seed'])
+            for _ in range(options['students']):
+                student_seed = population.random()
+                ability = population.gauss(0, 1)
+                words = [population.gauss(0, 1.5) for _ in range(options['words'])]
+                # The legacy scheduler's recycle positions get their own
+                # generator, so they don't shift with the student's answers
+                result = simulate_student(
+                    SCHEDULERS[name], config, random.Random(student_seed), words, ability,
+                    attempts, options['seconds_per_answer'], options['retention_gap'],
+                    scheduler_rng=random.Random(student_seed)
+                )
+                for key, value in result.items():
+                    totals[key] += value
+
+            total_attempts = options['students'] * attempts
+            per_retained = total_attempts / totals['retained'] if totals['retained'] else float('inf')
+            retention = totals['learned_retained'] / totals['learned'] if totals['learned'] else 0
+            easy_share = totals['easy_reviews'] / totals['reviews'] if totals['reviews'] else 0
+            self.stdout.write(
+                f"{name:<10}{100 * totals['mastered'] / total_attempts:>14.1f}"
+                f"{100 * totals['retained'] / total_attempts:>14.1f}{per_retained:>14.1f}"
+                f"{100 * totals['learned'] / total_attempts:>13.1f}{retention:>11.0%}{easy_share:>14.0%}"
+            )
+
+        self.stdout.write(
+            '\nmastered/100  words marked mastered per 100 answers\n'
+            f"retained/100  mastered words still spelled right {options['retention_gap']} words later, per 100 answers\n"
+            'att/retained  answers spent per retained word\n'
+            'learned/100   words mastered after being missed at least once, per 100 answers\n'
+            'retention     share of those learned words retained\n'
+            'easy reviews  share of reviews the student was >95% sure to get right (wasted practice)'
+        )
@@ -0,0 +1,95 @@
+"""
+Summarise the JSON timing lines written by game/tracing.py.
+
+For each release and trace (submit_answer, refresh_game_status,
+leaderboard_standings) prints the total and per-stage p50/p95/mean, and
+each stage's share of the total time, largest first. Replayed duplicate
+submissions are left out.
+"""
+import json
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class Command(BaseCommand):
+    help = 'Per-stage latency of the sampled timing traces, per release'
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', nargs='?', help='Timing log file (default: GAME_TIMING_LOG)')
+        parser.add_argument('--trace', help='Only this trace, e.g. submit_answer')
+        parser.add_argument('--release', help='Only this release')
+        parser.add_argument('--last', type=int, help='Only the last N releases in the log')
+
+    def handle(self, *args, **options):
+        path = options['log'] or settings.GAME_TIMING_LOG
+        if not path:
+            raise CommandError('Give the log file (GAME_TIMING_LOG is not set)')
+
+        # (release, trace) -> list of records, releases in order of first appearance
+        groups = {}
+        releases = []
+        try:
+            with open(path, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(record, dict) or 'trace' not in record:
+                        continue
+                    # Replayed retries skip the whole pipeline
+                    if record.get('outcome') == 'duplicate':
+                        continue
+                    if options['trace'] and record['trace'] != options['trace']:
+                        continue
+                    release = record.get('release', 'unknown')
+                    if options['release'] and release != options['release']:
+                        continue
+                    if release not in releases:
+                        releases.append(release)
+                    groups.setdefault((release, record['trace']), []).append(record)
+        except OSError as error:
+            raise CommandError(f'Could not read {path}: {error}')
+
+        if not groups:
+            self.stdout.write(self.style.WARNING('No timing lines found'))
+            return
+        if options['last']:
+            releases = releases[-options['last']:]
+
+        for release in releases:
+            for (group_release, trace), records in groups.items():
+                if group_release != release:
+                    continue
+                self.report(release, trace, records)
+
+    def report(self, release, trace, records):
+        totals = sorted(record['total_ms'] for record in records)
+        total_sum = sum(totals)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{trace} @ {release} - {len(records)} samples'))
+        self.stdout.write(f"{'stage':<26}{'p50 ms':>9}{'p95 ms':>9}{'mean ms':>9}{'share':>8}")
+        self.stdout.write(
+            f"{'(total)':<26}{percentile(totals, 0.5):>9.2f}{percentile(totals, 0.95):>9.2f}"
+            f"{statistics.fmean(totals):>9.2f}{'100%':>8}"
+        )
+
+        stages = {}
+        for record in records:
+            for stage, ms in record.get('spans', {}).items():
+                stages.setdefault(stage, []).append(ms)
+        for stage, values in sorted(stages.items(), key=lambda item: sum(item[1]), reverse=True):
+            values.sort()
+            share = sum(values) / total_sum * 100 if total_sum else 0
+            # Stages that only some requests go through (e.g. bucket_advancement)
+            # show how many samples they appear in
+            label = stage if len(values) == len(records) else f'{stage} ({len(values)})'
+            self.stdout.write(
+                f'{label:<26}{percentile(values, 0.5):>9.2f}{percentile(values, 0.95):>9.2f}'
+                f'{statistics.fmean(values):>9.2f}{share:>7.0f}%'
+            )
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0005_bucketladder_custombucket_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordattempt',
+            name='client_attempt_id',
+            field=models.CharField(blank=True, help_text='Client-generated id used to detect retried submissions of the same answer', max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='wordattempt',
+            name='response_data',
+            field=models.JSONField(blank=True, help_text='Response originally returned for this attempt (replayed for retried submissions)', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='wordattempt',
+            constraint=models.UniqueConstraint(fields=('student', 'client_attempt_id'), name='unique_client_attempt_per_student'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0006_wordattempt_client_attempt_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprogress',
+            name='current_word_at',
+            field=models.DateTimeField(blank=True, help_text='When current_word_text was handed out', null=True),
+        ),
+        migrations.AddField(
+            model_name='studentprogress',
+            name='current_word_text',
+            field=models.CharField(blank=True, default='', help_text="Word the student was last given (shown on the teacher's live monitor)", max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['student', 'started_at'], name='game_gamese_student_7655fd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['student', 'ended_at'], name='game_gamese_student_6b1daf_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:20
+
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_review_state(apps, schema_editor):
+    """Existing queue order becomes the due order; count past correct answers per word"""
+    WordQueue = apps.get_model('game', 'WordQueue')
+    WordAttempt = apps.get_model('game', 'WordAttempt')
+    
+    WordQueue.objects.update(due_key=F('position'))
+    
+    for word_field in ('word', 'custom_word'):
+        correct_count = WordAttempt.objects.filter(
+            student=OuterRef('student'),
+            is_correct=True,
+            **{word_field: OuterRef(word_field)}
+        ).values(word_field).annotate(count=Count('id')).values('count')
+        WordQueue.objects.filter(**{f'{word_field}__isnull': False}).update(
+            times_correct=Coalesce(Subquery(correct_count, output_field=IntegerField()), Value(0))
+        )
+    
+    # Correct answers since a miss are what the spaced schedulers count
+    WordQueue.objects.filter(times_failed__gt=0, is_mastered=False).update(streak=F('times_correct'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0007_live_monitor_fields'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='wordqueue',
+            options={'ordering': ['due_key', 'position']},
+        ),
+        migrations.AddField(
+            model_name='gameconfiguration',
+            name='scheduler',
+            field=models.CharField(choices=[('legacy', 'Classic (random recycling)'), ('leitner', 'Leitner boxes'), ('sm2', 'SM-2 (adaptive intervals)')], default='legacy', help_text='How missed words are scheduled for review (see game/scheduling.py)', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='wordqueue',
+            name='due_at',
+            field=models.DateTimeField(blank=True, help_text="Don't show the word again before this time", null=True),
+        ),
+        migrations.AddField(
+            model_name='wordqueue',
+            name='due_key',
+            field=models.BigIntegerField(default=0, help_text='When the word is due, counted in words seen (lowest is shown next)'),
+        ),
+        migrations.AddField(
+            model_name='wordqueue',
+            name='ease',
+            field=models.FloatField(default=2.5, help_text='SM-2 ease factor'),
+        ),
+        migrations.AddField(
+            model_name='wordqueue',
+            name='interval',
+            field=models.IntegerField(default=0, help_text='Last review interval in words'),
+        ),
+        migrations.AddField(
+            model_name='wordqueue',
+            name='streak',
+            field=models.IntegerField(default=0, help_text='Correct answers in a row since the last miss'),
+        ),
+        migrations.AddField(
+            model_name='wordqueue',
+            name='times_correct',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='wordqueue',
+            index=models.Index(fields=['student', 'is_mastered', 'due_key'], name='game_wordqu_student_660065_idx'),
+        ),
+        migrations.RunPython(backfill_review_state, migrations.RunPython.noop),
+    ]
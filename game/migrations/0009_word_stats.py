@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0008_review_scheduling'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordStats',
+            fields=[
+                ('word', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='game.word')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('errors', models.PositiveIntegerField(default=0)),
+                ('students', models.PositiveIntegerField(default=0, help_text='Students who attempted the word')),
+                ('students_mastered', models.PositiveIntegerField(default=0)),
+                ('avg_attempts_to_mastery', models.FloatField(blank=True, null=True)),
+                ('difficulty', models.FloatField(default=0, help_text='Error rate smoothed towards the overall average (0 = easy, 1 = hard)')),
+                ('common_misspellings', models.JSONField(blank=True, default=list, help_text='Most frequent wrong spellings as [spelling, count] pairs')),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'word stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='gameconfiguration',
+            name='word_sampling',
+            field=models.CharField(choices=[('random', 'Random'), ('easier_first', 'Easier words first'), ('harder_first', 'Harder words first')], default='random', help_text='How new words are picked from the bucket (weighted by WordStats.difficulty)', max_length=20),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('game', '0009_word_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MisspellingPattern',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pattern', models.CharField(choices=[('missed_double', 'Missed double letter'), ('extra_double', 'Extra double letter'), ('ie_ei', 'ie / ei swap'), ('transposed', 'Swapped letters'), ('silent_e', 'Dropped final e'), ('missing_vowel', 'Missing vowel'), ('missing_letter', 'Missing consonant'), ('extra_letter', 'Extra letter'), ('wrong_vowel', 'Wrong vowel'), ('wrong_consonant', 'Wrong consonant'), ('other', 'Very different spelling')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0, help_text='Wrong answers showing this mistake')),
+                ('examples', models.JSONField(blank=True, default=list, help_text='Most recent examples as [word, spelling] pairs')),
+                ('last_seen_at', models.DateTimeField(blank=True, null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='misspelling_patterns', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['student', '-count'],
+                'unique_together': {('student', 'pattern')},
+            },
+        ),
+    ]
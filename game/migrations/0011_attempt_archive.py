@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('game', '0010_misspelling_patterns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedWordAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.IntegerField(blank=True, help_text='GameSession the attempt belonged to', null=True)),
+                ('user_spelling', models.CharField(max_length=100)),
+                ('is_correct', models.BooleanField()),
+                ('attempt_number', models.IntegerField(default=1)),
+                ('attempted_at', models.DateTimeField()),
+                ('term', models.CharField(db_index=True, max_length=50)),
+                ('custom_word', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_attempts', to='game.customword')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attempts', to=settings.AUTH_USER_MODEL)),
+                ('word', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='game.word')),
+            ],
+            options={
+                'ordering': ['-attempted_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TermSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('correct', models.PositiveIntegerField(default=0)),
+                ('first_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='term_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'term summaries',
+                'ordering': ['student', '-last_attempt_at'],
+                'unique_together': {('student', 'term')},
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:27
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_word_keys(apps, schema_editor):
+    """word id for default words, custom_word id negated for custom ones (see make_word_key)"""
+    for model_name in ('WordQueue', 'WordAttempt', 'ArchivedWordAttempt'):
+        model = apps.get_model('game', model_name)
+        model.objects.filter(custom_word__isnull=True, word__isnull=False).update(word_key=F('word_id'))
+        model.objects.filter(custom_word__isnull=False).update(word_key=F('custom_word_id') * -1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0011_attempt_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedwordattempt',
+            name='word_key',
+            field=models.IntegerField(default=0, help_text='word id, or custom_word id negated (see make_word_key)'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='wordattempt',
+            name='word_key',
+            field=models.IntegerField(default=0, help_text='word id, or custom_word id negated (see make_word_key) - set on save'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='wordqueue',
+            name='word_key',
+            field=models.IntegerField(default=0, help_text='word id, or custom_word id negated (see make_word_key) - set on save'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_word_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='wordattempt',
+            index=models.Index(fields=['student', 'word_key'], name='game_wordat_student_25335f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wordqueue',
+            index=models.Index(fields=['student', 'word_key'], name='game_wordqu_student_04b57f_idx'),
+        ),
+    ]
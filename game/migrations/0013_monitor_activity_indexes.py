@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-19 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0012_word_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='gamesession',
+            name='game_gamese_student_7655fd_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='gamesession',
+            name='game_gamese_student_6b1daf_idx',
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['started_at'], name='game_gamese_started_67682b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gamesession',
+            index=models.Index(fields=['ended_at'], name='game_gamese_ended_a_ce75d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentprogress',
+            index=models.Index(fields=['current_word_at'], name='game_studen_current_d7b683_idx'),
+        ),
+    ]
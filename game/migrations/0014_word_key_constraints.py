@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game', '0013_monitor_activity_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='wordattempt',
+            name='game_wordat_student_25335f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='wordqueue',
+            name='game_wordqu_student_04b57f_idx',
+        ),
+        migrations.AlterField(
+            model_name='wordattempt',
+            name='custom_word',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Custom word (only used when classroom uses custom ladder)', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='attempts', to='game.customword'),
+        ),
+        migrations.AlterField(
+            model_name='wordattempt',
+            name='word',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='game.word'),
+        ),
+        migrations.AlterField(
+            model_name='wordqueue',
+            name='custom_word',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Custom word (only used when classroom uses custom ladder)', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='queue_entries', to='game.customword'),
+        ),
+        migrations.AlterField(
+            model_name='wordqueue',
+            name='word',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='game.word'),
+        ),
+        migrations.AddIndex(
+            model_name='wordattempt',
+            index=models.Index(fields=['word_key', 'student'], name='game_wordat_word_ke_8074e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wordqueue',
+            index=models.Index(fields=['word_key', 'student'], name='game_wordqu_word_ke_5550ba_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='wordattempt',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('custom_word__isnull', True), ('word_key', models.F('word_id'))), models.Q(('custom_word__isnull', False), ('word_key', django.db.models.expressions.CombinedExpression(models.F('custom_word_id'), '*', models.Value(-1)))), _connector='OR'), name='wordattempt_word_key_matches'),
+        ),
+        migrations.AddConstraint(
+            model_name='wordqueue',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('custom_word__isnull', True), ('word_key', models.F('word_id'))), models.Q(('custom_word__isnull', False), ('word_key', django.db.models.expressions.CombinedExpression(models.F('custom_word_id'), '*', models.Value(-1)))), _connector='OR'), name='wordqueue_word_key_matches'),
+        ),
+    ]
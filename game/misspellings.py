@@ -0,0 +1,391 @@
+"""
+Spelling alignment and the misspelling pattern index.
+
+spelling_feedback() gives the edit distance and a per-letter diff of an
+answer for the submit response, so the game can highlight the wrong letters.
+Both words are trimmed of their common prefix and suffix first, and the
+distance tables are reused per thread, so a typical call costs a few
+microseconds (see the benchmark_spelling_feedback command).
+
+Every wrong answer is aligned against the correct spelling with an
+edit-distance routine (Levenshtein plus adjacent swaps). Each edit is
+classified as a kind of mistake - a missed double letter, an ie/ei swap, a
+wrong vowel, ... - and counted per student on MisspellingPattern.
+
+The index is built incrementally: a watermark remembers the last WordAttempt
+id analysed, and update_misspelling_index() only reads wrong answers after
+it. It runs in the background after each wrong answer, and nightly to catch
+anything missed. The teacher reports read the small per-student counters,
+so they never scan WordAttempt.
+"""
+import threading
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AnalysisWatermark, MisspellingPattern, WordAttempt
+
+WATERMARK_NAME = 'misspelling_patterns'
+# Wrong answers analysed per batch
+BATCH_SIZE = 2000
+# Example misspellings kept per student and pattern
+MAX_EXAMPLES = 5
+# Answers longer than this are not real attempts at the word
+MAX_SPELLING_LENGTH = 50
+
+VOWELS = set('aeiouy')
+
+PATTERN_LABELS = dict(MisspellingPattern.PATTERN_CHOICES)
+
+_index_lock = threading.Lock()
+# Per-thread distance buffers, reused between calls instead of reallocated
+_buffers = threading.local()
+
+
+def _trim(target, typed):
+    """Length of the common prefix, and both words without common prefix and suffix"""
+    limit = min(len(target), len(typed))
+    start = 0
+    while start < limit and target[start] == typed[start]:
+        start += 1
+    limit -= start
+    end = 0
+    while end < limit and target[-1 - end] == typed[-1 - end]:
+        end += 1
+    return start, target[start:len(target) - end], typed[start:len(typed) - end]
+
+
+def _rows(width):
+    """This thread's three reusable distance rows, at least width long"""
+    rows = getattr(_buffers, 'rows', None)
+    if rows is None or len(rows[0]) < width:
+        rows = [[0] * width for _ in range(3)]
+        _buffers.rows = rows
+    return rows
+
+
+def _matrix(height, width):
+    """This thread's reusable distance matrix, at least height x width"""
+    matrix = getattr(_buffers, 'matrix', None)
+    if matrix is None or len(matrix) < height or len(matrix[0]) < width:
+        matrix = [[0] * width for _ in range(height)]
+        _buffers.matrix = matrix
+    return matrix
+
+
+def edit_distance(target, typed, max_distance=None):
+    """
+    Levenshtein distance where swapping two neighbouring letters counts as
+    one edit. With max_distance, gives up as soon as the distance must be
+    larger and returns max_distance + 1.
+    """
+    _, target, typed = _trim(target, typed)
+    rows, cols = len(target), len(typed)
+    if max_distance is not None and abs(rows - cols) > max_distance:
+        return max_distance + 1
+    if not rows or not cols:
+        return rows or cols
+
+    before, previous, current = _rows(cols + 1)
+    previous[:cols + 1] = range(cols + 1)
+    previous_min = 0
+    for i in range(1, rows + 1):
+        char = target[i - 1]
+        current[0] = row_min = i
+        for j in range(1, cols + 1):
+            other = typed[j - 1]
+            best = previous[j - 1] + (char != other)
+            if previous[j] + 1 < best:
+                best = previous[j] + 1
+            if current[j - 1] + 1 < best:
+                best = current[j - 1] + 1
+            if (i > 1 and j > 1 and char == typed[j - 2] and target[i - 2] == other
+                    and before[j - 2] + 1 < best):
+                best = before[j - 2] + 1
+            current[j] = best
+            if best < row_min:
+                row_min = best
+        # Every later cell builds on this row, or on the previous one plus a swap
+        if max_distance is not None and row_min > max_distance and previous_min >= max_distance:
+            return max_distance + 1
+        previous_min = row_min
+        before, previous, current = previous, current, before
+    if max_distance is not None and previous[cols] > max_distance:
+        return max_distance + 1
+    return previous[cols]
+
+
+def _steps(target, typed):
+    """
+    Full alignment of target (correct spelling) and typed as a list of
+    (kind, target position, target chars, typed chars). kind is 'ok', 'sub',
+    'del' (letter left out), 'ins' (extra letter) or 'swap' (two neighbouring
+    letters swapped), covering the letters between the common prefix and
+    suffix. Returns (distance, prefix length, steps).
+    """
+    offset, core_target, core_typed = _trim(target, typed)
+    rows, cols = len(core_target) + 1, len(core_typed) + 1
+    dist = _matrix(rows, cols)
+    for i in range(rows):
+        dist[i][0] = i
+    for j in range(cols):
+        dist[0][j] = j
+
+    for i in range(1, rows):
+        char = core_target[i - 1]
+        row, above = dist[i], dist[i - 1]
+        for j in range(1, cols):
+            other = core_typed[j - 1]
+            best = above[j - 1] + (char != other)
+            if above[j] + 1 < best:
+                best = above[j] + 1
+            if row[j - 1] + 1 < best:
+                best = row[j - 1] + 1
+            if (i > 1 and j > 1 and char == core_typed[j - 2] and core_target[i - 2] == other
+                    and dist[i - 2][j - 2] + 1 < best):
+                best = dist[i - 2][j - 2] + 1
+            row[j] = best
+
+    # Walk back from the corner, preferring matches, then swaps, substitutions,
+    # left-out letters and extra letters
+    steps = []
+    i, j = rows - 1, cols - 1
+    while i > 0 or j > 0:
+        if i > 0 and j > 0 and core_target[i - 1] == core_typed[j - 1] and dist[i][j] == dist[i - 1][j - 1]:
+            steps.append(('ok', offset + i - 1, core_target[i - 1], core_typed[j - 1]))
+            i, j = i - 1, j - 1
+        elif (i > 1 and j > 1 and core_target[i - 1] == core_typed[j - 2]
+                and core_target[i - 2] == core_typed[j - 1] and core_target[i - 1] != core_target[i - 2]
+                and dist[i][j] == dist[i - 2][j - 2] + 1):
+            steps.append(('swap', offset + i - 2, core_target[i - 2:i], core_typed[j - 2:j]))
+            i, j = i - 2, j - 2
+        elif i > 0 and j > 0 and dist[i][j] == dist[i - 1][j - 1] + 1:
+            steps.append(('sub', offset + i - 1, core_target[i - 1], core_typed[j - 1]))
+            i, j = i - 1, j - 1
+        elif i > 0 and dist[i][j] == dist[i - 1][j] + 1:
+            steps.append(('del', offset + i - 1, core_target[i - 1], ''))
+            i -= 1
+        else:
+            steps.append(('ins', offset + i, '', core_typed[j - 1]))
+            j -= 1
+    steps.reverse()
+    return dist[rows - 1][cols - 1], offset, steps
+
+
+def align(target, typed):
+    """
+    Edit operations turning target (correct spelling) into typed, as
+    (distance, ops) - the steps of _steps() without the matching letters
+    """
+    distance, _, steps = _steps(target, typed)
+    return distance, [step for step in steps if step[0] != 'ok']
+
+
+def spelling_feedback(target, typed):
+    """
+    Distance and per-letter diff of an answer, for the submit response.
+    Each diff entry is {'op', 'expected', 'typed'} in reading order; 'del'
+    entries are letters the student left out.
+    """
+    if len(typed) > MAX_SPELLING_LENGTH:
+        return {'distance': None, 'diff': None}
+    distance, offset, steps = _steps(target, typed)
+    diff = [{'op': 'ok', 'expected': char, 'typed': char} for char in target[:offset]]
+    diff.extend({'op': kind, 'expected': expected, 'typed': got} for kind, _, expected, got in steps)
+    suffix = offset + sum(len(expected) for _, _, expected, _ in steps)
+    diff.extend({'op': 'ok', 'expected': char, 'typed': char} for char in target[suffix:])
+    return {'distance': distance, 'diff': diff}
+
+
+def classify(target, typed):
+    """Set of pattern names for one misspelling of target"""
+    target = target.lower()
+    typed = typed.lower()
+    if not typed or typed == target or len(typed) > MAX_SPELLING_LENGTH:
+        return set()
+
+    # Too far off to say what went wrong - probably a different word
+    limit = max(3, len(target) // 2)
+    if edit_distance(target, typed, limit) > limit:
+        return {'other'}
+    _, ops = align(target, typed)
+
+    patterns = set()
+    for kind, position, expected, got in ops:
+        if kind == 'swap':
+            patterns.add('ie_ei' if expected in ('ie', 'ei') else 'transposed')
+        elif kind == 'del':
+            doubled = (
+                (position > 0 and target[position - 1] == expected)
+                or (position + 1 < len(target) and target[position + 1] == expected)
+            )
+            if doubled:
+                patterns.add('missed_double')
+            elif expected == 'e' and position == len(target) - 1:
+                patterns.add('silent_e')
+            elif expected in VOWELS:
+                patterns.add('missing_vowel')
+            else:
+                patterns.add('missing_letter')
+        elif kind == 'ins':
+            neighbours = target[position - 1:position] + target[position:position + 1]
+            if got in neighbours:
+                patterns.add('extra_double')
+            else:
+                patterns.add('extra_letter')
+        elif expected in VOWELS and got in VOWELS:
+            patterns.add('wrong_vowel')
+        else:
+            patterns.add('wrong_consonant')
+    return patterns
+
+
+def update_misspelling_index(batch_size=BATCH_SIZE, max_batches=None):
+    """
+    Analyse wrong answers recorded since the last run and add them to
+    MisspellingPattern. Returns the number of answers analysed.
+    """
+    # One updater per process; the watermark check in _analyse_batch keeps
+    # processes from counting the same answers twice
+    if not _index_lock.acquire(blocking=False):
+        return 0
+    try:
+        analysed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            count = _analyse_batch(batch_size)
+            analysed += count
+            batches += 1
+            if count < batch_size:
+                break
+        return analysed
+    finally:
+        _index_lock.release()
+
+
+def _analyse_batch(batch_size):
+    """
+    Analyse the next batch_size wrong answers after the watermark. Reading and
+    classifying happen outside any transaction; only writing the counters and
+    moving the watermark hold SQLite's write lock, so students' answers never
+    wait behind the classification. Returns the number of answers analysed -
+    0 if another process analysed them first.
+    """
+    watermark, _ = AnalysisWatermark.objects.get_or_create(name=WATERMARK_NAME)
+    start_id = watermark.last_id
+
+    attempts = list(
+        WordAttempt.objects.filter(
+            id__gt=start_id,
+            is_correct=False
+        ).select_related('word', 'custom_word').order_by('id')[:batch_size]
+    )
+    if not attempts:
+        return 0
+
+    found = _classify_attempts(attempts)
+
+    with transaction.atomic():
+        # Moving the watermark first takes SQLite's write lock. If another
+        # process moved it while these answers were being classified, they
+        # are already counted - drop this batch
+        moved = AnalysisWatermark.objects.filter(pk=watermark.pk, last_id=start_id).update(
+            last_id=attempts[-1].id,
+            updated_at=timezone.now()
+        )
+        if not moved:
+            return 0
+        _save_patterns(found)
+    return len(attempts)
+
+
+def _classify_attempts(attempts):
+    """student_id -> pattern -> [count, examples, last seen] for a batch of wrong answers"""
+    found = {}
+    for attempt in attempts:
+        word_text = attempt.get_word_text()
+        for pattern in classify(word_text, attempt.user_spelling):
+            entry = found.setdefault(attempt.student_id, {}).setdefault(pattern, [0, [], None])
+            entry[0] += 1
+            entry[1].append([word_text, attempt.user_spelling])
+            entry[2] = attempt.attempted_at
+    return found
+
+
+def _save_patterns(found):
+    """Add the counts from _classify_attempts to MisspellingPattern"""
+    if not found:
+        return
+    existing = {
+        (row.student_id, row.pattern): row
+        for row in MisspellingPattern.objects.filter(student_id__in=found.keys())
+    }
+    to_create = []
+    to_update = []
+    for student_id, patterns in found.items():
+        for pattern, (count, examples, last_seen_at) in patterns.items():
+            row = existing.get((student_id, pattern))
+            if row is None:
+                to_create.append(MisspellingPattern(
+                    student_id=student_id,
+                    pattern=pattern,
+                    count=count,
+                    examples=examples[-MAX_EXAMPLES:],
+                    last_seen_at=last_seen_at
+                ))
+            else:
+                row.count += count
+                row.examples = (row.examples + examples)[-MAX_EXAMPLES:]
+                row.last_seen_at = last_seen_at
+                to_update.append(row)
+    MisspellingPattern.objects.bulk_create(to_create)
+    MisspellingPattern.objects.bulk_update(to_update, ['count', 'examples', 'last_seen_at'])
+
+
+def rebuild_misspelling_index():
+    """Forget the index and analyse every wrong answer again"""
+    with transaction.atomic():
+        MisspellingPattern.objects.all().delete()
+        AnalysisWatermark.objects.filter(name=WATERMARK_NAME).update(last_id=0)
+    return update_misspelling_index()
+
+
+def get_student_patterns(student):
+    """A student's mistake patterns, most frequent first"""
+    return [
+        {
+            'pattern': row.pattern,
+            'label': PATTERN_LABELS.get(row.pattern, row.pattern),
+            'count': row.count,
+            'examples': row.examples,
+            'last_seen_at': row.last_seen_at,
+        }
+        for row in MisspellingPattern.objects.filter(student=student).order_by('-count')
+    ]
+
+
+def get_classroom_patterns(classroom):
+    """
+    Mistake patterns across a classroom, most frequent first, with how many
+    students make each one and a few examples
+    """
+    totals = {}
+    for row in MisspellingPattern.objects.filter(
+        student__classroom=classroom
+    ).select_related('student').order_by('-last_seen_at'):
+        entry = totals.setdefault(row.pattern, {
+            'pattern': row.pattern,
+            'label': PATTERN_LABELS.get(row.pattern, row.pattern),
+            'count': 0,
+            'students': [],
+            'examples': [],
+        })
+        entry['count'] += row.count
+        entry['students'].append({'username': row.student.username, 'count': row.count})
+        if len(entry['examples']) < MAX_EXAMPLES and row.examples:
+            entry['examples'].append(row.examples[-1])
+
+    patterns = sorted(totals.values(), key=lambda entry: entry['count'], reverse=True)
+    for entry in patterns:
+        entry['students'].sort(key=lambda student: student['count'], reverse=True)
+    return patterns
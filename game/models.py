@@ -1,10 +1,55 @@
 from django.db import models
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
 from django.conf import settings
 from django.utils import timezone
+from .scheduling import DEFAULT_SCHEDULER, SCHEDULER_CHOICES
 import secrets
 import string
 
 
+def make_word_key(word_id=None, custom_word_id=None):
+    """
+    One integer naming a word of either system: a Word's id, or a
+    CustomWord's id negated. WordQueue and WordAttempt store it next to
+    their two foreign keys, so a per-word lookup is one indexed column
+    instead of a branch per system.
+    """
+    if custom_word_id:
+        return -custom_word_id
+    return word_id
+
+
+def word_in_bucket(bucket):
+    """
+    Filter for queue entries and attempts whose word (found by word_key) is
+    in bucket - a CustomBucket, or a default word length. Each row's word is
+    one primary key lookup, so the student's own rows are read first.
+    """
+    if isinstance(bucket, CustomBucket):
+        return Exists(CustomWord.objects.filter(pk=OuterRef('word_key') * -1, bucket=bucket))
+    return Exists(Word.objects.filter(pk=OuterRef('word_key'), difficulty_bucket=bucket))
+
+
+def bucket_word_keys(bucket):
+    """
+    The word_key of every word in bucket (a CustomBucket, or a default word
+    length) as a subquery, aliased "key"
+    """
+    if isinstance(bucket, CustomBucket):
+        return CustomWord.objects.filter(bucket=bucket).values(key=F('id') * -1)
+    return Word.objects.filter(difficulty_bucket=bucket).values(key=F('id'))
+
+
+def word_key_matches():
+    """Check constraint: word_key is make_word_key() of the row's foreign keys"""
+    return (
+        Q(custom_word__isnull=True, word_key=F('word_id'))
+        | Q(custom_word__isnull=False, word_key=F('custom_word_id') * -1)
+    )
+
+
 class Classroom(models.Model):
     """Represents a teacher's classroom (period, class group, etc.)"""
     name = models.CharField(
@@ -90,6 +135,12 @@ class Classroom(models.Model):
 
 class GameConfiguration(models.Model):
     """Teacher-configurable game parameters"""
+    WORD_SAMPLING_CHOICES = [
+        ('random', 'Random'),
+        ('easier_first', 'Easier words first'),
+        ('harder_first', 'Harder words first'),
+    ]
+    
     teacher = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -107,6 +158,18 @@ class GameConfiguration(models.Model):
         default=3,
         help_text="Default starting difficulty bucket for new students (word length)"
     )
+    scheduler = models.CharField(
+        max_length=20,
+        choices=SCHEDULER_CHOICES,
+        default=DEFAULT_SCHEDULER,
+        help_text="How missed words are scheduled for review (see game/scheduling.py)"
+    )
+    word_sampling = models.CharField(
+        max_length=20,
+        choices=WORD_SAMPLING_CHOICES,
+        default='random',
+        help_text="How new words are picked from the bucket (weighted by WordStats.difficulty)"
+    )
     
     def __str__(self):
         return f"Config for {self.teacher.username}"
@@ -137,6 +200,48 @@ class Word(models.Model):
             # Map word length to difficulty buckets
             self.difficulty_bucket = self.word_length
         super().save(*args, **kwargs)
+    
+    @property
+    def word_key(self):
+        return make_word_key(word_id=self.id)
+
+
+class WordStats(models.Model):
+    """
+    Empirical difficulty of a word, computed from WordAttempt by the nightly
+    compute_word_difficulty command (see game/difficulty.py)
+    """
+    word = models.OneToOneField(
+        Word,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    errors = models.PositiveIntegerField(default=0)
+    students = models.PositiveIntegerField(default=0, help_text="Students who attempted the word")
+    students_mastered = models.PositiveIntegerField(default=0)
+    avg_attempts_to_mastery = models.FloatField(null=True, blank=True)
+    difficulty = models.FloatField(
+        default=0,
+        help_text="Error rate smoothed towards the overall average (0 = easy, 1 = hard)"
+    )
+    common_misspellings = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Most frequent wrong spellings as [spelling, count] pairs"
+    )
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name_plural = 'word stats'
+    
+    def __str__(self):
+        return f"{self.word.text}: {self.error_rate:.0%} errors over {self.attempts} attempts"
+    
+    @property
+    def error_rate(self):
+        return self.errors / self.attempts if self.attempts else 0
 
 
 class StudentProgress(models.Model):
@@ -161,11 +266,26 @@ class StudentProgress(models.Model):
         default=0,
         help_text="Total points earned from correct words (points = word length)"
     )
+    current_word_text = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        help_text="Word the student was last given (shown on the teacher's live monitor)"
+    )
+    current_word_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When current_word_text was handed out"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name_plural = "Student progress"
+        indexes = [
+            # Live classroom monitor: words handed out since the last poll
+            models.Index(fields=['current_word_at']),
+        ]
     
     def __str__(self):
         if self.custom_bucket:
@@ -300,6 +420,11 @@ class GameSession(models.Model):
     
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            # Live classroom monitor: sessions started/ended since the last poll
+            models.Index(fields=['started_at']),
+            models.Index(fields=['ended_at']),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
@@ -325,15 +450,21 @@ class WordAttempt(models.Model):
         on_delete=models.CASCADE,
         related_name='word_attempts'
     )
-    word = models.ForeignKey(Word, on_delete=models.CASCADE, null=True, blank=True)
+    # Not indexed, and deleted along with their word by delete_word_references:
+    # the (word_key, student) index serves lookups by either
+    word = models.ForeignKey(Word, on_delete=models.DO_NOTHING, null=True, blank=True, db_index=False)
     custom_word = models.ForeignKey(
         'CustomWord',
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
         null=True,
         blank=True,
+        db_index=False,
         related_name='attempts',
         help_text="Custom word (only used when classroom uses custom ladder)"
     )
+    word_key = models.IntegerField(
+        help_text="word id, or custom_word id negated (see make_word_key) - set on save"
+    )
     session = models.ForeignKey(
         GameSession,
         on_delete=models.CASCADE,
@@ -346,15 +477,41 @@ class WordAttempt(models.Model):
         help_text="How many times this word has been attempted"
     )
     attempted_at = models.DateTimeField(auto_now_add=True)
+    client_attempt_id = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        help_text="Client-generated id used to detect retried submissions of the same answer"
+    )
+    response_data = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Response originally returned for this attempt (replayed for retried submissions)"
+    )
     
     class Meta:
         ordering = ['-attempted_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'client_attempt_id'],
+                name='unique_client_attempt_per_student'
+            ),
+            models.CheckConstraint(check=word_key_matches(), name='wordattempt_word_key_matches'),
+        ]
+        indexes = [
+            # Attempts at one word, default or custom (of one student, or all)
+            models.Index(fields=['word_key', 'student']),
+        ]
     
     def __str__(self):
         status = "✓" if self.is_correct else "✗"
         word_text = self.custom_word.text if self.custom_word else self.word.text
         return f"{status} {self.student.username}: {word_text}"
     
+    def save(self, *args, **kwargs):
+        self.word_key = make_word_key(self.word_id, self.custom_word_id)
+        super().save(*args, **kwargs)
+    
     def get_word_text(self):
         """Get the word text (works for both default and custom words)"""
         if self.custom_word:
@@ -362,6 +519,125 @@ class WordAttempt(models.Model):
         return self.word.text
 
 
+class MisspellingPattern(models.Model):
+    """
+    How often a student makes one kind of spelling mistake, built
+    incrementally from wrong WordAttempts (see game/misspellings.py)
+    """
+    PATTERN_CHOICES = [
+        ('missed_double', 'Missed double letter'),
+        ('extra_double', 'Extra double letter'),
+        ('ie_ei', 'ie / ei swap'),
+        ('transposed', 'Swapped letters'),
+        ('silent_e', 'Dropped final e'),
+        ('missing_vowel', 'Missing vowel'),
+        ('missing_letter', 'Missing consonant'),
+        ('extra_letter', 'Extra letter'),
+        ('wrong_vowel', 'Wrong vowel'),
+        ('wrong_consonant', 'Wrong consonant'),
+        ('other', 'Very different spelling'),
+    ]
+
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='misspelling_patterns'
+    )
+    pattern = models.CharField(max_length=20, choices=PATTERN_CHOICES)
+    count = models.PositiveIntegerField(default=0, help_text="Wrong answers showing this mistake")
+    examples = models.JSONField(
+        default=list,
+        blank=True,
+        help_text="Most recent examples as [word, spelling] pairs"
+    )
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['student', '-count']
+        unique_together = ['student', 'pattern']
+
+    def __str__(self):
+        return f"{self.student.username}: {self.get_pattern_display()} x{self.count}"
+
+
+class AnalysisWatermark(models.Model):
+    """Last WordAttempt id an incremental analysis has processed"""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
+class ArchivedWordAttempt(models.Model):
+    """
+    WordAttempt from a past term, moved out of the hot table by the
+    archive_attempts command (see game/archive.py). Keeps only what history
+    reports need - no retry bookkeeping.
+    """
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_attempts'
+    )
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, null=True, blank=True)
+    custom_word = models.ForeignKey(
+        'CustomWord',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='archived_attempts'
+    )
+    word_key = models.IntegerField(help_text="word id, or custom_word id negated (see make_word_key)")
+    session_id = models.IntegerField(null=True, blank=True, help_text="GameSession the attempt belonged to")
+    user_spelling = models.CharField(max_length=100)
+    is_correct = models.BooleanField()
+    attempt_number = models.IntegerField(default=1)
+    attempted_at = models.DateTimeField()
+    term = models.CharField(max_length=50, db_index=True)
+
+    class Meta:
+        ordering = ['-attempted_at']
+
+    def __str__(self):
+        status = "✓" if self.is_correct else "✗"
+        return f"{status} {self.student.username}: {self.get_word_text()} ({self.term})"
+
+    def get_word_text(self):
+        """Get the word text (works for both default and custom words)"""
+        if self.custom_word:
+            return self.custom_word.text
+        return self.word.text
+
+
+class TermSummary(models.Model):
+    """A student's answer totals for an archived term"""
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='term_summaries'
+    )
+    term = models.CharField(max_length=50)
+    attempts = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    first_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['student', '-last_attempt_at']
+        unique_together = ['student', 'term']
+        verbose_name_plural = 'term summaries'
+
+    def __str__(self):
+        return f"{self.student.username} - {self.term}: {self.correct}/{self.attempts}"
+
+    @property
+    def accuracy(self):
+        return (self.correct / self.attempts * 100) if self.attempts else 0
+
+
 class BucketProgress(models.Model):
     """Track progress within each difficulty bucket"""
     student = models.ForeignKey(
@@ -400,15 +676,21 @@ class WordQueue(models.Model):
         on_delete=models.CASCADE,
         related_name='word_queue'
     )
-    word = models.ForeignKey(Word, on_delete=models.CASCADE, null=True, blank=True)
+    # Not indexed, and deleted along with their word by delete_word_references:
+    # the (word_key, student) index serves lookups by either
+    word = models.ForeignKey(Word, on_delete=models.DO_NOTHING, null=True, blank=True, db_index=False)
     custom_word = models.ForeignKey(
         'CustomWord',
-        on_delete=models.CASCADE,
+        on_delete=models.DO_NOTHING,
         null=True,
         blank=True,
+        db_index=False,
         related_name='queue_entries',
         help_text="Custom word (only used when classroom uses custom ladder)"
     )
+    word_key = models.IntegerField(
+        help_text="word id, or custom_word id negated (see make_word_key) - set on save"
+    )
     position = models.IntegerField(
         help_text="Position in queue (lower = sooner)"
     )
@@ -419,13 +701,43 @@ class WordQueue(models.Model):
     is_mastered = models.BooleanField(default=False)
     added_at = models.DateTimeField(auto_now_add=True)
     
+    # Review scheduling (see game/scheduling.py)
+    due_key = models.BigIntegerField(
+        default=0,
+        help_text="When the word is due, counted in words seen (lowest is shown next)"
+    )
+    due_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Don't show the word again before this time"
+    )
+    times_correct = models.IntegerField(default=0)
+    streak = models.IntegerField(
+        default=0,
+        help_text="Correct answers in a row since the last miss"
+    )
+    ease = models.FloatField(default=2.5, help_text="SM-2 ease factor")
+    interval = models.IntegerField(default=0, help_text="Last review interval in words")
+    
     class Meta:
-        ordering = ['position']
+        ordering = ['due_key', 'position']
+        constraints = [
+            models.CheckConstraint(check=word_key_matches(), name='wordqueue_word_key_matches'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'is_mastered', 'due_key']),
+            # The entries for one word, default or custom (of one student, or all)
+            models.Index(fields=['word_key', 'student']),
+        ]
     
     def __str__(self):
         word_text = self.custom_word.text if self.custom_word else self.word.text
         return f"{self.student.username}: {word_text} (pos {self.position})"
     
+    def save(self, *args, **kwargs):
+        self.word_key = make_word_key(self.word_id, self.custom_word_id)
+        super().save(*args, **kwargs)
+    
     def get_word_text(self):
         """Get the word text (works for both default and custom words)"""
         if self.custom_word:
@@ -547,4 +859,18 @@ class CustomWord(models.Model):
     def word_length(self):
         """Calculate word length"""
         return len(self.text)
+    
+    @property
+    def word_key(self):
+        return make_word_key(custom_word_id=self.id)
+
 
+@receiver(pre_delete, sender=Word)
+@receiver(pre_delete, sender=CustomWord)
+def delete_word_references(sender, instance, **kwargs):
+    """
+    Delete the queue entries and attempts of a word being deleted, through
+    the word_key index (their foreign keys to it aren't indexed)
+    """
+    for model in (WordQueue, WordAttempt):
+        model.objects.filter(word_key=instance.word_key).delete()
@@ -0,0 +1,203 @@
+"""
+Live classroom monitor for teachers.
+
+The monitor page polls classroom_monitor_feed with the cursor it got last
+time and receives only what changed since then:
+
+- new answers (WordAttempt id watermark)
+- the word each student was just given (StudentProgress.current_word_at)
+- sessions started or ended (GameSession.started_at / ended_at)
+- bucket advances (new BucketProgress rows, id watermark)
+
+New answers and bucket advances seek straight to the new rows through the
+(student, id) indexes. Current words and session starts/ends are read through
+their timestamp indexes for the whole school - the few rows that changed since
+the last poll - and narrowed to the classroom here: joined to the classroom in
+SQL, SQLite would walk every student of the classroom instead. So a poll reads
+roughly the new activity plus one index probe per student - never the answer
+or session history. Only the first poll (no cursor) loads a full snapshot of
+the classroom.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import User
+from .models import BucketProgress, GameSession, StudentProgress, WordAttempt
+
+# Timestamp watermarks are re-read with this much overlap, so a row that
+# committed just after its timestamp was taken is not missed. The state they
+# carry (current word, session start/end) is safe to apply twice.
+TIMESTAMP_OVERLAP = timedelta(seconds=5)
+# Most answers returned per poll; the client polls again at once when 'more' is set
+MAX_ATTEMPTS_PER_POLL = 200
+# Recent answers included with the initial snapshot
+SNAPSHOT_ATTEMPTS = 20
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(attempt_id, bucket_progress_id, timestamp):
+    return f'{attempt_id}.{bucket_progress_id}.{int(timestamp.timestamp() * 1000)}'
+
+
+def decode_cursor(cursor):
+    """Returns (attempt_id, bucket_progress_id, timestamp)"""
+    try:
+        attempt_id, bucket_progress_id, millis = (int(part) for part in cursor.split('.'))
+        timestamp = datetime.fromtimestamp(millis / 1000, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        # OverflowError / OSError: a timestamp outside what datetime can hold
+        raise InvalidCursor(cursor)
+    return attempt_id, bucket_progress_id, timestamp
+
+
+def bucket_display(bucket_progress):
+    if bucket_progress.custom_bucket_id:
+        return bucket_progress.custom_bucket.name
+    return f"Bucket {bucket_progress.bucket}"
+
+
+def serialize_attempt(attempt):
+    return {
+        'id': attempt.id,
+        'student_id': attempt.student_id,
+        'username': attempt.student.username,
+        'word': attempt.get_word_text(),
+        'spelling': attempt.user_spelling,
+        'correct': attempt.is_correct,
+        'at': attempt.attempted_at.isoformat(),
+    }
+
+
+def serialize_session(session):
+    return {
+        'id': session.id,
+        'student_id': session.student_id,
+        'username': session.student.username,
+        'active': session.is_active,
+        'started_at': session.started_at.isoformat(),
+        'ended_at': session.ended_at.isoformat() if session.ended_at else None,
+        'words_correct': session.words_correct,
+        'words_attempted': session.words_attempted,
+    }
+
+
+def get_monitor_snapshot(classroom):
+    """Full state of the classroom, returned for the first poll"""
+    now = timezone.now()
+    # Global maxima are primary key lookups - the next poll starts from here
+    max_attempt_id = WordAttempt.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    max_bucket_progress_id = BucketProgress.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+
+    students = User.objects.filter(
+        role='student',
+        classroom=classroom
+    ).select_related('progress__custom_bucket').order_by('username')
+
+    active_sessions = {
+        session.student_id: session
+        for session in GameSession.objects.filter(
+            student__classroom=classroom,
+            is_active=True
+        ).select_related('student')
+    }
+
+    student_rows = []
+    for student in students:
+        progress = getattr(student, 'progress', None)
+        session = active_sessions.get(student.id)
+        student_rows.append({
+            'id': student.id,
+            'username': student.username,
+            'bucket': progress.get_current_bucket_display() if progress else None,
+            'current_word': progress.current_word_text if progress else '',
+            'current_word_at': progress.current_word_at.isoformat() if progress and progress.current_word_at else None,
+            'session': serialize_session(session) if session else None,
+        })
+
+    recent_attempts = WordAttempt.objects.filter(
+        student__classroom=classroom,
+        id__lte=max_attempt_id
+    ).select_related('student', 'word', 'custom_word').order_by('-id')[:SNAPSHOT_ATTEMPTS]
+
+    return {
+        'reset': True,
+        'cursor': encode_cursor(max_attempt_id, max_bucket_progress_id, now),
+        'students': student_rows,
+        'attempts': [serialize_attempt(attempt) for attempt in reversed(recent_attempts)],
+        'current_words': [],
+        'sessions': [],
+        'bucket_changes': [],
+        'more': False,
+    }
+
+
+def get_monitor_changes(classroom, cursor):
+    """Everything that happened in the classroom since cursor (see module docstring)"""
+    last_attempt_id, last_bucket_progress_id, last_polled_at = decode_cursor(cursor)
+    now = timezone.now()
+    since = last_polled_at - TIMESTAMP_OVERLAP
+
+    attempts = list(
+        WordAttempt.objects.filter(
+            id__gt=last_attempt_id,
+            student__classroom=classroom
+        ).select_related('student', 'word', 'custom_word').order_by('id')[:MAX_ATTEMPTS_PER_POLL]
+    )
+    more = len(attempts) == MAX_ATTEMPTS_PER_POLL
+    if attempts:
+        last_attempt_id = attempts[-1].id
+
+    current_words = [
+        {
+            'student_id': row['student_id'],
+            'username': row['student__username'],
+            'word': row['current_word_text'],
+            'at': row['current_word_at'].isoformat(),
+            'bucket': row['custom_bucket__name'] or f"Bucket {row['current_bucket']}",
+        }
+        for row in StudentProgress.objects.filter(
+            current_word_at__gte=since
+        ).values(
+            'student_id', 'student__username', 'student__classroom_id', 'current_word_text',
+            'current_word_at', 'current_bucket', 'custom_bucket__name'
+        )
+        if row['student__classroom_id'] == classroom.id
+    ]
+
+    # Two queries rather than started_at OR ended_at, so each uses its own index
+    # (unordered - the default -started_at ordering would pick that index for both)
+    sessions = {}
+    for field in ('started_at', 'ended_at'):
+        for session in GameSession.objects.filter(
+            **{f'{field}__gte': since}
+        ).select_related('student').order_by():
+            if session.student.classroom_id == classroom.id:
+                sessions[session.id] = session
+    sessions = sorted(sessions.values(), key=lambda session: session.started_at)
+
+    bucket_changes = []
+    for bucket_progress in BucketProgress.objects.filter(
+        id__gt=last_bucket_progress_id,
+        student__classroom=classroom
+    ).select_related('student', 'custom_bucket').order_by('id'):
+        last_bucket_progress_id = bucket_progress.id
+        bucket_changes.append({
+            'student_id': bucket_progress.student_id,
+            'username': bucket_progress.student.username,
+            'bucket': bucket_display(bucket_progress),
+        })
+
+    return {
+        'reset': False,
+        'cursor': encode_cursor(last_attempt_id, last_bucket_progress_id, now),
+        'attempts': [serialize_attempt(attempt) for attempt in attempts],
+        'current_words': current_words,
+        'sessions': [serialize_session(session) for session in sessions],
+        'bucket_changes': bucket_changes,
+        'more': more,
+    }
@@ -0,0 +1,374 @@
+"""
+Opt-in per-request query profiler.
+
+QueryProfilerMiddleware times every request (wall time, number of queries
+and time spent in them, through connection.execute_wrapper) and files it
+under the URL name of the view. Each query is also counted under its
+"shape" - the SQL with literals and IN (...) lists folded - so the report
+can show which statements cost the most overall.
+
+Every process keeps its own totals in memory and writes them to its own
+JSON file in GAME_QUERY_PROFILER_DIR at most every FLUSH_INTERVAL seconds.
+Nothing is ever read back by a worker, so processes never contend; reports
+(load_profile) add up all the files. Times are kept in fixed log-scale
+histograms, which is what lets totals from different processes be merged
+into percentiles.
+
+The middleware works under WSGI and ASGI. Queries are timed by one execute
+wrapper on every connection, which charges them to the request in a context
+variable, so an async view's queries - run by sync_to_async on another
+thread - are counted too.
+
+A streaming response (the CSV exports, the leaderboard stream) is timed up
+to the moment it is returned, before any of its content is produced: the
+queries run while it streams are not counted.
+
+A process that exits leaves its file behind; load_profile deletes those not
+written for STALE_AFTER, and reset_profile deletes them all.
+
+With GAME_QUERY_PROFILER off the middleware raises MiddlewareNotUsed and
+Django leaves it out of the chain altogether.
+"""
+import atexit
+import bisect
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+FLUSH_INTERVAL = 10  # seconds
+# Files of processes that have exited are deleted once this old
+STALE_AFTER = 24 * 60 * 60  # seconds
+# Histogram bucket upper bounds in ms: 0.1ms up to ~100s, 12% apart
+HISTOGRAM_BOUNDS = [0.1 * 1.12 ** i for i in range(123)]
+# Query shapes kept per process; the least costly are dropped beyond this
+MAX_SHAPES = 500
+MAX_SHAPE_LENGTH = 600
+RESET_FILE = 'reset'
+UNRESOLVED = '<unresolved>'
+
+_current_request = contextvars.ContextVar('query_profile', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_REPEATED_ROWS = re.compile(r'(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+_SPACE = re.compile(r'\s+')
+
+
+def query_shape(sql):
+    """sql with its values replaced by ? and value lists folded to (...)"""
+    shape = _STRING.sub('?', sql).replace('%s', '?')
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(...)', shape)
+    shape = _REPEATED_ROWS.sub(r'\1, ...', shape)
+    return _SPACE.sub(' ', shape).strip()[:MAX_SHAPE_LENGTH]
+
+
+def empty_histogram():
+    return [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+
+def percentile(histogram, fraction):
+    """Upper bound in ms of the bucket holding the given fraction of samples"""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= rank:
+            return HISTOGRAM_BOUNDS[min(index, len(HISTOGRAM_BOUNDS) - 1)]
+    return HISTOGRAM_BOUNDS[-1]
+
+
+def profiler_dir():
+    return Path(settings.GAME_QUERY_PROFILER_DIR)
+
+
+class RequestProfile:
+    """Queries of one request, filled in by the execute wrapper"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.shapes = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            self.shapes.append((sql, elapsed))
+
+
+def _profile_query(execute, sql, params, many, context):
+    """Execute wrapper: times the query for the request being profiled, if any"""
+    request_profile = _current_request.get()
+    if request_profile is None:
+        return execute(sql, params, many, context)
+    return request_profile(execute, sql, params, many, context)
+
+
+def install_query_wrapper():
+    """Add the execute wrapper to this thread's connection, once"""
+    if _profile_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_profile_query)
+
+
+class ProcessProfile:
+    """This process's totals since it started (or since the last reset)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.last_flush = time.monotonic()
+        self.reset_seen = self.started
+        self.clear()
+
+    def clear(self):
+        self.endpoints = {}
+        self.shapes = {}
+
+    def record(self, view_name, status_code, wall_seconds, request_profile):
+        with self.lock:
+            endpoint = self.endpoints.get(view_name)
+            if endpoint is None:
+                endpoint = self.endpoints[view_name] = {
+                    'requests': 0, 'errors': 0, 'queries': 0, 'max_queries': 0,
+                    'wall_ms': 0.0, 'db_ms': 0.0,
+                    'wall': empty_histogram(), 'db': empty_histogram(),
+                }
+            wall_ms = wall_seconds * 1000
+            db_ms = request_profile.db_seconds * 1000
+            endpoint['requests'] += 1
+            endpoint['errors'] += status_code >= 500
+            endpoint['queries'] += request_profile.queries
+            endpoint['max_queries'] = max(endpoint['max_queries'], request_profile.queries)
+            endpoint['wall_ms'] += wall_ms
+            endpoint['db_ms'] += db_ms
+            endpoint['wall'][bisect.bisect_left(HISTOGRAM_BOUNDS, wall_ms)] += 1
+            endpoint['db'][bisect.bisect_left(HISTOGRAM_BOUNDS, db_ms)] += 1
+
+            for sql, elapsed in request_profile.shapes:
+                shape = query_shape(sql)
+                entry = self.shapes.get(shape)
+                if entry is None:
+                    entry = self.shapes[shape] = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': {}}
+                elapsed_ms = elapsed * 1000
+                entry['count'] += 1
+                entry['total_ms'] += elapsed_ms
+                entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+                entry['views'][view_name] = entry['views'].get(view_name, 0) + 1
+            if len(self.shapes) > MAX_SHAPES:
+                kept = sorted(self.shapes.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+                self.shapes = dict(kept[:MAX_SHAPES * 3 // 4])
+
+            if time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self.last_flush = time.monotonic()
+        directory = profiler_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        try:
+            reset_at = (directory / RESET_FILE).stat().st_mtime
+        except FileNotFoundError:
+            reset_at = 0
+        if reset_at > self.reset_seen:
+            self.reset_seen = reset_at
+            self.clear()
+        if not self.endpoints:
+            return
+
+        # pid alone could be reused by a later worker
+        path = directory / f'{os.getpid()}-{int(self.started)}.json'
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps({
+            'pid': os.getpid(),
+            'started': self.started,
+            'updated': time.time(),
+            'endpoints': self.endpoints,
+            'shapes': self.shapes,
+        }))
+        os.replace(temporary, path)
+
+
+_process_profile = None
+_process_profile_lock = threading.Lock()
+
+
+def get_process_profile():
+    global _process_profile
+    if _process_profile is None:
+        with _process_profile_lock:
+            if _process_profile is None:
+                _process_profile = ProcessProfile()
+                atexit.register(_process_profile.flush)
+    return _process_profile
+
+
+class QueryProfilerMiddleware:
+    """Records wall time, query count and query time of every request"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'GAME_QUERY_PROFILER', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profile = get_process_profile()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        install_query_wrapper()
+        request_profile = RequestProfile()
+        token = _current_request.set(request_profile)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, time.perf_counter() - started, request_profile)
+        return response
+
+    async def __acall__(self, request):
+        # Sync views and sync_to_async calls of this request run on one thread
+        # (Django gives each request its own thread-sensitive context)
+        await sync_to_async(install_query_wrapper)()
+        request_profile = RequestProfile()
+        token = _current_request.set(request_profile)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, time.perf_counter() - started, request_profile)
+        return response
+
+    def record(self, request, response, wall_seconds, request_profile):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else UNRESOLVED
+        self.profile.record(view_name, response.status_code, wall_seconds, request_profile)
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # running as another user
+    return True
+
+
+def prune_stale_files(directory):
+    """Delete the files of exited processes that haven't been written for STALE_AFTER"""
+    cutoff = time.time() - STALE_AFTER
+    for path in [*directory.glob('*.json'), *directory.glob('*.tmp')]:
+        try:
+            if path.stat().st_mtime >= cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        pid = path.stem.split('-')[0]
+        if path.suffix == '.tmp' or not pid.isdigit() or not is_running(int(pid)):
+            path.unlink(missing_ok=True)
+
+
+def load_profile():
+    """All processes' totals added up: (endpoints, shapes, process count)"""
+    endpoints = {}
+    shapes = {}
+    directory = profiler_dir()
+    if directory.exists():
+        prune_stale_files(directory)
+    files = sorted(directory.glob('*.json')) if directory.exists() else []
+    for path in files:
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # being replaced right now
+        for view_name, stats in data['endpoints'].items():
+            total = endpoints.setdefault(view_name, {
+                'requests': 0, 'errors': 0, 'queries': 0, 'max_queries': 0,
+                'wall_ms': 0.0, 'db_ms': 0.0,
+                'wall': empty_histogram(), 'db': empty_histogram(),
+            })
+            for key in ('requests', 'errors', 'queries', 'wall_ms', 'db_ms'):
+                total[key] += stats[key]
+            total['max_queries'] = max(total['max_queries'], stats['max_queries'])
+            for key in ('wall', 'db'):
+                total[key] = [a + b for a, b in zip(total[key], stats[key])]
+        for shape, stats in data['shapes'].items():
+            total = shapes.setdefault(shape, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'views': {}})
+            total['count'] += stats['count']
+            total['total_ms'] += stats['total_ms']
+            total['max_ms'] = max(total['max_ms'], stats['max_ms'])
+            for view_name, count in stats['views'].items():
+                total['views'][view_name] = total['views'].get(view_name, 0) + count
+    return endpoints, shapes, len(files)
+
+
+def get_profile_report(top=20):
+    """Per-endpoint percentiles, slowest p95 first, and the costliest query shapes"""
+    endpoints, shapes, processes = load_profile()
+    rows = []
+    for view_name, stats in endpoints.items():
+        requests = stats['requests']
+        rows.append({
+            'view': view_name,
+            'requests': requests,
+            'errors': stats['errors'],
+            'p50': percentile(stats['wall'], 0.50),
+            'p95': percentile(stats['wall'], 0.95),
+            'p99': percentile(stats['wall'], 0.99),
+            'db_p95': percentile(stats['db'], 0.95),
+            'mean_ms': stats['wall_ms'] / requests,
+            'db_share': stats['db_ms'] / stats['wall_ms'] * 100 if stats['wall_ms'] else 0,
+            'mean_queries': stats['queries'] / requests,
+            'max_queries': stats['max_queries'],
+        })
+    rows.sort(key=lambda row: row['p95'], reverse=True)
+
+    top_shapes = []
+    for shape, stats in sorted(shapes.items(), key=lambda item: item[1]['total_ms'], reverse=True)[:top]:
+        views = sorted(stats['views'].items(), key=lambda item: item[1], reverse=True)
+        top_shapes.append({
+            'sql': shape,
+            'count': stats['count'],
+            'total_ms': stats['total_ms'],
+            'mean_ms': stats['total_ms'] / stats['count'],
+            'max_ms': stats['max_ms'],
+            'views': [view_name for view_name, _ in views[:3]],
+        })
+    return {'endpoints': rows, 'shapes': top_shapes, 'processes': processes}
+
+
+def reset_profile():
+    """Delete all totals; running processes drop theirs at their next flush"""
+    directory = profiler_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in [*directory.glob('*.json'), *directory.glob('*.tmp')]:
+        path.unlink(missing_ok=True)
+    (directory / RESET_FILE).touch()
@@ -0,0 +1,164 @@
+"""
+Bulk student roster import.
+
+A roster is a CSV file with a header row. Recognised columns (any order,
+case-insensitive): username (required), password, first_name, last_name,
+email. Students without a password get a generated one.
+
+import_roster() creates every account, its StudentProgress at the
+classroom's starting bucket and the matching BucketProgress with three
+bulk_create calls in one transaction. Password hashing - by far the
+slowest part - runs in a process pool first (see accounts/passwords.py).
+"""
+import csv
+import io
+import secrets
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from accounts.models import User
+from accounts.passwords import hash_passwords
+from .models import BucketProgress, StudentProgress
+
+ROSTER_COLUMNS = ['username', 'password', 'first_name', 'last_name', 'email']
+COLUMN_ALIASES = {
+    'user': 'username',
+    'user_name': 'username',
+    'login': 'username',
+    'first': 'first_name',
+    'firstname': 'first_name',
+    'given_name': 'first_name',
+    'last': 'last_name',
+    'lastname': 'last_name',
+    'surname': 'last_name',
+    'family_name': 'last_name',
+    'e-mail': 'email',
+}
+MAX_ROSTER_ROWS = 2000
+# No 0/o, 1/l/i - generated passwords get copied from paper
+PASSWORD_ALPHABET = 'abcdefghjkmnpqrstuvwxyz23456789'
+GENERATED_PASSWORD_LENGTH = 8
+
+
+class RosterError(Exception):
+    """The roster file can't be read at all"""
+
+
+def generate_password():
+    return ''.join(secrets.choice(PASSWORD_ALPHABET) for _ in range(GENERATED_PASSWORD_LENGTH))
+
+
+def normalize_column(name):
+    name = name.strip().lower().replace(' ', '_')
+    return COLUMN_ALIASES.get(name, name)
+
+
+def parse_roster(text):
+    """
+    Rows of a roster CSV as dicts with ROSTER_COLUMNS keys, plus a list of
+    problems ("Line 4: ...") for rows that were left out
+    """
+    text = text.lstrip('\ufeff')
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(io.StringIO(text), dialect)
+
+    header = next(reader, None)
+    if not header:
+        raise RosterError('The file is empty')
+    columns = [normalize_column(name) for name in header]
+    if 'username' not in columns:
+        raise RosterError('The first row must name the columns, including "username"')
+
+    rows = []
+    problems = []
+    seen = set()
+    for line, values in enumerate(reader, 2):
+        if not any(value.strip() for value in values):
+            continue
+        if len(rows) >= MAX_ROSTER_ROWS:
+            raise RosterError(f'A roster can have at most {MAX_ROSTER_ROWS} students')
+        record = dict.fromkeys(ROSTER_COLUMNS, '')
+        for column, value in zip(columns, values):
+            if column in record:
+                record[column] = value.strip()
+
+        username = record['username']
+        try:
+            if not username:
+                raise ValidationError('username is missing')
+            User.username_validator(username)
+        except ValidationError as error:
+            problems.append(f'Line {line}: {" ".join(error.messages)}')
+            continue
+        if username.lower() in seen:
+            problems.append(f'Line {line}: {username} appears more than once')
+            continue
+        seen.add(username.lower())
+        rows.append(record)
+    return rows, problems
+
+
+def get_classroom_starting_bucket(classroom):
+    """(current_bucket, custom_bucket) a new student of classroom starts at"""
+    # Same rules as StudentProgress.get_starting_bucket, without a query per student
+    if classroom.uses_custom_ladder():
+        return None, classroom.bucket_ladder.get_first_bucket()
+    return classroom.default_starting_bucket, None
+
+
+def import_roster(classroom, rows, provisional_hashes=False, workers=None):
+    """
+    Create the students in rows in classroom. Usernames that already exist
+    are skipped. Returns (created, skipped): created is a list of
+    (username, password, generated) for the class sheet, skipped a list of
+    usernames. provisional_hashes=True hashes the passwords with a tenth of
+    the iterations until each student's first login (accounts/passwords.py).
+    """
+    existing = set(
+        User.objects.filter(username__in=[row['username'] for row in rows]).values_list('username', flat=True)
+    )
+    skipped = [row['username'] for row in rows if row['username'] in existing]
+    rows = [row for row in rows if row['username'] not in existing]
+    if not rows:
+        return [], skipped
+
+    passwords = [row['password'] or generate_password() for row in rows]
+    hashes = hash_passwords(passwords, provisional=provisional_hashes, workers=workers)
+    current_bucket, custom_bucket = get_classroom_starting_bucket(classroom)
+
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(
+                username=row['username'],
+                password=password_hash,
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                email=row['email'],
+                role='student',
+                classroom=classroom,
+                teacher=classroom.teacher
+            )
+            for row, password_hash in zip(rows, hashes)
+        ])
+        # Not every database returns ids from bulk_create - look them up
+        student_ids = list(
+            User.objects.filter(username__in=[row['username'] for row in rows]).values_list('id', flat=True)
+        )
+        StudentProgress.objects.bulk_create([
+            StudentProgress(student_id=student_id, current_bucket=current_bucket, custom_bucket=custom_bucket)
+            for student_id in student_ids
+        ])
+        BucketProgress.objects.bulk_create([
+            BucketProgress(student_id=student_id, bucket=current_bucket, custom_bucket=custom_bucket)
+            for student_id in student_ids
+        ])
+
+    created = [
+        (row['username'], password, not row['password'])
+        for row, password in zip(rows, passwords)
+    ]
+    return created, skipped
@@ -0,0 +1,213 @@
+"""
+Review schedulers for the word queue.
+
+Every WordQueue entry carries a due_key: the queue is a timeline measured in
+words seen, and get_next_word hands out the unmastered entry with the lowest
+due_key (see next_due_entry). After each answer the classroom's scheduler
+updates the entry's review state, decides whether it is now mastered and
+computes its next due_key:
+
+    due_key = front_key + interval_in_words
+
+where front_key is the lowest due_key still waiting in the student's queue,
+so "interval N" means "after about N other words". Schedulers can also set
+due_at, a wall-clock "not before" time, so a word isn't reviewed again
+too soon just because the student answers quickly.
+
+The schedulers only read and write plain attributes (is_mastered,
+times_failed, times_correct, streak, ease, interval, due_key, due_at), so the
+simulator in management/commands/simulate_schedulers.py replays them on
+in-memory entries without touching the database.
+
+Available schedulers (GameConfiguration.scheduler):
+- legacy:  recycle at a random spot within recycling_distance; mastered on
+           the first correct answer, or after 3 correct answers once missed
+- leitner: a missed word climbs boxes with growing intervals (3, 10, 25
+           words); mastered after 3 correct answers in a row
+- sm2:     SuperMemo-2 style - intervals grow by a per-word ease factor that
+           drops on every miss; mastered once the interval reaches 30 words
+"""
+import random
+from abc import ABC, abstractmethod
+from datetime import timedelta
+
+from django.db.models import Q
+
+DEFAULT_SCHEDULER = 'legacy'
+
+# Minimum wall-clock time per word of interval for the spaced schedulers.
+# A 10-word interval is also at least 50 seconds away.
+SECONDS_PER_WORD = 5
+
+
+class Scheduler(ABC):
+    """Base class - subclasses implement schedule and mastery_progress"""
+    name = ''
+    label = ''
+
+    def record_answer(self, entry, is_correct, front_key, now, config=None, rng=None):
+        """
+        Update entry after an answer. Returns True if the word was mastered
+        by this answer. The caller saves the entry. rng is the random.Random
+        to draw from (the module's shared one if None).
+        """
+        if entry.is_mastered:
+            # Word was already mastered - just keep the counters
+            if is_correct:
+                entry.times_correct += 1
+            else:
+                entry.times_failed += 1
+            return False
+
+        if is_correct:
+            entry.times_correct += 1
+            entry.streak += 1
+        else:
+            entry.times_failed += 1
+            entry.streak = 0
+
+        if is_correct and entry.times_failed == 0:
+            # Never missed - the student already knows this word
+            entry.is_mastered = True
+            return True
+
+        return self.schedule(entry, is_correct, front_key, now, config, rng or random)
+
+    @abstractmethod
+    def schedule(self, entry, is_correct, front_key, now, config, rng):
+        """Update an unmastered entry's review state and due_key; returns True if it is now mastered"""
+
+    @abstractmethod
+    def mastery_progress(self, entry):
+        """Returns (correct answers counted so far, correct answers required)"""
+
+    def set_due(self, entry, front_key, interval, now):
+        entry.interval = interval
+        entry.due_key = front_key + interval
+        entry.due_at = now + timedelta(seconds=interval * SECONDS_PER_WORD)
+
+
+class LegacyScheduler(Scheduler):
+    """The original rule: random recycle position, 3 correct answers after a miss"""
+    name = 'legacy'
+    label = 'Classic (random recycling)'
+    required_after_miss = 3
+
+    def schedule(self, entry, is_correct, front_key, now, config, rng):
+        if is_correct and entry.times_correct >= self.required_after_miss:
+            entry.is_mastered = True
+            return True
+
+        recycling_distance = config.recycling_distance if config else 100
+        entry.interval = rng.randint(1, min(recycling_distance, 50))
+        entry.due_key = front_key + entry.interval
+        entry.due_at = None
+        return False
+
+    def mastery_progress(self, entry):
+        if entry.times_failed > 0:
+            return entry.times_correct, self.required_after_miss
+        return entry.times_correct, 1
+
+
+class LeitnerScheduler(Scheduler):
+    """Leitner boxes: each correct answer in a row moves the word to a longer interval"""
+    name = 'leitner'
+    label = 'Leitner boxes'
+    # Interval (in words) for each box; box = correct answers in a row since the last miss
+    box_intervals = [3, 10, 25]
+
+    def schedule(self, entry, is_correct, front_key, now, config, rng):
+        if entry.streak >= len(self.box_intervals):
+            entry.is_mastered = True
+            return True
+
+        self.set_due(entry, front_key, self.box_intervals[entry.streak], now)
+        return False
+
+    def mastery_progress(self, entry):
+        if entry.times_failed > 0:
+            return entry.streak, len(self.box_intervals)
+        return entry.times_correct, 1
+
+
+class SM2Scheduler(Scheduler):
+    """SuperMemo-2 adapted to intervals counted in words"""
+    name = 'sm2'
+    label = 'SM-2 (adaptive intervals)'
+    first_intervals = [4, 12]
+    mastery_interval = 30
+    min_ease = 1.3
+    default_ease = 2.5
+
+    @staticmethod
+    def quality(is_correct):
+        # SM-2 grades answers 0-5; a spelling is either right or wrong
+        return 4 if is_correct else 1
+
+    def next_interval(self, streak, interval, ease):
+        if streak <= len(self.first_intervals):
+            return self.first_intervals[streak - 1]
+        return round(interval * ease)
+
+    def schedule(self, entry, is_correct, front_key, now, config, rng):
+        q = self.quality(is_correct)
+        entry.ease = max(self.min_ease, entry.ease + 0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+
+        if not is_correct:
+            self.set_due(entry, front_key, 2, now)
+            return False
+
+        interval = self.next_interval(entry.streak, entry.interval, entry.ease)
+        if interval >= self.mastery_interval:
+            entry.is_mastered = True
+            return True
+
+        self.set_due(entry, front_key, interval, now)
+        return False
+
+    def mastery_progress(self, entry):
+        if entry.times_failed == 0:
+            return entry.times_correct, 1
+        # Count how many more correct answers the interval needs to reach mastery
+        streak, interval, remaining = entry.streak, entry.interval, 0
+        while True:
+            streak += 1
+            remaining += 1
+            interval = self.next_interval(streak, interval, entry.ease)
+            if interval >= self.mastery_interval:
+                return entry.streak, entry.streak + remaining
+
+
+SCHEDULERS = {
+    scheduler.name: scheduler
+    for scheduler in (LegacyScheduler(), LeitnerScheduler(), SM2Scheduler())
+}
+
+SCHEDULER_CHOICES = [(name, scheduler.label) for name, scheduler in SCHEDULERS.items()]
+
+
+def get_scheduler(config):
+    """Scheduler selected in a GameConfiguration (legacy if none)"""
+    name = getattr(config, 'scheduler', None) or DEFAULT_SCHEDULER
+    return SCHEDULERS.get(name, SCHEDULERS[DEFAULT_SCHEDULER])
+
+
+def due_now_filter(now):
+    return Q(due_at__isnull=True) | Q(due_at__lte=now)
+
+
+def next_due_entry(queue_items, now):
+    """
+    The entry to show next: lowest due_key among entries whose wall-clock
+    wait has passed. If everything is still waiting, the lowest due_key
+    overall (better than showing nothing).
+    """
+    ordered = queue_items.order_by('due_key', 'position')
+    return ordered.filter(due_now_filter(now)).first() or ordered.first()
+
+
+async def anext_due_entry(queue_items, now):
+    """Async version of next_due_entry"""
+    ordered = queue_items.order_by('due_key', 'position')
+    return await ordered.filter(due_now_filter(now)).afirst() or await ordered.afirst()
@@ -0,0 +1,172 @@
+"""
+Server-Sent Events support for live classroom leaderboards.
+
+Answers are recorded by the regular (WSGI or ASGI) workers, which bump a
+per-classroom leaderboard version in the shared cache. Inside an ASGI worker
+every classroom that has at least one open stream gets a single
+ClassroomBroadcaster: it polls that version, loads the standings once per
+change and wakes up all of the classroom's connections. An idle connection is
+just a suspended coroutine, so hundreds of them are cheap on one Pi.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# How often each broadcaster checks the shared leaderboard version (seconds)
+POLL_INTERVAL = 2
+# Comment line sent on idle connections so proxies don't time them out
+HEARTBEAT_INTERVAL = 25
+# Streams are closed after this long; EventSource reconnects automatically.
+# This also reaps connections whose client went away without us noticing.
+MAX_STREAM_SECONDS = 300
+# Tells EventSource how long to wait before reconnecting (milliseconds)
+RECONNECT_DELAY_MS = 3000
+
+
+def leaderboard_version_key(classroom_id):
+    return f'leaderboard_version:{classroom_id}'
+
+
+def get_leaderboard_version(classroom_id):
+    return cache.get(leaderboard_version_key(classroom_id), 0)
+
+
+def bump_leaderboard_version(classroom_id, version):
+    """Mark a classroom's leaderboard as changed (called after every answer)"""
+    cache.set(leaderboard_version_key(classroom_id), version, timeout=None)
+
+
+def format_event(event, data):
+    """Encode one SSE message"""
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+def diff_standings(previous, standings):
+    """
+    Compare two standings lists (see get_classroom_standings).
+    Returns (changed_entries, removed_student_ids).
+    """
+    previous_by_id = {entry['id']: entry for entry in previous}
+    current_ids = set()
+    changed = []
+    for entry in standings:
+        current_ids.add(entry['id'])
+        old = previous_by_id.get(entry['id'])
+        if old is None or old['rank'] != entry['rank'] or old['score'] != entry['score']:
+            changed.append(entry)
+    removed = [student_id for student_id in previous_by_id if student_id not in current_ids]
+    return changed, removed
+
+
+class ClassroomBroadcaster:
+    """Shares one version poll and one standings load among a classroom's streams"""
+
+    def __init__(self, classroom_id, load_standings):
+        self.classroom_id = classroom_id
+        self.load_standings = sync_to_async(load_standings)
+        self.version = None
+        self.standings = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._ready = asyncio.Event()
+        self._task = None
+
+    def subscribe(self):
+        self.subscribers += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll())
+
+    def unsubscribe(self):
+        self.subscribers -= 1
+
+    async def wait_ready(self):
+        await self._ready.wait()
+
+    async def wait_for_change(self, seen_version, timeout):
+        """Wait until the standings move past seen_version (or timeout)"""
+        if self.version != seen_version:
+            return
+        try:
+            # No shield: on timeout wait_for cancels the wait, which takes it
+            # off the event instead of leaving a task behind per heartbeat
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _poll(self):
+        try:
+            while self.subscribers > 0:
+                version = await cache.aget(leaderboard_version_key(self.classroom_id), 0)
+                if version != self.version or self.standings is None:
+                    try:
+                        self.standings = await self.load_standings(self.classroom_id)
+                    except Exception:
+                        logger.exception('Could not load standings for classroom %s', self.classroom_id)
+                        await asyncio.sleep(POLL_INTERVAL)
+                        continue
+                    self.version = version
+                    self._ready.set()
+                    # Wake everyone waiting on the old event, start a new one
+                    changed, self._changed = self._changed, asyncio.Event()
+                    changed.set()
+                await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            if _broadcasters.get(self.classroom_id) is self:
+                del _broadcasters[self.classroom_id]
+
+
+_broadcasters = {}
+
+
+def get_broadcaster(classroom_id, load_standings):
+    broadcaster = _broadcasters.get(classroom_id)
+    if broadcaster is None:
+        broadcaster = ClassroomBroadcaster(classroom_id, load_standings)
+        _broadcasters[classroom_id] = broadcaster
+    return broadcaster
+
+
+async def leaderboard_events(classroom_id, load_standings):
+    """
+    Async generator of SSE messages for one connection: a full 'standings'
+    snapshot first, then 'changes' messages containing only the students
+    whose rank or score moved.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    broadcaster = get_broadcaster(classroom_id, load_standings)
+    broadcaster.subscribe()
+    try:
+        yield f'retry: {RECONNECT_DELAY_MS}\n\n'
+        await broadcaster.wait_ready()
+
+        sent_version = broadcaster.version
+        sent_standings = broadcaster.standings
+        yield format_event('standings', {
+            'version': sent_version,
+            'standings': sent_standings,
+        })
+
+        while loop.time() - started < MAX_STREAM_SECONDS:
+            await broadcaster.wait_for_change(sent_version, HEARTBEAT_INTERVAL)
+            if broadcaster.version == sent_version:
+                yield ': keep-alive\n\n'
+                continue
+
+            changed, removed = diff_standings(sent_standings, broadcaster.standings)
+            sent_version = broadcaster.version
+            sent_standings = broadcaster.standings
+            if changed or removed:
+                yield format_event('changes', {
+                    'version': sent_version,
+                    'changed': changed,
+                    'removed': removed,
+                    'total_students': len(sent_standings),
+                })
+    finally:
+        broadcaster.unsubscribe()
@@ -1,3 +1,1684 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.hashers import get_hasher
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+import fill_word_lists
+from accounts.models import User
+from accounts.passwords import hash_passwords
+from . import (
+    async_views, difficulty, engine, exports, lexicon, misspellings, profiling, roster, scheduling, streams, tracing,
+    views, word_frequency, word_patterns, word_search
+)
+from .archive import archive_attempts
+from .difficulty import compute_word_stats
+from .engine import queries, rules
+from .management.commands.nightly_maintenance import Command as NightlyMaintenance
+from .misspellings import update_misspelling_index
+from .models import (
+    AnalysisWatermark, ArchivedWordAttempt, BucketLadder, BucketProgress, Classroom, CustomBucket, CustomWord,
+    GameConfiguration, GameSession, MisspellingPattern, StudentProgress, TermSummary, Word, WordAttempt,
+    WordQueue, WordStats, bucket_word_keys, word_in_bucket
+)
+from .scheduling import SCHEDULERS, get_scheduler
+
+# The student game API served by the async views, as under spelling_game.asgi
+# (GAME_ASYNC_API) - AsyncGameAPITestCase uses this module as its URLconf
+urlpatterns = [
+    path('api/next-word/', async_views.get_next_word),
+    path('api/submit-answer/', async_views.submit_answer),
+    path('api/end-session/', async_views.end_session),
+]
+
+# In-memory caches for every test, so the tests never write to the project's
+# cache directory or read what a dev server left there
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-sessions'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class GameTestCase(TestCase):
+    """A TestCase on TEST_CACHES, emptied before each test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+
+THREE_LETTER_WORDS = ['cat', 'dog', 'sun', 'hat', 'pig', 'cup', 'bed', 'box', 'jam', 'net', 'owl', 'rug']
+FOUR_LETTER_WORDS = ['bird', 'fish', 'frog']
+
+
+class GameEngineTestCase(GameTestCase):
+    """
+    The game engine on a small word list (buckets 3 and 4, two mastered
+    words complete a bucket).
+
+    The assertNumQueries counts are the engine's documented query bounds
+    (GAME_ENGINE.md). A change that adds a query to an operation has to
+    update them there too.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        GameConfiguration.objects.create(teacher=cls.teacher, words_to_complete_bucket=2)
+        cls.classroom = Classroom.objects.create(name='P1', teacher=cls.teacher, default_starting_bucket=3)
+        for text in THREE_LETTER_WORDS + FOUR_LETTER_WORDS:
+            Word.objects.create(text=text)
+
+        cls.student = cls.create_student('student', current_bucket=3)
+
+    @classmethod
+    def create_student(cls, username, classroom=None, current_bucket=None, custom_bucket=None):
+        student = User.objects.create(
+            username=username, role='student', classroom=classroom or cls.classroom, teacher=cls.teacher
+        )
+        StudentProgress.objects.create(student=student, current_bucket=current_bucket, custom_bucket=custom_bucket)
+        BucketProgress.objects.create(student=student, bucket=current_bucket, custom_bucket=custom_bucket)
+        return student
+
+    def answer(self, word_id, spelling=None, student=None, attempt_id=None):
+        """Answer word_id - correctly unless spelling is given"""
+        if spelling is None:
+            spelling = queries.find_word(word_id)[0].text
+        return engine.submit_answer(student or self.student, word_id, spelling, attempt_id)
+
+    def queued_word_ids(self, student=None):
+        return [
+            f'default_{word_id}' for word_id in WordQueue.objects.filter(
+                student=student or self.student, is_mastered=False
+            ).values_list('word_id', flat=True)
+        ]
+
+    def test_load_state_queries(self):
+        with self.assertNumQueries(engine.LOAD_QUERIES):
+            state = engine.load_state(self.student)
+        # Everything the rules read about the student comes with it
+        with self.assertNumQueries(0):
+            self.assertFalse(state.using_custom)
+            self.assertEqual(state.student.get_teacher(), self.teacher)
+            self.assertEqual(state.current_bucket, 3)
+            self.assertEqual(state.bucket_progress.words_mastered, 0)
+            self.assertEqual(state.config.words_to_complete_bucket, 2)
+
+    def test_next_word_queues_new_words(self):
+        data = engine.next_word(self.student)
+        self.assertEqual(data['difficulty_bucket'], 'Bucket 3')
+        self.assertFalse(data['bucket_complete'])
+        self.assertEqual(len(self.queued_word_ids()), rules.NEW_WORDS_PER_REQUEST)
+        self.assertIn(data['word_id'], self.queued_word_ids())
+        self.assertEqual(StudentProgress.objects.get(student=self.student).current_word_text, data['word'])
+
+    def test_next_word_queries(self):
+        engine.next_word(self.student)
+        with self.assertNumQueries(engine.NEXT_WORD_QUERIES):
+            engine.next_word(self.student)
+
+    def test_next_word_queries_do_not_grow_with_the_queue(self):
+        engine.next_word(self.student)
+        for word_id in self.queued_word_ids()[:3]:
+            self.answer(word_id, 'wrong')
+        with self.assertNumQueries(engine.NEXT_WORD_QUERIES):
+            engine.next_word(self.student)
+
+    def test_submit_answer_queries(self):
+        word_id = engine.next_word(self.student)['word_id']
+        with self.assertNumQueries(engine.SUBMIT_ANSWER_QUERIES):
+            submission = self.answer(word_id, 'wrong')
+        self.assertEqual(submission.outcome, 'wrong')
+
+    def test_wrong_answer_recycles_word(self):
+        word_id = engine.next_word(self.student)['word_id']
+        submission = self.answer(word_id, 'wrong')
+        self.assertEqual(submission.status, 200)
+        self.assertFalse(submission.data['correct'])
+        self.assertIn('distance', submission.data)
+        self.assertEqual(submission.data['word_mastery_required'], 3)
+        self.assertEqual(submission.data['status_version'], submission.attempt.id)
+
+        entry = WordQueue.objects.get(student=self.student, word_id=int(word_id.split('_')[1]))
+        self.assertFalse(entry.is_mastered)
+        self.assertEqual(entry.times_failed, 1)
+
+    def test_correct_answer_masters_word(self):
+        word_id = engine.next_word(self.student)['word_id']
+        submission = self.answer(word_id)
+        self.assertEqual(submission.outcome, 'correct')
+        self.assertEqual(submission.data['words_mastered'], 1)
+        self.assertEqual(submission.data['session_correct'], 1)
+        progress = StudentProgress.objects.get(student=self.student)
+        self.assertEqual((progress.total_attempts, progress.total_words_correct, progress.total_points_earned), (1, 1, 3))
+
+    def test_bucket_completion(self):
+        engine.next_word(self.student)
+        first, second = self.queued_word_ids()[:2]
+        self.answer(first)
+        spelling = queries.find_word(second)[0].text
+        # Mastering the word (+1), counting words in progress (+1), finding
+        # the next bucket (+1) and clearing the old one's queue (+1)
+        with self.assertNumQueries(engine.SUBMIT_ANSWER_QUERIES + 4):
+            submission = self.answer(second, spelling)
+
+        self.assertEqual(submission.outcome, 'bucket_complete')
+        self.assertEqual(submission.data['new_bucket'], 4)
+        self.assertEqual(submission.data['words_mastered'], 2)
+        self.assertEqual(StudentProgress.objects.get(student=self.student).current_bucket, 4)
+        self.assertTrue(BucketProgress.objects.get(student=self.student, bucket=3).is_completed)
+        # Words left unanswered in the old bucket are dropped from the queue
+        self.assertEqual(self.queued_word_ids(), [])
+
+        data = engine.next_word(self.student)
+        self.assertEqual(data['difficulty_bucket'], 'Bucket 4')
+
+    @override_settings(GAME_TIMING_SAMPLE_RATE=1)
+    def test_submit_answer_trace_spans(self):
+        engine.next_word(self.student)
+        first, second = self.queued_word_ids()[:2]
+
+        def spans(word_id):
+            with self.assertLogs('game.timing') as logs, tracing.traced('submit_answer'):
+                self.answer(word_id)
+            return list(json.loads(logs.records[0].getMessage())['spans'])
+
+        self.assertEqual(spans(first), [
+            'word_lookup', 'state_load', 'session_lookup', 'progress_update', 'queue_update', 'mastery_check',
+            'response_build', 'attempt_insert', 'persist',
+        ])
+        # The bucket move is decided and written under bucket_advancement
+        self.assertEqual(spans(second), [
+            'word_lookup', 'state_load', 'session_lookup', 'progress_update', 'queue_update', 'mastery_check',
+            'bucket_advancement', 'response_build', 'attempt_insert', 'persist',
+        ])
+
+    def test_words_in_progress_hold_back_bucket_completion(self):
+        engine.next_word(self.student)
+        missed, first, second = self.queued_word_ids()[:3]
+        self.answer(missed, 'wrong')
+        self.answer(first)
+        submission = self.answer(second)
+
+        self.assertEqual(submission.outcome, 'correct')
+        self.assertEqual(submission.data['words_mastered'], 2)
+        self.assertEqual(StudentProgress.objects.get(student=self.student).current_bucket, 3)
+
+    def test_game_complete(self):
+        student = self.create_student('last_bucket', current_bucket=4)
+        engine.next_word(student)
+        first, second = self.queued_word_ids(student)[:2]
+        self.answer(first, student=student)
+        submission = self.answer(second, student=student)
+
+        self.assertEqual(submission.outcome, 'game_complete')
+        self.assertEqual(submission.data['final_bucket'], 4)
+
+    def test_retried_submission_is_replayed(self):
+        word_id = engine.next_word(self.student)['word_id']
+        first = self.answer(word_id, 'wrong', attempt_id='a1')
+        with self.assertNumQueries(1):
+            retry = self.answer(word_id, 'wrong', attempt_id='a1')
+
+        self.assertEqual(retry.outcome, 'duplicate')
+        self.assertIsNone(retry.attempt)
+        self.assertTrue(retry.data.pop('duplicate'))
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(WordAttempt.objects.filter(student=self.student).count(), 1)
+
+    def test_unknown_word(self):
+        for word_id in ['default_0', 'default_x', 'custom', None]:
+            self.assertEqual(self.answer(word_id, 'cat').status, 404)
+
+    def test_custom_ladder(self):
+        ladder = BucketLadder.objects.create(teacher=self.teacher, name='Phonics')
+        short_a = CustomBucket.objects.create(ladder=ladder, name='Short a', position=1)
+        short_e = CustomBucket.objects.create(ladder=ladder, name='Short e', position=2)
+        for text in ['map', 'bag', 'jam']:
+            CustomWord.objects.create(bucket=short_a, text=text)
+        CustomWord.objects.create(bucket=short_e, text='pen')
+        classroom = Classroom.objects.create(name='P2', teacher=self.teacher, bucket_ladder=ladder)
+        student = self.create_student('phonics', classroom=classroom, custom_bucket=short_a)
+
+        data = engine.next_word(student)
+        self.assertTrue(data['word_id'].startswith('custom_'))
+        self.assertEqual(data['difficulty_bucket'], 'Short a')
+
+        queued = [
+            f'custom_{word_id}' for word_id in
+            WordQueue.objects.filter(student=student).values_list('custom_word_id', flat=True)
+        ]
+        # Saved attempts carry the same key as the queue entry
+        self.assertTrue(all(key < 0 for key in WordQueue.objects.filter(student=student).values_list('word_key', flat=True)))
+        self.answer(queued[0], student=student)
+        attempt = WordAttempt.objects.get(student=student)
+        self.assertEqual(attempt.word_key, -attempt.custom_word_id)
+        submission = self.answer(queued[1], student=student)
+        self.assertEqual(submission.outcome, 'bucket_complete')
+        self.assertEqual(submission.data['new_bucket'], 'Short e')
+        # The old bucket's unanswered word is dropped, not the new bucket's
+        self.assertFalse(WordQueue.objects.filter(student=student, is_mastered=False).exists())
+        self.assertEqual(engine.next_word(student)['word'], 'pen')
+
+
+class GameRulesTestCase(GameTestCase):
+    """The pure rules need no database"""
+    databases = []
+
+    def test_bucket_is_done(self):
+        config = GameConfiguration(words_to_complete_bucket=2)
+        full = BucketProgress(words_mastered=2)
+        self.assertTrue(rules.bucket_is_done(full, config, 0))
+        self.assertFalse(rules.bucket_is_done(full, config, 1))
+        self.assertFalse(rules.bucket_is_done(BucketProgress(words_mastered=1), config, 0))
+        self.assertFalse(rules.bucket_is_done(None, config, 0))
+
+    def test_new_queue_entries_go_to_the_back(self):
+        student = User(id=1)
+        words = [Word(id=1, text='cat'), Word(id=2, text='dog')]
+        entries = rules.new_queue_entries(student, words, 'word', (10, 40))
+        self.assertEqual([(entry.position, entry.due_key) for entry in entries], [(11, 41), (12, 42)])
+        self.assertEqual([entry.word_key for entry in entries], [1, 2])
+
+    def test_word_key(self):
+        # Custom words get negative keys, so the two id ranges never collide
+        self.assertEqual(Word(id=7).word_key, 7)
+        self.assertEqual(CustomWord(id=7).word_key, -7)
+
+
+class LexiconTestCase(GameTestCase):
+    """Compiling the word lists (no database)"""
+    databases = []
+
+    def write_lists(self, lists):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        words_dir = directory.name
+        for bucket, text in lists.items():
+            with open(lexicon.source_path(bucket, words_dir), 'w', encoding='utf-8') as f:
+                f.write(text)
+        return words_dir
+
+    def test_compile_round_trip(self):
+        words_dir = self.write_lists({3: ' Cat\ndog\n\nsun\n', 4: 'bird\ndog\nfish\n', 5: 'two words\ncafe\u0301\n'})
+        path = os.path.join(words_dir, 'words.lexicon')
+        self.assertTrue(lexicon.is_stale(path, words_dir))
+        lists = lexicon.compile_lexicon(path, words_dir, word_filter=None)
+        self.assertFalse(lexicon.is_stale(path, words_dir))
+
+        # Later files win, as load_words always did; bad lines are reported
+        self.assertEqual(lists.moved, 1)
+        self.assertEqual([problem.text for problem in lists.problems], ['two words'])
+
+        compiled = lexicon.Lexicon.open(path)
+        self.assertEqual(len(compiled), 6)
+        self.assertEqual(compiled.buckets(), [3, 4, 5])
+        self.assertEqual(compiled.words(3), ['cat', 'sun'])
+        self.assertEqual(compiled.words(4), ['bird', 'dog', 'fish'])
+        self.assertEqual(compiled.words(6), [])
+        # Accents are stored composed, whichever way the file spelled them
+        self.assertEqual(compiled.words(5), ['caf\u00e9'])
+        self.assertEqual(dict(compiled.items()), lists.words)
+
+    def test_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            lexicon.Lexicon(b'not a lexicon at all')
+
+    def test_frequency_filter(self):
+        words_dir = self.write_lists({})
+        frequencies = os.path.join(words_dir, 'counts.txt')
+        with open(frequencies, 'w') as f:
+            f.write('word,count\nthe,999000\ncat,500\ndog,400\nsun,300\nbird,200\nyak,1\n')
+        words = {'cat': 3, 'dog': 3, 'sun': 3, 'yak': 3, 'gnu': 3, 'bird': 4, 'wren': 4}
+
+        # Rarest first (gnu is missing from the list), at most half of a
+        # bucket; the others keep their bucket
+        dropped = dict(words)
+        reports = word_frequency.FrequencyFilter(frequencies, min_zipf=3, max_share=0.5).apply(dropped)
+        self.assertEqual(dropped, {'bird': 4, 'cat': 3, 'dog': 3, 'sun': 3})
+        self.assertEqual((reports[3].dropped, reports[3].after, reports[4].dropped, reports[4].after), (2, 3, 1, 1))
+
+
+class LoadWordsTestCase(GameTestCase):
+    def test_deletes_dropped_words(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        words_dir = directory.name
+        for bucket in lexicon.BUCKETS:
+            with open(lexicon.source_path(bucket, words_dir), 'w') as f:
+                f.write({3: 'cat\ndog\nyak\n', 4: 'bird\n'}.get(bucket, ''))
+        frequencies = os.path.join(words_dir, 'counts.txt')
+        with open(frequencies, 'w') as f:
+            f.write('cat 500\ndog 400\nbird 200\nyak 1\n')
+        self.enterContext(mock.patch(
+            'game.management.commands.load_words.read_word_lists',
+            lambda: lexicon.read_word_lists(words_dir)
+        ))
+
+        with self.settings(GAME_WORD_FREQUENCIES=''):
+            call_command('load_words', '--from-text', stdout=io.StringIO())
+        self.assertEqual(list(Word.objects.values_list('text', flat=True)), ['cat', 'dog', 'yak', 'bird'])
+        yak = Word.objects.get(text='yak')
+        student = User.objects.create(username='student', role='student')
+        WordQueue.objects.create(student=student, word=yak, position=0)
+
+        with self.settings(GAME_WORD_FREQUENCIES=frequencies, GAME_WORD_MIN_ZIPF=6, GAME_RARE_WORDS_MAX_SHARE=0.5):
+            call_command('load_words', '--from-text', stdout=io.StringIO())
+        self.assertEqual(list(Word.objects.values_list('text', flat=True)), ['cat', 'dog', 'bird'])
+        self.assertFalse(WordQueue.objects.filter(student=student).exists())
+
+
+class StandInDatamuse(BaseHTTPRequestHandler):
+    """Answers ?sp=c?? like Datamuse, from a fixed word list, and counts requests; letters in `failing` get a 500"""
+    words = ['cab', 'cat', 'cog', 'cow', 'dog', 'den', 'cart', 'a cat']
+    requests = 0
+    failing = set()
+
+    def do_GET(self):
+        type(self).requests += 1
+        pattern = parse_qs(urlparse(self.path).query)['sp'][0]
+        if pattern[0] in self.failing:
+            self.send_error(500)
+            return
+        body = [
+            {'word': word, 'score': 100} for word in self.words
+            if len(word) == len(pattern) and word.startswith(pattern[0])
+        ]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class FillWordListsTestCase(GameTestCase):
+    """fill_word_lists.py against a local stand-in for the API (no network, no database)"""
+    databases = []
+
+    def setUp(self):
+        StandInDatamuse.requests = 0
+        StandInDatamuse.failing = set()
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInDatamuse)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.api_url = f'http://127.0.0.1:{server.server_port}/words'
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.tmp = directory.name
+        self.words_dir = os.path.join(self.tmp, 'words')
+        os.mkdir(self.words_dir)
+        with open(os.path.join(self.words_dir, '3_letter_words.txt'), 'w') as f:
+            f.write('cat\n')
+
+    def run_filler(self, *args):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            fill_word_lists.main([
+                '--lengths', '3', '--rate', '0', '--api-url', self.api_url,
+                '--cache-dir', os.path.join(self.tmp, 'cache'),
+                '--checkpoint', os.path.join(self.tmp, 'checkpoint.json'),
+                '--words-dir', self.words_dir, *args
+            ])
+        with open(os.path.join(self.words_dir, '3_letter_words.txt')) as f:
+            return f.read().split()
+
+    def test_fills_from_the_api_and_caches_responses(self):
+        self.assertEqual(self.run_filler(), ['cab', 'cat', 'cog', 'cow', 'den', 'dog'])
+        self.assertEqual(StandInDatamuse.requests, 26)
+
+        # A second run - even offline - is answered from the cache
+        self.assertEqual(self.run_filler('--offline'), ['cab', 'cat', 'cog', 'cow', 'den', 'dog'])
+        self.run_filler()
+        self.assertEqual(StandInDatamuse.requests, 26)
+
+    def test_resumes_from_the_checkpoint(self):
+        checkpoint = fill_word_lists.Checkpoint(os.path.join(self.tmp, 'checkpoint.json'))
+        checkpoint.mark_done(3, 1)
+        self.assertEqual(self.run_filler(), ['cat'])
+        self.assertEqual(StandInDatamuse.requests, 0)
+        # A run that finishes leaves nothing to resume
+        self.assertFalse(os.path.exists(checkpoint.path))
+
+    def test_failed_letter_is_fetched_again(self):
+        StandInDatamuse.failing = {'d'}
+        self.assertEqual(self.run_filler(), ['cat'])
+        self.assertEqual(StandInDatamuse.requests, 26)
+        self.assertNotIn(3, fill_word_lists.Checkpoint(os.path.join(self.tmp, 'checkpoint.json')).done)
+
+        # The next run asks only for the letter that failed
+        StandInDatamuse.failing = set()
+        self.assertEqual(self.run_filler(), ['cab', 'cat', 'cog', 'cow', 'den', 'dog'])
+        self.assertEqual(StandInDatamuse.requests, 27)
+
+
+class WordSearchTestCase(GameTestCase):
+    """The teachers' word autocomplete"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        for text in ['cab', 'cat', 'cart', 'catch', 'dog', 'scat']:
+            Word.objects.create(text=text)
+
+    def setUp(self):
+        word_search.word_index_changed()
+        self.client.force_login(self.teacher)
+
+    def search(self, **params):
+        return self.client.get('/teacher/words/search/', params).json()
+
+    def test_prefix_search(self):
+        data = self.search(q='Ca')
+        self.assertEqual([word['text'] for word in data['results']], ['cab', 'cart', 'cat', 'catch'])
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(self.search(q='cat', limit=1)['results'][0]['difficulty_bucket'], 3)
+        self.assertEqual(self.search(q='cat', limit=1)['total'], 2)
+        self.assertEqual([word['text'] for word in self.search(q='ca', bucket=4)['results']], ['cart'])
+        self.assertEqual(self.search(q='')['results'], [])
+
+    def test_search_needs_no_queries_once_built(self):
+        word_search.get_word_index()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(word_search.get_word_index().search('c')[0]), 4)
+
+    def test_index_follows_word_changes(self):
+        self.search(q='ca')
+        Word.objects.create(text='camel')
+        word_search.word_index_changed()
+        self.assertIn('camel', [word['text'] for word in self.search(q='ca')['results']])
+
+    def test_flags_words_already_in_the_bucket(self):
+        ladder = BucketLadder.objects.create(teacher=self.teacher, name='Phonics')
+        bucket = CustomBucket.objects.create(ladder=ladder, name='Short a', position=1)
+        CustomWord.objects.create(bucket=bucket, text='cat')
+        results = self.search(q='cat', custom_bucket=bucket.id)['results']
+        self.assertEqual([(word['text'], word['in_bucket']) for word in results], [('cat', True), ('catch', False)])
+
+    def test_teachers_only(self):
+        self.client.force_login(User.objects.create(username='student', role='student'))
+        self.assertEqual(self.client.get('/teacher/words/search/', {'q': 'ca'}).status_code, 403)
+
+    def test_bad_numbers(self):
+        for params in [{'bucket': 'x'}, {'limit': 'x'}, {'custom_bucket': 'abc'}]:
+            response = self.client.get('/teacher/words/search/', {'q': 'ca', **params})
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_admin_prefix_filter(self):
+        words = Word.objects.filter(**word_search.prefix_filter('CAT'))
+        self.assertEqual(sorted(words.values_list('text', flat=True)), ['cat', 'catch'])
+
+    def test_admin_search(self):
+        admin_user = User.objects.create(username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+
+        def found(term):
+            response = self.client.get(reverse('admin:game_word_changelist'), {'q': term})
+            return sorted(word.text for word in response.context['cl'].result_list)
+
+        # Words starting with the term, then - only if there are none - words containing it
+        self.assertEqual(found('cat'), ['cat', 'catch'])
+        self.assertEqual(found('at'), ['cat', 'catch', 'scat'])
+        self.assertEqual(found('xyz'), [])
+
+
+class WordPatternTestCase(GameTestCase):
+    """Matching bucket patterns against the vocabulary (no database)"""
+    databases = []
+
+    WORDS = [('action', 6), ('nation', 6), ('station', 7), ('lotion', 6), ('piece', 5), ('field', 5), ('queen', 5), ('quit', 4), ('die', 3)]
+
+    def setUp(self):
+        index = word_search.WordIndex(word_search.WordMatch(text, i, bucket) for i, (text, bucket) in enumerate(self.WORDS))
+        self.patterns = word_patterns.PatternIndex(index)
+
+    def match(self, **data):
+        return [word.text for word in self.patterns.match(word_patterns.WordPattern.from_data(data))]
+
+    def test_patterns(self):
+        self.assertEqual(self.match(suffix='-tion'), ['action', 'lotion', 'nation', 'station'])
+        self.assertEqual(self.match(contains='ie'), ['die', 'field', 'piece'])
+        self.assertEqual(self.match(prefix='st', suffix='tion'), ['station'])
+        self.assertEqual(self.match(include='qu', exclude='n'), ['quit'])
+        self.assertEqual(self.match(suffix='tion', min_length='7'), ['station'])
+        self.assertEqual(self.match(contains='ati', max_length='6'), ['nation'])
+        self.assertEqual(self.match(regex='^[^aeiou]*ie'), ['die', 'field', 'piece'])
+        self.assertEqual(self.match(contains='xy'), [])
+
+    def test_invalid_patterns(self):
+        for data in [{'suffix': 'ti on'}, {'regex': '(unclosed'}, {'regex': '(.*)*x$'}, {'regex': 'a{2}'},
+                     {'regex': 'a**'}, {'regex': '[a'}, {'regex': 'a|'}, {'min_length': 'five'}]:
+            with self.assertRaises(word_patterns.PatternError):
+                word_patterns.WordPattern.from_data(data)
+        self.assertTrue(word_patterns.WordPattern.from_data({'prefix': ' '}).is_empty())
+
+    def test_letter_patterns(self):
+        """LetterPattern agrees with re on the syntax it takes"""
+        words = ['', 'a', 'ab', 'ba', 'abc', 'cab', 'aab', 'bbb', 'abab', 'cabbac']
+        for pattern in ['a', '^a', 'b$', '^ab$', 'a.c', 'a?b', '^a*b', 'ab+', '[bc]a', '[^a]b$', '[a-b]+c', '^c|b$', 'a*a*a*c']:
+            letter_pattern = word_patterns.LetterPattern(pattern)
+            for word in words:
+                self.assertEqual(letter_pattern.search(word), bool(re.search(pattern, word)), (pattern, word))
+
+    def test_slow_regexes(self):
+        """Patterns that backtrack for minutes in re take no time"""
+        start = time.perf_counter()
+        for pattern in ['.*.*.*.*.*.*.*.*.*.*.*.*x$', 'a*a*a*a*a*a*a*a*a*a*a*a*a*a*b']:
+            self.assertFalse(word_patterns.LetterPattern(pattern).search('a' * 200))
+        self.assertLess(time.perf_counter() - start, 1)
+
+
+class GenerateWordsTestCase(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        ladder = BucketLadder.objects.create(teacher=cls.teacher, name='Endings')
+        cls.bucket = CustomBucket.objects.create(ladder=ladder, name='-tion', position=1)
+        CustomWord.objects.create(bucket=cls.bucket, text='nation')
+        for text in ['action', 'nation', 'station', 'cat']:
+            Word.objects.create(text=text)
+
+    def setUp(self):
+        word_search.word_index_changed()
+        self.client.force_login(self.teacher)
+
+    def test_preview_and_generate(self):
+        preview = self.client.get(f'/teacher/buckets/{self.bucket.id}/generate/preview/', {'suffix': '-tion'}).json()
+        self.assertEqual((preview['count'], preview['new'], preview['sample']), (3, 2, ['action', 'station']))
+        self.assertEqual(self.client.get(f'/teacher/buckets/{self.bucket.id}/generate/preview/', {'regex': '('}).status_code, 400)
+        self.assertEqual(self.client.get(f'/teacher/buckets/{self.bucket.id}/generate/preview/', {'regex': '(.*)*x$'}).status_code, 400)
+
+        self.client.post(f'/teacher/buckets/{self.bucket.id}/generate/', {'suffix': '-tion'})
+        self.assertEqual(
+            list(CustomWord.objects.filter(bucket=self.bucket).order_by('text').values_list('text', flat=True)),
+            ['action', 'nation', 'station']
+        )
+
+    def test_concurrent_generate(self):
+        """A word added by another request between the lookup and the insert is skipped"""
+        words_for_bucket = word_patterns.words_for_bucket
+
+        def added_meanwhile(bucket, pattern):
+            found = words_for_bucket(bucket, pattern)
+            CustomWord.objects.create(bucket=bucket, text='action')
+            return found
+
+        with mock.patch.object(views, 'words_for_bucket', added_meanwhile):
+            response = self.client.post(f'/teacher/buckets/{self.bucket.id}/generate/', {'suffix': 'tion'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(CustomWord.objects.filter(bucket=self.bucket).order_by('text').values_list('text', flat=True)),
+            ['action', 'nation', 'station']
+        )
+
+    def test_ladder_page(self):
+        response = self.client.get(reverse('ladder_detail', args=[self.bucket.ladder_id]))
+        self.assertContains(response, f'showGenerateWordsModal({self.bucket.id}')
+
+    def test_other_teachers_buckets(self):
+        self.client.force_login(User.objects.create(username='other', role='teacher'))
+        self.assertEqual(self.client.get(f'/teacher/buckets/{self.bucket.id}/generate/preview/', {'suffix': 'tion'}).status_code, 404)
+        self.client.post(f'/teacher/buckets/{self.bucket.id}/generate/', {'suffix': 'tion'})
+        self.assertEqual(CustomWord.objects.filter(bucket=self.bucket).count(), 1)
+
+
+class LadderPagesTestCase(GameTestCase):
+    """Ladder pages load their counts with the rows, and bucket words come a page at a time"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        for name in ['Phonics', 'Endings']:
+            ladder = BucketLadder.objects.create(teacher=cls.teacher, name=name)
+            for position in range(1, 4):
+                bucket = CustomBucket.objects.create(ladder=ladder, name=f'{name} {position}', position=position)
+                CustomWord.objects.bulk_create([CustomWord(bucket=bucket, text=f'w{i:03d}') for i in range(position * 5)])
+        cls.ladder = ladder
+        cls.bucket = bucket
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_counts_do_not_add_queries(self):
+        # session, user, ladders (with bucket counts)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('ladder_list'))
+        self.assertContains(response, '3 buckets', count=2)
+        # session, user, ladder, buckets (with word counts), classrooms
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('ladder_detail', args=[self.ladder.id]))
+        self.assertContains(response, '15 words')
+
+    def test_bucket_words_keyset_pages(self):
+        url = reverse('bucket_get_words', args=[self.bucket.id])
+        first = self.client.get(url, {'limit': 10}).json()
+        self.assertEqual((len(first['words']), first['word_count'], first['has_more']), (10, 15, True))
+        self.assertEqual(first['next_after'], 'w009')
+
+        # session, user, bucket, page - no count after the first page
+        with self.assertNumQueries(4):
+            second = self.client.get(url, {'limit': 10, 'after': first['next_after']}).json()
+        self.assertEqual([word['text'] for word in second['words']], [f'w{i:03d}' for i in range(10, 15)])
+        self.assertNotIn('word_count', second)
+        self.assertFalse(second['has_more'])
+        self.assertIsNone(second['next_after'])
+
+
+class LeaderboardStandingsTestCase(GameTestCase):
+    """The cached standings behind the leaderboard stream"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        cls.classroom = Classroom.objects.create(name='P1', teacher=cls.teacher)
+        for username, points in [('ann', 10), ('bob', 30)]:
+            student = User.objects.create(username=username, role='student', classroom=cls.classroom)
+            StudentProgress.objects.create(student=student, total_points_earned=points)
+
+    def test_one_cache_entry_per_classroom(self):
+        streams.bump_leaderboard_version(self.classroom.id, 1)
+        standings = views.get_classroom_standings(self.classroom.id)
+        self.assertEqual([(entry['username'], entry['rank']) for entry in standings], [('bob', 1), ('ann', 2)])
+        with self.assertNumQueries(0):
+            views.get_classroom_standings(self.classroom.id)
+
+        StudentProgress.objects.filter(student__username='ann').update(total_points_earned=50)
+        streams.bump_leaderboard_version(self.classroom.id, 2)
+        self.assertEqual(views.get_classroom_standings(self.classroom.id)[0]['username'], 'ann')
+        # The new standings replaced the old ones rather than adding a key
+        self.assertEqual(cache.get(f'leaderboard_standings:{self.classroom.id}')['version'], 2)
+        self.assertIsNone(cache.get(f'leaderboard_standings:{self.classroom.id}:1'))
+
+    def test_stream_needs_asgi(self):
+        self.client.force_login(self.teacher)
+        url = reverse('leaderboard_stream', args=[self.classroom.id])
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+
+class LeaderboardBroadcastTestCase(GameTestCase):
+    """One connection's SSE messages, with the standings loader stubbed out (no database)"""
+    databases = []
+
+    def setUp(self):
+        cache.clear()
+        self.standings = [{'id': 1, 'rank': 1, 'score': 30}, {'id': 2, 'rank': 2, 'score': 10}]
+        for name, value in [('POLL_INTERVAL', 0.01), ('HEARTBEAT_INTERVAL', 0.02)]:
+            patcher = mock.patch.object(streams, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def load_standings(self, classroom_id):
+        return [dict(entry) for entry in self.standings]
+
+    def test_diff_standings(self):
+        previous = self.load_standings(1)
+        current = [{'id': 2, 'rank': 1, 'score': 40}, {'id': 1, 'rank': 2, 'score': 30}, {'id': 3, 'rank': 3, 'score': 0}]
+        changed, removed = streams.diff_standings(previous, current)
+        self.assertEqual([entry['id'] for entry in changed], [2, 1, 3])
+        self.assertEqual(removed, [])
+        self.assertEqual(streams.diff_standings(current, current[:1]), ([], [1, 3]))
+
+    async def test_snapshot_then_changes(self):
+        events = streams.leaderboard_events(7, self.load_standings)
+        try:
+            self.assertTrue((await anext(events)).startswith('retry:'))
+            snapshot = await anext(events)
+            self.assertIn('event: standings', snapshot)
+
+            self.standings = [{'id': 2, 'rank': 1, 'score': 40}, {'id': 1, 'rank': 2, 'score': 30}]
+            await cache.aset(streams.leaderboard_version_key(7), 5)
+            message = await asyncio.wait_for(anext(events), 1)
+            while message.startswith(':'):
+                message = await asyncio.wait_for(anext(events), 1)
+            data = json.loads(message.split('data: ', 1)[1])
+            self.assertEqual((data['version'], [entry['id'] for entry in data['changed']]), (5, [2, 1]))
+        finally:
+            await events.aclose()
+
+    async def test_heartbeats_leave_no_waiters_behind(self):
+        events = streams.leaderboard_events(8, self.load_standings)
+        try:
+            await anext(events)
+            await anext(events)
+            for _ in range(5):
+                self.assertEqual(await asyncio.wait_for(anext(events), 1), ': keep-alive\n\n')
+            # Each timed-out wait is taken off the event again
+            broadcaster = streams._broadcasters[8]
+            self.assertLessEqual(len(broadcaster._changed._waiters or ()), 1)
+        finally:
+            await events.aclose()
+
+
+class AsyncGameAPITestCase(GameTestCase):
+    """The async game API answers exactly like the sync views"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        GameConfiguration.objects.create(teacher=cls.teacher, words_to_complete_bucket=2)
+        classroom = Classroom.objects.create(name='P1', teacher=cls.teacher, default_starting_bucket=3)
+        for text in THREE_LETTER_WORDS:
+            Word.objects.create(text=text)
+        cls.students = {}
+        for name in ['sync', 'async']:
+            student = User.objects.create(username=name, role='student', classroom=classroom, teacher=cls.teacher)
+            StudentProgress.objects.create(student=student, current_bucket=3)
+            BucketProgress.objects.create(student=student, bucket=3)
+            cls.students[name] = student
+
+    def call(self, api, method, url, data=None, user=None):
+        """(status, JSON body or None) of one request to the sync or the async API"""
+        if api == 'sync':
+            client = self.client
+            request = getattr(client, method)
+        else:
+            client = self.async_client
+
+            @async_to_sync
+            async def request(*args, **kwargs):
+                return await getattr(client, method)(*args, **kwargs)
+        client.logout()
+        if user is not None:
+            client.force_login(user)
+        if data is not None:
+            response = request(url, json.dumps(data), content_type='application/json')
+        else:
+            response = request(url)
+        is_json = response.get('Content-Type') == 'application/json'
+        return response.status_code, response.json() if is_json else None
+
+    def play(self, api):
+        """A short game on each API, as (status, response keys) per step"""
+        student = self.students[api]
+        steps = [
+            self.call(api, 'post', '/api/end-session/', user=student),
+            self.call(api, 'get', '/api/next-word/', user=student),
+        ]
+        word_id = steps[-1][1]['word_id']
+        for data in [
+            {'word_id': word_id, 'spelling': 'wrong', 'attempt_id': 'a1'},
+            {'word_id': word_id, 'spelling': 'wrong', 'attempt_id': 'a1'},
+            {'word_id': word_id, 'spelling': queries.find_word(word_id)[0].text},
+            {'word_id': 'default_0', 'spelling': 'cat'},
+        ]:
+            steps.append(self.call(api, 'post', '/api/submit-answer/', data, user=student))
+        steps += [
+            self.call(api, 'post', '/api/end-session/', user=student),
+            self.call(api, 'get', '/api/submit-answer/', user=student),
+            self.call(api, 'get', '/api/next-word/', user=self.teacher),
+            self.call(api, 'get', '/api/next-word/'),
+        ]
+        return steps
+
+    def test_same_responses_as_the_sync_views(self):
+        sync_steps = self.play('sync')
+        with self.settings(ROOT_URLCONF=__name__):
+            async_steps = self.play('async')
+
+        self.assertEqual([status for status, _ in async_steps], [404, 200, 200, 200, 200, 404, 200, 405, 403, 302])
+        self.assertEqual(
+            [(status, sorted(data or ())) for status, data in async_steps],
+            [(status, sorted(data or ())) for status, data in sync_steps]
+        )
+        # Answers that don't depend on which word was drawn match exactly
+        for step in [2, 3, 4]:
+            for field in ['correct', 'session_correct', 'session_attempted', 'words_mastered']:
+                if field in sync_steps[step][1]:
+                    self.assertEqual(async_steps[step][1][field], sync_steps[step][1][field], (step, field))
+        self.assertTrue(async_steps[3][1]['duplicate'])
+        session_sync, session_async = dict(sync_steps[6][1]), dict(async_steps[6][1])
+        session_sync.pop('session_id'), session_async.pop('session_id')
+        self.assertEqual(session_async, session_sync)
+
+
+class ClassroomMonitorTestCase(GameTestCase):
+    """The live monitor's snapshot and delta feed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        GameConfiguration.objects.create(teacher=cls.teacher, words_to_complete_bucket=2)
+        cls.classroom = Classroom.objects.create(name='P1', teacher=cls.teacher, default_starting_bucket=3)
+        other_classroom = Classroom.objects.create(name='P2', teacher=cls.teacher, default_starting_bucket=3)
+        for text in THREE_LETTER_WORDS:
+            Word.objects.create(text=text)
+        cls.students = []
+        for username, classroom in [('ann', cls.classroom), ('bob', cls.classroom), ('eve', other_classroom)]:
+            student = User.objects.create(username=username, role='student', classroom=classroom, teacher=cls.teacher)
+            StudentProgress.objects.create(student=student, current_bucket=3)
+            BucketProgress.objects.create(student=student, bucket=3)
+            cls.students.append(student)
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def poll(self, cursor=None):
+        params = {'cursor': cursor} if cursor else {}
+        return self.client.get(reverse('classroom_monitor_feed', args=[self.classroom.id]), params).json()
+
+    def play(self, student):
+        word_id = engine.next_word(student)['word_id']
+        engine.submit_answer(student, word_id, 'wrong')
+
+    def test_snapshot(self):
+        self.play(self.students[0])
+        snapshot = self.poll()
+        self.assertTrue(snapshot['reset'])
+        self.assertEqual([row['username'] for row in snapshot['students']], ['ann', 'bob'])
+        self.assertTrue(snapshot['students'][0]['current_word'])
+        self.assertTrue(snapshot['students'][0]['session']['active'])
+        self.assertEqual([attempt['spelling'] for attempt in snapshot['attempts']], ['wrong'])
+
+    def test_changes_since_the_cursor(self):
+        ann, bob, eve = self.students
+        self.play(ann)
+        cursor = self.poll()['cursor']
+
+        self.play(bob)
+        self.play(eve)
+        BucketProgress.objects.create(student=bob, bucket=4)
+        changes = self.poll(cursor)
+        self.assertFalse(changes['reset'])
+        # Only this classroom's activity, and not ann's answer from before the cursor
+        self.assertEqual([attempt['username'] for attempt in changes['attempts']], ['bob'])
+        self.assertEqual({row['username'] for row in changes['current_words']} - {'ann'}, {'bob'})
+        self.assertIn('bob', [session['username'] for session in changes['sessions']])
+        self.assertNotIn('eve', [session['username'] for session in changes['sessions']])
+        self.assertEqual(changes['bucket_changes'], [{'student_id': bob.id, 'username': 'bob', 'bucket': 'Bucket 4'}])
+
+        GameSession.objects.filter(student=bob).update(is_active=False, ended_at=timezone.now())
+        later = self.poll(changes['cursor'])
+        self.assertEqual((later['attempts'], later['bucket_changes']), ([], []))
+        self.assertIn(('bob', False), [(session['username'], session['active']) for session in later['sessions']])
+
+    def test_unreadable_cursor_starts_over(self):
+        for cursor in ['junk', '1.1.99999999999999999999', '1.1.-99999999999999999999']:
+            self.assertTrue(self.poll(cursor)['reset'], cursor)
+
+    def test_other_teachers_classrooms(self):
+        self.client.force_login(User.objects.create(username='other', role='teacher'))
+        response = self.client.get(reverse('classroom_monitor_feed', args=[self.classroom.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class SchedulerTestCase(GameTestCase):
+    """The review schedulers' answer transitions (no database)"""
+    databases = []
+
+    now = timezone.now()
+
+    def answer(self, scheduler, entry, *answers, front_key=100, config=None):
+        """Record answers (True = correct) on entry; returns what the last one returned"""
+        for is_correct in answers:
+            mastered = scheduler.record_answer(entry, is_correct, front_key, self.now, config, random.Random(1))
+        return mastered
+
+    def test_known_words_are_mastered_at_once(self):
+        for scheduler in SCHEDULERS.values():
+            entry = WordQueue()
+            self.assertTrue(self.answer(scheduler, entry, True), scheduler.name)
+            self.assertTrue(entry.is_mastered)
+            self.assertEqual(scheduler.mastery_progress(entry), (1, 1))
+
+            # Answers after mastery only count
+            self.assertFalse(self.answer(scheduler, entry, False))
+            self.assertEqual((entry.times_correct, entry.times_failed, entry.is_mastered), (1, 1, True))
+
+    def test_incomplete_scheduler(self):
+        class NoProgress(scheduling.Scheduler):
+            def schedule(self, entry, is_correct, front_key, now, config, rng):
+                return False
+
+        # Caught when the scheduler is made, not in the middle of an answer
+        with self.assertRaises(TypeError):
+            NoProgress()
+
+    def test_legacy(self):
+        scheduler = SCHEDULERS['legacy']
+        entry = WordQueue()
+        self.assertFalse(self.answer(scheduler, entry, False, config=GameConfiguration(recycling_distance=5)))
+        self.assertTrue(1 <= entry.interval <= 5)
+        self.assertEqual((entry.due_key, entry.due_at), (100 + entry.interval, None))
+        self.assertEqual(scheduler.mastery_progress(entry), (0, 3))
+
+        # Three correct answers in all after the miss - not necessarily in a row
+        self.assertFalse(self.answer(scheduler, entry, True, False, True))
+        self.assertEqual(scheduler.mastery_progress(entry), (2, 3))
+        self.assertTrue(self.answer(scheduler, entry, True))
+
+        # The same generator gives the same recycle positions
+        first, second = WordQueue(), WordQueue()
+        self.answer(scheduler, first, False)
+        self.answer(scheduler, second, False)
+        self.assertEqual(first.interval, second.interval)
+
+    def test_leitner(self):
+        scheduler = SCHEDULERS['leitner']
+        entry = WordQueue()
+        intervals = []
+        for is_correct in [False, True, True]:
+            self.assertFalse(self.answer(scheduler, entry, is_correct))
+            intervals.append(entry.interval)
+        self.assertEqual(intervals, [3, 10, 25])
+        self.assertEqual(entry.due_key, 125)
+        self.assertEqual(entry.due_at, self.now + timedelta(seconds=25 * scheduling.SECONDS_PER_WORD))
+        self.assertEqual(scheduler.mastery_progress(entry), (2, 3))
+
+        # A miss sends the word back to the first box
+        self.assertFalse(self.answer(scheduler, entry, False))
+        self.assertEqual((entry.interval, scheduler.mastery_progress(entry)), (3, (0, 3)))
+        self.assertTrue(self.answer(scheduler, entry, True, True, True))
+
+    def test_sm2(self):
+        scheduler = SCHEDULERS['sm2']
+        entry = WordQueue()
+        self.assertFalse(self.answer(scheduler, entry, False))
+        self.assertAlmostEqual(entry.ease, 1.96)
+        self.assertEqual(entry.interval, 2)
+        # 4, 12, 24 words, then 47 - past the 30 word mastery interval
+        self.assertEqual(scheduler.mastery_progress(entry), (0, 4))
+
+        intervals = []
+        for _ in range(3):
+            self.assertFalse(self.answer(scheduler, entry, True))
+            intervals.append(entry.interval)
+        self.assertEqual(intervals, [4, 12, 24])
+        self.assertAlmostEqual(entry.ease, 1.96)
+        self.assertEqual(scheduler.mastery_progress(entry), (3, 4))
+        self.assertTrue(self.answer(scheduler, entry, True))
+
+    def test_sm2_ease_floor(self):
+        scheduler = SCHEDULERS['sm2']
+        entry = WordQueue()
+        self.answer(scheduler, entry, False, False, False)
+        self.assertEqual(entry.ease, scheduler.min_ease)
+        # 4, 12, 16, 21, 27, 35 words
+        self.assertEqual(scheduler.mastery_progress(entry), (0, 6))
+
+    def test_get_scheduler(self):
+        self.assertEqual(get_scheduler(GameConfiguration(scheduler='sm2')).name, 'sm2')
+        self.assertEqual(get_scheduler(GameConfiguration(scheduler='gone')).name, 'legacy')
+        self.assertEqual(get_scheduler(None).name, 'legacy')
+
+
+class WordDifficultyTestCase(GameTestCase):
+    """The nightly word stats, over live and archived attempts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.start = timezone.now() - timedelta(days=30)
+        cls.cat, cls.dog, cls.sun = (Word.objects.create(text=text) for text in ['cat', 'dog', 'sun'])
+        cls.students = []
+        for username in ['ann', 'bob', 'eve']:
+            student = User.objects.create(username=username, role='student')
+            cls.students.append((student, GameSession.objects.create(student=student)))
+
+    def attempt(self, student, word, spelling, minutes, archived=False):
+        student, session = self.students[student]
+        at = self.start + timedelta(minutes=minutes)
+        if archived:
+            ArchivedWordAttempt.objects.create(
+                student=student, word=word, word_key=word.id, user_spelling=spelling,
+                is_correct=spelling == word.text, attempted_at=at, term='autumn'
+            )
+        else:
+            attempt = WordAttempt.objects.create(
+                student=student, word=word, session=session, user_spelling=spelling, is_correct=spelling == word.text
+            )
+            WordAttempt.objects.filter(id=attempt.id).update(attempted_at=at)
+
+    def test_compute_word_stats(self):
+        self.attempt(0, self.cat, 'cat', 1)
+        for minutes, spelling in enumerate(['kat', 'cat', 'cat', 'cat'], 1):
+            self.attempt(1, self.cat, spelling, minutes)
+        # eve's miss was archived last term - her one correct answer since
+        # doesn't master the word
+        self.attempt(2, self.cat, 'kat', 1, archived=True)
+        self.attempt(2, self.cat, 'cat', 2)
+        self.attempt(0, self.dog, 'dgo', 1)
+        self.attempt(0, self.dog, 'dgo', 2, archived=True)
+        WordStats.objects.create(word=self.sun, attempts=5, computed_at=self.start)
+
+        ranges = []
+        self.assertEqual(compute_word_stats(chunk_words=1, progress=lambda *done: ranges.append(done)), (2, 9))
+        self.assertEqual(ranges[-1], (2, 9))
+
+        cat, dog = WordStats.objects.get(word=self.cat), WordStats.objects.get(word=self.dog)
+        self.assertEqual((cat.attempts, cat.errors, cat.students, cat.students_mastered), (7, 2, 3, 2))
+        self.assertEqual(cat.avg_attempts_to_mastery, 2.5)
+        self.assertEqual(cat.common_misspellings, [['kat', 2]])
+        self.assertEqual((dog.attempts, dog.errors, dog.students_mastered, dog.avg_attempts_to_mastery), (2, 2, 0, None))
+        # Smoothed towards the overall error rate of 4 in 9
+        self.assertAlmostEqual(cat.difficulty, (2 + difficulty.PRIOR_ATTEMPTS * 4 / 9) / (7 + difficulty.PRIOR_ATTEMPTS))
+        self.assertGreater(dog.difficulty, cat.difficulty)
+        # Words whose attempts are gone lose their stats
+        self.assertFalse(WordStats.objects.filter(word=self.sun).exists())
+
+    def test_nightly_maintenance_reports_failed_steps(self):
+        steps = [('compute_word_difficulty', {}), ('no_such_command', {})]
+        with mock.patch.object(NightlyMaintenance, 'STEPS', steps), self.assertRaises(CommandError) as raised:
+            call_command('nightly_maintenance', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertIn('no_such_command', str(raised.exception))
+
+
+class SampleNewWordsTestCase(GameTestCase):
+    """Difficulty-weighted picking of new queue words (no database)"""
+    databases = []
+
+    def words(self, *difficulties):
+        words = []
+        for i, value in enumerate(difficulties):
+            word = Word(text=f'w{i}')
+            if value is not None:
+                word.stats = WordStats(difficulty=value)
+            words.append(word)
+        return words
+
+    def picks(self, words, word_sampling, trials=500):
+        """How often each word was picked first"""
+        picked = Counter()
+        with mock.patch.object(difficulty, 'random', random.Random(5)):
+            for _ in range(trials):
+                picked[difficulty.sample_new_words(words, 1, word_sampling)[0].text] += 1
+        return picked
+
+    def test_weighted_by_difficulty(self):
+        words = self.words(0.1, 0.9)
+        self.assertGreater(self.picks(words, 'easier_first')['w0'], 450)
+        self.assertGreater(self.picks(words, 'harder_first')['w1'], 450)
+        self.assertTrue(200 < self.picks(words, 'random')['w0'] < 300)
+
+    def test_words_without_stats_count_as_average(self):
+        picked = self.picks(self.words(0.1, None, 0.9), 'easier_first', trials=1000)
+        self.assertGreater(picked['w0'], picked['w1'])
+        self.assertGreater(picked['w1'], picked['w2'])
+
+    def test_count(self):
+        words = self.words(0.2, 0.4, None)
+        for word_sampling in ['random', 'easier_first', 'harder_first']:
+            picked = difficulty.sample_new_words(words, 5, word_sampling)
+            self.assertEqual(sorted(word.text for word in picked), ['w0', 'w1', 'w2'])
+        self.assertEqual(len(difficulty.sample_new_words(self.words(None, None, None), 2, 'easier_first')), 2)
+
+
+class MisspellingIndexTestCase(GameTestCase):
+    """The incremental misspelling pattern index and the classroom report"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        cls.classroom = Classroom.objects.create(name='P1', teacher=cls.teacher)
+        cls.student = User.objects.create(username='ann', role='student', classroom=cls.classroom)
+        cls.session = GameSession.objects.create(student=cls.student)
+        cls.words = {text: Word.objects.create(text=text) for text in ['letter', 'believe', 'cat']}
+
+    def attempt(self, text, spelling):
+        return WordAttempt.objects.create(
+            student=self.student, word=self.words[text], session=self.session,
+            user_spelling=spelling, is_correct=spelling == text
+        )
+
+    def counts(self):
+        return dict(MisspellingPattern.objects.filter(student=self.student).values_list('pattern', 'count'))
+
+    def test_incremental_updates(self):
+        self.attempt('letter', 'leter')
+        self.attempt('believe', 'beleive')
+        self.attempt('cat', 'cat')
+        self.assertEqual(update_misspelling_index(), 2)
+        self.assertEqual(self.counts(), {'missed_double': 1, 'ie_ei': 1})
+
+        # Only answers after the watermark are read
+        self.assertEqual(update_misspelling_index(), 0)
+        last = self.attempt('letter', 'leter')
+        self.assertEqual(update_misspelling_index(), 1)
+        self.assertEqual(self.counts(), {'missed_double': 2, 'ie_ei': 1})
+        self.assertEqual(AnalysisWatermark.objects.get(name=misspellings.WATERMARK_NAME).last_id, last.id)
+
+        row = MisspellingPattern.objects.get(student=self.student, pattern='missed_double')
+        self.assertEqual(row.examples, [['letter', 'leter'], ['letter', 'leter']])
+
+    def test_batches(self):
+        for _ in range(5):
+            self.attempt('cat', 'kat')
+        self.assertEqual(update_misspelling_index(batch_size=2, max_batches=2), 4)
+        self.assertEqual(update_misspelling_index(batch_size=2), 1)
+        self.assertEqual(self.counts(), {'wrong_consonant': 5})
+
+    def test_batch_analysed_elsewhere_meanwhile_is_dropped(self):
+        self.attempt('cat', 'kat')
+        classify_attempts = misspellings._classify_attempts
+
+        def classify_while_another_process_finishes(attempts):
+            found = classify_attempts(attempts)
+            AnalysisWatermark.objects.filter(name=misspellings.WATERMARK_NAME).update(last_id=attempts[-1].id)
+            return found
+
+        with mock.patch.object(misspellings, '_classify_attempts', classify_while_another_process_finishes):
+            self.assertEqual(update_misspelling_index(), 0)
+        self.assertEqual(self.counts(), {})
+
+    def test_classroom_error_report(self):
+        self.attempt('letter', 'leter')
+        self.attempt('believe', 'beleive')
+        self.attempt('cat', 'kat')
+        update_misspelling_index()
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('classroom_error_report', args=[self.classroom.id]))
+        self.assertEqual(response.context['total_mistakes'], 3)
+        self.assertEqual({entry['pattern'] for entry in response.context['patterns']}, {'missed_double', 'ie_ei', 'wrong_consonant'})
+        self.assertContains(response, 'Missed double letter')
+
+        self.client.force_login(User.objects.create(username='other', role='teacher'))
+        self.assertRedirects(
+            self.client.get(reverse('classroom_error_report', args=[self.classroom.id])),
+            reverse('classroom_list'), fetch_redirect_response=False
+        )
+
+
+class SpellingFeedbackTestCase(GameTestCase):
+    """Edit distance, the per-letter diff and mistake classification (no database)"""
+    databases = []
+
+    def test_edit_distance(self):
+        for target, typed, distance in [
+            ('cat', 'cat', 0),
+            ('cat', 'cot', 1),            # substitution
+            ('cat', 'cart', 1),           # insertion
+            ('letter', 'leter', 1),       # deletion
+            ('form', 'from', 1),          # transposition
+            ('believe', 'beleive', 1),
+            ('', 'abc', 3),
+            ('kitten', 'sitting', 3),
+        ]:
+            self.assertEqual(misspellings.edit_distance(target, typed), distance, (target, typed))
+
+    def test_bounded_edit_distance(self):
+        for target, typed, max_distance, distance in [
+            ('kitten', 'sitting', 3, 3),
+            ('kitten', 'sitting', 2, 3),  # gives up: max_distance + 1
+            ('cat', 'elephant', 2, 3),    # lengths alone are too far apart
+            ('abcdef', 'uvwxyz', 2, 3),   # every row is past the bound
+            ('form', 'from', 1, 1),
+        ]:
+            self.assertEqual(misspellings.edit_distance(target, typed, max_distance), distance, (target, typed))
+        self.assertEqual(misspellings.edit_distance('abcdef', 'uvwxyz'), 6)
+
+    def test_spelling_feedback(self):
+        for target, typed, distance, ops in [
+            ('cat', 'cot', 1, ['ok', 'sub', 'ok']),
+            ('cat', 'cart', 1, ['ok', 'ok', 'ins', 'ok']),
+            ('letter', 'leter', 1, ['ok', 'ok', 'ok', 'del', 'ok', 'ok']),
+            ('form', 'from', 1, ['ok', 'swap', 'ok']),
+            ('cat', 'dog', 3, ['sub', 'sub', 'sub']),
+        ]:
+            feedback = misspellings.spelling_feedback(target, typed)
+            self.assertEqual(feedback['distance'], distance, (target, typed))
+            self.assertEqual([entry['op'] for entry in feedback['diff']], ops, (target, typed))
+            # The diff spells out both words
+            self.assertEqual(''.join(entry['expected'] for entry in feedback['diff']), target)
+            self.assertEqual(''.join(entry['typed'] for entry in feedback['diff']), typed)
+        self.assertEqual(misspellings.spelling_feedback('cat', 'x' * 51), {'distance': None, 'diff': None})
+
+    def test_classify(self):
+        for target, typed, patterns in [
+            ('letter', 'leter', {'missed_double'}),
+            ('believe', 'beleive', {'ie_ei'}),
+            ('form', 'from', {'transposed'}),
+            ('make', 'mak', {'silent_e'}),
+            ('ocean', 'ocan', {'missing_vowel'}),
+            ('plant', 'plat', {'missing_letter'}),
+            ('cat', 'catt', {'extra_double'}),
+            ('cat', 'cast', {'extra_letter'}),
+            ('cat', 'cot', {'wrong_vowel'}),
+            ('cat', 'kat', {'wrong_consonant'}),
+            ('cat', 'elephant', {'other'}),
+            ('Cat', 'CAT', set()),
+            ('cat', '', set()),
+        ]:
+            self.assertEqual(misspellings.classify(target, typed), patterns, (target, typed))
+
+
+class AttemptArchiveTestCase(GameTestCase):
+    """Archiving past terms, their summaries and the full-history student page"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        cls.cutoff = timezone.now() - timedelta(days=10)
+        cls.cat, cls.dog, cls.sun = (Word.objects.create(text=text) for text in ['cat', 'dog', 'sun'])
+        cls.students = []
+        for username in ['ann', 'bob']:
+            student = User.objects.create(username=username, role='student', teacher=cls.teacher)
+            cls.students.append((student, GameSession.objects.create(student=student)))
+
+    def add_attempts(self, student, word, answers, days_ago):
+        """Attempts at word, one per answer (True = correct), the first days_ago days back"""
+        student, session = self.students[student]
+        start = timezone.now() - timedelta(days=days_ago)
+        attempts = WordAttempt.objects.bulk_create([
+            WordAttempt(
+                student=student, word=word, word_key=word.id, session=session,
+                user_spelling=word.text if is_correct else 'x', is_correct=is_correct
+            )
+            for is_correct in answers
+        ])
+        for minutes, attempt in enumerate(attempts):
+            WordAttempt.objects.filter(id=attempt.id).update(attempted_at=start + timedelta(minutes=minutes))
+
+    def test_archive_attempts(self):
+        ann = self.students[0][0]
+        self.add_attempts(0, self.cat, [False, True, True, True], days_ago=30)
+        self.add_attempts(1, self.cat, [True], days_ago=20)
+        # dog is still in ann's queue, and sun was answered this term
+        self.add_attempts(0, self.dog, [False], days_ago=30)
+        WordQueue.objects.create(student=ann, word=self.dog, position=1)
+        self.add_attempts(0, self.sun, [True], days_ago=1)
+
+        batches = []
+        self.assertEqual(archive_attempts(self.cutoff, 'autumn', batch_size=2, progress=batches.append), 5)
+        self.assertEqual(batches, [2, 4, 5])
+        self.assertEqual(
+            sorted(WordAttempt.objects.values_list('word__text', flat=True)), ['dog', 'sun']
+        )
+        archived = ArchivedWordAttempt.objects.filter(student=ann)
+        self.assertEqual(archived.count(), 4)
+        self.assertEqual(set(archived.values_list('term', 'word_key')), {('autumn', self.cat.id)})
+
+        # Totals add up across batches
+        summary = TermSummary.objects.get(student=ann, term='autumn')
+        self.assertEqual((summary.attempts, summary.correct), (4, 3))
+        self.assertEqual(summary.last_attempt_at - summary.first_attempt_at, timedelta(minutes=3))
+        self.assertEqual(TermSummary.objects.get(student=self.students[1][0]).attempts, 1)
+
+        # Nothing left to archive; a later run adds to the same term
+        self.assertEqual(archive_attempts(self.cutoff, 'autumn'), 0)
+        WordQueue.objects.filter(student=ann).update(is_mastered=True)
+        self.assertEqual(archive_attempts(self.cutoff, 'autumn'), 1)
+        self.assertEqual(TermSummary.objects.get(student=ann, term='autumn').attempts, 5)
+
+    def test_batches_stay_under_the_sqlite_variable_limit(self):
+        self.add_attempts(0, self.cat, [True] * 1200, days_ago=30)
+        most_params = []
+
+        def count_params(execute, sql, params, many, context):
+            if not many:
+                most_params.append(len(params or ()))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_params):
+            self.assertEqual(archive_attempts(self.cutoff, 'autumn'), 1200)
+        self.assertLess(max(most_params), 999)
+        self.assertEqual(ArchivedWordAttempt.objects.count(), 1200)
+
+    def test_student_detail_full_history(self):
+        self.add_attempts(0, self.cat, [False, True], days_ago=30)
+        self.add_attempts(0, self.cat, [True], days_ago=1)
+        archive_attempts(self.cutoff, 'autumn')
+
+        self.client.force_login(self.teacher)
+        url = reverse('student_detail', args=[self.students[0][0].id])
+        current = self.client.get(url).context
+        self.assertEqual([(row['word__text'], row['total_attempts']) for row in current['word_performance']], [('cat', 1)])
+        self.assertEqual([summary.term for summary in current['term_summaries']], ['autumn'])
+
+        full = self.client.get(url, {'history': 'full'}).context
+        self.assertTrue(full['full_history'])
+        row = full['word_performance'][0]
+        self.assertEqual((row['total_attempts'], row['correct_attempts']), (3, 2))
+
+
+class GradeBookExportTestCase(GameTestCase):
+    """The classroom CSV exports, streamed by the sync and the async handler"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        cls.classroom = Classroom.objects.create(name='Room 4', teacher=cls.teacher)
+        cls.student = User.objects.create(
+            username='+bob', first_name='=cmd', last_name='Smith', role='student', classroom=cls.classroom
+        )
+        StudentProgress.objects.create(student=cls.student, current_bucket=3, total_points_earned=6)
+        BucketProgress.objects.create(student=cls.student, bucket=3, words_mastered=2)
+        session = GameSession.objects.create(student=cls.student, words_attempted=2, words_correct=1)
+        cat = Word.objects.create(text='cat')
+        for spelling in ['-cat', 'cat']:
+            WordAttempt.objects.create(
+                student=cls.student, word=cat, session=session, user_spelling=spelling, is_correct=spelling == 'cat'
+            )
+        ArchivedWordAttempt.objects.create(
+            student=cls.student, word=cat, word_key=cat.id, user_spelling='kat', is_correct=False,
+            attempted_at=timezone.now() - timedelta(days=100), term='autumn'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+        self.async_client.force_login(self.teacher)
+
+    def url(self, dataset):
+        return reverse('classroom_export', args=[self.classroom.id, dataset])
+
+    def export(self, dataset, **params):
+        response = self.client.get(self.url(dataset), params)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+
+    def test_attempts(self):
+        rows = self.export('attempts')
+        self.assertEqual(rows[0][:5], ['Username', 'First Name', 'Last Name', 'Word', 'Bucket'])
+        # Text a spreadsheet would take for a formula is quoted, usernames too
+        self.assertEqual([row[:6] for row in rows[1:]], [
+            ["'+bob", "'=cmd", 'Smith', 'cat', '3', "'-cat"],
+            ["'+bob", "'=cmd", 'Smith', 'cat', '3', 'cat'],
+        ])
+        full = self.export('attempts', history='full')
+        self.assertEqual([(row[5], row[-1]) for row in full[1:]], [('kat', 'autumn'), ("'-cat", ''), ('cat', '')])
+
+    def test_sessions_and_progress(self):
+        sessions = self.export('sessions')
+        self.assertEqual(sessions[1][0], "'+bob")
+        self.assertEqual(sessions[1][6:], ['2', '1', '50.0', 'yes'])
+        progress = self.export('progress')
+        self.assertEqual(progress[0][3:6], ['Bucket', 'Words Mastered', 'Completed'])
+        self.assertEqual(progress[1][3:], ['3', '2', 'no', 'Bucket 3', '6', '0', '0'])
+
+    def test_csv_chunks(self):
+        rows = [['word', str(i)] for i in range(100)]
+        with mock.patch.object(exports, 'FLUSH_BYTES', 64):
+            chunks = list(exports.csv_chunks(rows))
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(len(chunk) < 64 + 20 for chunk in chunks))
+        self.assertEqual(''.join(chunks), exports.UTF8_BOM + ''.join(f'word,{i}\r\n' for i in range(100)))
+
+    async def test_async_export_streams_the_same_csv(self):
+        with mock.patch.object(exports, 'FLUSH_BYTES', 64):
+            response = await self.async_client.get(self.url('attempts'), {'history': 'full'})
+            chunks = [chunk async for chunk in response.streaming_content]
+            sync_response = await sync_to_async(self.client.get)(self.url('attempts'), {'history': 'full'})
+            sync_chunks = await sync_to_async(list)(sync_response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(chunks, sync_chunks)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterImportTestCase(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        cls.classroom = Classroom.objects.create(name='P1', teacher=cls.teacher, default_starting_bucket=4)
+        User.objects.create(username='taken', role='student')
+
+    def test_parse_roster(self):
+        text = (
+            '\ufeffUser Name;Password;First Name;Surname\n'
+            'amy;secret1;Amy;Pond\n'
+            '\n'
+            'bad name!;;;\n'
+            ';x;;\n'
+            'AMY;;;\n'
+            'rory;;Rory;Williams\n'
+        )
+        rows, problems = roster.parse_roster(text)
+        self.assertEqual(rows, [
+            {'username': 'amy', 'password': 'secret1', 'first_name': 'Amy', 'last_name': 'Pond', 'email': ''},
+            {'username': 'rory', 'password': '', 'first_name': 'Rory', 'last_name': 'Williams', 'email': ''},
+        ])
+        self.assertEqual([problem.split(':')[0] for problem in problems], ['Line 4', 'Line 5', 'Line 6'])
+        self.assertIn('more than once', problems[2])
+
+    def test_parse_roster_errors(self):
+        with self.assertRaisesMessage(roster.RosterError, 'empty'):
+            roster.parse_roster('')
+        with self.assertRaisesMessage(roster.RosterError, 'username'):
+            roster.parse_roster('name,password\namy,x\n')
+        with mock.patch.object(roster, 'MAX_ROSTER_ROWS', 2):
+            with self.assertRaisesMessage(roster.RosterError, 'at most 2'):
+                roster.parse_roster('username\na\nb\nc\n')
+
+    def test_import_roster(self):
+        rows, _ = roster.parse_roster('username,password\namy,secret1\nrory,\ntaken,\n')
+        with self.assertNumQueries(7):
+            # existing usernames, the three bulk_creates, the new ids, and the savepoint around them
+            created, skipped = roster.import_roster(self.classroom, rows, workers=1)
+        self.assertEqual(skipped, ['taken'])
+        self.assertEqual([(username, generated) for username, _, generated in created], [('amy', False), ('rory', True)])
+        self.assertTrue(User.objects.get(username='amy').check_password('secret1'))
+        rory = User.objects.get(username='rory')
+        self.assertTrue(rory.check_password(created[1][1]))
+        self.assertEqual(len(created[1][1]), roster.GENERATED_PASSWORD_LENGTH)
+        self.assertEqual((rory.role, rory.classroom, rory.teacher), ('student', self.classroom, self.teacher))
+        self.assertEqual(rory.progress.current_bucket, 4)
+        self.assertTrue(BucketProgress.objects.filter(student=rory, bucket=4).exists())
+
+        # Importing the same file again creates nothing
+        self.assertEqual(roster.import_roster(self.classroom, rows, workers=1), ([], ['amy', 'rory', 'taken']))
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher'])
+    def test_passwords_hashed_at_full_strength_by_default(self):
+        iterations = get_hasher().iterations
+        full, = hash_passwords(['secret1'], workers=1)
+        provisional, = hash_passwords(['secret1'], provisional=True, workers=1)
+        self.assertEqual(full.split('$')[1], str(iterations))
+        self.assertEqual(provisional.split('$')[1], str(iterations // 10))
+
+        with mock.patch.object(roster, 'hash_passwords', return_value=['!']) as hashed:
+            roster.import_roster(self.classroom, [dict.fromkeys(roster.ROSTER_COLUMNS, '') | {'username': 'amy'}])
+            roster.import_roster(self.classroom, [dict.fromkeys(roster.ROSTER_COLUMNS, '') | {'username': 'rory'}],
+                                 provisional_hashes=True)
+        self.assertEqual([call.kwargs['provisional'] for call in hashed.call_args_list], [False, True])
+
+    def test_upload_view(self):
+        url = reverse('classroom_import_roster', args=[self.classroom.id])
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        upload = SimpleUploadedFile('roster.csv', '\ufeffusername,first name\namy,Amy\nbad name!,\n'.encode('utf-8'))
+        with mock.patch.object(roster, 'hash_passwords', wraps=hash_passwords) as hashed:
+            response = self.client.post(url, {'roster': upload})
+        self.assertFalse(hashed.call_args.kwargs['provisional'])
+        self.assertEqual([username for username, _, _ in response.context['created']], ['amy'])
+        self.assertEqual(len(response.context['problems']), 1)
+        self.assertEqual(User.objects.get(username='amy').classroom, self.classroom)
+
+        response = self.client.post(url, {'roster': SimpleUploadedFile('roster.csv', b'\xff\xfe')})
+        self.assertContains(response, 'UTF-8')
+        response = self.client.post(url, {'roster': SimpleUploadedFile('roster.csv', b'name\namy\n')})
+        self.assertContains(response, 'including')
+        self.assertFalse(response.context.get('imported'))
+
+        other = User.objects.create(username='other', role='teacher')
+        self.client.force_login(other)
+        self.assertRedirects(self.client.get(url), reverse('classroom_list'), fetch_redirect_response=False)
+
+
+class QueryProfilerTestCase(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        classroom = Classroom.objects.create(name='P1', teacher=cls.teacher, default_starting_bucket=3)
+        for text in THREE_LETTER_WORDS:
+            Word.objects.create(text=text)
+        cls.student = User.objects.create(username='amy', role='student', classroom=classroom, teacher=cls.teacher)
+        StudentProgress.objects.create(student=cls.student, current_bucket=3)
+        BucketProgress.objects.create(student=cls.student, bucket=3)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.enterContext(override_settings(GAME_QUERY_PROFILER=True, GAME_QUERY_PROFILER_DIR=self.directory))
+        self.profile = profiling.ProcessProfile()
+        self.enterContext(mock.patch.object(profiling, '_process_profile', self.profile))
+        self.client.force_login(self.student)
+        self.async_client.force_login(self.student)
+
+    def test_sync_request(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get('/api/next-word/')
+        endpoint = self.profile.endpoints['get_next_word']
+        self.assertEqual(endpoint['requests'], 1)
+        # The middleware comes first, so the session and user lookups count too
+        self.assertEqual(endpoint['queries'], len(captured))
+        self.assertEqual(sum(shape['count'] for shape in self.profile.shapes.values()), len(captured))
+
+        # Queries outside a request aren't charged to anything
+        Word.objects.count()
+        self.assertEqual(self.profile.endpoints['get_next_word']['queries'], len(captured))
+
+    async def test_async_request(self):
+        with self.settings(ROOT_URLCONF=__name__):
+            response = await self.async_client.get('/api/next-word/')
+        self.assertEqual(response.status_code, 200)
+        endpoint = self.profile.endpoints['game.async_views.get_next_word']
+        self.assertEqual(endpoint['requests'], 1)
+        self.assertGreater(endpoint['queries'], 3)
+
+    def test_middleware_is_async_capable(self):
+        async def get_response(request):
+            pass
+
+        middleware = profiling.QueryProfilerMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assertFalse(asyncio.iscoroutinefunction(profiling.QueryProfilerMiddleware(lambda request: None)))
+
+    def test_report_and_reset(self):
+        self.client.get('/api/next-word/')
+        self.profile.flush()
+        report = profiling.get_profile_report()
+        self.assertEqual(report['processes'], 1)
+        self.assertEqual([row['view'] for row in report['endpoints']], ['get_next_word'])
+
+        profiling.reset_profile()
+        self.assertEqual(profiling.get_profile_report()['endpoints'], [])
+        # This process drops its totals at its next write
+        os.utime(self.directory / profiling.RESET_FILE, (time.time() + 1, time.time() + 1))
+        self.profile.flush()
+        self.assertEqual(self.profile.endpoints, {})
+
+    def test_stale_files_pruned(self):
+        exited = subprocess.Popen(['true'])
+        exited.wait()
+        old = time.time() - profiling.STALE_AFTER - 60
+        files = {
+            'exited_old': f'{exited.pid}-1.json',
+            'exited_recent': f'{exited.pid}-2.json',
+            'running_old': f'{os.getpid()}-3.json',
+            'partial_old': f'{exited.pid}-4.tmp',
+        }
+        for name, filename in files.items():
+            path = self.directory / filename
+            path.write_text(json.dumps({'endpoints': {}, 'shapes': {}}))
+            if name.endswith('old'):
+                os.utime(path, (old, old))
+
+        self.assertEqual(profiling.load_profile()[2], 2)
+        self.assertEqual(
+            sorted(path.name for path in self.directory.iterdir()),
+            sorted([files['exited_recent'], files['running_old']])
+        )
+        profiling.reset_profile()
+        self.assertEqual([path.name for path in self.directory.iterdir()], [profiling.RESET_FILE])
+
+
+class WordKeyTestCase(GameTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create(username='teacher', role='teacher')
+        cls.student = User.objects.create(username='amy', role='student', teacher=cls.teacher)
+        cls.session = GameSession.objects.create(student=cls.student)
+        cls.words = [Word.objects.create(text=text) for text in ['cat', 'dog', 'bird']]
+        ladder = BucketLadder.objects.create(teacher=cls.teacher, name='Phonics')
+        cls.bucket = CustomBucket.objects.create(ladder=ladder, name='Short a', position=1)
+        cls.custom_words = [CustomWord.objects.create(bucket=cls.bucket, text=text) for text in ['map', 'bag']]
+
+    def queue(self, word, **fields):
+        field = 'custom_word' if isinstance(word, CustomWord) else 'word'
+        return WordQueue.objects.create(student=self.student, position=0, **{field: word}, **fields)
+
+    def test_word_key_must_match_the_foreign_keys(self):
+        cat, dog = self.words[:2]
+        for entry in [
+            WordQueue(student=self.student, word=cat, word_key=dog.id, position=0),
+            WordQueue(student=self.student, custom_word=self.custom_words[0], word_key=self.custom_words[0].id, position=0),
+            WordAttempt(student=self.student, session=self.session, word=cat, word_key=-cat.id,
+                        user_spelling='cat', is_correct=True),
+        ]:
+            with self.subTest(entry=entry), self.assertRaises(IntegrityError), transaction.atomic():
+                type(entry).objects.bulk_create([entry])
+
+    def test_deleting_a_word_deletes_its_queue_entries_and_attempts(self):
+        cat, dog = self.words[:2]
+        map_ = self.custom_words[0]
+        for word in [cat, dog, map_]:
+            self.queue(word)
+            WordAttempt.objects.create(
+                student=self.student, session=self.session, user_spelling=word.text, is_correct=True,
+                **{'custom_word' if word is map_ else 'word': word}
+            )
+        cat.delete()
+        self.bucket.delete()
+        self.assertEqual(list(WordQueue.objects.values_list('word_key', flat=True)), [dog.id])
+        self.assertEqual(list(WordAttempt.objects.values_list('word_key', flat=True)), [dog.id])
+
+    def test_word_in_bucket(self):
+        cat, dog, bird = self.words
+        entries = [self.queue(word) for word in [cat, bird, *self.custom_words]]
+        in_bucket = lambda bucket: set(WordQueue.objects.filter(word_in_bucket(bucket)))
+        self.assertEqual(in_bucket(3), {entries[0]})
+        self.assertEqual(in_bucket(4), {entries[1]})
+        self.assertEqual(in_bucket(self.bucket), set(entries[2:]))
+        self.assertEqual(set(bucket_word_keys(self.bucket).values_list('key', flat=True)),
+                         {word.word_key for word in self.custom_words})
+
+    def test_words_in_progress_breakdown(self):
+        progress = StudentProgress.objects.create(student=self.student, current_bucket=3)
+        cat, dog, bird = self.words
+        self.queue(cat, times_failed=1, times_correct=2)
+        self.queue(dog, times_failed=1)
+        self.queue(bird, times_failed=1)  # another bucket
+        for word in self.custom_words:
+            self.queue(word, times_failed=1, times_correct=1)
+        self.assertEqual(views.get_words_in_progress_breakdown(progress), (1, 0, 1))
+
+        progress.custom_bucket = self.bucket
+        self.assertEqual(views.get_words_in_progress_breakdown(progress), (0, 2, 0))
+
+    def test_student_game_checks_mastered_words_by_word_key(self):
+        StudentProgress.objects.create(student=self.student, current_bucket=4)
+        entry = self.queue(self.words[2], is_mastered=True)
+        self.client.force_login(self.student)
+        # Every word of the last bucket mastered: the game is over
+        self.assertRedirects(self.client.get(reverse('student_game')), reverse('student_dashboard'),
+                             fetch_redirect_response=False)
+        entry.delete()
+        self.assertEqual(self.client.get(reverse('student_game')).status_code, 200)
@@ -0,0 +1,169 @@
+"""
+Sampled timing spans for the answer pipeline.
+
+A trace times the stages of one unit of work - an answer submission, a
+progress widget refresh, a leaderboard rebuild - and writes them as one
+JSON line to the 'game.timing' logger:
+
+    {"trace": "submit_answer", "release": "3f2a9c1", "total_ms": 41.2,
+     "spans": {"word_lookup": 1.3, "attempt_insert": 6.8, ...}, "outcome": "correct", ...}
+
+Stages are timed as laps: trace.lap('queue_update') records the time since
+the previous lap (or the start of the trace), so a long view only needs one
+line at the end of each stage. Work outside a view is traced with
+`with traced(name) as trace:`.
+
+Only GAME_TIMING_SAMPLE_RATE of traces are recorded. The others get
+NULL_TRACE, whose methods do nothing, so an unsampled request pays for one
+random() call. "release" (GAME_RELEASE, or the checked-out git commit) lets
+the lines be compared across deployments.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger('game.timing')
+
+_current_trace = contextvars.ContextVar('game_trace', default=None)
+_release = None
+
+
+def get_release():
+    """GAME_RELEASE, or the short hash of the checked-out commit"""
+    global _release
+    if _release is None:
+        _release = getattr(settings, 'GAME_RELEASE', '') or _git_revision() or 'unknown'
+    return _release
+
+
+def _git_revision():
+    git_dir = Path(settings.BASE_DIR) / '.git'
+    try:
+        head = (git_dir / 'HEAD').read_text().strip()
+        if not head.startswith('ref: '):
+            return head[:7]
+        ref = head[5:]
+        ref_file = git_dir / ref
+        if ref_file.exists():
+            return ref_file.read_text().strip()[:7]
+        for line in (git_dir / 'packed-refs').read_text().splitlines():
+            if line.endswith(' ' + ref):
+                return line[:7]
+    except OSError:
+        pass
+    return None
+
+
+class Trace:
+    def __init__(self, name, **fields):
+        self.name = name
+        self.fields = fields
+        self.spans = {}
+        self.started = self.last_lap = time.perf_counter()
+
+    def lap(self, stage):
+        """Add the time since the previous lap to stage"""
+        now = time.perf_counter()
+        self.spans[stage] = self.spans.get(stage, 0.0) + (now - self.last_lap) * 1000
+        self.last_lap = now
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def finish(self, **fields):
+        total_ms = (time.perf_counter() - self.started) * 1000
+        record = {
+            'trace': self.name,
+            'release': get_release(),
+            'pid': os.getpid(),
+            'time': round(time.time(), 3),
+            'total_ms': round(total_ms, 2),
+            'spans': {stage: round(ms, 2) for stage, ms in self.spans.items()},
+        }
+        record.update(self.fields)
+        record.update(fields)
+        logger.info(json.dumps(record, separators=(',', ':'), default=str))
+
+
+class _NullTrace:
+    """Stands in for an unsampled trace"""
+
+    def lap(self, stage):
+        pass
+
+    def set(self, **fields):
+        pass
+
+    def finish(self, **fields):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+def start_trace(name, **fields):
+    """A Trace for GAME_TIMING_SAMPLE_RATE of calls, NULL_TRACE for the rest"""
+    rate = getattr(settings, 'GAME_TIMING_SAMPLE_RATE', 0)
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return NULL_TRACE
+    return Trace(name, **fields)
+
+
+def current_trace():
+    """The trace of the view being run (see timed_view), or NULL_TRACE"""
+    return _current_trace.get() or NULL_TRACE
+
+
+@contextmanager
+def traced(name, **fields):
+    """Run a with-block as a trace that current_trace() returns inside it"""
+    trace = start_trace(name, **fields)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+    trace.finish()
+
+
+def timed_view(name):
+    """
+    Start a trace around a view (sync or async) and finish it with the
+    response status. The view and the helpers it calls reach the trace
+    through current_trace().
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                trace = start_trace(name, mode='async')
+                token = _current_trace.set(trace)
+                try:
+                    response = await view(request, *args, **kwargs)
+                finally:
+                    _current_trace.reset(token)
+                trace.finish(status=response.status_code)
+                return response
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            trace = start_trace(name, mode='sync')
+            token = _current_trace.set(trace)
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                _current_trace.reset(token)
+            trace.finish(status=response.status_code)
+            return response
+        return wrapper
+    return decorator
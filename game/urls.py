@@ -1,17 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Student game API: async views under ASGI, sync views under Gunicorn (WSGI)
+game_api = async_views if settings.GAME_ASYNC_API else views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('dashboard/', views.student_dashboard, name='student_dashboard'),
     path('play/', views.student_game, name='student_game'),
     path('leaderboard/', views.classroom_leaderboard, name='classroom_leaderboard'),
-    path('api/next-word/', views.get_next_word, name='get_next_word'),
-    path('api/submit-answer/', views.submit_answer, name='submit_answer'),
-    path('api/end-session/', views.end_session, name='end_session'),
+    path('api/next-word/', game_api.get_next_word, name='get_next_word'),
+    path('api/submit-answer/', game_api.submit_answer, name='submit_answer'),
+    path('api/game-status/', views.game_status, name='game_status'),
+    path('api/end-session/', game_api.end_session, name='end_session'),
+    path('api/classrooms/<int:classroom_id>/leaderboard/stream/', views.leaderboard_stream, name='leaderboard_stream'),
     path('teacher/', views.teacher_dashboard, name='teacher_dashboard'),
     path('teacher/student/<int:student_id>/', views.student_detail, name='student_detail'),
     path('teacher/config/', views.teacher_config, name='teacher_config'),
+    path('teacher/config/preview/', views.teacher_config_preview, name='teacher_config_preview'),
     path('teacher/config/bulk-assign/', views.bulk_assign_students, name='bulk_assign_students'),
     path('teacher/student/<int:student_id>/update-bucket/', views.update_student_starting_bucket, name='update_student_starting_bucket'),
     
@@ -19,6 +26,11 @@ urlpatterns = [
     path('teacher/classrooms/', views.classroom_list, name='classroom_list'),
     path('teacher/classrooms/create/', views.classroom_create, name='classroom_create'),
     path('teacher/classrooms/<int:classroom_id>/', views.classroom_detail, name='classroom_detail'),
+    path('teacher/classrooms/<int:classroom_id>/monitor/', views.classroom_monitor, name='classroom_monitor'),
+    path('teacher/classrooms/<int:classroom_id>/monitor/feed/', views.classroom_monitor_feed, name='classroom_monitor_feed'),
+    path('teacher/classrooms/<int:classroom_id>/errors/', views.classroom_error_report, name='classroom_error_report'),
+    path('teacher/classrooms/<int:classroom_id>/import/', views.classroom_import_roster, name='classroom_import_roster'),
+    path('teacher/classrooms/<int:classroom_id>/export/<str:dataset>.csv', views.classroom_export, name='classroom_export'),
     path('teacher/classrooms/<int:classroom_id>/delete/', views.classroom_delete, name='classroom_delete'),
     path('teacher/classrooms/<int:classroom_id>/regenerate-code/', views.classroom_regenerate_code, name='classroom_regenerate_code'),
     path('teacher/classrooms/<int:classroom_id>/assign-ladder/', views.classroom_assign_ladder, name='classroom_assign_ladder'),
@@ -33,5 +45,11 @@ urlpatterns = [
     path('teacher/buckets/<int:bucket_id>/delete/', views.bucket_delete, name='bucket_delete'),
     path('teacher/buckets/<int:bucket_id>/add-words/', views.bucket_add_words, name='bucket_add_words'),
     path('teacher/buckets/<int:bucket_id>/words/', views.bucket_get_words, name='bucket_get_words'),
+    path('teacher/buckets/<int:bucket_id>/generate/', views.bucket_generate_words, name='bucket_generate_words'),
+    path('teacher/buckets/<int:bucket_id>/generate/preview/', views.bucket_generate_preview, name='bucket_generate_preview'),
     path('teacher/words/<int:word_id>/delete/', views.bucket_remove_word, name='bucket_remove_word'),
+    path('teacher/words/search/', views.word_search, name='word_search'),
+    
+    # Staff
+    path('staff/query-profile/', views.query_profile_report, name='query_profile_report'),
 ]
@@ -1,104 +1,177 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.conf import settings
 from django.contrib import messages
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
-from django.db.models import Count, Q, Avg, Max, Min
+from django.db.models import Count, Q, Avg, Max
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.text import slugify
+from . import engine
+from .archive import get_word_performance
+from .background import run_in_background
+from .exports import EXPORTS, async_csv_chunks, csv_chunks
+from .profiling import get_profile_report, reset_profile
+from .roster import MAX_ROSTER_ROWS, RosterError, import_roster, parse_roster
+from .tracing import current_trace, timed_view, traced
+from .streams import bump_leaderboard_version, get_leaderboard_version, leaderboard_events
+from .monitor import InvalidCursor, get_monitor_changes, get_monitor_snapshot
+from .misspellings import get_classroom_patterns, get_student_patterns, update_misspelling_index
+from .scheduling import SCHEDULER_CHOICES, SCHEDULERS, get_scheduler
+from .word_patterns import MAX_GENERATED_WORDS, PatternError, WordPattern, words_for_bucket
+from .word_search import MAX_RESULTS, get_word_index
+from .learning_curve import (
+    PREVIEW_BUCKETS, PREVIEW_MAX_ATTEMPTS, PREVIEW_STUDENTS, SimulatorUnavailable,
+    get_average_session_length, simulate_default_buckets
+)
 from .models import (
     Word, GameSession, WordAttempt, StudentProgress,
     BucketProgress, WordQueue, GameConfiguration, Classroom,
-    BucketLadder, CustomBucket, CustomWord
+    BucketLadder, CustomBucket, CustomWord, TermSummary, bucket_word_keys, word_in_bucket
 )
 from accounts.models import User
-import random
+from asgiref.sync import sync_to_async
+import logging
 import json
 import re
 
+logger = logging.getLogger(__name__)
+
+# Words per page of bucket_get_words
+WORDS_PAGE_SIZE = 200
+MAX_WORDS_PAGE_SIZE = 1000
+
 
 # ===== BUCKET SYSTEM HELPER FUNCTIONS =====
 
-def get_available_words_for_student(progress):
+def get_words_in_progress_breakdown(progress, scheduler=None):
     """
-    Get available words for the student's current bucket.
-    Returns queryset of Word or CustomWord depending on bucket system.
+    Count words in the current bucket that have been attempted but not yet
+    mastered, grouped by how many more correct answers the scheduler needs.
+    Returns (needs_1_more, needs_2_more, needs_3_or_more)
     """
-    if progress.custom_bucket:
-        # Custom ladder system
-        mastered_or_queued_words = WordQueue.objects.filter(
-            student=progress.student
-        ).values_list('custom_word_id', flat=True)
-        
-        return CustomWord.objects.filter(
-            bucket=progress.custom_bucket
-        ).exclude(id__in=mastered_or_queued_words)
-    else:
-        # Default system
-        mastered_or_queued_words = WordQueue.objects.filter(
-            student=progress.student
-        ).values_list('word_id', flat=True)
-        
-        return Word.objects.filter(
-            difficulty_bucket=progress.current_bucket
-        ).exclude(id__in=mastered_or_queued_words)
-
-
-def add_words_to_queue(student, word_objs, is_custom=False):
-    """Add words to student's queue"""
-    max_position = WordQueue.objects.filter(
-        student=student
-    ).aggregate(max_pos=Max('position'))['max_pos'] or 0
-    
-    for i, word_obj in enumerate(word_objs):
-        if is_custom:
-            WordQueue.objects.create(
-                student=student,
-                custom_word=word_obj,
-                position=max_position + i + 1
-            )
-        else:
-            WordQueue.objects.create(
-                student=student,
-                word=word_obj,
-                position=max_position + i + 1
-            )
+    queue_items = WordQueue.objects.filter(
+        word_in_bucket(progress.custom_bucket or progress.current_bucket),
+        student=progress.student,
+        is_mastered=False
+    )
+    
+    scheduler = scheduler or get_scheduler(None)
+    
+    needs_1_more = 0
+    needs_2_more = 0
+    needs_3_more = 0
+    
+    # The queue entries carry their own answer counts - no WordAttempt queries.
+    # Words that haven't been answered yet are skipped.
+    attempted = queue_items.filter(
+        Q(times_failed__gt=0) | Q(times_correct__gt=0)
+    ).only('times_failed', 'times_correct', 'streak', 'ease', 'interval', 'is_mastered')
+    for entry in attempted:
+        correct_count, required = scheduler.mastery_progress(entry)
+        remaining = required - correct_count
+        if remaining == 1:
+            needs_1_more += 1
+        elif remaining == 2:
+            needs_2_more += 1
+        elif remaining >= 3:
+            needs_3_more += 1
+    
+    return needs_1_more, needs_2_more, needs_3_more
+
 
+def game_status_cache_key(student_id):
+    return f'game_status:{student_id}'
 
-def get_words_in_progress_count(progress):
-    """Count words that are in progress (attempted but not mastered)"""
+
+def compute_game_status(student):
+    """
+    Build the progress widget data shown next to the game.
+    This is the expensive part of answering a word, so it runs in the
+    background after each answer (see refresh_game_status).
+    The leaderboard is pushed separately (see leaderboard_stream).
+    """
+    progress = StudentProgress.objects.select_related(
+        'custom_bucket', 'student__classroom'
+    ).get(student=student)
+    
     if progress.custom_bucket:
-        words_in_progress = WordQueue.objects.filter(
-            student=progress.student,
-            custom_word__bucket=progress.custom_bucket,
-            is_mastered=False
-        )
+        bucket_progress = BucketProgress.objects.filter(
+            student=student,
+            custom_bucket=progress.custom_bucket
+        ).first()
     else:
-        words_in_progress = WordQueue.objects.filter(
-            student=progress.student,
-            word__difficulty_bucket=progress.current_bucket,
-            is_mastered=False
-        )
+        bucket_progress = BucketProgress.objects.filter(
+            student=student,
+            bucket=progress.current_bucket
+        ).first()
     
-    count = 0
-    for queue_item in words_in_progress:
-        # Check if word has been attempted
-        if progress.custom_bucket:
-            has_been_attempted = WordAttempt.objects.filter(
-                student=progress.student,
-                custom_word=queue_item.custom_word
-            ).exists()
-        else:
-            has_been_attempted = WordAttempt.objects.filter(
-                student=progress.student,
-                word=queue_item.word
-            ).exists()
-        
-        if has_been_attempted:
-            count += 1
+    teacher = student.get_teacher()
+    if teacher:
+        config = GameConfiguration.objects.filter(teacher=teacher).first()
+    else:
+        config = GameConfiguration.objects.first()
     
-    return count
+    trace = current_trace()
+    trace.lap('status_queries')
+    needs_1_more, needs_2_more, needs_3_more = get_words_in_progress_breakdown(
+        progress, get_scheduler(config)
+    )
+    trace.lap('histogram')
+    
+    return {
+        'words_mastered': bucket_progress.words_mastered if bucket_progress else 0,
+        'words_to_complete': config.words_to_complete_bucket if config else 200,
+        'words_need_1': needs_1_more,
+        'words_need_2': needs_2_more,
+        'words_need_3': needs_3_more,
+    }
+
+
+def refresh_game_status(student_id, version):
+    """Recompute a student's game status and cache it (runs in the background)"""
+    with traced('refresh_game_status', student=student_id) as trace:
+        student = User.objects.select_related('classroom').get(id=student_id)
+        status = compute_game_status(student)
+        status['version'] = version
+        cache.set(game_status_cache_key(student_id), status, timeout=60 * 60)
+        trace.lap('cache_write')
+    return status
+
 
+def finish_submission(submission):
+    """
+    Turn an engine Submission into the response. For a newly recorded answer,
+    also queue the progress widget recomputation and flag the classroom
+    leaderboard as changed.
+    """
+    trace = current_trace()
+    if submission.outcome:
+        trace.set(outcome=submission.outcome)
+    
+    attempt = submission.attempt
+    if attempt is not None:
+        run_in_background(refresh_game_status, attempt.student_id, attempt.id)
+        if not attempt.is_correct:
+            # Add the mistake to the teacher's misspelling reports
+            run_in_background(update_misspelling_index)
+        if attempt.student.classroom_id:
+            # Scores changed - open leaderboard streams will pick this up
+            bump_leaderboard_version(attempt.student.classroom_id, attempt.id)
+    response = JsonResponse(submission.data, status=submission.status)
+    trace.lap('finish')
+    return response
+
+
+def answer_submission(student, data):
+    """Record a submitted answer (the parsed request body) and build its response"""
+    return finish_submission(engine.submit_answer(
+        student, data.get('word_id'), data.get('spelling'), data.get('attempt_id')
+    ))
 
 
 def home(request):
@@ -191,29 +264,13 @@ def student_game(request):
         
         progress.save()
     
-    # Check if current bucket has any words available
-    if progress.uses_custom_ladder():
-        # Custom ladder - check if bucket has words
-        mastered_word_ids = WordQueue.objects.filter(
-            student=request.user,
-            is_mastered=True,
-            custom_word__isnull=False
-        ).values_list('custom_word_id', flat=True)
-        
-        available_words = CustomWord.objects.filter(
-            bucket=progress.custom_bucket
-        ).exclude(id__in=mastered_word_ids).exists()
-    else:
-        # Default system - check if bucket has words
-        mastered_word_ids = WordQueue.objects.filter(
-            student=request.user,
-            is_mastered=True,
-            word__isnull=False
-        ).values_list('word_id', flat=True)
-        
-        available_words = Word.objects.filter(
-            difficulty_bucket=progress.current_bucket
-        ).exclude(id__in=mastered_word_ids).exists()
+    # Check if current bucket has any words the student hasn't mastered
+    bucket = progress.custom_bucket if progress.uses_custom_ladder() else progress.current_bucket
+    mastered_keys = WordQueue.objects.filter(
+        student=request.user,
+        is_mastered=True
+    ).values('word_key')
+    available_words = bucket_word_keys(bucket).exclude(key__in=mastered_keys).exists()
     
     # If no words in current bucket, check if we can advance or if game is complete
     if not available_words:
@@ -297,80 +354,9 @@ def student_game(request):
     
     # Calculate words in progress (not yet mastered but in queue)
     # ONLY count words that have been attempted at least once
-    if progress.uses_custom_ladder():
-        words_in_progress = WordQueue.objects.filter(
-            student=request.user,
-            custom_word__bucket=progress.custom_bucket,
-            is_mastered=False
-        )
-    else:
-        words_in_progress = WordQueue.objects.filter(
-            student=request.user,
-            word__difficulty_bucket=progress.current_bucket,
-            is_mastered=False
-        )
-    
-    # Count how many words need 1, 2, or 3 more correct attempts
-    needs_1_more = 0
-    needs_2_more = 0
-    needs_3_more = 0
-    
-    for queue_item in words_in_progress:
-        # Check if word has been attempted at all based on system type
-        if progress.uses_custom_ladder():
-            has_been_attempted = WordAttempt.objects.filter(
-                student=request.user,
-                custom_word=queue_item.custom_word
-            ).exists()
-        else:
-            has_been_attempted = WordAttempt.objects.filter(
-                student=request.user,
-                word=queue_item.word
-            ).exists()
-        
-        if not has_been_attempted:
-            # Skip words that haven't been seen yet
-            continue
-            
-        if queue_item.times_failed > 0:
-            # Word has been failed - needs 3 correct total
-            if progress.uses_custom_ladder():
-                correct_count = WordAttempt.objects.filter(
-                    student=request.user,
-                    custom_word=queue_item.custom_word,
-                    is_correct=True
-                ).count()
-            else:
-                correct_count = WordAttempt.objects.filter(
-                    student=request.user,
-                    word=queue_item.word,
-                    is_correct=True
-                ).count()
-            
-            remaining = 3 - correct_count
-            if remaining == 1:
-                needs_1_more += 1
-            elif remaining == 2:
-                needs_2_more += 1
-            elif remaining >= 3:
-                needs_3_more += 1
-        else:
-            # Word never failed but has been attempted - needs 1 correct
-            if progress.uses_custom_ladder():
-                has_correct = WordAttempt.objects.filter(
-                    student=request.user,
-                    custom_word=queue_item.custom_word,
-                    is_correct=True
-                ).exists()
-            else:
-                has_correct = WordAttempt.objects.filter(
-                    student=request.user,
-                    word=queue_item.word,
-                    is_correct=True
-                ).exists()
-            
-            if not has_correct:
-                needs_1_more += 1
+    needs_1_more, needs_2_more, needs_3_more = get_words_in_progress_breakdown(
+        progress, get_scheduler(config)
+    )
     
     context = {
         'progress': progress,
@@ -393,221 +379,10 @@ def get_next_word(request):
     if request.user.is_teacher():
         return JsonResponse({'error': 'Teachers cannot play the game'}, status=403)
     
-    # Get student progress
-    progress = StudentProgress.objects.get(student=request.user)
-    
-    # Determine if using custom or default bucket system
-    using_custom = progress.uses_custom_ladder()
-    
-    # Get game configuration
-    teacher = request.user.get_teacher()
-    if teacher:
-        config = GameConfiguration.objects.filter(teacher=teacher).first()
-    else:
-        config = GameConfiguration.objects.first()
-    
-    if not config:
-        config = GameConfiguration.objects.create(
-            teacher=User.objects.filter(role='teacher').first() or request.user
-        )
-    
-    # Get current bucket progress
-    if using_custom:
-        bucket_progress = BucketProgress.objects.filter(
-            student=request.user,
-            custom_bucket=progress.custom_bucket
-        ).first()
-    else:
-        bucket_progress = BucketProgress.objects.filter(
-            student=request.user,
-            bucket=progress.current_bucket
-        ).first()
-    
-    # CHECK IF CURRENT BUCKET IS ALREADY COMPLETE
-    if bucket_progress and bucket_progress.words_mastered >= config.words_to_complete_bucket:
-        # Check if there are any words still in progress
-        words_in_progress_count = get_words_in_progress_count(progress)
-        
-        # Only advance if there are NO words in progress
-        if words_in_progress_count == 0:
-            # Bucket should be complete! Mark it and advance
-            if not bucket_progress.is_completed:
-                bucket_progress.is_completed = True
-                bucket_progress.save()
-            
-            # Check if next bucket exists
-            if not progress.has_next_bucket():
-                # Game complete!
-                bucket_name = progress.get_current_bucket_display()
-                return JsonResponse({
-                    'game_complete': True,
-                    'message': f'Congratulations! You have mastered all available buckets up to {bucket_name}!',
-                    'words_mastered': bucket_progress.words_mastered,
-                    'final_bucket': bucket_name
-                })
-            
-            # Move to next bucket
-            next_bucket_result = progress.advance_to_next_bucket()
-            
-            # Clean up unmastered words from the old bucket
-            if using_custom:
-                WordQueue.objects.filter(
-                    student=request.user,
-                    custom_word__bucket=bucket_progress.custom_bucket,
-                    is_mastered=False
-                ).delete()
-            else:
-                WordQueue.objects.filter(
-                    student=request.user,
-                    word__difficulty_bucket=bucket_progress.bucket,
-                    is_mastered=False
-                ).delete()
-            
-            # Create new bucket progress if needed
-            if using_custom:
-                BucketProgress.objects.get_or_create(
-                    student=request.user,
-                    custom_bucket=progress.custom_bucket
-                )
-            else:
-                BucketProgress.objects.get_or_create(
-                    student=request.user,
-                    bucket=progress.current_bucket
-                )
-            
-            return JsonResponse({
-                'bucket_complete': True,
-                'new_bucket': progress.get_current_bucket_display(),
-                'words_mastered': bucket_progress.words_mastered
-            })
-    
-    # Check if there are words in the queue FROM THE CURRENT BUCKET
-    if using_custom:
-        queue_word = WordQueue.objects.filter(
-            student=request.user,
-            custom_word__bucket=progress.custom_bucket,
-            is_mastered=False
-        ).order_by('position').first()
-    else:
-        queue_word = WordQueue.objects.filter(
-            student=request.user,
-            word__difficulty_bucket=progress.current_bucket,
-            is_mastered=False
-        ).order_by('position').first()
-    
-    # Always try to keep the queue populated with new words
-    available_words = get_available_words_for_student(progress)
-    
-    # If there are available words, add some to the queue to keep it full
-    if available_words.exists():
-        # Add up to 5 new words to the queue each time
-        words_to_add = min(5, available_words.count())
-        word_sample = random.sample(list(available_words), words_to_add)
-        add_words_to_queue(request.user, word_sample, is_custom=using_custom)
-    
-    # Get the next word from queue
-    if queue_word:
-        if using_custom:
-            word_obj = queue_word.custom_word
-            word_text = word_obj.text
-            word_id = f"custom_{word_obj.id}"
-        else:
-            word_obj = queue_word.word
-            word_text = word_obj.text
-            word_id = f"default_{word_obj.id}"
-    else:
-        # Queue is empty - check if we should move to next bucket
-        if not available_words.exists():
-            # No more words in this bucket
-            if not progress.has_next_bucket():
-                # No more buckets available - game complete!
-                bucket_name = progress.get_current_bucket_display()
-                return JsonResponse({
-                    'game_complete': True,
-                    'message': f'Congratulations! You have completed all available buckets up to {bucket_name}!'
-                })
-            
-            # Move to next bucket
-            progress.advance_to_next_bucket()
-            
-            # Create new bucket progress
-            if using_custom:
-                BucketProgress.objects.get_or_create(
-                    student=request.user,
-                    custom_bucket=progress.custom_bucket
-                )
-            else:
-                BucketProgress.objects.get_or_create(
-                    student=request.user,
-                    bucket=progress.current_bucket
-                )
-            
-            return JsonResponse({
-                'bucket_complete': True,
-                'new_bucket': progress.get_current_bucket_display()
-            })
-        
-        # Queue is empty but words are available - get first queued word
-        if using_custom:
-            queue_word = WordQueue.objects.filter(
-                student=request.user,
-                custom_word__isnull=False,
-                is_mastered=False
-            ).order_by('position').first()
-            
-            if queue_word:
-                word_obj = queue_word.custom_word
-                word_text = word_obj.text
-                word_id = f"custom_{word_obj.id}"
-            else:
-                # Fallback: no words were added (shouldn't happen), add one now
-                word_obj = random.choice(available_words)
-                max_position = WordQueue.objects.filter(
-                    student=request.user
-                ).aggregate(max_pos=Max('position'))['max_pos'] or 0
-                
-                WordQueue.objects.create(
-                    student=request.user,
-                    custom_word=word_obj,
-                    position=max_position + 1
-                )
-                word_text = word_obj.text
-                word_id = f"custom_{word_obj.id}"
-        else:
-            queue_word = WordQueue.objects.filter(
-                student=request.user,
-                word__isnull=False,
-                is_mastered=False
-            ).order_by('position').first()
-            
-            if queue_word:
-                word_obj = queue_word.word
-                word_text = word_obj.text
-                word_id = f"default_{word_obj.id}"
-            else:
-                # Fallback: no words were added (shouldn't happen), add one now
-                word_obj = random.choice(available_words)
-                max_position = WordQueue.objects.filter(
-                    student=request.user
-                ).aggregate(max_pos=Max('position'))['max_pos'] or 0
-                
-                WordQueue.objects.create(
-                    student=request.user,
-                    word=word_obj,
-                    position=max_position + 1
-                )
-                word_text = word_obj.text
-                word_id = f"default_{word_obj.id}"
-    
-    return JsonResponse({
-        'word_id': word_id,
-        'word': word_text,
-        'difficulty_bucket': progress.get_current_bucket_display(),
-        'bucket_complete': False
-    })
-
+    return JsonResponse(engine.next_word(request.user))
 
 
+@timed_view('submit_answer')
 @login_required
 @require_http_methods(["POST"])
 def submit_answer(request):
@@ -615,524 +390,36 @@ def submit_answer(request):
     if request.user.is_teacher():
         return JsonResponse({'error': 'Teachers cannot play the game'}, status=403)
     
-    data = json.loads(request.body)
-    word_id_str = data.get('word_id')
-    user_spelling = data.get('spelling', '').strip().lower()
-    
-    # Parse word_id to determine if custom or default
-    is_custom = word_id_str.startswith('custom_')
-    
-    try:
-        if is_custom:
-            actual_id = int(word_id_str.split('_')[1])
-            word_obj = CustomWord.objects.get(id=actual_id)
-        else:
-            actual_id = int(word_id_str.split('_')[1])
-            word_obj = Word.objects.get(id=actual_id)
-    except (ValueError, IndexError, Word.DoesNotExist, CustomWord.DoesNotExist):
-        return JsonResponse({'error': 'Word not found'}, status=404)
-    
-    # Get active session
-    session = GameSession.objects.filter(
-        student=request.user,
-        is_active=True
-    ).first()
-    
-    if not session:
-        session = GameSession.objects.create(student=request.user)
-    
-    # Check if answer is correct
-    is_correct = user_spelling == word_obj.text.lower()
-    
-    # Get attempt number for this word
-    if is_custom:
-        previous_attempts = WordAttempt.objects.filter(
-            student=request.user,
-            custom_word=word_obj
-        ).count()
-    else:
-        previous_attempts = WordAttempt.objects.filter(
-            student=request.user,
-            word=word_obj
-        ).count()
-    
-    # Create word attempt record
-    if is_custom:
-        attempt = WordAttempt.objects.create(
-            student=request.user,
-            custom_word=word_obj,
-            session=session,
-            user_spelling=user_spelling,
-            is_correct=is_correct,
-            attempt_number=previous_attempts + 1
-        )
-    else:
-        attempt = WordAttempt.objects.create(
-            student=request.user,
-            word=word_obj,
-            session=session,
-            user_spelling=user_spelling,
-            is_correct=is_correct,
-            attempt_number=previous_attempts + 1
-        )
+    return answer_submission(request.user, json.loads(request.body))
 
+
+@login_required
+@require_http_methods(["GET"])
+def game_status(request):
+    """
+    API endpoint for the progress widget (and optionally the leaderboard).
+    The widget data is computed in the background after each answer; pass the
+    status_version from submit_answer to make sure the data includes it.
+    """
+    if request.user.is_teacher():
+        return JsonResponse({'error': 'Teachers cannot play the game'}, status=403)
     
-    # Update session stats
-    session.words_attempted += 1
-    if is_correct:
-        session.words_correct += 1
-    session.save()
-    
-    # Update overall progress
-    progress = StudentProgress.objects.get(student=request.user)
-    progress.total_attempts += 1
-    if is_correct:
-        progress.total_words_correct += 1
-        # Award points based on word length
-        progress.total_points_earned += word_obj.word_length
-    progress.save()
-    
-    # Handle word queue
-    if is_custom:
-        queue_word = WordQueue.objects.filter(
-            student=request.user,
-            custom_word=word_obj
-        ).first()
-    else:
-        queue_word = WordQueue.objects.filter(
-            student=request.user,
-            word=word_obj
-        ).first()
-    
-    if queue_word:
-        if is_correct:
-            # Check if word was already mastered BEFORE this attempt
-            was_already_mastered = queue_word.is_mastered
-            
-            if not was_already_mastered:
-                # Check if this word has ever been failed
-                has_been_failed = queue_word.times_failed > 0
-                
-                if has_been_failed:
-                    # Word was misspelled before - need 3 correct attempts total to master
-                    if is_custom:
-                        correct_attempts = WordAttempt.objects.filter(
-                            student=request.user,
-                            custom_word=word_obj,
-                            is_correct=True
-                        ).count()
-                    else:
-                        correct_attempts = WordAttempt.objects.filter(
-                            student=request.user,
-                            word=word_obj,
-                            is_correct=True
-                        ).count()
-                    
-                    if correct_attempts >= 3:
-                        # Now mastered after 3 correct attempts!
-                        queue_word.is_mastered = True
-                        queue_word.save()
-                        should_increment_bucket = True
-                    else:
-                        # Correct, but need more attempts - recycle the word
-                        # Get config for recycling distance (use student's teacher's config)
-                        teacher = request.user.get_teacher()
-                        if teacher:
-                            config = GameConfiguration.objects.filter(teacher=teacher).first()
-                        else:
-                            config = GameConfiguration.objects.first()
-                        
-                        if not config:
-                            config = GameConfiguration.objects.create(
-                                teacher=User.objects.filter(role='teacher').first() or request.user
-                            )
-                        
-                        # Calculate new position (AT THE FRONT, within recycling_distance)
-                        # Get the minimum position currently in the queue
-                        current_min_position = WordQueue.objects.filter(
-                            student=request.user,
-                            is_mastered=False
-                        ).aggregate(min_pos=Min('position'))['min_pos'] or 0
-                        
-                        # Place it at the front, randomly within 1 to recycling_distance positions from the start
-                        new_position = current_min_position + random.randint(1, min(config.recycling_distance, 50))
-                        queue_word.position = new_position
-                        queue_word.save()
-                        should_increment_bucket = False
-                else:
-                    # Word never failed - mastered on first correct attempt!
-                    queue_word.is_mastered = True
-                    queue_word.save()
-                    should_increment_bucket = True
-                
-                # Update bucket progress if word was newly mastered
-                if should_increment_bucket:
-                    # Get or create bucket progress based on system type
-                    if progress.uses_custom_ladder():
-                        bucket_progress, _ = BucketProgress.objects.get_or_create(
-                            student=request.user,
-                            custom_bucket=progress.custom_bucket
-                        )
-                    else:
-                        bucket_progress, _ = BucketProgress.objects.get_or_create(
-                            student=request.user,
-                            bucket=word_obj.difficulty_bucket
-                        )
-                    bucket_progress.words_mastered += 1
-                    
-                    # Check if bucket is complete (use student's teacher's config)
-                    teacher = request.user.get_teacher()
-                    if teacher:
-                        config = GameConfiguration.objects.filter(teacher=teacher).first()
-                    else:
-                        config = GameConfiguration.objects.first()
-                    
-                    if config and bucket_progress.words_mastered >= config.words_to_complete_bucket:
-                        # Before completing bucket, check if there are any words still in progress
-                        # (words that have been attempted but not yet mastered)
-                        if progress.uses_custom_ladder():
-                            words_in_progress = WordQueue.objects.filter(
-                                student=request.user,
-                                custom_word__bucket=progress.custom_bucket,
-                                is_mastered=False
-                            )
-                        else:
-                            words_in_progress = WordQueue.objects.filter(
-                                student=request.user,
-                                word__difficulty_bucket=word_obj.difficulty_bucket,
-                                is_mastered=False
-                            )
-                        
-                        # Count how many have been attempted
-                        has_words_in_progress = False
-                        words_in_progress_count = 0
-                        for queue_item in words_in_progress:
-                            # Check based on system type
-                            if progress.uses_custom_ladder():
-                                has_been_attempted = WordAttempt.objects.filter(
-                                    student=request.user,
-                                    custom_word=queue_item.custom_word
-                                ).exists()
-                                word_text = queue_item.custom_word.text if queue_item.custom_word else 'N/A'
-                            else:
-                                has_been_attempted = WordAttempt.objects.filter(
-                                    student=request.user,
-                                    word=queue_item.word
-                                ).exists()
-                                word_text = queue_item.word.text if queue_item.word else 'N/A'
-                            
-                            if has_been_attempted:
-                                has_words_in_progress = True
-                                words_in_progress_count += 1
-                                # DEBUG
-                                print(f'DEBUG: Word in progress: {word_text}, times_failed={queue_item.times_failed}')
-                        
-                        # DEBUG
-                        if progress.uses_custom_ladder():
-                            bucket_name = progress.custom_bucket.name if progress.custom_bucket else 'N/A'
-                            print(f'DEBUG: Bucket {bucket_name} - Mastered: {bucket_progress.words_mastered}, Required: {config.words_to_complete_bucket}, Words in progress: {words_in_progress_count}')
-                        else:
-                            print(f'DEBUG: Bucket {word_obj.difficulty_bucket} - Mastered: {bucket_progress.words_mastered}, Required: {config.words_to_complete_bucket}, Words in progress: {words_in_progress_count}')
-                        
-                        # Only complete bucket if there are NO words in progress
-                        if not has_words_in_progress:
-                            bucket_progress.is_completed = True
-                            bucket_progress.save()
-                            
-                            print(f'DEBUG: ADVANCING TO NEXT BUCKET')
-                            
-                            # Check if next bucket exists based on system type
-                            if progress.uses_custom_ladder():
-                                # Custom ladder - check if there's a next bucket
-                                if progress.has_next_bucket():
-                                    # Advance to next bucket
-                                    progress.advance_to_next_bucket()
-                                    progress.save()
-                                    
-                                    # Clean up unmastered words from the old bucket
-                                    WordQueue.objects.filter(
-                                        student=request.user,
-                                        custom_word__bucket=progress.custom_bucket,
-                                        is_mastered=False
-                                    ).delete()
-                                    
-                                    leaderboard_data = None
-                                    if request.user.classroom:
-                                        raw_leaderboard = get_classroom_leaderboard(request.user.classroom, request.user)
-                                        leaderboard_data = serialize_leaderboard_for_json(raw_leaderboard)
-                                    
-                                    return JsonResponse({
-                                        'correct': True,
-                                        'bucket_complete': True,
-                                        'words_mastered': bucket_progress.words_mastered,
-                                        'new_bucket': progress.get_current_bucket_display(),
-                                        'session_correct': session.words_correct,
-                                        'session_attempted': session.words_attempted,
-                                        'total_correct': progress.total_words_correct,
-                                        'leaderboard': leaderboard_data
-                                    })
-                                else:
-                                    # No more buckets - game complete!
-                                    leaderboard_data = None
-                                    if request.user.classroom:
-                                        raw_leaderboard = get_classroom_leaderboard(request.user.classroom, request.user)
-                                        leaderboard_data = serialize_leaderboard_for_json(raw_leaderboard)
-                                    
-                                    return JsonResponse({
-                                        'correct': True,
-                                        'game_complete': True,
-                                        'words_mastered': bucket_progress.words_mastered,
-                                        'final_bucket': progress.get_current_bucket_display(),
-                                        'session_correct': session.words_correct,
-                                        'session_attempted': session.words_attempted,
-                                        'total_correct': progress.total_words_correct,
-                                        'message': f'Congratulations! You have mastered all buckets in {progress.custom_bucket.ladder.name}!',
-                                        'leaderboard': leaderboard_data
-                                    })
-                            else:
-                                # Default system - check if next bucket has words
-                                next_bucket = word_obj.difficulty_bucket + 1
-                                next_bucket_has_words = Word.objects.filter(difficulty_bucket=next_bucket).exists()
-                                
-                                if not next_bucket_has_words:
-                                    # Game complete!
-                                    leaderboard_data = None
-                                    if request.user.classroom:
-                                        raw_leaderboard = get_classroom_leaderboard(request.user.classroom, request.user)
-                                        leaderboard_data = serialize_leaderboard_for_json(raw_leaderboard)
-                                    
-                                    return JsonResponse({
-                                        'correct': True,
-                                        'game_complete': True,
-                                        'words_mastered': bucket_progress.words_mastered,
-                                        'final_bucket': word_obj.difficulty_bucket,
-                                        'session_correct': session.words_correct,
-                                        'session_attempted': session.words_attempted,
-                                        'total_correct': progress.total_words_correct,
-                                        'message': f'Congratulations! You have mastered all available buckets up to {word_obj.difficulty_bucket}-letter words!',
-                                        'leaderboard': leaderboard_data
-                                    })
-                                
-                                # Move to next bucket
-                                progress.current_bucket = next_bucket
-                                progress.save()
-                                
-                                # Clean up unmastered words from the old bucket (they won't be used anymore)
-                                WordQueue.objects.filter(
-                                    student=request.user,
-                                    word__difficulty_bucket=word_obj.difficulty_bucket,
-                                    is_mastered=False
-                                ).delete()
-                                
-                                leaderboard_data = None
-                                if request.user.classroom:
-                                    raw_leaderboard = get_classroom_leaderboard(request.user.classroom, request.user)
-                                    leaderboard_data = serialize_leaderboard_for_json(raw_leaderboard)
-                                
-                                return JsonResponse({
-                                    'correct': True,
-                                    'bucket_complete': True,
-                                    'words_mastered': bucket_progress.words_mastered,
-                                    'new_bucket': progress.current_bucket,
-                                    'session_correct': session.words_correct,
-                                    'session_attempted': session.words_attempted,
-                                    'total_correct': progress.total_words_correct,
-                                    'leaderboard': leaderboard_data
-                                })
-                        else:
-                            # DEBUG
-                            print(f'DEBUG: NOT ADVANCING - Still have {words_in_progress_count} words in progress')
-                    
-                    bucket_progress.save()
-            # else: word was already mastered, don't do anything special
-        else:
-            # Recycle the word - move it back into the queue
-            queue_word.times_failed += 1
-            
-            # Get config for recycling distance (use student's teacher's config)
-            teacher = request.user.get_teacher()
-            if teacher:
-                config = GameConfiguration.objects.filter(teacher=teacher).first()
-            else:
-                config = GameConfiguration.objects.first()
-            
-            if not config:
-                config = GameConfiguration.objects.create(
-                    teacher=User.objects.filter(role='teacher').first() or request.user
-                )
-            
-            # Calculate new position (AT THE FRONT, within recycling_distance)
-            # Get the minimum position currently in the queue
-            current_min_position = WordQueue.objects.filter(
-                student=request.user,
-                is_mastered=False
-            ).aggregate(min_pos=Min('position'))['min_pos'] or 0
-            
-            # Place it at the front, randomly within 1 to recycling_distance positions from the start
-            # This puts failed words BEFORE most unattempted words
-            new_position = current_min_position + random.randint(1, min(config.recycling_distance, 50))
-            queue_word.position = new_position
-            queue_word.save()
-    
-    # Get config for words_to_complete
-    teacher = request.user.get_teacher()
-    if teacher:
-        config = GameConfiguration.objects.filter(teacher=teacher).first()
-    else:
-        config = GameConfiguration.objects.first()
-    
-    words_to_complete = config.words_to_complete_bucket if config else 200
-    
-    # Count correct attempts for this word to show progress
-    if is_custom:
-        correct_attempts_for_word = WordAttempt.objects.filter(
-            student=request.user,
-            custom_word=word_obj,
-            is_correct=True
-        ).count()
-    else:
-        correct_attempts_for_word = WordAttempt.objects.filter(
-            student=request.user,
-            word=word_obj,
-            is_correct=True
-        ).count()
-    
-    # Determine mastery requirement based on whether word has been failed
-    if is_custom:
-        queue_word_for_response = WordQueue.objects.filter(
-            student=request.user,
-            custom_word=word_obj
-        ).first()
-    else:
-        queue_word_for_response = WordQueue.objects.filter(
-            student=request.user,
-            word=word_obj
-        ).first()
-    
-    if queue_word_for_response and queue_word_for_response.times_failed > 0:
-        # Word has been misspelled - needs 3 correct attempts
-        mastery_required = 3
-    else:
-        # Word never failed - needs only 1 correct attempt
-        mastery_required = 1
-    
-    # Get updated leaderboard data
-    leaderboard_data = None
-    if request.user.classroom:
-        raw_leaderboard = get_classroom_leaderboard(request.user.classroom, request.user)
-        leaderboard_data = serialize_leaderboard_for_json(raw_leaderboard)
-    
-    # Calculate words in progress (not yet mastered but in queue)
-    if progress.uses_custom_ladder():
-        words_in_progress = WordQueue.objects.filter(
-            student=request.user,
-            custom_word__bucket=progress.custom_bucket,
-            is_mastered=False
-        )
-    else:
-        words_in_progress = WordQueue.objects.filter(
-            student=request.user,
-            word__difficulty_bucket=progress.current_bucket,
-            is_mastered=False
-        )
-    
-    # Count how many words need 1, 2, or 3 more correct attempts
-    # ONLY count words that have been attempted at least once
-    needs_1_more = 0
-    needs_2_more = 0
-    needs_3_more = 0
+    try:
+        min_version = int(request.GET.get('version', 0))
+    except ValueError:
+        min_version = 0
     
-    for queue_item in words_in_progress:
-        # Check if word has been attempted at all based on system type
-        if progress.uses_custom_ladder():
-            has_been_attempted = WordAttempt.objects.filter(
-                student=request.user,
-                custom_word=queue_item.custom_word
-            ).exists()
-        else:
-            has_been_attempted = WordAttempt.objects.filter(
-                student=request.user,
-                word=queue_item.word
-            ).exists()
-        
-        if not has_been_attempted:
-            # Skip words that haven't been seen yet
-            continue
-            
-        if queue_item.times_failed > 0:
-            # Word has been failed - needs 3 correct total
-            if progress.uses_custom_ladder():
-                correct_count = WordAttempt.objects.filter(
-                    student=request.user,
-                    custom_word=queue_item.custom_word,
-                    is_correct=True
-                ).count()
-            else:
-                correct_count = WordAttempt.objects.filter(
-                    student=request.user,
-                    word=queue_item.word,
-                    is_correct=True
-                ).count()
-            remaining = 3 - correct_count
-            if remaining == 1:
-                needs_1_more += 1
-            elif remaining == 2:
-                needs_2_more += 1
-            elif remaining >= 3:
-                needs_3_more += 1
-        else:
-            # Word never failed but has been attempted - needs 1 correct
-            if progress.uses_custom_ladder():
-                has_correct = WordAttempt.objects.filter(
-                    student=request.user,
-                    custom_word=queue_item.custom_word,
-                    is_correct=True
-                ).exists()
-            else:
-                has_correct = WordAttempt.objects.filter(
-                    student=request.user,
-                    word=queue_item.word,
-                    is_correct=True
-                ).exists()
-            if not has_correct:
-                needs_1_more += 1
-    
-    # Get bucket progress for response
-    if progress.uses_custom_ladder():
-        bucket_progress_response = BucketProgress.objects.filter(
-            student=request.user,
-            custom_bucket=progress.custom_bucket
-        ).first()
-    else:
-        bucket_progress_response = BucketProgress.objects.filter(
-            student=request.user,
-            bucket=progress.current_bucket
-        ).first()
+    status = cache.get(game_status_cache_key(request.user.id))
+    if status is None or status.get('version', 0) < min_version:
+        # Background job hasn't finished yet (or ran in another worker) - compute now
+        status = refresh_game_status(request.user.id, min_version)
     
-    # Use the bucket_progress_response or default values
-    if bucket_progress_response:
-        words_mastered = bucket_progress_response.words_mastered
-    else:
-        words_mastered = 0
-    
-    response_data = {
-        'correct': is_correct,
-        'correct_spelling': word_obj.text,
-        'bucket_complete': False,
-        'words_mastered': words_mastered,
-        'words_to_complete': words_to_complete,
-        'session_correct': session.words_correct,
-        'session_attempted': session.words_attempted,
-        'total_correct': progress.total_words_correct,
-        'word_correct_count': correct_attempts_for_word,
-        'word_mastery_required': mastery_required,
-        'words_need_1': needs_1_more,
-        'words_need_2': needs_2_more,
-        'words_need_3': needs_3_more,
-        'leaderboard': leaderboard_data
-    }
+    # Browsers without a leaderboard stream ask for the leaderboard here instead
+    if request.GET.get('leaderboard') and request.user.classroom_id:
+        standings = get_classroom_standings(request.user.classroom_id)
+        status = dict(status, leaderboard=leaderboard_from_standings(standings, request.user.id))
     
-    return JsonResponse(response_data)
+    return JsonResponse(status)
 
 
 @login_required
@@ -1227,21 +514,10 @@ def student_detail(request, student_id):
     # Get all sessions
     sessions = GameSession.objects.filter(student=student).order_by('-started_at')
     
-    # Get word attempts grouped by word
-    word_performance = WordAttempt.objects.filter(
-        student=student
-    ).values(
-        'word__text',
-        'word__difficulty_bucket'
-    ).annotate(
-        total_attempts=Count('id'),
-        correct_attempts=Count('id', filter=Q(is_correct=True)),
-        last_attempt=Count('attempted_at')
-    ).order_by('-total_attempts')
-    
-    # Calculate accuracy for each word
-    for perf in word_performance:
-        perf['accuracy'] = (perf['correct_attempts'] / perf['total_attempts'] * 100) if perf['total_attempts'] > 0 else 0
+    # Get word attempts grouped by word - archived terms only when asked for
+    full_history = request.GET.get('history') == 'full'
+    word_performance = get_word_performance(student, full_history)
+    term_summaries = TermSummary.objects.filter(student=student)
     
     # Get bucket progress
     bucket_progress = BucketProgress.objects.filter(student=student).order_by('bucket')
@@ -1272,6 +548,9 @@ def student_detail(request, student_id):
         'config': config,
         'available_buckets': available_buckets,
         'custom_ladder_buckets': custom_ladder_buckets,
+        'misspelling_patterns': get_student_patterns(student),
+        'full_history': full_history,
+        'term_summaries': term_summaries,
     }
     
     return render(request, 'game/student_detail.html', context)
@@ -1292,6 +571,8 @@ def teacher_config(request):
         words_to_complete = request.POST.get('words_to_complete_bucket')
         recycling_distance = request.POST.get('recycling_distance')
         default_starting_bucket = request.POST.get('default_starting_bucket')
+        scheduler = request.POST.get('scheduler', config.scheduler)
+        word_sampling = request.POST.get('word_sampling', config.word_sampling)
         
         try:
             old_default_bucket = config.default_starting_bucket
@@ -1300,6 +581,10 @@ def teacher_config(request):
             config.words_to_complete_bucket = int(words_to_complete)
             config.recycling_distance = int(recycling_distance)
             config.default_starting_bucket = new_default_bucket
+            if scheduler in SCHEDULERS:
+                config.scheduler = scheduler
+            if word_sampling in dict(GameConfiguration.WORD_SAMPLING_CHOICES):
+                config.word_sampling = word_sampling
             config.save()
             
             # ONLY update students who were on the old default bucket
@@ -1358,11 +643,64 @@ def teacher_config(request):
         'config': config,
         'available_buckets': available_buckets,
         'students_on_default': students_on_default_count,
+        'scheduler_choices': SCHEDULER_CHOICES,
+        'word_sampling_choices': GameConfiguration.WORD_SAMPLING_CHOICES,
+        'preview_students': PREVIEW_STUDENTS,
     }
     
     return render(request, 'game/teacher_config.html', context)
 
 
+@login_required
+@require_http_methods(["GET"])
+def teacher_config_preview(request):
+    """Simulated answers and sessions per bucket for the settings on the config form"""
+    if not request.user.is_teacher():
+        return JsonResponse({'error': 'Only teachers can preview settings'}, status=403)
+    
+    config = GameConfiguration.objects.filter(teacher=request.user).first()
+    try:
+        words_to_complete = int(request.GET.get('words_to_complete_bucket', config.words_to_complete_bucket if config else 200))
+        recycling_distance = int(request.GET.get('recycling_distance', config.recycling_distance if config else 100))
+        starting_bucket = int(request.GET.get('default_starting_bucket', config.default_starting_bucket if config else 3))
+    except ValueError:
+        return JsonResponse({'error': 'Please enter valid numbers'}, status=400)
+    if words_to_complete < 1 or recycling_distance < 1:
+        return JsonResponse({'error': 'Please enter valid numbers'}, status=400)
+    
+    scheduler = request.GET.get('scheduler')
+    if scheduler not in SCHEDULERS:
+        scheduler = get_scheduler(config).name
+    
+    # Same settings give the same answer - the simulation takes a second or two
+    cache_key = f'config_preview:{request.user.id}:{words_to_complete}:{recycling_distance}:{starting_bucket}:{scheduler}'
+    preview = cache.get(cache_key)
+    if preview is None:
+        buckets = list(
+            Word.objects.filter(difficulty_bucket__gte=starting_bucket)
+            .values_list('difficulty_bucket', flat=True)
+            .distinct().order_by('difficulty_bucket')[:PREVIEW_BUCKETS]
+        )
+        students = User.objects.filter(
+            Q(classroom__teacher=request.user) | Q(teacher=request.user),
+            role='student'
+        )
+        try:
+            results = simulate_default_buckets(
+                buckets, words_to_complete, recycling_distance, scheduler,
+                students=PREVIEW_STUDENTS,
+                session_length=get_average_session_length(students),
+                max_attempts=PREVIEW_MAX_ATTEMPTS,
+                seed=0
+            )
+        except SimulatorUnavailable as error:
+            return JsonResponse({'error': str(error)}, status=503)
+        preview = {'students': PREVIEW_STUDENTS, 'buckets': results}
+        cache.set(cache_key, preview, 600)
+    
+    return JsonResponse(preview)
+
+
 @login_required
 def bulk_assign_students(request):
     """Assign ALL students in the classroom to a specific bucket"""
@@ -1669,6 +1007,147 @@ def classroom_detail(request, classroom_id):
     return render(request, 'game/classroom_detail.html', context)
 
 
+@login_required
+def classroom_monitor(request, classroom_id):
+    """Live monitor - who is playing, their current word and answers as they happen"""
+    if not request.user.is_teacher():
+        return redirect('student_game')
+    
+    try:
+        classroom = Classroom.objects.get(id=classroom_id, teacher=request.user)
+    except Classroom.DoesNotExist:
+        messages.error(request, 'Classroom not found')
+        return redirect('classroom_list')
+    
+    return render(request, 'game/classroom_monitor.html', {'classroom': classroom})
+
+
+@login_required
+@require_http_methods(["GET"])
+def classroom_export(request, classroom_id, dataset):
+    """
+    Stream a classroom's attempts, sessions or bucket progress as CSV.
+    ?history=full adds archived terms to the attempts export.
+    """
+    if not request.user.is_teacher():
+        return redirect('student_game')
+    
+    try:
+        classroom = Classroom.objects.get(id=classroom_id, teacher=request.user)
+    except Classroom.DoesNotExist:
+        messages.error(request, 'Classroom not found')
+        return redirect('classroom_list')
+    
+    if dataset not in EXPORTS:
+        messages.error(request, 'Unknown export')
+        return redirect('classroom_detail', classroom_id=classroom.id)
+    
+    if dataset == 'attempts':
+        rows = EXPORTS[dataset](classroom, full_history=request.GET.get('history') == 'full')
+    else:
+        rows = EXPORTS[dataset](classroom)
+    
+    # Under ASGI a plain generator would be read into memory before sending
+    chunks = async_csv_chunks(rows) if isinstance(request, ASGIRequest) else csv_chunks(rows)
+    response = StreamingHttpResponse(chunks, content_type='text/csv; charset=utf-8')
+    filename = f"{slugify(classroom.name) or 'classroom'}-{dataset}-{timezone.localdate():%Y-%m-%d}.csv"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def classroom_import_roster(request, classroom_id):
+    """Create student accounts from an uploaded roster CSV and show their passwords"""
+    if not request.user.is_teacher():
+        return redirect('student_game')
+    
+    try:
+        classroom = Classroom.objects.get(id=classroom_id, teacher=request.user)
+    except Classroom.DoesNotExist:
+        messages.error(request, 'Classroom not found')
+        return redirect('classroom_list')
+    
+    context = {
+        'classroom': classroom,
+        'max_rows': MAX_ROSTER_ROWS,
+    }
+    
+    if request.method == 'POST':
+        roster_file = request.FILES.get('roster')
+        if not roster_file:
+            messages.error(request, 'Please choose a CSV file')
+            return render(request, 'game/classroom_import.html', context)
+        
+        try:
+            rows, problems = parse_roster(roster_file.read().decode('utf-8-sig'))
+        except UnicodeDecodeError:
+            messages.error(request, 'The file must be a CSV saved as UTF-8')
+            return render(request, 'game/classroom_import.html', context)
+        except RosterError as error:
+            messages.error(request, str(error))
+            return render(request, 'game/classroom_import.html', context)
+        
+        created, skipped = import_roster(classroom, rows)
+        if created:
+            messages.success(request, f'✅ {len(created)} student account{"s" if len(created) != 1 else ""} created')
+        
+        context.update({
+            'created': created,
+            'skipped': skipped,
+            'problems': problems,
+            'imported': True,
+        })
+    
+    return render(request, 'game/classroom_import.html', context)
+
+
+@login_required
+def classroom_error_report(request, classroom_id):
+    """Most common kinds of spelling mistakes across a classroom"""
+    if not request.user.is_teacher():
+        return redirect('student_game')
+    
+    try:
+        classroom = Classroom.objects.get(id=classroom_id, teacher=request.user)
+    except Classroom.DoesNotExist:
+        messages.error(request, 'Classroom not found')
+        return redirect('classroom_list')
+    
+    patterns = get_classroom_patterns(classroom)
+    context = {
+        'classroom': classroom,
+        'patterns': patterns,
+        'total_mistakes': sum(entry['count'] for entry in patterns),
+    }
+    return render(request, 'game/classroom_errors.html', context)
+
+
+@login_required
+@require_http_methods(["GET"])
+def classroom_monitor_feed(request, classroom_id):
+    """
+    API endpoint polled by the live monitor.
+    Without ?cursor= returns a snapshot of the classroom; with the cursor from
+    the previous response returns only the changes since then.
+    """
+    if not request.user.is_teacher():
+        return JsonResponse({'error': 'Only teachers can monitor classrooms'}, status=403)
+    
+    classroom = Classroom.objects.filter(id=classroom_id, teacher=request.user).first()
+    if not classroom:
+        return JsonResponse({'error': 'Classroom not found'}, status=404)
+    
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            return JsonResponse(get_monitor_changes(classroom, cursor))
+        except InvalidCursor:
+            # Unreadable cursor - start over with a fresh snapshot
+            pass
+    
+    return JsonResponse(get_monitor_snapshot(classroom))
+
+
 @login_required
 def classroom_delete(request, classroom_id):
     """Delete a classroom"""
@@ -1821,6 +1300,117 @@ def serialize_leaderboard_for_json(leaderboard_data):
     }
 
 
+def get_classroom_standings(classroom_id):
+    """
+    Ranked scores for every student in a classroom, as plain JSON-friendly dicts.
+    Cached with the leaderboard version they were built for, so however many
+    students are watching the leaderboard it is only rebuilt once per change.
+    Each classroom has one cache entry that every rebuild overwrites - a key
+    per version would add a cache file per answer and make the file cache
+    cull constantly.
+    """
+    version = get_leaderboard_version(classroom_id)
+    cache_key = f'leaderboard_standings:{classroom_id}'
+    cached = cache.get(cache_key)
+    if cached is not None and cached['version'] == version:
+        return cached['standings']
+    
+    with traced('leaderboard_standings', classroom=classroom_id) as trace:
+        progresses = list(StudentProgress.objects.filter(
+            student__role='student',
+            student__classroom_id=classroom_id
+        ).select_related('student', 'custom_bucket'))
+        trace.lap('query')
+        
+        standings = [
+            {
+                'id': progress.student_id,
+                'username': progress.student.username,
+                'score': progress.score,
+                'accuracy': round(progress.accuracy, 1),
+                'bucket': progress.current_bucket,
+                'words_correct': progress.total_words_correct,
+            }
+            for progress in progresses
+        ]
+        standings.sort(key=lambda x: x['score'], reverse=True)
+        for i, entry in enumerate(standings):
+            entry['rank'] = i + 1
+        trace.lap('leaderboard_serialization')
+        
+        cache.set(cache_key, {'version': version, 'standings': standings}, timeout=60 * 60)
+        trace.lap('cache_write')
+        trace.set(students=len(standings))
+    return standings
+
+
+def leaderboard_from_standings(standings, student_id):
+    """
+    Build the same structure as serialize_leaderboard_for_json from cached
+    standings (game.js does the same thing for streamed standings)
+    """
+    top_5 = [dict(entry, is_current=entry['id'] == student_id) for entry in standings[:5]]
+    
+    current_student = None
+    next_student = None
+    gap_to_next = 0
+    for i, entry in enumerate(standings):
+        if entry['id'] == student_id:
+            current_student = dict(entry, is_current=True)
+            if i > 0:
+                next_student = {
+                    'username': standings[i - 1]['username'],
+                    'score': standings[i - 1]['score'],
+                }
+                gap_to_next = next_student['score'] - entry['score']
+            break
+    
+    return {
+        'top_5': top_5,
+        'current_student': current_student,
+        'gap_to_next': gap_to_next,
+        'next_student': next_student,
+        'total_students': len(standings)
+    }
+
+
+def get_stream_user(request, classroom_id):
+    """Return the user if they may watch this classroom's leaderboard, else None"""
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    if user.is_teacher():
+        allowed = Classroom.objects.filter(id=classroom_id, teacher=user).exists()
+    else:
+        allowed = user.classroom_id == classroom_id
+    return user if allowed else None
+
+
+async def leaderboard_stream(request, classroom_id):
+    """
+    Server-Sent Events stream of a classroom's leaderboard.
+    Sends a full snapshot, then only the students whose rank or score changed.
+    Must be served by the ASGI application (see spelling_game/asgi.py).
+    """
+    if not isinstance(request, ASGIRequest):
+        # A WSGI worker would be tied up for the whole stream. 204 tells
+        # EventSource not to reconnect, so game.js falls back to polling.
+        return HttpResponse(status=204)
+    
+    user = await sync_to_async(get_stream_user)(request, classroom_id)
+    if user is None:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    response = StreamingHttpResponse(
+        leaderboard_events(classroom_id, get_classroom_standings),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
 def classroom_leaderboard(request):
     """Full leaderboard page for students"""
@@ -1849,11 +1439,10 @@ def ladder_list(request):
     if not request.user.is_teacher():
         return redirect('student_game')
     
-    ladders = BucketLadder.objects.filter(teacher=request.user).order_by('name')
-    
-    # Add bucket count to each ladder
-    for ladder in ladders:
-        ladder.bucket_count = ladder.custom_buckets.count()
+    # Bucket counts come with the ladders, in the same query
+    ladders = BucketLadder.objects.filter(
+        teacher=request.user
+    ).annotate(bucket_count=Count('custom_buckets')).order_by('name')
     
     context = {
         'ladders': ladders,
@@ -1900,8 +1489,8 @@ def ladder_detail(request, ladder_id):
         messages.error(request, 'Ladder not found')
         return redirect('ladder_list')
     
-    # Get buckets in order
-    buckets = ladder.get_ordered_buckets()
+    # Get buckets in order, with their word counts in the same query
+    buckets = ladder.get_ordered_buckets().annotate(num_words=Count('custom_words'))
     
     # Get classrooms using this ladder
     classrooms_using = Classroom.objects.filter(bucket_ladder=ladder)
@@ -2109,6 +1698,77 @@ def bucket_add_words(request, bucket_id):
     return redirect('ladder_detail', ladder_id=bucket.ladder.id)
 
 
+@login_required
+def bucket_generate_preview(request, bucket_id):
+    """AJAX endpoint: the default words a pattern would add to a bucket (count and a sample)"""
+    if not request.user.is_teacher():
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    try:
+        bucket = CustomBucket.objects.get(id=bucket_id, ladder__teacher=request.user)
+    except CustomBucket.DoesNotExist:
+        return JsonResponse({'error': 'Bucket not found'}, status=404)
+
+    try:
+        pattern = WordPattern.from_data(request.GET)
+    except PatternError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if pattern.is_empty():
+        return JsonResponse({'description': '', 'count': 0, 'new': 0, 'to_add': 0, 'sample': []})
+
+    words, new_words = words_for_bucket(bucket, pattern)
+    return JsonResponse({
+        'description': pattern.describe(),
+        'count': len(words),
+        'new': len(new_words),
+        'to_add': min(len(new_words), MAX_GENERATED_WORDS),
+        'limit': MAX_GENERATED_WORDS,
+        'sample': new_words[:40],
+    })
+
+
+@login_required
+def bucket_generate_words(request, bucket_id):
+    """Add the default words matching a pattern (suffix, letters, length...) to a bucket"""
+    if not request.user.is_teacher():
+        return redirect('student_game')
+
+    try:
+        bucket = CustomBucket.objects.select_related('ladder').get(
+            id=bucket_id,
+            ladder__teacher=request.user
+        )
+    except CustomBucket.DoesNotExist:
+        messages.error(request, 'Bucket not found')
+        return redirect('ladder_list')
+
+    if request.method == 'POST':
+        try:
+            pattern = WordPattern.from_data(request.POST)
+        except PatternError as e:
+            messages.error(request, str(e))
+            return redirect('ladder_detail', ladder_id=bucket.ladder.id)
+        if pattern.is_empty():
+            messages.error(request, 'Describe the words to add - a beginning, ending, letters or length')
+            return redirect('ladder_detail', ladder_id=bucket.ladder.id)
+
+        words, new_words = words_for_bucket(bucket, pattern)
+        to_add = new_words[:MAX_GENERATED_WORDS]
+        # Another request may add some of the same words first
+        CustomWord.objects.bulk_create([CustomWord(bucket=bucket, text=text) for text in to_add], ignore_conflicts=True)
+
+        if to_add:
+            messages.success(request, f'✅ Added {len(to_add)} {pattern.describe()} to "{bucket.name}"!')
+        if len(new_words) > len(to_add):
+            messages.info(request, f'Only the first {MAX_GENERATED_WORDS} of {len(new_words)} matching words were added.')
+        if len(words) > len(new_words):
+            messages.info(request, f'{len(words) - len(new_words)} word(s) already in the bucket were skipped.')
+        if not words:
+            messages.warning(request, f'No {pattern.describe()} found.')
+
+    return redirect('ladder_detail', ladder_id=bucket.ladder.id)
+
+
 @login_required
 def bucket_remove_word(request, word_id):
     """Remove a word from a bucket"""
@@ -2133,7 +1793,12 @@ def bucket_remove_word(request, word_id):
 
 @login_required
 def bucket_get_words(request, bucket_id):
-    """AJAX endpoint to get all words in a bucket"""
+    """
+    AJAX endpoint to get the words in a bucket, a page at a time in
+    alphabetical order. Pass the previous page's next_after as ?after= for
+    the next one - a keyset on the (bucket, text) unique index, so every page
+    costs the same however deep into the bucket it is.
+    """
     if not request.user.is_teacher():
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
@@ -2142,29 +1807,80 @@ def bucket_get_words(request, bucket_id):
             id=bucket_id,
             ladder__teacher=request.user
         )
-        
-        # Get all words in this bucket, ordered alphabetically
-        words = CustomWord.objects.filter(bucket=bucket).order_by('text')
-        
-        words_data = [
-            {
-                'id': word.id,
-                'text': word.text,
-                'word_length': word.word_length
-            }
-            for word in words
-        ]
-        
-        return JsonResponse({
-            'success': True,
-            'bucket_name': bucket.name,
-            'words': words_data,
-            'word_count': len(words_data)
-        })
-        
     except CustomBucket.DoesNotExist:
         return JsonResponse({'error': 'Bucket not found'}, status=404)
 
+    try:
+        limit = min(max(int(request.GET.get('limit', WORDS_PAGE_SIZE)), 1), MAX_WORDS_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    after = request.GET.get('after', '')
+
+    words = CustomWord.objects.filter(bucket=bucket).order_by('text')
+    if after:
+        words = words.filter(text__gt=after)
+    # One extra row says whether there is another page
+    page = list(words.values('id', 'text')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    words_data = [
+        {
+            'id': word['id'],
+            'text': word['text'],
+            'word_length': len(word['text'])
+        }
+        for word in page
+    ]
+    
+    data = {
+        'success': True,
+        'bucket_name': bucket.name,
+        'words': words_data,
+        'has_more': has_more,
+        'next_after': page[-1]['text'] if has_more else None,
+    }
+    if not after:
+        # The total is counted for the first page only, so a later page
+        # costs no more than the first
+        data['word_count'] = CustomWord.objects.filter(bucket=bucket).count()
+    return JsonResponse(data)
+
+
+@login_required
+def word_search(request):
+    """
+    AJAX autocomplete over the default word list, for adding words to a
+    custom bucket. ?q= is the prefix typed so far; ?bucket= limits it to one
+    difficulty bucket and ?custom_bucket= flags words already in that bucket.
+    """
+    if not request.user.is_teacher():
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    prefix = request.GET.get('q', '').strip().lower()
+    try:
+        bucket = int(request.GET['bucket']) if request.GET.get('bucket') else None
+        custom_bucket_id = int(request.GET['custom_bucket']) if request.GET.get('custom_bucket') else None
+        limit = min(max(int(request.GET.get('limit', 20)), 1), MAX_RESULTS)
+    except ValueError:
+        return JsonResponse({'error': 'bucket, custom_bucket and limit must be numbers'}, status=400)
+    if not prefix:
+        return JsonResponse({'query': '', 'results': [], 'total': 0})
+
+    matches, total = get_word_index().search(prefix, bucket, limit)
+    results = [match.as_dict() for match in matches]
+
+    if custom_bucket_id and results:
+        already_added = set(CustomWord.objects.filter(
+            bucket_id=custom_bucket_id,
+            bucket__ladder__teacher=request.user,
+            text__in=[result['text'] for result in results]
+        ).values_list('text', flat=True))
+        for result in results:
+            result['in_bucket'] = result['text'] in already_added
+
+    return JsonResponse({'query': prefix, 'results': results, 'total': total})
+
 
 @login_required
 def classroom_assign_ladder(request, classroom_id):
@@ -2275,3 +1991,15 @@ def classroom_assign_ladder(request, classroom_id):
     
     return redirect('classroom_detail', classroom_id=classroom_id)
 
+
+@staff_member_required
+def query_profile_report(request):
+    """Staff only - per-endpoint latency percentiles and the costliest queries"""
+    if request.method == 'POST' and request.POST.get('action') == 'reset':
+        reset_profile()
+        messages.success(request, 'Query profile reset')
+        return redirect('query_profile_report')
+    
+    context = get_profile_report(top=25)
+    context['enabled'] = settings.GAME_QUERY_PROFILER
+    return render(request, 'game/query_profile.html', context)
@@ -0,0 +1,116 @@
+"""
+Word list quality filter: scores the built-in words against a local
+frequency list and takes the rarest out of each bucket before the lists are
+compiled (see lexicon.py).
+
+The frequency list is a text file of "word count" lines (whitespace, tab or
+comma separated), like the unigram counts published with most corpora. Only
+the counts of the words being filtered are kept, as Zipf values - log10 of
+the word's frequency per billion words: 7 for "the", about 4 for "garden",
+below 2 for words most students have never read.
+
+A word is rare if its Zipf value is below min_zipf (words missing from the
+list count as 0). At most max_share of a bucket is dropped, rarest first,
+so the long-word buckets - where nearly every word is uncommon - keep most
+of their words. Words are only ever dropped, never moved: a word's bucket
+stays its length, which is what the game tells students and teachers.
+"""
+import math
+import os
+import re
+
+from django.conf import settings
+
+FIELD_SEPARATOR = re.compile(r'[\s,]+')
+
+
+def zipf(count, total):
+    return math.log10(count * 1e9 / total) if count > 0 else 0.0
+
+
+class FrequencyList:
+    """Zipf values of the words asked for, read from a counts file"""
+
+    def __init__(self, scores, total):
+        self.scores = scores
+        self.total = total
+
+    @classmethod
+    def load(cls, path, words):
+        """Read path, keeping the counts of words (a set) only"""
+        counts = {}
+        total = 0
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                fields = FIELD_SEPARATOR.split(line.strip(), 2)
+                if len(fields) < 2:
+                    continue
+                try:
+                    count = float(fields[1])
+                except ValueError:
+                    # A header line
+                    continue
+                total += count
+                word = fields[0].lower()
+                if word in words:
+                    counts[word] = counts.get(word, 0) + count
+        return cls({word: zipf(count, total) for word, count in counts.items()}, total)
+
+    def score(self, word):
+        return self.scores.get(word, 0.0)
+
+
+class BucketReport:
+    """What the filter did to one bucket"""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.before = 0
+        self.dropped = 0
+        self.after = 0
+
+
+class FrequencyFilter:
+    def __init__(self, path, min_zipf=2.0, max_share=0.25):
+        self.path = path
+        self.min_zipf = min_zipf
+        self.max_share = max_share
+
+    @classmethod
+    def from_settings(cls):
+        """The filter configured in settings, or None if there is no frequency list"""
+        path = getattr(settings, 'GAME_WORD_FREQUENCIES', '')
+        if not path or not os.path.exists(path):
+            return None
+        return cls(
+            path,
+            min_zipf=getattr(settings, 'GAME_WORD_MIN_ZIPF', 2.0),
+            max_share=getattr(settings, 'GAME_RARE_WORDS_MAX_SHARE', 0.25),
+        )
+
+    def rare_words(self, bucket_words, frequencies):
+        """The rare words of one bucket, rarest first, capped at max_share of it"""
+        rare = sorted(
+            (word for word in bucket_words if frequencies.score(word) < self.min_zipf),
+            key=lambda word: (frequencies.score(word), word)
+        )
+        return rare[:int(len(bucket_words) * self.max_share)]
+
+    def apply(self, words):
+        """Drop the rare words from a {word: bucket} dict in place; returns {bucket: BucketReport}"""
+        frequencies = FrequencyList.load(self.path, set(words))
+        by_bucket = {}
+        for word, bucket in words.items():
+            by_bucket.setdefault(bucket, []).append(word)
+        reports = {bucket: BucketReport(bucket) for bucket in by_bucket}
+
+        for bucket, bucket_words in sorted(by_bucket.items()):
+            report = reports[bucket]
+            report.before = len(bucket_words)
+            for word in self.rare_words(bucket_words, frequencies):
+                del words[word]
+                report.dropped += 1
+
+        for word, bucket in words.items():
+            reports[bucket].after += 1
+        return reports
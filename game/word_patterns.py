@@ -0,0 +1,348 @@
+"""
+Pattern-based word selection for custom buckets: "words ending in -tion",
+"words with ie", "5-7 letters without an e".
+
+A WordPattern is matched against the default vocabulary through PatternIndex,
+built once per process from the prefix index in word_search.py:
+
+    prefix      the sorted word list itself (two bisects)
+    suffix      the words reversed and sorted (two bisects)
+    contains    for every two-letter sequence, the words containing it
+    letters     a 26-bit mask of each word's letters
+    length      each word's length and difficulty bucket
+
+Each constraint that can narrow the candidates does so with the index; only
+the words left are checked against the full pattern (and regex, if any), so a
+pattern costs milliseconds instead of a regex over every Word row.
+
+The "regex" is typed by teachers, so it is not handed to Python's re, where
+a pattern like (.*)*x$ backtracks for minutes. LetterPattern takes the part
+of the syntax word patterns need - letters, ., [classes], ? * +, ^ $ and |
+between alternatives, but no groups - and matches it by following every
+possible position in the pattern at once, so a word costs at most its length
+times the pattern's.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+
+from .models import CustomWord
+from .word_search import PREFIX_END, get_word_index
+
+# Most words one pattern adds to a bucket
+MAX_GENERATED_WORDS = 500
+
+MAX_REGEX_LENGTH = 100
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+LETTER_BITS = {letter: 1 << i for i, letter in enumerate(LETTERS)}
+
+
+class PatternError(ValueError):
+    pass
+
+
+class LetterSet:
+    """One position of a LetterPattern: ., a letter or a [class]"""
+    __slots__ = ('letters', 'negated')
+
+    def __init__(self, letters=None, negated=False):
+        self.letters = letters  # None for .
+        self.negated = negated
+
+    def matches(self, letter):
+        if self.letters is None:
+            return True
+        return (letter in self.letters) != self.negated
+
+
+class LetterPattern:
+    """A teacher's regular expression, in the restricted syntax described above"""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.alternatives = [self.parse(alternative) for alternative in pattern.split('|')]
+
+    @staticmethod
+    def parse(text):
+        """(anchored at start, anchored at end, [(LetterSet, optional, repeats)])"""
+        if not text:
+            raise PatternError('Invalid pattern: empty alternative')
+        at_start = text.startswith('^')
+        at_end = text.endswith('$')
+        body = text[at_start:len(text) - at_end]
+        steps = []
+        i = 0
+        while i < len(body):
+            char = body[i]
+            if char == '.':
+                letter_set = LetterSet()
+                i += 1
+            elif char == '[':
+                end = body.find(']', i + 1)
+                if end == -1:
+                    raise PatternError('Invalid pattern: [ without ]')
+                letter_set = LetterPattern.parse_class(body[i + 1:end])
+                i = end + 1
+            elif char.isalpha():
+                letter_set = LetterSet(frozenset(char))
+                i += 1
+            elif char in '?*+':
+                raise PatternError(f'Invalid pattern: nothing before {char}')
+            elif char in '^$':
+                raise PatternError(f'Invalid pattern: {char} can only start or end the pattern')
+            else:
+                raise PatternError(f'"{char}" is not supported - use letters, ., [ ], ?, *, +, ^, $ and |')
+
+            quantifier = body[i] if i < len(body) and body[i] in '?*+' else ''
+            i += bool(quantifier)
+            if i < len(body) and body[i] in '?*+':
+                raise PatternError('Invalid pattern: two repeats in a row')
+            if quantifier == '+':
+                # a+ is a then a*
+                steps.append((letter_set, False, False))
+                quantifier = '*'
+            steps.append((letter_set, quantifier in ('?', '*'), quantifier == '*'))
+        return at_start, at_end, steps
+
+    @staticmethod
+    def parse_class(text):
+        negated = text.startswith('^')
+        text = text[negated:]
+        if not text:
+            raise PatternError('Invalid pattern: empty [ ]')
+        letters = set()
+        i = 0
+        while i < len(text):
+            if i + 2 < len(text) and text[i + 1] == '-':
+                first, last = text[i], text[i + 2]
+                if not (first.isalpha() and last.isalpha()) or first > last:
+                    raise PatternError(f'Invalid pattern: bad range {first}-{last}')
+                letters.update(chr(code) for code in range(ord(first), ord(last) + 1))
+                i += 3
+            elif text[i].isalpha():
+                letters.add(text[i])
+                i += 1
+            else:
+                raise PatternError('Invalid pattern: [ ] can only hold letters and ranges like a-e')
+        return LetterSet(frozenset(letters), negated)
+
+    def search(self, text):
+        return any(self.search_alternative(text, *alternative) for alternative in self.alternatives)
+
+    @staticmethod
+    def search_alternative(text, at_start, at_end, steps):
+        end = len(steps)
+
+        def closure(states):
+            # Optional steps can be skipped without reading a letter
+            pending = list(states)
+            while pending:
+                state = pending.pop()
+                if state < end and steps[state][1] and state + 1 not in states:
+                    states.add(state + 1)
+                    pending.append(state + 1)
+            return states
+
+        start = closure({0})
+        states = set(start)
+        for letter in text:
+            if end in states and not at_end:
+                return True
+            following = set()
+            for state in states:
+                if state < end:
+                    letter_set, _, repeats = steps[state]
+                    if letter_set.matches(letter):
+                        following.add(state + 1)
+                        if repeats:
+                            following.add(state)
+            states = closure(following)
+            if not at_start:
+                states |= start
+            elif not states:
+                return False
+        return end in states
+
+
+def letter_mask(text):
+    mask = 0
+    for letter in text:
+        mask |= LETTER_BITS.get(letter, 0)
+    return mask
+
+
+class WordPattern:
+    """What the words of a generated bucket have in common; empty fields match anything"""
+
+    TEXT_FIELDS = ('prefix', 'suffix', 'contains', 'include', 'exclude')
+
+    def __init__(self, prefix='', suffix='', contains='', include='', exclude='',
+                 regex='', min_length=None, max_length=None, bucket=None):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.contains = contains
+        self.include = include
+        self.exclude = exclude
+        self.min_length = min_length
+        self.max_length = max_length
+        self.bucket = bucket
+        self.regex = None
+        if regex:
+            if len(regex) > MAX_REGEX_LENGTH:
+                raise PatternError(f'The pattern can be at most {MAX_REGEX_LENGTH} characters')
+            self.regex = LetterPattern(regex.lower())
+
+    @classmethod
+    def from_data(cls, data):
+        """A pattern from request.GET / request.POST"""
+        fields = {}
+        for name in cls.TEXT_FIELDS:
+            value = data.get(name, '').strip().lower()
+            if name == 'suffix':
+                # "-tion" and "tion" mean the same
+                value = value.lstrip('-')
+            if value and not value.isalpha():
+                raise PatternError(f'"{name}" can only contain letters')
+            fields[name] = value
+        for name in ('min_length', 'max_length', 'bucket'):
+            value = data.get(name, '').strip()
+            try:
+                fields[name] = int(value) if value else None
+            except ValueError:
+                raise PatternError(f'"{name}" must be a number')
+        return cls(regex=data.get('regex', '').strip(), **fields)
+
+    def is_empty(self):
+        return not (
+            any(getattr(self, name) for name in self.TEXT_FIELDS)
+            or self.regex or self.min_length or self.max_length or self.bucket
+        )
+
+    def describe(self):
+        parts = []
+        if self.prefix:
+            parts.append(f'starting with "{self.prefix}"')
+        if self.suffix:
+            parts.append(f'ending in "-{self.suffix}"')
+        if self.contains:
+            parts.append(f'containing "{self.contains}"')
+        if self.include:
+            parts.append(f'with the letters {", ".join(sorted(set(self.include)))}')
+        if self.exclude:
+            parts.append(f'without {", ".join(sorted(set(self.exclude)))}')
+        if self.min_length or self.max_length:
+            parts.append(f'{self.min_length or 1}-{self.max_length or "any"} letters')
+        if self.bucket:
+            parts.append(f'from bucket {self.bucket}')
+        if self.regex:
+            parts.append(f'matching /{self.regex.pattern}/')
+        return 'words ' + ', '.join(parts)
+
+
+class PatternIndex:
+    def __init__(self, word_index):
+        self.word_index = word_index
+        matches = word_index.matches
+        self.lengths = array('B', [min(len(match.text), 255) for match in matches])
+        self.masks = array('L', [letter_mask(match.text) for match in matches])
+
+        reversed_words = sorted((match.text[::-1], position) for position, match in enumerate(matches))
+        self.reversed_texts = [text for text, _ in reversed_words]
+        self.reversed_positions = array('L', [position for _, position in reversed_words])
+
+        postings = {}
+        for position, match in enumerate(matches):
+            text = match.text
+            for gram in {text[i:i + 2] for i in range(len(text) - 1)}:
+                postings.setdefault(gram, array('L')).append(position)
+        self.postings = postings
+
+    def prefix_positions(self, prefix):
+        start, end = self.word_index.prefix_range(prefix)
+        return set(range(start, end))
+
+    def suffix_positions(self, suffix):
+        backwards = suffix[::-1]
+        start = bisect_left(self.reversed_texts, backwards)
+        end = bisect_left(self.reversed_texts, backwards + PREFIX_END)
+        return set(self.reversed_positions[start:end])
+
+    def contains_positions(self, text):
+        """Words holding every two-letter sequence of text - a superset of those containing text"""
+        grams = sorted((self.postings.get(text[i:i + 2], ()) for i in range(len(text) - 1)), key=len)
+        positions = set(grams[0])
+        for gram in grams[1:]:
+            positions.intersection_update(gram)
+        return positions
+
+    def candidates(self, pattern):
+        """Positions the index narrows pattern to, or None if it can't"""
+        sets = []
+        if pattern.prefix:
+            sets.append(self.prefix_positions(pattern.prefix))
+        if pattern.suffix:
+            sets.append(self.suffix_positions(pattern.suffix))
+        if len(pattern.contains) > 1:
+            sets.append(self.contains_positions(pattern.contains))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        positions = sets[0]
+        for other in sets[1:]:
+            positions &= other
+        return positions
+
+    def match(self, pattern):
+        """The words matching pattern, easiest bucket first, then alphabetically"""
+        matches = self.word_index.matches
+        candidates = self.candidates(pattern)
+        positions = range(len(matches)) if candidates is None else sorted(candidates)
+
+        required = letter_mask(pattern.include + pattern.contains)
+        excluded = letter_mask(pattern.exclude)
+        min_length = pattern.min_length or 0
+        max_length = pattern.max_length or 255
+        found = []
+        for position in positions:
+            mask = self.masks[position]
+            if mask & required != required or mask & excluded:
+                continue
+            if not min_length <= self.lengths[position] <= max_length:
+                continue
+            word = matches[position]
+            if pattern.bucket and word.bucket != pattern.bucket:
+                continue
+            if pattern.contains and pattern.contains not in word.text:
+                continue
+            if pattern.regex and not pattern.regex.search(word.text):
+                continue
+            found.append(word)
+        found.sort(key=lambda word: (word.bucket, word.text))
+        return found
+
+
+_pattern_index = None
+_lock = threading.Lock()
+
+
+def get_pattern_index():
+    """This process's pattern index, rebuilt with the word index"""
+    global _pattern_index
+    word_index = get_word_index()
+    if _pattern_index is None or _pattern_index.word_index is not word_index:
+        with _lock:
+            if _pattern_index is None or _pattern_index.word_index is not word_index:
+                _pattern_index = PatternIndex(word_index)
+    return _pattern_index
+
+
+def match_pattern(pattern):
+    return get_pattern_index().match(pattern)
+
+
+def words_for_bucket(bucket, pattern):
+    """(all words matching pattern, texts of those not yet in the CustomBucket)"""
+    words = match_pattern(pattern)
+    existing = set(CustomWord.objects.filter(bucket=bucket).values_list('text', flat=True))
+    return words, [word.text for word in words if word.text not in existing]
@@ -0,0 +1,99 @@
+"""
+Prefix search over the default vocabulary, for teachers building custom
+buckets (the autocomplete in the ladder editor) and the admin word list.
+
+A `text LIKE '%ca%'` lookup reads every one of the ~30,000 Word rows. Instead
+each process keeps WordIndex: the words sorted by text in a plain list, so
+the words starting with a prefix are one contiguous slice found with two
+bisects - microseconds, with no query at all.
+
+Words only change when load_words runs or someone edits them in the admin.
+Both call word_index_changed(), which stores a new version in the shared
+cache; every process checks that version (one cache read) and rebuilds its
+index when it moves.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+from .models import Word
+
+VERSION_KEY = 'word_index_version'
+
+# Most suggestions returned for one prefix
+MAX_RESULTS = 50
+
+# Sorts after every character a word can contain
+PREFIX_END = '\U0010ffff'
+
+
+class WordMatch:
+    """One Word, as the index keeps it"""
+    __slots__ = ('text', 'id', 'bucket')
+
+    def __init__(self, text, id, bucket):
+        self.text = text
+        self.id = id
+        self.bucket = bucket
+
+    def as_dict(self):
+        return {'id': self.id, 'text': self.text, 'difficulty_bucket': self.bucket, 'word_length': len(self.text)}
+
+
+class WordIndex:
+    def __init__(self, matches):
+        self.matches = sorted(matches, key=lambda match: match.text)
+        self.texts = [match.text for match in self.matches]
+
+    @classmethod
+    def build(cls):
+        return cls(WordMatch(*row) for row in Word.objects.values_list('text', 'id', 'difficulty_bucket'))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def prefix_range(self, prefix):
+        """(start, end) of the words starting with prefix"""
+        return bisect_left(self.texts, prefix), bisect_left(self.texts, prefix + PREFIX_END)
+
+    def search(self, prefix, bucket=None, limit=MAX_RESULTS):
+        """(first `limit` matches in alphabetical order, total matches) for prefix, optionally in one bucket"""
+        start, end = self.prefix_range(prefix.strip().lower())
+        if bucket is None:
+            return self.matches[start:min(end, start + limit)], end - start
+        in_bucket = [match for match in self.matches[start:end] if match.bucket == bucket]
+        return in_bucket[:limit], len(in_bucket)
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_word_index():
+    """This process's index, rebuilt if the words changed since it was built"""
+    global _index, _index_version
+    version = cache.get(VERSION_KEY, 0)
+    if _index is None or version != _index_version:
+        with _lock:
+            if _index is None or version != _index_version:
+                _index = WordIndex.build()
+                _index_version = version
+    return _index
+
+
+def word_index_changed():
+    """Call after adding, changing or deleting Word rows"""
+    cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+
+def prefix_filter(prefix):
+    """
+    Queryset filter for words starting with prefix, as a range on the text
+    index - words are stored lowercase, so no case-insensitive LIKE (which
+    SQLite can't answer from the index) is needed.
+    """
+    prefix = prefix.strip().lower()
+    return {'text__gte': prefix, 'text__lt': prefix + PREFIX_END}
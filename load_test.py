@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Load test for the student game API.
+
+Simulates a classroom of students playing at the same time: each student logs
+in, opens the game page and then loops get next word -> submit answer as fast
+as the server allows. Reports throughput and latency percentiles per endpoint.
+
+Only uses the standard library, so it runs anywhere Python 3 does.
+
+Setup (once, on the server):
+    python3 manage.py create_demo_users --load-test 100
+
+Run against one server:
+    python3 load_test.py --host http://eduflows.org --students 100 --duration 60
+
+Compare sync vs async (e.g. Gunicorn WSGI on one port, ASGI on another):
+    python3 load_test.py --host http://127.0.0.1:8000 --compare-host http://127.0.0.1:8001
+
+Tip: the answers are recorded for real, so run it against a test database.
+"""
+import argparse
+import http.cookiejar
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+
+class SimulatedStudent:
+    """One student with their own cookie jar (session + CSRF token)"""
+
+    def __init__(self, host, username, password, correct_rate, timeout):
+        self.host = host.rstrip('/')
+        self.username = username
+        self.password = password
+        self.correct_rate = correct_rate
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, path, data=None, json_body=None):
+        headers = {'Referer': self.host + '/play/'}
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+            headers['X-CSRFToken'] = self.csrf_token()
+        elif data is not None:
+            body = urllib.parse.urlencode(data).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        req = urllib.request.Request(self.host + path, data=body, headers=headers)
+        with self.opener.open(req, timeout=self.timeout) as response:
+            return response.status, response.read()
+
+    def login(self):
+        self.request('/accounts/login/')
+        self.request('/accounts/login/', data={
+            'csrfmiddlewaretoken': self.csrf_token(),
+            'username': self.username,
+            'password': self.password,
+        })
+        # Opening the game page creates the student's progress and session
+        self.request('/play/')
+
+    def play_word(self, record):
+        """Fetch a word and answer it. Calls record(endpoint, seconds, ok)."""
+        started = time.perf_counter()
+        try:
+            status, body = self.request('/api/next-word/')
+            word = json.loads(body)
+            record('next-word', time.perf_counter() - started, True)
+        except (urllib.error.URLError, OSError, ValueError):
+            record('next-word', time.perf_counter() - started, False)
+            return
+
+        if 'word_id' not in word:
+            # Bucket or game complete - just ask for the next word again
+            return
+
+        spelling = word['word']
+        if random.random() > self.correct_rate:
+            spelling = spelling[:-1] or 'x'
+
+        started = time.perf_counter()
+        try:
+            self.request('/api/submit-answer/', json_body={
+                'word_id': word['word_id'],
+                'spelling': spelling,
+                'attempt_id': str(uuid.uuid4()),
+            })
+            record('submit-answer', time.perf_counter() - started, True)
+        except (urllib.error.URLError, OSError):
+            record('submit-answer', time.perf_counter() - started, False)
+
+    def end_session(self, record):
+        started = time.perf_counter()
+        try:
+            self.request('/api/end-session/', json_body={})
+            record('end-session', time.perf_counter() - started, True)
+        except urllib.error.HTTPError as error:
+            # 404 = no active session, still a valid response
+            record('end-session', time.perf_counter() - started, error.code == 404)
+        except (urllib.error.URLError, OSError):
+            record('end-session', time.perf_counter() - started, False)
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, seconds, ok):
+        with self.lock:
+            if ok:
+                self.latencies.setdefault(endpoint, []).append(seconds)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self, duration):
+        rows = {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies.get(endpoint, []))
+            rows[endpoint] = {
+                'requests': len(latencies),
+                'errors': self.errors.get(endpoint, 0),
+                'rps': len(latencies) / duration,
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'mean': statistics.fmean(latencies) if latencies else 0,
+            }
+        return rows
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load_test(host, args):
+    """Log every student in, then let them all play for args.duration seconds"""
+    students = [
+        SimulatedStudent(host, f'{args.username_prefix}{i:03d}', args.password,
+                         args.correct_rate, args.timeout)
+        for i in range(1, args.students + 1)
+    ]
+
+    print(f'\n{host}: logging in {len(students)} students...')
+    login_errors = []
+
+    def login(student):
+        try:
+            student.login()
+        except (urllib.error.URLError, OSError) as error:
+            login_errors.append(f'{student.username}: {error}')
+
+    threads = [threading.Thread(target=login, args=(student,)) for student in students]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if login_errors:
+        print(f'  {len(login_errors)} logins failed, e.g. {login_errors[0]}')
+
+    results = Results()
+    stop_at = time.perf_counter() + args.duration
+    start_barrier = threading.Barrier(len(students))
+
+    def play(student):
+        start_barrier.wait()
+        while time.perf_counter() < stop_at:
+            student.play_word(results.record)
+            if args.think_time:
+                time.sleep(random.uniform(0, 2 * args.think_time))
+        student.end_session(results.record)
+
+    print(f'  playing for {args.duration}s...')
+    threads = [threading.Thread(target=play, args=(student,)) for student in students]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = results.summary(elapsed)
+    print_summary(summary)
+    return summary
+
+
+def print_summary(summary):
+    print(f"  {'endpoint':<15}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint, row in summary.items():
+        print(f"  {endpoint:<15}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9.1f}"
+              f"{row['p50'] * 1000:>9.0f}{row['p95'] * 1000:>9.0f}{row['p99'] * 1000:>9.0f}")
+
+
+def print_comparison(host_a, summary_a, host_b, summary_b):
+    print(f'\nComparison ({host_b} vs {host_a}):')
+    print(f"  {'endpoint':<15}{'req/s A':>9}{'req/s B':>9}{'speedup':>9}{'p95 A ms':>10}{'p95 B ms':>10}")
+    for endpoint in sorted(set(summary_a) | set(summary_b)):
+        a = summary_a.get(endpoint, {'rps': 0, 'p95': 0})
+        b = summary_b.get(endpoint, {'rps': 0, 'p95': 0})
+        speedup = f"{b['rps'] / a['rps']:.2f}x" if a['rps'] else '-'
+        print(f"  {endpoint:<15}{a['rps']:>9.1f}{b['rps']:>9.1f}{speedup:>9}"
+              f"{a['p95'] * 1000:>10.0f}{b['p95'] * 1000:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the student game API')
+    parser.add_argument('--host', default='http://127.0.0.1:8000', help='Server to test (A)')
+    parser.add_argument('--compare-host', help='Second server to test (B), e.g. the ASGI deployment')
+    parser.add_argument('--students', type=int, default=100, help='Concurrent simulated students')
+    parser.add_argument('--duration', type=int, default=60, help='Seconds of play per server')
+    parser.add_argument('--think-time', type=float, default=0,
+                        help='Average pause between words in seconds (0 = as fast as possible)')
+    parser.add_argument('--correct-rate', type=float, default=0.8, help='Share of answers spelled correctly')
+    parser.add_argument('--username-prefix', default='loadtest')
+    parser.add_argument('--password', default='loadtest123')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    args = parser.parse_args()
+
+    summary_a = run_load_test(args.host, args)
+    if args.compare_host:
+        summary_b = run_load_test(args.compare_host, args)
+        print_comparison(args.host, summary_a, args.compare_host, summary_b)
+
+
+if __name__ == '__main__':
+    main()
@@ -23,10 +23,22 @@ NC='\033[0m' # No Color
 CURRENT_USER=$(whoami)
 PROJECT_DIR=$(pwd)
 
+# Server mode for the main site:
+#   wsgi - Gunicorn sync workers, sync views (default)
+#   asgi - Gunicorn managing Uvicorn workers, async game API views
+# e.g. SERVER_MODE=asgi ./setup_production.sh
+SERVER_MODE=${SERVER_MODE:-wsgi}
+
 echo -e "${BLUE}Detected user: ${CURRENT_USER}${NC}"
 echo -e "${BLUE}Project directory: ${PROJECT_DIR}${NC}"
+echo -e "${BLUE}Server mode: ${SERVER_MODE}${NC}"
 echo ""
 
+if [[ "$SERVER_MODE" != "wsgi" && "$SERVER_MODE" != "asgi" ]]; then
+    echo -e "${RED}❌ Unknown SERVER_MODE '${SERVER_MODE}' (use wsgi or asgi)${NC}"
+    exit 1
+fi
+
 # Check if running as root
 if [[ $EUID -eq 0 ]]; then
    echo -e "${RED}❌ Don't run this script as root!${NC}"
@@ -60,6 +72,28 @@ if ! python3 -c "import gunicorn" 2>/dev/null; then
     echo ""
 fi
 
+# Check if uvicorn is installed (serves the ASGI app for live leaderboard streams)
+if ! python3 -c "import uvicorn" 2>/dev/null; then
+    echo -e "${YELLOW}⚠️  Uvicorn not installed. Installing via pip...${NC}"
+    pip3 install uvicorn
+    echo -e "${GREEN}✓ Uvicorn installed${NC}"
+    echo ""
+fi
+
+# Check if NumPy is installed (optional - only the learning-curve simulator needs it)
+if ! python3 -c "import numpy" 2>/dev/null; then
+    echo -e "${YELLOW}⚠️  NumPy not installed (needed for the settings preview). Installing via pip...${NC}"
+    pip3 install numpy || echo -e "${YELLOW}   Skipped - the settings preview will be unavailable${NC}"
+    echo ""
+fi
+
+# Check if argon2-cffi is installed (optional - the low-power password hasher profile needs it)
+if ! python3 -c "import argon2" 2>/dev/null; then
+    echo -e "${YELLOW}⚠️  argon2-cffi not installed (makes logins much cheaper). Installing via pip...${NC}"
+    pip3 install argon2-cffi || echo -e "${YELLOW}   Skipped - passwords will keep using PBKDF2${NC}"
+    echo ""
+fi
+
 # Check Django settings
 echo -e "${YELLOW}Step 1: Checking Django settings...${NC}"
 if grep -q "STATIC_ROOT" spelling_game/settings.py; then
@@ -112,6 +146,16 @@ else
     exit 1
 fi
 
+# In ASGI mode each Gunicorn worker runs an event loop (Uvicorn worker), so
+# requests waiting on the database don't block the worker
+if [[ "$SERVER_MODE" == "asgi" ]]; then
+    WORKER_OPTIONS="--worker-class uvicorn.workers.UvicornWorker"
+    APP_MODULE="spelling_game.asgi:application"
+else
+    WORKER_OPTIONS="--worker-class sync"
+    APP_MODULE="spelling_game.wsgi:application"
+fi
+
 # Update the service file with actual paths
 cat > /tmp/spelling-game.service << EOF
 [Unit]
@@ -123,13 +167,18 @@ User=${CURRENT_USER}
 Group=www-data
 WorkingDirectory=${PROJECT_DIR}
 Environment="PATH=${PROJECT_DIR}/.venv/bin:/usr/local/bin:/usr/bin:/bin"
+Environment="PASSWORD_HASHER_PROFILE=low-power"
+Environment="SESSION_PROFILE=cached_db"
+Environment="GAME_TIMING_SAMPLE_RATE=0.05"
+Environment="GAME_TIMING_LOG=${PROJECT_DIR}/logs/timing.log"
 ExecStart=${GUNICORN_CMD} \\
     --workers 3 \\
+    ${WORKER_OPTIONS} \\
     --bind unix:${PROJECT_DIR}/gunicorn.sock \\
     --access-logfile ${PROJECT_DIR}/logs/gunicorn-access.log \\
     --error-logfile ${PROJECT_DIR}/logs/gunicorn-error.log \\
     --timeout 60 \\
-    spelling_game.wsgi:application
+    ${APP_MODULE}
 
 Restart=on-failure
 RestartSec=5s
@@ -140,8 +189,74 @@ EOF
 
 sudo cp /tmp/spelling-game.service /etc/systemd/system/
 rm /tmp/spelling-game.service
+
+# ASGI service for long-lived connections (live leaderboard streams).
+# One async worker holds hundreds of idle streams, so the Gunicorn
+# workers above are never tied up by them.
+PYTHON_PATH=$(which python3)
+cat > /tmp/spelling-game-asgi.service << EOF
+[Unit]
+Description=Spelling Game ASGI (Uvicorn) daemon - live leaderboard streams
+After=network.target
+
+[Service]
+User=${CURRENT_USER}
+Group=www-data
+WorkingDirectory=${PROJECT_DIR}
+Environment="PATH=${PROJECT_DIR}/.venv/bin:/usr/local/bin:/usr/bin:/bin"
+Environment="PASSWORD_HASHER_PROFILE=low-power"
+Environment="SESSION_PROFILE=cached_db"
+Environment="GAME_TIMING_SAMPLE_RATE=0.05"
+Environment="GAME_TIMING_LOG=${PROJECT_DIR}/logs/timing.log"
+ExecStart=${PYTHON_PATH} -m uvicorn \\
+    --uds ${PROJECT_DIR}/uvicorn.sock \\
+    --workers 1 \\
+    --timeout-keep-alive 75 \\
+    spelling_game.asgi:application
+UMask=0007
+
+Restart=on-failure
+RestartSec=5s
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
+sudo cp /tmp/spelling-game-asgi.service /etc/systemd/system/
+rm /tmp/spelling-game-asgi.service
+# Nightly batch jobs (word difficulty stats, ...) - see nightly_maintenance.py.
+# Runs at 3am when nobody is playing; Persistent catches up after a power cut.
+cat > /tmp/spelling-game-nightly.service << EOF
+[Unit]
+Description=Spelling Game nightly maintenance
+
+[Service]
+Type=oneshot
+User=${CURRENT_USER}
+Group=www-data
+WorkingDirectory=${PROJECT_DIR}
+Environment="PATH=${PROJECT_DIR}/.venv/bin:/usr/local/bin:/usr/bin:/bin"
+ExecStart=${PYTHON_PATH} manage.py nightly_maintenance
+Nice=10
+IOSchedulingClass=idle
+EOF
+
+cat > /tmp/spelling-game-nightly.timer << EOF
+[Unit]
+Description=Run Spelling Game nightly maintenance at 3am
+
+[Timer]
+OnCalendar=*-*-* 03:00:00
+Persistent=true
+
+[Install]
+WantedBy=timers.target
+EOF
+
+sudo cp /tmp/spelling-game-nightly.service /tmp/spelling-game-nightly.timer /etc/systemd/system/
+rm /tmp/spelling-game-nightly.service /tmp/spelling-game-nightly.timer
 sudo systemctl daemon-reload
-echo -e "${GREEN}✓ Systemd service created${NC}"
+echo -e "${GREEN}✓ Systemd services created${NC}"
 echo ""
 
 echo -e "${YELLOW}Step 5: Starting Gunicorn service...${NC}"
@@ -157,6 +272,23 @@ else
     echo "Check logs: sudo journalctl -u spelling-game -n 50"
     exit 1
 fi
+
+sudo systemctl stop spelling-game-asgi 2>/dev/null || true
+sudo systemctl start spelling-game-asgi
+sudo systemctl enable spelling-game-asgi
+sleep 2
+
+if sudo systemctl is-active --quiet spelling-game-asgi; then
+    echo -e "${GREEN}✓ Uvicorn (ASGI) service is running${NC}"
+else
+    echo -e "${RED}❌ Uvicorn (ASGI) service failed to start!${NC}"
+    echo "Check logs: sudo journalctl -u spelling-game-asgi -n 50"
+    exit 1
+fi
+echo ""
+
+sudo systemctl enable --now spelling-game-nightly.timer
+echo -e "${GREEN}✓ Nightly maintenance timer enabled (3am)${NC}"
 echo ""
 
 echo -e "${YELLOW}Step 6: Creating Nginx configuration...${NC}"
@@ -187,6 +319,32 @@ server {
         alias ${PROJECT_DIR}/media/;
     }
 
+    # Live leaderboard streams (Server-Sent Events) go to the ASGI service
+    location ~ ^/api/classrooms/[0-9]+/leaderboard/stream/\$ {
+        proxy_pass http://unix:${PROJECT_DIR}/uvicorn.sock;
+        proxy_http_version 1.1;
+        proxy_set_header Connection '';
+        proxy_set_header Host \$host;
+        proxy_set_header X-Real-IP \$remote_addr;
+        proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto \$scheme;
+        proxy_buffering off;
+        proxy_cache off;
+        proxy_read_timeout 1h;
+    }
+
+    # Grade-book CSV exports can run for minutes on a year of data - stream
+    # them from the ASGI service, whose workers have no request timeout
+    location ~ ^/teacher/classrooms/[0-9]+/export/ {
+        proxy_pass http://unix:${PROJECT_DIR}/uvicorn.sock;
+        proxy_set_header Host \$host;
+        proxy_set_header X-Real-IP \$remote_addr;
+        proxy_set_header X-Forwarded-For \$proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto \$scheme;
+        proxy_buffering off;
+        proxy_read_timeout 10m;
+    }
+
     # Proxy all other requests to Gunicorn
     location / {
         proxy_pass http://unix:${PROJECT_DIR}/gunicorn.sock;
@@ -278,6 +436,13 @@ else
     echo -e "${RED}✗ Not running${NC}"
 fi
 
+echo -ne "Uvicorn:  "
+if sudo systemctl is-active --quiet spelling-game-asgi; then
+    echo -e "${GREEN}✓ Running${NC}"
+else
+    echo -e "${RED}✗ Not running${NC}"
+fi
+
 echo -ne "Nginx:    "
 if sudo systemctl is-active --quiet nginx; then
     echo -e "${GREEN}✓ Running${NC}"
@@ -304,15 +469,27 @@ echo "View Nginx logs:"
 echo "  ${BLUE}sudo tail -f /var/log/nginx/error.log${NC}"
 echo "  ${BLUE}sudo tail -f /var/log/nginx/access.log${NC}"
 echo ""
+echo "Nightly maintenance (next run / last log / run now):"
+echo "  ${BLUE}systemctl list-timers spelling-game-nightly${NC}"
+echo "  ${BLUE}sudo journalctl -u spelling-game-nightly -n 50${NC}"
+echo "  ${BLUE}sudo systemctl start spelling-game-nightly${NC}"
+echo ""
 echo "Restart after code changes:"
-echo "  ${BLUE}sudo systemctl restart spelling-game${NC}"
+echo "  ${BLUE}sudo systemctl restart spelling-game spelling-game-asgi${NC}"
 echo ""
 echo "═══════════════════════════════════════════════════════════════"
 echo "🧪 Performance Testing:"
 echo "═══════════════════════════════════════════════════════════════"
 echo ""
+echo "Create 100 load-test students (once):"
+echo "  ${BLUE}python3 manage.py create_demo_users --load-test 100${NC}"
+echo ""
 echo "Test from your local machine (not on the Pi):"
-echo "  ${BLUE}locust -f load_test.py --headless --users 25 --spawn-rate 3 --run-time 2m --host http://eduflows.org${NC}"
+echo "  ${BLUE}python3 load_test.py --students 100 --duration 60 --host http://eduflows.org${NC}"
+echo ""
+echo "Compare sync vs async: run the load test once with SERVER_MODE=wsgi and"
+echo "once with SERVER_MODE=asgi (re-run this script in between), or point"
+echo "--host and --compare-host at two servers."
 echo ""
 echo "Expected improvements over dev server:"
 echo "  • Response times: 2-5x faster"
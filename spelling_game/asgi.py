@@ -3,6 +3,11 @@ ASGI config for spelling_game project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+In production this is served by Uvicorn (see setup_production.sh) for
+long-lived connections such as the live leaderboard streams, and optionally
+for the whole site (SERVER_MODE=asgi). Under ASGI the student game API uses
+the async views in game/async_views.py (GAME_ASYNC_API).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -12,5 +17,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "spelling_game.settings")
+os.environ.setdefault("GAME_ASYNC_API", "1")
 
 application = get_asgi_application()
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from accounts.hashers import get_password_hashers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its times include the other middleware; removes itself unless GAME_QUERY_PROFILER
+    "game.profiling.QueryProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -88,6 +93,12 @@ DATABASES = {
 }
 
 
+# Password hashing (see accounts/hashers.py). "low-power" makes each login
+# much cheaper on a Raspberry Pi; setup_production.sh turns it on.
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'default')
+PASSWORD_HASHERS = get_password_hashers(PASSWORD_HASHER_PROFILE)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -131,3 +142,82 @@ AUTH_USER_MODEL = 'accounts.User'
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
+
+# Cache - file based so every Gunicorn worker sees the same entries
+# (used for precomputed progress widgets and leaderboards)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+    },
+    # Sessions get their own directory so culling other entries never drops them
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "sessions",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+# Session storage profile (see SESSION_PROFILES.md). Every request loads the
+# session, so "db" costs a django_session query per game API call; "cached_db"
+# reads it from the shared cache above and "signed_cookies" from the cookie.
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_PROFILE = os.environ.get('SESSION_PROFILE', 'db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_PROFILE]
+SESSION_CACHE_ALIAS = "sessions"
+
+# Background tasks (see game/background.py)
+# Set GAME_BACKGROUND_TASKS = False to run them inline instead of on a thread pool
+GAME_BACKGROUND_TASKS = True
+GAME_BACKGROUND_WORKERS = 2
+
+# Serve the student game API (next word / submit answer / end session) with the
+# async views in game/async_views.py. spelling_game/asgi.py turns this on, so
+# the ASGI server uses them while the Gunicorn (WSGI) workers keep the sync views.
+GAME_ASYNC_API = os.environ.get('GAME_ASYNC_API', '0') == '1'
+
+# Per-request query profiler (see game/profiling.py). Off unless
+# GAME_QUERY_PROFILER=1 - then every process writes its totals to
+# GAME_QUERY_PROFILER_DIR, read by `manage.py query_profile` and /staff/query-profile/.
+GAME_QUERY_PROFILER = os.environ.get('GAME_QUERY_PROFILER', '0') == '1'
+GAME_QUERY_PROFILER_DIR = BASE_DIR / "cache" / "profiler"
+
+# Timing traces (see game/tracing.py). This share of answer submissions,
+# progress refreshes and leaderboard rebuilds is timed stage by stage and
+# logged as one JSON line each to GAME_TIMING_LOG (stderr if unset).
+GAME_TIMING_SAMPLE_RATE = float(os.environ.get('GAME_TIMING_SAMPLE_RATE', '0'))
+GAME_TIMING_LOG = os.environ.get('GAME_TIMING_LOG', '')
+# Tags every trace; defaults to the checked-out git commit
+GAME_RELEASE = os.environ.get('GAME_RELEASE', '')
+
+# Word list quality filter (see game/word_frequency.py). If this "word count"
+# frequency list exists, compile_words drops the rarest words of each
+# bucket - those under GAME_WORD_MIN_ZIPF, at most GAME_RARE_WORDS_MAX_SHARE
+# of the bucket - and load_words deletes them from the database.
+GAME_WORD_FREQUENCIES = os.environ.get(
+    'GAME_WORD_FREQUENCIES', str(BASE_DIR / 'game' / 'management' / 'commands' / 'word_frequencies.txt')
+)
+GAME_WORD_MIN_ZIPF = 2.0
+GAME_RARE_WORDS_MAX_SHARE = 0.25
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "timing": (
+            {"class": "logging.handlers.WatchedFileHandler", "filename": GAME_TIMING_LOG, "formatter": "message"}
+            if GAME_TIMING_LOG else
+            {"class": "logging.StreamHandler", "formatter": "message"}
+        ),
+    },
+    "loggers": {
+        "game.timing": {"handlers": ["timing"], "level": "INFO", "propagate": False},
+    },
+}
@@ -1,8 +1,13 @@
 // Game state
 let currentWord = null;
+let currentAttemptId = null; // Sent with every submit so retries aren't counted twice
 let wordDefinition = null;
 let speechSpeed = 0.75; // Default speech speed
 
+// Retry settings for answer submission (flaky classroom Wi-Fi)
+const SUBMIT_MAX_RETRIES = 3;
+const SUBMIT_RETRY_DELAY_MS = 500;
+
 // Update bucket progress widget
 function updateBucketProgress(wordsMastered, wordsToComplete, wordsNeed1, wordsNeed2, wordsNeed3) {
     // Update words mastered count
@@ -66,6 +71,60 @@ function updateBucketProgress(wordsMastered, wordsToComplete, wordsNeed1, wordsN
     }
 }
 
+// ===== LIVE LEADERBOARD STREAM =====
+// The server pushes a full 'standings' snapshot, then 'changes' events with
+// only the students whose rank or score moved.
+let leaderboardStream = null;
+let leaderboardStandings = new Map(); // student id -> standing entry
+let leaderboardStreamActive = false;
+
+function startLeaderboardStream() {
+    const sidebar = document.querySelector('.leaderboard-sidebar');
+    if (!sidebar || !sidebar.dataset.streamUrl || !window.EventSource) return;
+    
+    const studentId = parseInt(sidebar.dataset.studentId, 10);
+    leaderboardStream = new EventSource(sidebar.dataset.streamUrl);
+    
+    leaderboardStream.addEventListener('standings', (event) => {
+        const data = JSON.parse(event.data);
+        leaderboardStandings = new Map(data.standings.map(entry => [entry.id, entry]));
+        leaderboardStreamActive = true;
+        renderStandings(studentId);
+    });
+    
+    leaderboardStream.addEventListener('changes', (event) => {
+        const data = JSON.parse(event.data);
+        data.removed.forEach(id => leaderboardStandings.delete(id));
+        data.changed.forEach(entry => leaderboardStandings.set(entry.id, entry));
+        renderStandings(studentId);
+    });
+    
+    leaderboardStream.onerror = () => {
+        // EventSource reconnects by itself; if the server refused the stream
+        // (e.g. not running under ASGI) it stays closed and we fall back to
+        // fetching the leaderboard with the game status after each answer.
+        if (leaderboardStream.readyState === EventSource.CLOSED) {
+            leaderboardStreamActive = false;
+        }
+    };
+}
+
+// Turn streamed standings into the structure updateLeaderboard() expects
+function renderStandings(studentId) {
+    const ranked = Array.from(leaderboardStandings.values()).sort((a, b) => a.rank - b.rank);
+    const currentIndex = ranked.findIndex(entry => entry.id === studentId);
+    const current = currentIndex >= 0 ? ranked[currentIndex] : null;
+    const next = currentIndex > 0 ? ranked[currentIndex - 1] : null;
+    
+    updateLeaderboard({
+        top_5: ranked.slice(0, 5).map(entry => ({...entry, is_current: entry.id === studentId})),
+        current_student: current ? {...current, is_current: true} : null,
+        gap_to_next: current && next ? next.score - current.score : 0,
+        next_student: next ? {username: next.username, score: next.score} : null,
+        total_students: ranked.length
+    });
+}
+
 // Update leaderboard widget with new data
 function updateLeaderboard(leaderboardData) {
     if (!leaderboardData) return;
@@ -548,6 +607,75 @@ function stripParenthesesForSpeech(text) {
     return text.replace(/\s*\([^)]*\)/g, '').trim();
 }
 
+// Generate a unique id for one answer to one word
+function generateAttemptId() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+// Student's answer with the wrong letters highlighted, from the per-letter
+// diff in the submit response: wrong letters in red, extra letters struck
+// through, swapped letters in orange and left-out letters as a gap
+function renderSpellingDiff(diff) {
+    return diff.map(entry => {
+        switch (entry.op) {
+            case 'ok':
+                return escapeHtml(entry.typed);
+            case 'sub':
+                return `<span class="letter-wrong" title="should be ${escapeHtml(entry.expected)}">${escapeHtml(entry.typed)}</span>`;
+            case 'ins':
+                return `<span class="letter-extra" title="extra letter">${escapeHtml(entry.typed)}</span>`;
+            case 'swap':
+                return `<span class="letter-swapped" title="should be ${escapeHtml(entry.expected)}">${escapeHtml(entry.typed)}</span>`;
+            case 'del':
+                return `<span class="letter-missing" title="missing ${escapeHtml(entry.expected)}">_</span>`;
+            default:
+                return '';
+        }
+    }).join('');
+}
+
+function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+// POST an answer, retrying on network errors and server hiccups.
+// Every retry reuses the same attempt id, so the server replays the
+// original result instead of recording the answer again.
+async function postAnswer(payload) {
+    for (let retry = 0; ; retry++) {
+        try {
+            const response = await fetch('/api/submit-answer/', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': csrftoken,
+                },
+                body: JSON.stringify(payload)
+            });
+            
+            // 409 = the first copy of this answer is still being processed
+            const shouldRetry = response.status === 409 || response.status >= 500;
+            if (!shouldRetry || retry >= SUBMIT_MAX_RETRIES) {
+                return response;
+            }
+        } catch (error) {
+            if (retry >= SUBMIT_MAX_RETRIES) {
+                throw error;
+            }
+        }
+        await sleep(SUBMIT_RETRY_DELAY_MS * Math.pow(2, retry));
+    }
+}
+
 // Get next word from API
 async function getNextWord() {
     document.getElementById('loading').style.display = 'block';
@@ -572,6 +700,7 @@ async function getNextWord() {
         }
         
         currentWord = data;
+        currentAttemptId = generateAttemptId();
         
         // Fetch definition
         wordDefinition = await getDefinition(data.word);
@@ -615,19 +744,16 @@ async function submitAnswer() {
     document.getElementById('spelling-input').disabled = true;
     
     try {
-        const response = await fetch('/api/submit-answer/', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-CSRFToken': csrftoken,
-            },
-            body: JSON.stringify({
-                word_id: currentWord.word_id,
-                spelling: spelling
-            })
+        const response = await postAnswer({
+            word_id: currentWord.word_id,
+            spelling: spelling,
+            attempt_id: currentAttemptId
         });
         
         const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
         
         // Show feedback
         const feedbackEl = document.getElementById('feedback');
@@ -638,14 +764,14 @@ async function submitAnswer() {
             
             // Check if word is mastered or needs more attempts
             if (data.word_correct_count >= data.word_mastery_required) {
-                feedbackEl.innerHTML = `✅ Correct! The word is "${data.correct_spelling}"<br>🎉 <strong>Word Mastered!</strong>`;
+                feedbackEl.innerHTML = `✅ Correct! The word is "${escapeHtml(data.correct_spelling)}"<br>🎉 <strong>Word Mastered!</strong>`;
             } else if (data.word_mastery_required > 1) {
                 // Word has been misspelled before, needs multiple attempts
                 const attemptsRemaining = data.word_mastery_required - data.word_correct_count;
-                feedbackEl.innerHTML = `✅ Correct! The word is "${data.correct_spelling}"<br>📚 Progress: ${data.word_correct_count}/${data.word_mastery_required} - Need ${attemptsRemaining} more to master!`;
+                feedbackEl.innerHTML = `✅ Correct! The word is "${escapeHtml(data.correct_spelling)}"<br>📚 Progress: ${data.word_correct_count}/${data.word_mastery_required} - Need ${attemptsRemaining} more to master!`;
             } else {
                 // Word never failed, mastered on first attempt
-                feedbackEl.innerHTML = `✅ Correct! The word is "${data.correct_spelling}"<br>🎉 <strong>Word Mastered!</strong>`;
+                feedbackEl.innerHTML = `✅ Correct! The word is "${escapeHtml(data.correct_spelling)}"<br>🎉 <strong>Word Mastered!</strong>`;
             }
             
             // Update stats
@@ -656,19 +782,11 @@ async function submitAnswer() {
             
             // Update bucket progress widget
             if (data.words_mastered !== undefined && data.words_to_complete !== undefined) {
-                updateBucketProgress(
-                    data.words_mastered, 
-                    data.words_to_complete,
-                    data.words_need_1,
-                    data.words_need_2,
-                    data.words_need_3
-                );
+                updateBucketProgress(data.words_mastered, data.words_to_complete);
             }
             
-            // Update leaderboard if data is present
-            if (data.leaderboard) {
-                updateLeaderboard(data.leaderboard);
-            }
+            // Words-in-progress breakdown and leaderboard are computed in the background
+            refreshGameStatus(data.status_version);
             
             // Check if game is complete
             if (data.game_complete) {
@@ -692,7 +810,14 @@ async function submitAnswer() {
             
         } else {
             feedbackEl.className = 'feedback incorrect';
-            feedbackEl.innerHTML = `❌ Incorrect. You spelled: "${spelling}"<br>Correct spelling: "${data.correct_spelling}"`;
+            const spelled = data.diff ? renderSpellingDiff(data.diff) : escapeHtml(spelling);
+            let closeness = '';
+            if (data.distance === 1) {
+                closeness = '<br>So close - just one letter off!';
+            } else if (data.distance === 2) {
+                closeness = '<br>Close - two letters off.';
+            }
+            feedbackEl.innerHTML = `❌ Incorrect. You spelled: "<span class="spelling-diff">${spelled}</span>"<br>Correct spelling: "${escapeHtml(data.correct_spelling)}"${closeness}`;
             
             // Update stats
             document.getElementById('session-correct').textContent = data.session_correct;
@@ -702,19 +827,11 @@ async function submitAnswer() {
             
             // Update bucket progress widget (even on incorrect, attempts count)
             if (data.words_mastered !== undefined && data.words_to_complete !== undefined) {
-                updateBucketProgress(
-                    data.words_mastered, 
-                    data.words_to_complete,
-                    data.words_need_1,
-                    data.words_need_2,
-                    data.words_need_3
-                );
+                updateBucketProgress(data.words_mastered, data.words_to_complete);
             }
             
-            // Update leaderboard if data is present
-            if (data.leaderboard) {
-                updateLeaderboard(data.leaderboard);
-            }
+            // Words-in-progress breakdown and leaderboard are computed in the background
+            refreshGameStatus(data.status_version);
             
             // Check if game is complete (unlikely on incorrect answer, but possible)
             if (data.game_complete) {
@@ -743,6 +860,33 @@ async function submitAnswer() {
     }
 }
 
+// Fetch the progress widget data computed after an answer.
+// Runs after the answer feedback is already on screen, so it never delays typing.
+async function refreshGameStatus(version) {
+    try {
+        // The leaderboard comes from the live stream when it's connected
+        const leaderboardParam = leaderboardStreamActive ? '' : '&leaderboard=1';
+        const response = await fetch(`/api/game-status/?version=${version || 0}${leaderboardParam}`);
+        if (!response.ok) return;
+        const status = await response.json();
+        
+        updateBucketProgress(
+            status.words_mastered,
+            status.words_to_complete,
+            status.words_need_1,
+            status.words_need_2,
+            status.words_need_3
+        );
+        
+        if (status.leaderboard) {
+            updateLeaderboard(status.leaderboard);
+        }
+    } catch (error) {
+        // Not critical - the widgets will catch up after the next answer
+        console.error('Error refreshing game status:', error);
+    }
+}
+
 // Show definition
 function showDefinition() {
     const definitionBox = document.getElementById('definition-box');
@@ -866,6 +1010,9 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+    // Live leaderboard updates
+    startLeaderboardStream();
+    
     // Load first word
     getNextWord();
 });